@@ -9,16 +9,16 @@
 
 import json
 import logging
-import sqlite3
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from datetime import datetime
-import uuid
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 
+from rag_core import Retriever, SQLiteStore
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,6 +28,7 @@
 class RAGConfig(BaseModel):
     base_port: int = 8097
     max_documents: int = 1000
+    db_path: str = "rag_system.db"
 
     # Main categories with display names and subcategories
     categories: Dict[str, Dict[str, Any]] = {
@@ -324,243 +325,6 @@ class RAGCategory(BaseModel):
     subcategories: Dict[str, Any]
 
 
-# Database setup
-def init_database():
-    """Initialize SQLite database for advanced RAG system"""
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    # Create documents table with hierarchical structure
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS documents (
-            id TEXT PRIMARY KEY,
-            title TEXT NOT NULL,
-            content TEXT NOT NULL,
-            category TEXT NOT NULL,
-            subcategory TEXT NOT NULL,
-            item TEXT NOT NULL,
-            source TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            metadata TEXT NOT NULL
-        )
-    """
-    )
-
-    # Create categories table
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS categories (
-            name TEXT PRIMARY KEY,
-            display_name TEXT NOT NULL,
-            description TEXT NOT NULL,
-            document_count INTEGER DEFAULT 0,
-            last_updated TEXT NOT NULL,
-            subcategories TEXT NOT NULL
-        )
-    """
-    )
-
-    # Insert categories with hierarchical structure
-    for category_key, category_data in config.categories.items():
-        cursor.execute(
-            """
-            INSERT OR IGNORE INTO categories (name, display_name, description, document_count, last_updated, subcategories)
-            VALUES (?, ?, ?, 0, ?, ?)
-        """,
-            (
-                category_key,
-                category_data["display_name"],
-                category_data["description"],
-                datetime.now().isoformat(),
-                json.dumps(category_data["subcategories"]),
-            ),
-        )
-
-    conn.commit()
-    conn.close()
-    logger.info("✅ Advanced RAG database initialized with hierarchical structure")
-
-
-# Initialize database
-init_database()
-
-# FastAPI app
-app = FastAPI(
-    title="CoolBits.ai Advanced RAG Categories System",
-    description="Hierarchical RAG system with main categories and detailed subcategories",
-    version="2.0.0",
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:8098", "http://127.0.0.1:8098", "*"],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-)
-
-# Global storage
-documents: Dict[str, Document] = {}
-categories: Dict[str, RAGCategory] = {}
-
-
-def load_documents_from_db():
-    """Load documents from database"""
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM documents")
-    rows = cursor.fetchall()
-
-    for row in rows:
-        doc = Document(
-            id=row[0],
-            title=row[1],
-            content=row[2],
-            category=row[3],
-            subcategory=row[4],
-            item=row[5],
-            source=row[6],
-            created_at=row[7],
-            metadata=json.loads(row[8]),
-        )
-        documents[doc.id] = doc
-
-    conn.close()
-    logger.info(f"✅ Loaded {len(documents)} documents from database")
-
-
-def load_categories_from_db():
-    """Load categories from database"""
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM categories")
-    rows = cursor.fetchall()
-
-    for row in rows:
-        cat = RAGCategory(
-            name=row[0],
-            display_name=row[1],
-            description=row[2],
-            document_count=row[3],
-            last_updated=row[4],
-            subcategories=json.loads(row[5]),
-        )
-        categories[cat.name] = cat
-
-    conn.close()
-    logger.info(f"✅ Loaded {len(categories)} categories from database")
-
-
-# Load data on startup
-load_documents_from_db()
-load_categories_from_db()
-
-
-# API Endpoints
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    return {
-        "service": "CoolBits.ai Advanced RAG Categories System",
-        "version": "2.0.0",
-        "status": "healthy",
-        "total_documents": len(documents),
-        "total_categories": len(categories),
-        "categories": {cat.name: cat.display_name for cat in categories.values()},
-    }
-
-
-@app.get("/health")
-async def health():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "CoolBits.ai Advanced RAG Categories System",
-        "version": "2.0.0",
-        "total_documents": len(documents),
-        "total_categories": len(categories),
-        "timestamp": datetime.now().isoformat(),
-    }
-
-
-@app.options("/api/documents/upload")
-async def options_upload():
-    """Handle preflight requests for document upload"""
-    return {"status": "ok"}
-
-
-@app.options("/api/documents")
-async def options_documents():
-    """Handle preflight requests for documents"""
-    return {"status": "ok"}
-
-
-@app.options("/api/categories")
-async def options_categories():
-    """Handle preflight requests for categories"""
-    return {"status": "ok"}
-
-
-@app.get("/api/categories")
-async def get_categories():
-    """Get all RAG categories with hierarchical structure"""
-    return {
-        "categories": list(categories.values()),
-        "total_categories": len(categories),
-        "hierarchical_structure": config.categories,
-    }
-
-
-@app.get("/api/categories/{category_name}")
-async def get_category(category_name: str):
-    """Get specific category with documents and subcategories"""
-    if category_name not in categories:
-        raise HTTPException(
-            status_code=404, detail=f"Category {category_name} not found"
-        )
-
-    category_docs = [doc for doc in documents.values() if doc.category == category_name]
-
-    return {
-        "category": categories[category_name],
-        "documents": category_docs,
-        "document_count": len(category_docs),
-        "subcategories": categories[category_name].subcategories,
-    }
-
-
-@app.get("/api/categories/{category_name}/{subcategory_name}")
-async def get_subcategory(category_name: str, subcategory_name: str):
-    """Get specific subcategory with documents"""
-    if category_name not in categories:
-        raise HTTPException(
-            status_code=404, detail=f"Category {category_name} not found"
-        )
-
-    if subcategory_name not in categories[category_name].subcategories:
-        raise HTTPException(
-            status_code=404, detail=f"Subcategory {subcategory_name} not found"
-        )
-
-    subcategory_docs = [
-        doc
-        for doc in documents.values()
-        if doc.category == category_name and doc.subcategory == subcategory_name
-    ]
-
-    return {
-        "category": category_name,
-        "subcategory": subcategory_name,
-        "subcategory_info": categories[category_name].subcategories[subcategory_name],
-        "documents": subcategory_docs,
-        "document_count": len(subcategory_docs),
-    }
-
-
 class DocumentCreate(BaseModel):
     title: str
     content: str
@@ -579,336 +343,364 @@ class TrainingDiscussion(BaseModel):
     item: str = "general"
 
 
-@app.post("/api/documents")
-async def create_document(doc_data: DocumentCreate):
-    """Create a new document with hierarchical structure"""
-    if doc_data.category not in categories:
-        raise HTTPException(
-            status_code=400, detail=f"Category {doc_data.category} not found"
-        )
-
-    if doc_data.subcategory not in categories[doc_data.category].subcategories:
-        raise HTTPException(
-            status_code=400, detail=f"Subcategory {doc_data.subcategory} not found"
-        )
+# Storage: shared rag_core store, filters pushed into indexed SQL
+store = SQLiteStore(config.db_path)
+retriever = Retriever(store)
 
-    doc_id = str(uuid.uuid4())
-    doc = Document(
-        id=doc_id,
-        title=doc_data.title,
-        content=doc_data.content,
-        category=doc_data.category,
-        subcategory=doc_data.subcategory,
-        item=doc_data.item,
-        source=doc_data.source,
-        created_at=datetime.now().isoformat(),
-        metadata=json.loads(doc_data.metadata),
-    )
 
-    # Save to database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO documents (id, title, content, category, subcategory, item, source, created_at, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            doc.id,
-            doc.title,
-            doc.content,
-            doc.category,
-            doc.subcategory,
-            doc.item,
-            doc.source,
-            doc.created_at,
-            json.dumps(doc.metadata),
-        ),
-    )
+def init_categories():
+    """Register the hierarchical categories (existing rows are kept)"""
+    for category_key, category_data in config.categories.items():
+        store.upsert_collection(
+            category_key,
+            "category",
+            category_data["display_name"],
+            category_data["description"],
+            {
+                "display_name": category_data["display_name"],
+                "subcategories": category_data["subcategories"],
+            },
+            overwrite=False,
+        )
+    logger.info("✅ Advanced RAG categories registered with hierarchical structure")
 
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count + 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), doc_data.category),
-    )
 
-    conn.commit()
-    conn.close()
+init_categories()
 
-    documents[doc_id] = doc
-    categories[doc_data.category].document_count += 1
-    categories[doc_data.category].last_updated = datetime.now().isoformat()
 
-    logger.info(
-        f"✅ Created document {doc_id} in {doc_data.category}/{doc_data.subcategory}/{doc_data.item}"
+def to_document(row: Dict[str, Any]) -> Document:
+    return Document(
+        id=row["id"],
+        title=row["title"],
+        content=row["content"],
+        category=row["category"] or "",
+        subcategory=row["subcategory"] or "",
+        item=row["item"] or "",
+        source=row["source"] or "",
+        created_at=row["created_at"],
+        metadata=row["metadata"],
     )
 
-    return {"document": doc, "status": "created"}
 
+def load_categories() -> Dict[str, RAGCategory]:
+    """Categories with live document counts (one GROUP BY)"""
+    stats = store.summary_by("category")
+    categories = {}
+    for collection in store.collections(kind="category"):
+        summary = stats.get(collection["id"], {})
+        categories[collection["id"]] = RAGCategory(
+            name=collection["id"],
+            display_name=collection["config"].get("display_name", collection["name"]),
+            description=collection["description"] or "",
+            document_count=summary.get("count", 0),
+            last_updated=summary.get("last_updated") or collection["created_at"],
+            subcategories=collection["config"].get("subcategories", {}),
+        )
+    return categories
 
-@app.post("/api/documents/upload")
-async def upload_document(
-    file: UploadFile = File(...),
-    category: str = "b-rag",
-    subcategory: str = "business_tools",
-    item: str = "general",
-    title: str = None,
-):
-    """Upload a document file with hierarchical structure"""
-    if category not in categories:
-        raise HTTPException(status_code=400, detail=f"Category {category} not found")
 
-    if subcategory not in categories[category].subcategories:
+def require_subcategory(category: str, subcategory: str, status_code: int = 400):
+    collection = store.collection(category)
+    if not collection or collection["kind"] != "category":
+        raise HTTPException(status_code=status_code, detail=f"Category {category} not found")
+    subcategories = collection["config"].get("subcategories", {})
+    if subcategory not in subcategories:
         raise HTTPException(
-            status_code=400, detail=f"Subcategory {subcategory} not found"
+            status_code=status_code, detail=f"Subcategory {subcategory} not found"
         )
+    return subcategories[subcategory]
 
-    content = await file.read()
-    content_str = content.decode("utf-8")
 
-    if not title:
-        title = (
-            file.filename or f"Document {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        )
+def save_document(**fields) -> Document:
+    doc_id = retriever.add(fields)
+    return to_document(store.get(doc_id))
 
-    doc_id = str(uuid.uuid4())
-    doc = Document(
-        id=doc_id,
-        title=title,
-        content=content_str,
-        category=category,
-        subcategory=subcategory,
-        item=item,
-        source=f"upload:{file.filename}",
-        created_at=datetime.now().isoformat(),
-        metadata={
-            "filename": file.filename,
-            "file_size": len(content),
-            "upload_time": datetime.now().isoformat(),
-        },
-    )
 
-    # Save to database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO documents (id, title, content, category, subcategory, item, source, created_at, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            doc.id,
-            doc.title,
-            doc.content,
-            doc.category,
-            doc.subcategory,
-            doc.item,
-            doc.source,
-            doc.created_at,
-            json.dumps(doc.metadata),
-        ),
-    )
+def create_app(
+    title: str,
+    description: str,
+    upload_defaults: Tuple[str, str, str] = ("b-rag", "business_tools", "general"),
+) -> FastAPI:
+    """Category RAG API over the shared store"""
+    app = FastAPI(title=title, description=description, version="2.0.0")
 
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count + 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), category),
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:8098", "http://127.0.0.1:8098", "*"],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
     )
 
-    conn.commit()
-    conn.close()
-
-    documents[doc_id] = doc
-    categories[category].document_count += 1
-    categories[category].last_updated = datetime.now().isoformat()
-
-    logger.info(f"✅ Uploaded document {doc_id} to {category}/{subcategory}/{item}")
-
-    return {"document": doc, "status": "uploaded"}
-
-
-@app.get("/api/documents")
-async def get_documents(
-    category: str = None, subcategory: str = None, item: str = None, limit: int = 100
-):
-    """Get documents with optional filtering by category, subcategory, or item"""
-    docs = list(documents.values())
-
-    if category:
-        docs = [doc for doc in docs if doc.category == category]
-    if subcategory:
-        docs = [doc for doc in docs if doc.subcategory == subcategory]
-    if item:
-        docs = [doc for doc in docs if doc.item == item]
-
-    docs = docs[:limit]
-
-    return {
-        "documents": docs,
-        "total_documents": len(docs),
-        "filters": {"category": category, "subcategory": subcategory, "item": item},
-    }
-
-
-@app.get("/api/documents/{doc_id}")
-async def get_document(doc_id: str):
-    """Get specific document"""
-    if doc_id not in documents:
-        raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
-
-    return {"document": documents[doc_id]}
-
-
-@app.delete("/api/documents/{doc_id}")
-async def delete_document(doc_id: str):
-    """Delete a document"""
-    if doc_id not in documents:
-        raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
-
-    doc = documents[doc_id]
-    category = doc.category
-
-    # Remove from database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count - 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), category),
-    )
-
-    conn.commit()
-    conn.close()
+    @app.get("/")
+    async def root():
+        """Root endpoint"""
+        categories = load_categories()
+        return {
+            "service": title,
+            "version": "2.0.0",
+            "status": "healthy",
+            "total_documents": store.count(),
+            "total_categories": len(categories),
+            "categories": {cat.name: cat.display_name for cat in categories.values()},
+        }
+
+    @app.get("/health")
+    async def health():
+        """Health check endpoint"""
+        return {
+            "status": "healthy",
+            "service": title,
+            "version": "2.0.0",
+            "total_documents": store.count(),
+            "total_categories": len(store.collections(kind="category")),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    @app.options("/api/documents/upload")
+    async def options_upload():
+        """Handle preflight requests for document upload"""
+        return {"status": "ok"}
+
+    @app.options("/api/documents")
+    async def options_documents():
+        """Handle preflight requests for documents"""
+        return {"status": "ok"}
+
+    @app.options("/api/categories")
+    async def options_categories():
+        """Handle preflight requests for categories"""
+        return {"status": "ok"}
+
+    @app.get("/api/categories")
+    async def get_categories():
+        """Get all RAG categories with hierarchical structure"""
+        categories = load_categories()
+        return {
+            "categories": list(categories.values()),
+            "total_categories": len(categories),
+            "hierarchical_structure": config.categories,
+        }
+
+    @app.get("/api/categories/{category_name}")
+    async def get_category(category_name: str, limit: int = 100, offset: int = 0):
+        """Get specific category with documents and subcategories"""
+        categories = load_categories()
+        if category_name not in categories:
+            raise HTTPException(
+                status_code=404, detail=f"Category {category_name} not found"
+            )
+
+        filters = {"category": category_name}
+        category_docs = store.find(filters, limit=limit, offset=offset)
+
+        return {
+            "category": categories[category_name],
+            "documents": [to_document(row) for row in category_docs],
+            "document_count": categories[category_name].document_count,
+            "subcategories": categories[category_name].subcategories,
+        }
+
+    @app.get("/api/categories/{category_name}/{subcategory_name}")
+    async def get_subcategory(
+        category_name: str, subcategory_name: str, limit: int = 100, offset: int = 0
+    ):
+        """Get specific subcategory with documents"""
+        subcategory_info = require_subcategory(category_name, subcategory_name, 404)
+
+        filters = {"category": category_name, "subcategory": subcategory_name}
+        subcategory_docs = store.find(filters, limit=limit, offset=offset)
+
+        return {
+            "category": category_name,
+            "subcategory": subcategory_name,
+            "subcategory_info": subcategory_info,
+            "documents": [to_document(row) for row in subcategory_docs],
+            "document_count": store.count(filters),
+        }
+
+    @app.post("/api/documents")
+    async def create_document(doc_data: DocumentCreate):
+        """Create a new document with hierarchical structure"""
+        require_subcategory(doc_data.category, doc_data.subcategory)
+
+        doc = save_document(
+            title=doc_data.title,
+            content=doc_data.content,
+            category=doc_data.category,
+            subcategory=doc_data.subcategory,
+            item=doc_data.item,
+            source=doc_data.source,
+            metadata=json.loads(doc_data.metadata),
+        )
 
-    del documents[doc_id]
-    categories[category].document_count -= 1
-    categories[category].last_updated = datetime.now().isoformat()
+        logger.info(
+            f"✅ Created document {doc.id} in {doc_data.category}/{doc_data.subcategory}/{doc_data.item}"
+        )
 
-    logger.info(
-        f"✅ Deleted document {doc_id} from {category}/{doc.subcategory}/{doc.item}"
-    )
+        return {"document": doc, "status": "created"}
 
-    return {"status": "deleted", "document_id": doc_id}
+    @app.post("/api/documents/upload")
+    async def upload_document(
+        file: UploadFile = File(...),
+        category: str = upload_defaults[0],
+        subcategory: str = upload_defaults[1],
+        item: str = upload_defaults[2],
+        title: str = None,
+    ):
+        """Upload a document file with hierarchical structure"""
+        require_subcategory(category, subcategory)
+
+        content = await file.read()
+        content_str = content.decode("utf-8")
+
+        if not title:
+            title = (
+                file.filename
+                or f"Document {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            )
+
+        doc = save_document(
+            title=title,
+            content=content_str,
+            category=category,
+            subcategory=subcategory,
+            item=item,
+            source=f"upload:{file.filename}",
+            metadata={
+                "filename": file.filename,
+                "file_size": len(content),
+                "upload_time": datetime.now().isoformat(),
+            },
+        )
 
+        logger.info(f"✅ Uploaded document {doc.id} to {category}/{subcategory}/{item}")
 
-# Special endpoint for processing training discussions
-@app.post("/api/process-training-discussion")
-async def process_training_discussion(discussion_data: TrainingDiscussion):
-    """Process a training discussion and save it to RAG"""
-    if discussion_data.category not in categories:
-        raise HTTPException(
-            status_code=400, detail=f"Category {discussion_data.category} not found"
-        )
+        return {"document": doc, "status": "uploaded"}
 
-    if (
-        discussion_data.subcategory
-        not in categories[discussion_data.category].subcategories
+    @app.get("/api/documents")
+    async def get_documents(
+        category: str = None,
+        subcategory: str = None,
+        item: str = None,
+        limit: int = 100,
+        offset: int = 0,
     ):
-        raise HTTPException(
-            status_code=400,
-            detail=f"Subcategory {discussion_data.subcategory} not found",
+        """Get documents with optional filtering by category, subcategory, or item"""
+        filters = {"category": category, "subcategory": subcategory, "item": item}
+        docs = [to_document(row) for row in store.find(filters, limit=limit, offset=offset)]
+
+        return {
+            "documents": docs,
+            "total_documents": len(docs),
+            "filters": filters,
+        }
+
+    @app.get("/api/search")
+    async def search_documents(
+        q: str,
+        category: str = None,
+        subcategory: str = None,
+        item: str = None,
+        limit: int = 10,
+    ):
+        """Full-text search within an optional category/subcategory/item"""
+        filters = {"category": category, "subcategory": subcategory, "item": item}
+        hits = retriever.search(q, k=limit, filters=filters)
+
+        return {
+            "query": q,
+            "results": [
+                {"document": to_document(hit), "score": hit["score"]} for hit in hits
+            ],
+            "total_results": len(hits),
+            "filters": filters,
+        }
+
+    @app.get("/api/documents/{doc_id}")
+    async def get_document(doc_id: str):
+        """Get specific document"""
+        row = store.get(doc_id)
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
+
+        return {"document": to_document(row)}
+
+    @app.delete("/api/documents/{doc_id}")
+    async def delete_document(doc_id: str):
+        """Delete a document"""
+        row = store.get(doc_id)
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
+
+        retriever.delete(doc_id)
+
+        logger.info(
+            f"✅ Deleted document {doc_id} from {row['category']}/{row['subcategory']}/{row['item']}"
         )
 
-    # Extract key information from discussion
-    lines = discussion_data.discussion_content.strip().split("\n")
-
-    # Find discussion topic
-    topic = "Unknown Topic"
-    for line in lines:
-        if "DISCUSSION TOPIC:" in line:
-            topic = line.split("DISCUSSION TOPIC:")[-1].strip()
-            break
-
-    # Extract participants
-    participants = []
-    for line in lines:
-        if (
-            line.strip()
-            and not line.startswith("Characters:")
-            and not line.startswith("System")
-        ):
-            if ":" in line and any(
-                role in line for role in ["CEO", "CTO", "CFO", "COO"]
+        return {"status": "deleted", "document_id": doc_id}
+
+    # Special endpoint for processing training discussions
+    @app.post("/api/process-training-discussion")
+    async def process_training_discussion(discussion_data: TrainingDiscussion):
+        """Process a training discussion and save it to RAG"""
+        require_subcategory(discussion_data.category, discussion_data.subcategory)
+
+        # Extract key information from discussion
+        lines = discussion_data.discussion_content.strip().split("\n")
+
+        # Find discussion topic
+        topic = "Unknown Topic"
+        for line in lines:
+            if "DISCUSSION TOPIC:" in line:
+                topic = line.split("DISCUSSION TOPIC:")[-1].strip()
+                break
+
+        # Extract participants
+        participants = []
+        for line in lines:
+            if (
+                line.strip()
+                and not line.startswith("Characters:")
+                and not line.startswith("System")
             ):
-                participants.append(line.strip())
-
-    # Create document
-    doc_id = str(uuid.uuid4())
-    doc = Document(
-        id=doc_id,
-        title=f"{discussion_data.session_title} - {topic}",
-        content=discussion_data.discussion_content,
-        category=discussion_data.category,
-        subcategory=discussion_data.subcategory,
-        item=discussion_data.item,
-        source="training-discussion",
-        created_at=datetime.now().isoformat(),
-        metadata={
-            "session_title": discussion_data.session_title,
-            "topic": topic,
-            "participants": participants,
-            "total_lines": len(lines),
-            "processed_at": datetime.now().isoformat(),
-        },
-    )
-
-    # Save to database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO documents (id, title, content, category, subcategory, item, source, created_at, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            doc.id,
-            doc.title,
-            doc.content,
-            doc.category,
-            doc.subcategory,
-            doc.item,
-            doc.source,
-            doc.created_at,
-            json.dumps(doc.metadata),
-        ),
-    )
+                if ":" in line and any(
+                    role in line for role in ["CEO", "CTO", "CFO", "COO"]
+                ):
+                    participants.append(line.strip())
+
+        doc = save_document(
+            title=f"{discussion_data.session_title} - {topic}",
+            content=discussion_data.discussion_content,
+            category=discussion_data.category,
+            subcategory=discussion_data.subcategory,
+            item=discussion_data.item,
+            source="training-discussion",
+            metadata={
+                "session_title": discussion_data.session_title,
+                "topic": topic,
+                "participants": participants,
+                "total_lines": len(lines),
+                "processed_at": datetime.now().isoformat(),
+            },
+        )
 
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count + 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), discussion_data.category),
-    )
+        logger.info(
+            f"✅ Processed training discussion {doc.id} in {discussion_data.category}/{discussion_data.subcategory}/{discussion_data.item}"
+        )
 
-    conn.commit()
-    conn.close()
+        return {"document": doc, "status": "processed", "metadata": doc.metadata}
 
-    documents[doc_id] = doc
-    categories[discussion_data.category].document_count += 1
-    categories[discussion_data.category].last_updated = datetime.now().isoformat()
+    return app
 
-    logger.info(
-        f"✅ Processed training discussion {doc_id} in {discussion_data.category}/{discussion_data.subcategory}/{discussion_data.item}"
-    )
 
-    return {"document": doc, "status": "processed", "metadata": doc.metadata}
+# FastAPI app
+app = create_app(
+    title="CoolBits.ai Advanced RAG Categories System",
+    description="Hierarchical RAG system with main categories and detailed subcategories",
+)
 
 
 if __name__ == "__main__":
@@ -5,21 +5,35 @@
 """
 
 import asyncio
-import sqlite3
 import logging
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Awaitable, Callable, Dict, List, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
 import hashlib
 
 # Import RAG system
 from andy_kim_local_rag import local_rag_system, RAGAgent, RAGQuery
+from andy_sqlite import AsyncSQLite
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SELECT_EXACT_RESPONSE = """
+    SELECT response, confidence FROM local_responses
+    WHERE prompt_hash = ?
+"""
+SELECT_PARTIAL_RESPONSES = """
+    SELECT response, confidence FROM local_responses
+    WHERE prompt LIKE ? OR prompt LIKE ?
+"""
+INSERT_PROCESSING_LOG = """
+    INSERT INTO processing_logs
+    (session_id, user_id, prompt, processing_level, confidence_score, response_time_ms)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
 
 class ProcessingLevel(Enum):
     """Processing levels for Andy Auto Engine"""
@@ -61,7 +75,14 @@ def __init__(self):
 
     def init_database(self):
         """Initialize local database for Level 1 processing"""
-        conn = sqlite3.connect(self.db_path)
+        self.db = AsyncSQLite(self.db_path)
+        self.db.call(self._create_tables)
+
+        # Initialize default responses
+        self.init_default_responses()
+
+    @staticmethod
+    def _create_tables(conn):
         cursor = conn.cursor()
 
         # Create tables
@@ -109,10 +130,6 @@ def init_database(self):
         )
 
         conn.commit()
-        conn.close()
-
-        # Initialize default responses
-        self.init_default_responses()
 
     def init_default_responses(self):
         """Initialize default responses for Level 1"""
@@ -149,33 +166,42 @@ def init_default_responses(self):
             },
         ]
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        rows = [
+            (
+                hashlib.md5(response["prompt"].lower().encode()).hexdigest(),
+                response["prompt"],
+                response["response"],
+                response["category"],
+                response["confidence"],
+            )
+            for response in default_responses
+        ]
 
-        for response in default_responses:
-            prompt_hash = hashlib.md5(response["prompt"].lower().encode()).hexdigest()
-            cursor.execute(
+        def _insert(conn):
+            conn.executemany(
                 """
-                INSERT OR IGNORE INTO local_responses 
+                INSERT OR IGNORE INTO local_responses
                 (prompt_hash, prompt, response, category, confidence)
                 VALUES (?, ?, ?, ?, ?)
             """,
-                (
-                    prompt_hash,
-                    response["prompt"],
-                    response["response"],
-                    response["category"],
-                    response["confidence"],
-                ),
+                rows,
             )
+            conn.commit()
 
-        conn.commit()
-        conn.close()
+        self.db.call(_insert)
 
     async def process_prompt(
-        self, user_id: str, session_id: str, prompt: str
+        self,
+        user_id: str,
+        session_id: str,
+        prompt: str,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> AutoContext:
-        """Main processing function - Auto determines the best level"""
+        """Main processing function - Auto determines the best level
+
+        ``on_delta`` receives the level response as soon as it exists,
+        before confidence scoring and logging finish.
+        """
         start_time = datetime.now()
 
         # Auto decision making
@@ -189,6 +215,9 @@ async def process_prompt(
         else:
             response = await self.level_3_kim_reasoning(prompt)
 
+        if on_delta:
+            await on_delta(response)
+
         # Calculate confidence score
         confidence_score = await self.calculate_confidence(
             prompt, response, processing_level
@@ -324,42 +353,23 @@ async def level_1_local_db(self, prompt: str) -> str:
             logger.error(f"RAG query failed: {e}")
 
         # Fallback to original local database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         # Try exact match first
         prompt_hash = hashlib.md5(prompt.lower().encode()).hexdigest()
-        cursor.execute(
-            """
-            SELECT response, confidence FROM local_responses 
-            WHERE prompt_hash = ?
-        """,
-            (prompt_hash,),
-        )
-
-        result = cursor.fetchone()
+        result = await self.db.fetchone(SELECT_EXACT_RESPONSE, (prompt_hash,))
         if result:
-            conn.close()
             return result[0]
 
         # Try partial match
-        cursor.execute(
-            """
-            SELECT response, confidence FROM local_responses 
-            WHERE prompt LIKE ? OR prompt LIKE ?
-        """,
+        results = await self.db.fetchall(
+            SELECT_PARTIAL_RESPONSES,
             (f"%{prompt.lower()}%", f"%{prompt.lower().split()[0]}%"),
         )
-
-        results = cursor.fetchall()
         if results:
             # Return highest confidence response
             best_response = max(results, key=lambda x: x[1])
-            conn.close()
             return best_response[0]
 
         # Default response
-        conn.close()
         return "I understand your question. Let me process this through our local knowledge base and get back to you with a more detailed response."
 
     async def level_2_local_model(self, prompt: str) -> str:
@@ -493,16 +503,9 @@ async def calculate_confidence(
         return base_confidence.get(level, 0.70)
 
     async def log_processing(self, context: AutoContext):
-        """Log processing information"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT INTO processing_logs 
-            (session_id, user_id, prompt, processing_level, confidence_score, response_time_ms)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
+        """Log processing information (batched; see AsyncSQLite.enqueue)"""
+        self.db.enqueue(
+            INSERT_PROCESSING_LOG,
             (
                 context.session_id,
                 context.user_id,
@@ -513,9 +516,6 @@ async def log_processing(self, context: AutoContext):
             ),
         )
 
-        conn.commit()
-        conn.close()
-
     async def get_processing_stats(self) -> Dict[str, Any]:
         """Get processing statistics"""
         self.processing_stats["total_requests"] = (
@@ -530,10 +530,7 @@ async def add_knowledge(
         self, topic: str, content: str, source: str, relevance_score: float = 0.8
     ):
         """Add knowledge to local database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
+        await self.db.execute(
             """
             INSERT INTO knowledge_base (topic, content, source, relevance_score)
             VALUES (?, ?, ?, ?)
@@ -541,15 +538,9 @@ async def add_knowledge(
             (topic, content, source, relevance_score),
         )
 
-        conn.commit()
-        conn.close()
-
     async def search_knowledge(self, query: str) -> List[Dict[str, Any]]:
         """Search local knowledge base"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
+        results = await self.db.fetchall(
             """
             SELECT topic, content, source, relevance_score FROM knowledge_base
             WHERE topic LIKE ? OR content LIKE ?
@@ -558,9 +549,6 @@ async def search_knowledge(self, query: str) -> List[Dict[str, Any]]:
             (f"%{query}%", f"%{query}%"),
         )
 
-        results = cursor.fetchall()
-        conn.close()
-
         return [
             {
                 "topic": row[0],
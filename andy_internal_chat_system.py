@@ -6,7 +6,7 @@
 """
 
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Awaitable, Callable, Dict, List, Any, Optional
 import uuid
 
 # Import our internal systems
@@ -248,9 +248,15 @@ def __init__(self):
         }
 
     async def process_message(
-        self, session_id: str, message: AndyChatMessage
+        self,
+        session_id: str,
+        message: AndyChatMessage,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> AndyChatMessage:
-        """Process incoming message through chat system"""
+        """Process incoming message through chat system
+
+        ``on_delta`` receives response text pieces as they are produced.
+        """
         # Get or create session
         if session_id not in self.sessions:
             self.sessions[session_id] = AndyChatSession(session_id)
@@ -267,7 +273,9 @@ async def process_message(
         )
 
         # Generate Andy's response
-        andy_response = await self._generate_andy_response(message, rag_result, session)
+        andy_response = await self._generate_andy_response(
+            message, rag_result, session, on_delta
+        )
 
         # Add Andy's response to session
         session.add_message(andy_response)
@@ -284,6 +292,7 @@ async def _generate_andy_response(
         user_message: AndyChatMessage,
         rag_result: Dict[str, Any],
         session: AndyChatSession,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> AndyChatMessage:
         """Generate Andy's response"""
         # Use core engine for processing
@@ -301,10 +310,15 @@ async def _generate_andy_response(
             response_content = core_result["result"]["response"]
         else:
             response_content = "I'm processing your message. Let me get back to you with a proper response."
+        if on_delta:
+            await on_delta(response_content)
 
         # Add RAG context if available
         if rag_result["total_found"] > 0:
-            response_content += f"\n\nI found {rag_result['total_found']} relevant pieces of information in my knowledge base."
+            rag_note = f"\n\nI found {rag_result['total_found']} relevant pieces of information in my knowledge base."
+            response_content += rag_note
+            if on_delta:
+                await on_delta(rag_note)
 
         # Create Andy's response message
         andy_response = AndyChatMessage(
@@ -6,22 +6,46 @@
 
 import asyncio
 import json
-import sqlite3
 import logging
 import hashlib
 import os
+import zlib
 import numpy as np
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-import pickle
 import re
 
+from andy_sqlite import AsyncSQLite
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+INSERT_DOCUMENT = """
+    INSERT OR REPLACE INTO rag_documents
+    (id, content, metadata, agent, embedding, updated_at)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+INSERT_CATEGORY = """
+    INSERT OR IGNORE INTO knowledge_categories (category, agent)
+    VALUES (?, ?)
+"""
+INSERT_QUERY_LOG = """
+    INSERT INTO rag_queries
+    (query, agent, context, results_count, processing_time_ms)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+EMBEDDING_DIM = 128
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> frozenset:
+    """Lowercased word set used by the lexical relevance score"""
+    return frozenset(_TOKEN_RE.findall(text.lower()))
+
 
 class RAGAgent(Enum):
     """RAG Agents"""
@@ -64,21 +88,74 @@ class RAGResult:
     context: Dict[str, Any]
 
 
+@dataclass
+class AgentIndex:
+    """In-memory embedding matrix for one agent, kept in sync with rag_documents"""
+
+    matrix: np.ndarray = field(
+        default_factory=lambda: np.zeros((16, EMBEDDING_DIM), dtype=np.float32)
+    )
+    ids: List[str] = field(default_factory=list)
+    contents: List[str] = field(default_factory=list)
+    metadata: List[Dict[str, Any]] = field(default_factory=list)
+    tokens: List[frozenset] = field(default_factory=list)
+    rows: Dict[str, int] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self.matrix[: len(self.ids)]
+
+    def upsert(
+        self,
+        doc_id: str,
+        content: str,
+        metadata: Dict[str, Any],
+        embedding: np.ndarray,
+    ):
+        """Insert or replace one row (embedding must already be normalized)"""
+        row = self.rows.get(doc_id)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self.matrix):
+                # amortized growth: double the preallocated matrix
+                grown = np.zeros((2 * len(self.matrix), EMBEDDING_DIM), dtype=np.float32)
+                grown[:row] = self.matrix[:row]
+                self.matrix = grown
+            self.rows[doc_id] = row
+            self.ids.append(doc_id)
+            self.contents.append(content)
+            self.metadata.append(metadata)
+            self.tokens.append(tokenize(content))
+        else:
+            self.contents[row] = content
+            self.metadata[row] = metadata
+            self.tokens[row] = tokenize(content)
+        self.matrix[row] = embedding
+
+
 class LocalRAGSystem:
     """Local RAG System for Andy and Kim"""
 
     def __init__(self):
         self.db_path = "andy_kim_rag.db"
-        self.embeddings_path = "rag_embeddings.pkl"
         self.knowledge_base_path = "knowledge_base/"
-        self.embeddings_cache = {}
+        self.indexes: Dict[RAGAgent, AgentIndex] = {
+            agent: AgentIndex() for agent in RAGAgent
+        }
         self.init_database()
-        self.init_knowledge_base()
         self.load_embeddings()
+        self.init_knowledge_base()
 
     def init_database(self):
         """Initialize RAG database"""
-        conn = sqlite3.connect(self.db_path)
+        self.db = AsyncSQLite(self.db_path)
+        self.db.call(self._create_tables)
+
+    @staticmethod
+    def _create_tables(conn):
         cursor = conn.cursor()
 
         # Create documents table
@@ -125,7 +202,6 @@ def init_database(self):
         )
 
         conn.commit()
-        conn.close()
 
     def init_knowledge_base(self):
         """Initialize knowledge base directories"""
@@ -212,39 +288,49 @@ def add_document(
         # Generate embedding
         embedding = self.generate_embedding(content)
 
-        conn = sqlite3.connect(self.db_path)
+        params = (doc_id, content, metadata, agent, category, embedding)
+        self.db.call(self._write_document, *params)
+        self._index_document(*params)
+
+    async def add_document_async(
+        self,
+        content: str,
+        metadata: Dict[str, Any],
+        agent: RAGAgent,
+        category: str = "general",
+    ):
+        """Add document to RAG system without blocking the event loop"""
+        doc_id = hashlib.md5(f"{content}_{agent.value}_{category}".encode()).hexdigest()
+        embedding = self.generate_embedding(content)
+
+        params = (doc_id, content, metadata, agent, category, embedding)
+        await self.db.run(self._write_document, *params)
+        self._index_document(*params)
+
+    @staticmethod
+    def _write_document(conn, doc_id, content, metadata, agent, category, embedding):
         cursor = conn.cursor()
 
         # Add document
         cursor.execute(
-            """
-            INSERT OR REPLACE INTO rag_documents 
-            (id, content, metadata, agent, embedding, updated_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """,
+            INSERT_DOCUMENT,
             (
                 doc_id,
                 content,
                 json.dumps(metadata),
                 agent.value,
-                pickle.dumps(embedding),
+                embedding.tobytes(),
             ),
         )
 
         # Add category if not exists
-        cursor.execute(
-            """
-            INSERT OR IGNORE INTO knowledge_categories (category, agent)
-            VALUES (?, ?)
-        """,
-            (category, agent.value),
-        )
+        cursor.execute(INSERT_CATEGORY, (category, agent.value))
 
         conn.commit()
-        conn.close()
 
-        # Update embeddings cache
-        self.embeddings_cache[doc_id] = embedding
+    def _index_document(self, doc_id, content, metadata, agent, category, embedding):
+        # Keep the agent's embedding matrix in sync
+        self.indexes[agent].upsert(doc_id, content, metadata, embedding)
 
         logger.info(f"Added document to {agent.value} RAG system: {category}")
 
@@ -257,40 +343,50 @@ def generate_embedding(self, text: str) -> np.ndarray:
         text = re.sub(r"[^\w\s]", "", text.lower())
         words = text.split()
 
-        # Create simple embedding vector
-        embedding = np.zeros(128)  # 128-dimensional embedding
-
-        for i, word in enumerate(words):
-            word_hash = hash(word) % 128
-            embedding[word_hash] += 1.0 / len(words)
+        # Create simple embedding vector; crc32 keeps buckets stable across
+        # processes (str hash() is salted per run), so stored rows stay valid
+        buckets = [zlib.crc32(word.encode()) % EMBEDDING_DIM for word in words]
+        embedding = np.bincount(buckets, minlength=EMBEDDING_DIM).astype(np.float32)
 
         # Normalize
         norm = np.linalg.norm(embedding)
         if norm > 0:
-            embedding = embedding / norm
+            embedding /= norm
 
         return embedding
 
     def load_embeddings(self):
-        """Load embeddings from cache"""
-        if os.path.exists(self.embeddings_path):
-            try:
-                with open(self.embeddings_path, "rb") as f:
-                    self.embeddings_cache = pickle.load(f)
-                logger.info(
-                    f"Loaded {len(self.embeddings_cache)} embeddings from cache"
-                )
-            except Exception as e:
-                logger.error(f"Failed to load embeddings: {e}")
+        """Load stored embeddings into the per-agent matrices"""
+        rows = self.db.call(
+            lambda conn: conn.execute(
+                "SELECT id, content, metadata, agent, embedding FROM rag_documents"
+            ).fetchall()
+        )
 
-    def save_embeddings(self):
-        """Save embeddings to cache"""
-        try:
-            with open(self.embeddings_path, "wb") as f:
-                pickle.dump(self.embeddings_cache, f)
-            logger.info(f"Saved {len(self.embeddings_cache)} embeddings to cache")
-        except Exception as e:
-            logger.error(f"Failed to save embeddings: {e}")
+        stale = []
+        for doc_id, content, metadata, agent, blob in rows:
+            if blob is not None and len(blob) == EMBEDDING_DIM * 4:
+                embedding = np.frombuffer(blob, dtype=np.float32)
+            else:
+                # legacy pickled (or missing) embedding: re-embed from content
+                embedding = self.generate_embedding(content)
+                stale.append((embedding.tobytes(), doc_id))
+            self.indexes[RAGAgent(agent)].upsert(
+                doc_id, content, json.loads(metadata or "{}"), embedding
+            )
+
+        if stale:
+            self.db.call(self._write_embeddings, stale)
+            logger.info(f"Migrated {len(stale)} embeddings to float32 blobs")
+
+        logger.info(
+            f"Loaded {sum(len(i) for i in self.indexes.values())} embeddings into memory"
+        )
+
+    @staticmethod
+    def _write_embeddings(conn, rows):
+        conn.executemany("UPDATE rag_documents SET embedding = ? WHERE id = ?", rows)
+        conn.commit()
 
     async def query_rag(self, rag_query: RAGQuery) -> List[RAGResult]:
         """Query RAG system"""
@@ -298,55 +394,49 @@ async def query_rag(self, rag_query: RAGQuery) -> List[RAGResult]:
 
         # Generate query embedding
         query_embedding = self.generate_embedding(rag_query.query)
+        index = self.indexes[rag_query.agent]
 
-        # Get documents for agent
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, content, metadata, embedding FROM rag_documents
-            WHERE agent = ?
-        """,
-            (rag_query.agent.value,),
-        )
-
-        documents = cursor.fetchall()
-        conn.close()
-
-        # Calculate similarities
         results = []
-        for doc_id, content, metadata, embedding_blob in documents:
-            if embedding_blob:
-                doc_embedding = pickle.loads(embedding_blob)
-                similarity = self.calculate_similarity(query_embedding, doc_embedding)
-
-                if similarity >= rag_query.similarity_threshold:
-                    # Calculate relevance score
-                    relevance_score = self.calculate_relevance(rag_query.query, content)
+        if len(index):
+            # Rows are pre-normalized: cosine similarity is one mat-vec product
+            similarities = index.embeddings @ query_embedding
+            candidates = np.flatnonzero(similarities >= rag_query.similarity_threshold)
+
+            query_words = tokenize(rag_query.query)
+            relevance = np.fromiter(
+                (
+                    self.calculate_relevance(query_words, index.tokens[i])
+                    for i in candidates
+                ),
+                dtype=np.float32,
+                count=len(candidates),
+            )
 
-                    # Create RAG result
-                    result = RAGResult(
+            # Top-k by combined score without sorting every candidate
+            combined = (similarities[candidates] + relevance) / 2
+            k = min(rag_query.max_results, len(candidates))
+            if 0 < k < len(candidates):
+                top = np.argpartition(-combined, k - 1)[:k]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-combined[top], kind="stable")][:k]
+
+            for pos in top:
+                row = candidates[pos]
+                results.append(
+                    RAGResult(
                         document=RAGDocument(
-                            id=doc_id,
-                            content=content,
-                            metadata=json.loads(metadata),
-                            embedding=doc_embedding,
+                            id=index.ids[row],
+                            content=index.contents[row],
+                            metadata=index.metadata[row],
+                            embedding=index.embeddings[row],
                             agent=rag_query.agent,
                         ),
-                        similarity_score=similarity,
-                        relevance_score=relevance_score,
+                        similarity_score=float(similarities[row]),
+                        relevance_score=float(relevance[pos]),
                         context=rag_query.context,
                     )
-                    results.append(result)
-
-        # Sort by combined score
-        results.sort(
-            key=lambda x: (x.similarity_score + x.relevance_score) / 2, reverse=True
-        )
-
-        # Limit results
-        results = results[: rag_query.max_results]
+                )
 
         # Log query
         processing_time = (datetime.now() - start_time).total_seconds() * 1000
@@ -367,10 +457,13 @@ def calculate_similarity(
 
         return dot_product / (norm1 * norm2)
 
-    def calculate_relevance(self, query: str, content: str) -> float:
-        """Calculate relevance score based on keyword matching"""
-        query_words = set(re.findall(r"\w+", query.lower()))
-        content_words = set(re.findall(r"\w+", content.lower()))
+    def calculate_relevance(self, query, content) -> float:
+        """Calculate relevance score based on keyword matching
+
+        Accepts raw strings or pre-tokenized word sets (see ``tokenize``).
+        """
+        query_words = tokenize(query) if isinstance(query, str) else query
+        content_words = tokenize(content) if isinstance(content, str) else content
 
         if not query_words:
             return 0.0
@@ -381,16 +474,9 @@ def calculate_relevance(self, query: str, content: str) -> float:
     async def log_query(
         self, rag_query: RAGQuery, results_count: int, processing_time: float
     ):
-        """Log RAG query"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT INTO rag_queries 
-            (query, agent, context, results_count, processing_time_ms)
-            VALUES (?, ?, ?, ?, ?)
-        """,
+        """Log RAG query (batched; see AsyncSQLite.enqueue)"""
+        self.db.enqueue(
+            INSERT_QUERY_LOG,
             (
                 rag_query.query,
                 rag_query.agent.value,
@@ -400,12 +486,23 @@ async def log_query(
             ),
         )
 
-        conn.commit()
-        conn.close()
-
     async def get_rag_stats(self) -> Dict[str, Any]:
         """Get RAG system statistics"""
-        conn = sqlite3.connect(self.db_path)
+        await self.db.flush()
+        doc_counts, query_counts, category_counts = await self.db.run(
+            self._count_by_agent
+        )
+
+        return {
+            "documents": doc_counts,
+            "queries": query_counts,
+            "categories": category_counts,
+            "embeddings_cache_size": sum(len(i) for i in self.indexes.values()),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    @staticmethod
+    def _count_by_agent(conn):
         cursor = conn.cursor()
 
         # Get document counts
@@ -422,15 +519,7 @@ async def get_rag_stats(self) -> Dict[str, Any]:
         )
         category_counts = dict(cursor.fetchall())
 
-        conn.close()
-
-        return {
-            "documents": doc_counts,
-            "queries": query_counts,
-            "categories": category_counts,
-            "embeddings_cache_size": len(self.embeddings_cache),
-            "timestamp": datetime.now().isoformat(),
-        }
+        return doc_counts, query_counts, category_counts
 
     async def search_knowledge(
         self, query: str, agent: RAGAgent, max_results: int = 5
@@ -465,7 +554,7 @@ async def add_knowledge_from_file(
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read()
 
-            self.add_document(
+            await self.add_document_async(
                 content=content,
                 metadata={"source": file_path, "type": "file_import"},
                 agent=agent,
@@ -479,10 +568,7 @@ async def add_knowledge_from_file(
 
     async def export_knowledge(self, agent: RAGAgent, output_path: str):
         """Export knowledge base"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
+        documents = await self.db.fetchall(
             """
             SELECT content, metadata FROM rag_documents
             WHERE agent = ?
@@ -490,9 +576,6 @@ async def export_knowledge(self, agent: RAGAgent, output_path: str):
             (agent.value,),
         )
 
-        documents = cursor.fetchall()
-        conn.close()
-
         export_data = {
             "agent": agent.value,
             "export_timestamp": datetime.now().isoformat(),
@@ -9,9 +9,10 @@
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import asyncio
 import json
+import logging
 from datetime import datetime
-from typing import Dict, List
 import uuid
 
 # Import our internal systems
@@ -28,6 +29,9 @@
 from andy_kim_local_rag import local_rag_system, RAGAgent, RAGQuery
 from andy_setup_console import andy_setup_console, SetupCategory
 from andy_kim_routing import routing_system
+from andy_ws_hub import SessionHub
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Andy Main Console", version="1.0.0")
 
@@ -41,38 +45,13 @@
 )
 
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.session_connections: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, session_id: str):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-        if session_id not in self.session_connections:
-            self.session_connections[session_id] = []
-        self.session_connections[session_id].append(websocket)
-
-    def disconnect(self, websocket: WebSocket, session_id: str):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+# WebSocket session hub (bounded per-client queues, optional Redis backplane)
+manager = SessionHub.from_env()
 
-        if session_id in self.session_connections:
-            if websocket in self.session_connections[session_id]:
-                self.session_connections[session_id].remove(websocket)
 
-    async def broadcast_to_session(self, message: str, session_id: str):
-        if session_id in self.session_connections:
-            for connection in self.session_connections[session_id]:
-                try:
-                    await connection.send_text(message)
-                except:
-                    self.session_connections[session_id].remove(connection)
-
-
-manager = ConnectionManager()
+@app.on_event("shutdown")
+async def close_ws_hub():
+    await manager.close()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -666,8 +645,17 @@ async def get_andy_main_console(request: Request):
             
             // Handle incoming messages
             function handleMessage(data) {
-                if (data.type === 'message') {
+                if (data.type === 'delta') {
+                    appendDelta(data);
+                } else if (data.type === 'message' && data.turn_id && streamingTurns[data.turn_id]) {
+                    finishTurn(data);
+                } else if (data.type === 'message') {
                     addMessage(data.sender, data.content, data.timestamp);
+                } else if (data.type === 'cancelled') {
+                    cancelTurn(data.turn_id);
+                } else if (data.type === 'error') {
+                    cancelTurn(data.turn_id, ' [failed]');
+                    showSystemMessage(data.message);
                 } else if (data.type === 'typing') {
                     showTypingIndicator(data.typing);
                 } else if (data.type === 'system') {
@@ -675,6 +663,43 @@ async def get_andy_main_console(request: Request):
                 }
             }
             
+            // Streaming answers: one bubble per turn, one section per stream
+            const streamingTurns = {};
+            
+            function appendDelta(data) {
+                let turn = streamingTurns[data.turn_id];
+                if (!turn) {
+                    const bubble = addMessage('Andy', '', new Date().toISOString());
+                    const content = bubble.querySelector('.message-content');
+                    const andy = document.createElement('div');
+                    const auto = document.createElement('div');
+                    auto.style.cssText = 'margin-top: 12px; opacity: 0.8;';
+                    content.insertBefore(auto, content.firstChild);
+                    content.insertBefore(andy, auto);
+                    turn = streamingTurns[data.turn_id] = {bubble, andy, auto};
+                    showTypingIndicator(false);
+                }
+                const section = data.stream === 'auto' ? turn.auto : turn.andy;
+                section.textContent += data.delta;
+                const chatMessages = document.getElementById('chatMessages');
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            }
+            
+            function finishTurn(data) {
+                const turn = streamingTurns[data.turn_id];
+                delete streamingTurns[data.turn_id];
+                turn.bubble.remove();
+                addMessage(data.sender, data.content, data.timestamp);
+            }
+            
+            function cancelTurn(turnId, note = ' [stopped]') {
+                const turn = streamingTurns[turnId];
+                if (turn) {
+                    delete streamingTurns[turnId];
+                    turn.andy.textContent += note;
+                }
+            }
+            
             // Add message to chat
             function addMessage(sender, content, timestamp) {
                 const chatMessages = document.getElementById('chatMessages');
@@ -701,6 +726,7 @@ async def get_andy_main_console(request: Request):
                     document.getElementById('chatTitle').textContent = currentChatTitle;
                     addToChatHistory(currentChatTitle);
                 }
+                return messageDiv;
             }
             
             // Show system message
@@ -825,9 +851,103 @@ async def get_andy_main_console(request: Request):
     return HTMLResponse(content=html_content)
 
 
+async def run_chat_turn(session_id: str, turn_id: str, user_message: str):
+    """One user message: auto engine and chat model run concurrently, each
+    streaming delta frames, then a final frame with the reconciled content.
+    Cancelled (and a ``cancelled`` frame sent) on a newer message or disconnect;
+    on failure an ``error`` frame is sent instead of the final one.
+    """
+
+    def delta_sink(stream: str):
+        async def on_delta(text: str):
+            await manager.publish(
+                session_id,
+                {"type": "delta", "turn_id": turn_id, "stream": stream, "delta": text},
+            )
+
+        return on_delta
+
+    # Show typing indicator
+    await manager.publish(session_id, {"type": "typing", "typing": True})
+
+    chat_message = AndyChatMessage(
+        sender="User", content=user_message, message_type="text", metadata={}
+    )
+    streams = [
+        asyncio.ensure_future(
+            andy_auto_engine.process_prompt(
+                "andrei", session_id, user_message, on_delta=delta_sink("auto")
+            )
+        ),
+        asyncio.ensure_future(
+            andy_chat_system.process_message(
+                session_id, chat_message, on_delta=delta_sink("andy")
+            )
+        ),
+    ]
+
+    try:
+        auto_context, andy_response = await asyncio.gather(*streams)
+
+        # Attach Auto Engine context to the stored user message
+        chat_message.metadata["auto_processing"] = {
+            "level": auto_context.processing_level.value,
+            "confidence": auto_context.confidence_score,
+            "auto_response": auto_context.response,
+        }
+
+        # Enhance response with Auto Engine context
+        enhanced_response = f"{andy_response.content}\n\n🤖 Auto Engine Analysis:\nLevel: {auto_context.processing_level.value}\nConfidence: {auto_context.confidence_score:.2f}\n\n{auto_context.response}"
+
+        # Hide typing indicator
+        await manager.publish(session_id, {"type": "typing", "typing": False})
+
+        # Final frame: full content replaces the streamed deltas
+        await manager.publish(
+            session_id,
+            {
+                "type": "message",
+                "turn_id": turn_id,
+                "final": True,
+                "sender": "Andy",
+                "content": enhanced_response,
+                "timestamp": andy_response.timestamp.isoformat(),
+                "auto_processing": {
+                    "level": auto_context.processing_level.value,
+                    "confidence": auto_context.confidence_score,
+                },
+            },
+        )
+    except asyncio.CancelledError:
+        await manager.publish(session_id, {"type": "cancelled", "turn_id": turn_id})
+        await manager.publish(session_id, {"type": "typing", "typing": False})
+        raise
+    except Exception:
+        logger.exception(f"Chat turn {turn_id} failed (session {session_id})")
+        # gather leaves the other stream running: stop its deltas too
+        for stream in streams:
+            stream.cancel()
+        await manager.publish(
+            session_id,
+            {
+                "type": "error",
+                "turn_id": turn_id,
+                "message": "Andy could not answer that message. Please try again.",
+            },
+        )
+        await manager.publish(session_id, {"type": "typing", "typing": False})
+
+
+def _log_turn_failure(turn: asyncio.Task) -> None:
+    """Done-callback: surface turns that died outside run_chat_turn's handling"""
+    if not turn.cancelled() and turn.exception() is not None:
+        logger.error("Chat turn task failed", exc_info=turn.exception())
+
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await manager.connect(websocket, session_id)
+    turn = None
 
     try:
         while True:
@@ -835,64 +955,23 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             message_data = json.loads(data)
 
             if message_data["type"] == "message":
-                # Show typing indicator
-                await manager.broadcast_to_session(
-                    json.dumps({"type": "typing", "typing": True}), session_id
-                )
-
-                # Process message through Andy's Auto Engine first
-                auto_context = await andy_auto_engine.process_prompt(
-                    "andrei", session_id, user_message
-                )
-
-                # Create chat message with Auto Engine response
-                chat_message = AndyChatMessage(
-                    sender="User",
-                    content=user_message,
-                    message_type="text",
-                    metadata={
-                        "auto_processing": {
-                            "level": auto_context.processing_level.value,
-                            "confidence": auto_context.confidence_score,
-                            "auto_response": auto_context.response,
-                        }
-                    },
-                )
-
-                # Process through Andy's chat system with Auto context
-                andy_response = await andy_chat_system.process_message(
-                    session_id, chat_message
-                )
-
-                # Enhance response with Auto Engine context
-                enhanced_response = f"{andy_response.content}\n\n🤖 Auto Engine Analysis:\nLevel: {auto_context.processing_level.value}\nConfidence: {auto_context.confidence_score:.2f}\n\n{auto_context.response}"
-
-                # Hide typing indicator
-                await manager.broadcast_to_session(
-                    json.dumps({"type": "typing", "typing": False}), session_id
-                )
-
-                # Send Andy's enhanced response
-                await manager.broadcast_to_session(
-                    json.dumps(
-                        {
-                            "type": "message",
-                            "sender": "Andy",
-                            "content": enhanced_response,
-                            "timestamp": andy_response.timestamp.isoformat(),
-                            "auto_processing": {
-                                "level": auto_context.processing_level.value,
-                                "confidence": auto_context.confidence_score,
-                            },
-                        }
-                    ),
-                    session_id,
+                # A new message supersedes the answer still streaming
+                if turn and not turn.done():
+                    turn.cancel()
+                turn = asyncio.create_task(
+                    run_chat_turn(
+                        session_id, str(uuid.uuid4()), message_data.get("content", "")
+                    )
                 )
+                turn.add_done_callback(_log_turn_failure)
 
     except WebSocketDisconnect:
-        manager.disconnect(websocket, session_id)
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.warning(f"WebSocket error: {e}")
+    finally:
+        if turn and not turn.done():
+            turn.cancel()
         manager.disconnect(websocket, session_id)
 
 
@@ -919,7 +998,7 @@ async def get_session(session_id: str):
 @app.get("/api/status")
 async def get_status():
     """Get system status"""
-    return andy_chat_system.get_system_status()
+    return {**andy_chat_system.get_system_status(), "websocket_hub": manager.info()}
 
 
 @app.post("/api/gcloud")
@@ -1109,7 +1188,7 @@ async def add_rag_knowledge(request: Request):
         rag_agent = RAGAgent.ANDY if agent.lower() == "andy" else RAGAgent.KIM
 
         # Add to RAG system
-        local_rag_system.add_document(
+        await local_rag_system.add_document_async(
             content=content, metadata=metadata, agent=rag_agent, category=category
         )
 
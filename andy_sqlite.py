@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Andy SQLite - Async storage layer for the Andy/Kim local services
+CoolBits.ai - Personal 1:1 Agent
+
+Every database gets one dedicated thread that owns a persistent WAL
+connection, so async handlers never block the event loop on connect,
+query or fsync. Log-style inserts go through a batched writer and are
+flushed with one executemany/commit per batch.
+"""
+
+import asyncio
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # WAL + NORMAL: fsync at checkpoint, not per commit
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class AsyncSQLite:
+    """SQLite connection pinned to a dedicated thread"""
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        cached_statements: int = 256,
+    ):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Daemon thread rather than a ThreadPoolExecutor: executors refuse work
+        # once interpreter shutdown starts, before atexit can flush the batch
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._worker, name=f"sqlite-{db_path}", daemon=True
+        )
+        self._thread.start()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cached_statements = cached_statements
+        self._pending: Dict[str, List[Sequence[Any]]] = defaultdict(list)
+        self._pending_count = 0
+        self._pending_lock = threading.Lock()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed = False
+        self.call(self._open)
+        atexit.register(self.close)
+
+    # -- DB thread --
+    def _open(self, _conn=None):
+        # sqlite3 keeps a per-connection LRU of prepared statements keyed by
+        # SQL text; callers pass module-level SQL constants so they hit it
+        conn = sqlite3.connect(
+            self.db_path, cached_statements=self._cached_statements
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        self._conn = conn
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(self._conn, *args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def _submit(self, fn: Callable, args: Tuple) -> Future:
+        future: Future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def call(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(conn, *args) on the DB thread and wait (startup/sync paths)"""
+        return self._submit(fn, args).result()
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(conn, *args) on the DB thread without blocking the loop"""
+        return await asyncio.wrap_future(self._submit(fn, args))
+
+    # -- convenience wrappers --
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Execute a write and commit; returns lastrowid"""
+
+        def _execute(conn):
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.lastrowid
+
+        return await self.run(_execute)
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    # -- batched writer --
+    def enqueue(self, sql: str, params: Sequence[Any]):
+        """Queue a log-style insert; flushed in batches off the event loop"""
+        with self._pending_lock:
+            self._pending[sql].append(params)
+            self._pending_count += 1
+            full = self._pending_count >= self.batch_size
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.call(self._write_batch, self._take_pending())
+            return
+
+        if full:
+            self._submit_flush()
+        elif self._flush_handle is None or self._flush_loop is not loop:
+            # (re)arm on this loop; a handle from a finished loop never fires
+            self._flush_loop = loop
+            self._flush_handle = loop.call_later(
+                self.flush_interval, self._submit_flush
+            )
+
+    def _take_pending(self) -> Dict[str, List[Sequence[Any]]]:
+        with self._pending_lock:
+            batch, self._pending = self._pending, defaultdict(list)
+            self._pending_count = 0
+        return batch
+
+    def _submit_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = self._take_pending()
+        if batch:
+            self._submit(self._write_batch, (batch,))
+
+    @staticmethod
+    def _write_batch(conn, batch: Dict[str, List[Sequence[Any]]]):
+        try:
+            for sql, rows in batch.items():
+                conn.executemany(sql, rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            rows = sum(map(len, batch.values()))
+            logger.error(f"Batched write failed ({rows} rows): {e}")
+
+    async def flush(self):
+        """Write everything queued so far (reads after this see it)"""
+        self._submit_flush()
+        await self.run(lambda conn: None)  # single DB thread: FIFO barrier
+
+    def close(self):
+        """Flush pending writes and close the connection"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = self._take_pending()
+        if batch:
+            self.call(self._write_batch, batch)
+        self.call(lambda conn: conn.close())
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Andy WS Hub - Session pub/sub for the Andy console websockets
+CoolBits.ai - Personal 1:1 Agent
+
+Every connection has a bounded send queue drained by its own writer
+task, so publishing to a session is one queue put per recipient and
+never awaits a socket: a slow client only fills its own queue. Frames
+are serialized once and the same string is shared by all recipients.
+When a queue is full the slow-consumer policy decides: drop the oldest
+queued frame, drop the new one, or disconnect the client.
+
+With a Redis URL, publishes also go out on a per-session Redis channel
+and each worker delivers what other workers publish, so one session
+can span several uvicorn workers.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from enum import Enum
+from typing import Any, Dict, Optional, Union
+
+from fastapi import WebSocket
+
+try:
+    import redis.asyncio as aioredis
+
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "andy:ws:"
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class SlowConsumerPolicy(Enum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    DISCONNECT = "disconnect"
+
+
+class Connection:
+    """One websocket with its bounded queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, session_id: str, queue_size: int):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.closed = False
+
+
+class SessionHub:
+    """Per-session fan-out of pre-serialized frames to websocket clients"""
+
+    def __init__(
+        self,
+        queue_size: int = 256,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DISCONNECT,
+        send_timeout: float = 5.0,
+        redis_url: Optional[str] = None,
+    ):
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.sessions: Dict[str, Dict[WebSocket, Connection]] = {}
+        self.backplane = RedisBackplane(redis_url, self) if redis_url else None
+        self.stats = {"published": 0, "frames_queued": 0, "dropped": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls) -> "SessionHub":
+        return cls(
+            queue_size=int(os.getenv("ANDY_WS_QUEUE_SIZE", "256")),
+            policy=SlowConsumerPolicy(os.getenv("ANDY_WS_SLOW_POLICY", "disconnect")),
+            send_timeout=float(os.getenv("ANDY_WS_SEND_TIMEOUT", "5")),
+            redis_url=os.getenv("ANDY_WS_REDIS_URL") or None,
+        )
+
+    # -- membership --
+    async def connect(self, websocket: WebSocket, session_id: str) -> Connection:
+        await websocket.accept()
+        conn = Connection(websocket, session_id, self.queue_size)
+        conn.writer = asyncio.create_task(self._writer(conn))
+        session = self.sessions.setdefault(session_id, {})
+        session[websocket] = conn
+        if self.backplane and len(session) == 1:
+            await self.backplane.subscribe(session_id)
+        return conn
+
+    def disconnect(self, websocket: WebSocket, session_id: str) -> None:
+        """Forget a connection (idempotent, O(1))"""
+        session = self.sessions.get(session_id)
+        conn = session.pop(websocket, None) if session else None
+        if conn is None:
+            return
+        conn.closed = True
+        if conn.writer and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+        if not session:
+            del self.sessions[session_id]
+            if self.backplane:
+                asyncio.create_task(self.backplane.unsubscribe(session_id))
+
+    # -- publishing --
+    async def publish(self, session_id: str, message: Union[str, Dict[str, Any]]) -> int:
+        """Fan a message out to the session on every worker; returns local recipients"""
+        frame = message if isinstance(message, str) else json.dumps(message)
+        self.stats["published"] += 1
+        delivered = self.deliver_local(session_id, frame)
+        if self.backplane:
+            await self.backplane.publish(session_id, frame)
+        return delivered
+
+    async def broadcast_to_session(self, message: str, session_id: str) -> int:
+        return await self.publish(session_id, message)
+
+    def deliver_local(self, session_id: str, frame: str) -> int:
+        """Queue one shared frame for each local connection of the session"""
+        session = self.sessions.get(session_id)
+        if not session:
+            return 0
+        delivered = 0
+        for conn in list(session.values()):
+            if self._offer(conn, frame):
+                delivered += 1
+        self.stats["frames_queued"] += delivered
+        return delivered
+
+    def _offer(self, conn: Connection, frame: str) -> bool:
+        try:
+            conn.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+        self.stats["dropped"] += 1
+        conn.dropped += 1
+        if self.policy is SlowConsumerPolicy.DROP_NEWEST:
+            return False
+        if self.policy is SlowConsumerPolicy.DROP_OLDEST:
+            conn.queue.get_nowait()
+            conn.queue.put_nowait(frame)
+            return True
+        self._evict(conn, "send queue full")
+        return False
+
+    # -- writers --
+    async def _writer(self, conn: Connection) -> None:
+        try:
+            while True:
+                frame = await conn.queue.get()
+                await asyncio.wait_for(conn.websocket.send_text(frame), self.send_timeout)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            self._evict(conn, f"send blocked > {self.send_timeout}s")
+        except Exception as e:
+            logger.debug(f"WebSocket send failed ({conn.session_id}): {e}")
+            self.disconnect(conn.websocket, conn.session_id)
+
+    def _evict(self, conn: Connection, reason: str) -> None:
+        if conn.closed:
+            return
+        self.stats["evicted"] += 1
+        logger.warning(f"Evicting slow websocket client in {conn.session_id}: {reason}")
+        self.disconnect(conn.websocket, conn.session_id)
+        asyncio.create_task(self._close(conn.websocket, reason))
+
+    async def _close(self, websocket: WebSocket, reason: str) -> None:
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason=reason), self.send_timeout
+            )
+        except Exception:
+            pass
+
+    # -- lifecycle --
+    def info(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self.sessions),
+            "connections": sum(len(s) for s in self.sessions.values()),
+            "policy": self.policy.value,
+            "queue_size": self.queue_size,
+            "backplane": self.backplane is not None,
+            **self.stats,
+        }
+
+    async def close(self) -> None:
+        for session_id, session in list(self.sessions.items()):
+            for websocket in list(session):
+                self.disconnect(websocket, session_id)
+        if self.backplane:
+            await self.backplane.close()
+
+
+class RedisBackplane:
+    """Redis pub/sub relay between the hubs of several workers"""
+
+    def __init__(self, redis_url: str, hub: SessionHub):
+        if not HAS_REDIS:
+            raise RuntimeError("ANDY_WS_REDIS_URL set but redis is not installed")
+        self.hub = hub
+        self.origin = uuid.uuid4().hex  # frames published here are already delivered
+        self.client = aioredis.from_url(redis_url)
+        self.pubsub = self.client.pubsub()
+        self.listener: Optional[asyncio.Task] = None
+
+    async def subscribe(self, session_id: str) -> None:
+        await self.pubsub.subscribe(CHANNEL_PREFIX + session_id)
+        if self.listener is None:
+            self.listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, session_id: str) -> None:
+        if session_id not in self.hub.sessions:
+            await self.pubsub.unsubscribe(CHANNEL_PREFIX + session_id)
+
+    async def publish(self, session_id: str, frame: str) -> None:
+        try:
+            await self.client.publish(CHANNEL_PREFIX + session_id, f"{self.origin}|{frame}")
+        except Exception as e:
+            logger.warning(f"Backplane publish failed for {session_id}: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Backplane receive failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None:
+                continue
+            data = message["data"]
+            data = data.decode("utf-8") if isinstance(data, bytes) else data
+            origin, _, frame = data.partition("|")
+            if origin != self.origin:
+                channel = message["channel"]
+                channel = channel.decode("utf-8") if isinstance(channel, bytes) else channel
+                self.hub.deliver_local(channel[len(CHANNEL_PREFIX):], frame)
+
+    async def close(self) -> None:
+        if self.listener:
+            self.listener.cancel()
+        await self.pubsub.close()
+        await self.client.close()
@@ -7,7 +7,10 @@
 import logging
 from lib.industry_rag_manager import IndustryRAGManager
 from lib.auth import get_current_user
+from gateway.query_cache import SemanticQueryCache
+from rag_core import sentence_transformer_embedder
 import os
+import threading
 from datetime import datetime
 
 # Configure logging
@@ -20,6 +23,59 @@
     region=os.getenv("GOOGLE_CLOUD_REGION", "europe-west3"),
 )
 
+# Response cache per industry and provider: exact normalized query, then
+# paraphrases within QUERY_CACHE_SIM_THRESHOLD cosine of a cached query.
+# Industry corpora are loaded into Vertex AI Search out of process
+# (create_real_rags.py), which indexes asynchronously and cannot reach this
+# cache, so staleness is bounded by a short TTL rather than by invalidation.
+INDUSTRY_CACHE_EMBED_MODEL = os.getenv("INDUSTRY_CACHE_EMBED_MODEL", "all-MiniLM-L6-v2")
+INDUSTRY_CACHE_TTL_S = float(os.getenv("INDUSTRY_CACHE_TTL_S", "300"))
+industry_cache = SemanticQueryCache(ttl_s=INDUSTRY_CACHE_TTL_S)
+_embedder = None
+_embedder_loaded = False
+_embedder_lock = threading.Lock()
+
+
+def _query_embedder():
+    """Embedder loaded on first use; None (exact tier only) if it cannot load"""
+    global _embedder, _embedder_loaded
+    if not _embedder_loaded:
+        with _embedder_lock:
+            if not _embedder_loaded:
+                try:
+                    if INDUSTRY_CACHE_EMBED_MODEL:
+                        _embedder = sentence_transformer_embedder(INDUSTRY_CACHE_EMBED_MODEL)
+                except Exception as e:
+                    logger.warning(f"Query cache embedder unavailable, exact tier only: {e}")
+                _embedder_loaded = True
+    return _embedder
+
+
+def _embed_query(query: str):
+    embed = _query_embedder()
+    if embed is None:
+        return None
+    try:
+        return embed([query])[0]
+    except Exception as e:
+        logger.warning(f"Query cache embedding failed: {e}")
+        return None
+
+
+def query_industry_cached(industry_id: str, query: str, provider: str) -> str:
+    """``rag_manager.query_industry_rag`` behind the industry response cache"""
+    response, tier = industry_cache.get_or_compute(
+        industry_id,
+        query,
+        lambda _: rag_manager.query_industry_rag(
+            industry_id=industry_id, query=query, provider=provider
+        ),
+        variant=provider or "",
+        embed=_embed_query,
+    )
+    logger.debug(f"{industry_id} query cache {tier}")
+    return response
+
 
 # Pydantic models
 class IndustryQuery(BaseModel):
@@ -44,7 +100,7 @@ async def query_agritech(
 ):
     """Query AgTech industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="agritech", query=query_data.query, provider=query_data.provider
         )
 
@@ -67,7 +123,7 @@ async def query_agri_inputs(
 ):
     """Query Agricultural Inputs industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="agri_inputs",
             query=query_data.query,
             provider=query_data.provider,
@@ -92,7 +148,7 @@ async def query_food_bev_mfg(
 ):
     """Query Food & Beverage Manufacturing industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="food_bev_mfg",
             query=query_data.query,
             provider=query_data.provider,
@@ -117,7 +173,7 @@ async def query_foodservice(
 ):
     """Query Food Service industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="foodservice",
             query=query_data.query,
             provider=query_data.provider,
@@ -143,7 +199,7 @@ async def query_oil_gas(
 ):
     """Query Oil & Gas industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="oil_gas", query=query_data.query, provider=query_data.provider
         )
 
@@ -166,7 +222,7 @@ async def query_power_gen(
 ):
     """Query Power Generation industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="power_gen",
             query=query_data.query,
             provider=query_data.provider,
@@ -191,7 +247,7 @@ async def query_renewables(
 ):
     """Query Renewable Energy industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="renewables",
             query=query_data.query,
             provider=query_data.provider,
@@ -216,7 +272,7 @@ async def query_water_wastewater(
 ):
     """Query Water & Wastewater industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="water_wastewater",
             query=query_data.query,
             provider=query_data.provider,
@@ -242,7 +298,7 @@ async def query_industrial_equipment(
 ):
     """Query Industrial Equipment industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="industrial_equipment",
             query=query_data.query,
             provider=query_data.provider,
@@ -267,7 +323,7 @@ async def query_electronics_mfg(
 ):
     """Query Electronics Manufacturing industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="electronics_mfg",
             query=query_data.query,
             provider=query_data.provider,
@@ -292,7 +348,7 @@ async def query_automation_robotics(
 ):
     """Query Automation & Robotics industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="automation_robotics",
             query=query_data.query,
             provider=query_data.provider,
@@ -318,7 +374,7 @@ async def query_banking(
 ):
     """Query Banking industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="banking", query=query_data.query, provider=query_data.provider
         )
 
@@ -341,7 +397,7 @@ async def query_payments_fintech(
 ):
     """Query Payments & FinTech industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="payments_fintech",
             query=query_data.query,
             provider=query_data.provider,
@@ -366,7 +422,7 @@ async def query_wealth_asset(
 ):
     """Query Wealth & Asset Management industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="wealth_asset",
             query=query_data.query,
             provider=query_data.provider,
@@ -391,7 +447,7 @@ async def query_capital_markets(
 ):
     """Query Capital Markets industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="capital_markets",
             query=query_data.query,
             provider=query_data.provider,
@@ -417,7 +473,7 @@ async def query_hospitals_clinics(
 ):
     """Query Hospitals & Clinics industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="hospitals_clinics",
             query=query_data.query,
             provider=query_data.provider,
@@ -442,7 +498,7 @@ async def query_med_devices(
 ):
     """Query Medical Devices industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="med_devices",
             query=query_data.query,
             provider=query_data.provider,
@@ -467,7 +523,7 @@ async def query_digital_health(
 ):
     """Query Digital Health industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="digital_health",
             query=query_data.query,
             provider=query_data.provider,
@@ -493,7 +549,7 @@ async def query_saas_b2b(
 ):
     """Query SaaS B2B industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="saas_b2b", query=query_data.query, provider=query_data.provider
         )
 
@@ -516,7 +572,7 @@ async def query_devtools_cloud(
 ):
     """Query DevTools & Cloud industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="devtools_cloud",
             query=query_data.query,
             provider=query_data.provider,
@@ -541,7 +597,7 @@ async def query_ai_ml_platforms(
 ):
     """Query AI/ML Platforms industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="ai_ml_platforms",
             query=query_data.query,
             provider=query_data.provider,
@@ -566,7 +622,7 @@ async def query_data_infra(
 ):
     """Query Data Infrastructure industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="data_infra",
             query=query_data.query,
             provider=query_data.provider,
@@ -592,7 +648,7 @@ async def query_exchanges(
 ):
     """Query Cryptocurrency Exchanges industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="exchanges",
             query=query_data.query,
             provider=query_data.provider,
@@ -617,7 +673,7 @@ async def query_defi(
 ):
     """Query DeFi industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="defi", query=query_data.query, provider=query_data.provider
         )
 
@@ -640,7 +696,7 @@ async def query_wallets_infra(
 ):
     """Query Wallets & Infrastructure industry AI with RAG integration"""
     try:
-        response = rag_manager.query_industry_rag(
+        response = query_industry_cached(
             industry_id="wallets_infra",
             query=query_data.query,
             provider=query_data.provider,
@@ -663,7 +719,11 @@ async def query_wallets_infra(
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "industries": len(rag_manager.industries)}
+    return {
+        "status": "healthy",
+        "industries": len(rag_manager.industries),
+        "query_cache": industry_cache.stats(),
+    }
 
 
 if __name__ == "__main__":
@@ -5,8 +5,10 @@
 """
 
 import argparse
+import asyncio
 import logging
 import socket
+import time
 import yaml
 from pathlib import Path
 
@@ -16,94 +18,123 @@
 )
 logger = logging.getLogger(__name__)
 
+LOCAL_PORTS = [8080, 8081, 8765, 8766, 9000, 9001]
+LAN_PORTS = [8080]
+
 
 class AgentDiscovery:
-    def __init__(self, config_path="config/board.agents.yaml"):
+    def __init__(
+        self,
+        config_path="config/board.agents.yaml",
+        local_ports=None,
+        lan_ports=None,
+        concurrency=256,
+        connect_timeout=0.5,
+    ):
         self.config_path = config_path
         self.discovered_agents = []
+        # Per-host port lists: every local port, a short list for LAN hosts
+        self.local_ports = local_ports or LOCAL_PORTS
+        self.lan_ports = lan_ports or LAN_PORTS
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+
+    async def probe_port(self, host, port, semaphore, identify=False):
+        """Connect to host:port; with identify, read an HTTP banner on the same socket
+
+        Returns None when closed, b"" when open, or the first bytes of
+        the response to a GET / when identify is set.
+        """
+        async with semaphore:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError):
+                return None
 
-    def scan_local_ports(self):
+            try:
+                if not identify:
+                    return b""
+                writer.write(
+                    f"GET / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+                )
+                await writer.drain()
+                return await asyncio.wait_for(reader.read(1024), 2)
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.debug(f"Banner read error for {host}:{port}: {e}")
+                return b""
+            finally:
+                writer.close()
+
+    async def scan_hosts(self, targets, identify=False):
+        """Probe {host: [ports]} concurrently; returns {(host, port): banner} for open ports"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pairs = [(host, port) for host, ports in targets.items() for port in ports]
+        results = await asyncio.gather(
+            *(self.probe_port(host, port, semaphore, identify) for host, port in pairs)
+        )
+        return {pair: banner for pair, banner in zip(pairs, results) if banner is not None}
+
+    async def scan_local_ports_async(self):
         """Scan local ports for potential agents"""
         logger.info("🔍 Scanning local ports...")
 
-        common_ports = [8080, 8081, 8765, 8766, 9000, 9001]
+        open_ports = await self.scan_hosts({"127.0.0.1": self.local_ports}, identify=True)
         local_agents = []
 
-        for port in common_ports:
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(1)
-                result = sock.connect_ex(("127.0.0.1", port))
-
-                if result == 0:
-                    # Port is open, try to identify service
-                    agent_info = self.identify_service(port)
-                    if agent_info:
-                        local_agents.append(agent_info)
-                        logger.info(
-                            f"✅ Found agent on port {port}: {agent_info['name']}"
-                        )
-
-                sock.close()
-
-            except Exception as e:
-                logger.debug(f"Port {port} scan error: {e}")
+        for (host, port), banner in sorted(open_ports.items()):
+            # Port is open, try to identify service
+            agent_info = self.identify_service(port, banner.decode("utf-8", errors="ignore"))
+            if agent_info:
+                local_agents.append(agent_info)
+                logger.info(f"✅ Found agent on port {port}: {agent_info['name']}")
 
         return local_agents
 
-    def identify_service(self, port):
-        """Try to identify service running on port"""
-        try:
-            # Try to connect and get basic info
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)
-            sock.connect(("127.0.0.1", port))
-
-            # Send basic HTTP request
-            sock.send(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
-            response = sock.recv(1024).decode("utf-8", errors="ignore")
-
-            sock.close()
-
-            # Parse response for service identification
-            if "oCopilot" in response or "Cursor" in response:
-                return {
-                    "id": f"ocursor-{port}",
-                    "name": "oCursor",
-                    "type": "LLM",
-                    "host": "127.0.0.1",
-                    "port": port,
-                    "protocols": ["ocim-ws-0.1", "http-json"],
-                    "heartbeat_url": f"ws://127.0.0.1:{port}/heartbeat",
-                    "status": "unknown",
-                    "capabilities": ["mic", "camera"],
-                    "tags": ["offline", "local"],
-                    "last_seen": None,
-                }
-            elif "FastAPI" in response or "uvicorn" in response:
-                return {
-                    "id": f"fastapi-{port}",
-                    "name": "FastAPI Service",
-                    "type": "API",
-                    "host": "127.0.0.1",
-                    "port": port,
-                    "protocols": ["http-json"],
-                    "heartbeat_url": f"http://127.0.0.1:{port}/health",
-                    "status": "unknown",
-                    "capabilities": ["api"],
-                    "tags": ["local"],
-                    "last_seen": None,
-                }
-
-        except Exception as e:
-            logger.debug(f"Service identification error for port {port}: {e}")
+    def scan_local_ports(self):
+        """Scan local ports for potential agents"""
+        return asyncio.run(self.scan_local_ports_async())
+
+    def identify_service(self, port, response):
+        """Identify the service on a local port from its HTTP response"""
+        # Parse response for service identification
+        if "oCopilot" in response or "Cursor" in response:
+            return {
+                "id": f"ocursor-{port}",
+                "name": "oCursor",
+                "type": "LLM",
+                "host": "127.0.0.1",
+                "port": port,
+                "protocols": ["ocim-ws-0.1", "http-json"],
+                "heartbeat_url": f"ws://127.0.0.1:{port}/heartbeat",
+                "status": "unknown",
+                "capabilities": ["mic", "camera"],
+                "tags": ["offline", "local"],
+                "last_seen": None,
+            }
+        elif "FastAPI" in response or "uvicorn" in response:
+            return {
+                "id": f"fastapi-{port}",
+                "name": "FastAPI Service",
+                "type": "API",
+                "host": "127.0.0.1",
+                "port": port,
+                "protocols": ["http-json"],
+                "heartbeat_url": f"http://127.0.0.1:{port}/health",
+                "status": "unknown",
+                "capabilities": ["api"],
+                "tags": ["local"],
+                "last_seen": None,
+            }
 
         return None
 
-    def scan_lan_subnet(self):
+    async def scan_lan_subnet_async(self):
         """Scan LAN subnet for potential agents"""
         logger.info("🌐 Scanning LAN subnet...")
 
+        lan_agents = []
         # Get local IP
         try:
             hostname = socket.gethostname()
@@ -112,65 +143,61 @@ def scan_lan_subnet(self):
 
             logger.info(f"📡 Scanning subnet: {subnet}0/24")
 
-            # Scan common ports on subnet
-            lan_agents = []
-            for i in range(1, 255):
-                ip = subnet + str(i)
-                if ip == local_ip:
-                    continue
-
-                # Quick ping test
-                try:
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    sock.settimeout(0.5)
-                    result = sock.connect_ex((ip, 8080))
-
-                    if result == 0:
-                        agent_info = {
-                            "id": f"lan-{ip.replace('.', '-')}",
-                            "name": f"LAN Agent {ip}",
-                            "type": "Unknown",
-                            "host": ip,
-                            "port": 8080,
-                            "protocols": ["http-json"],
-                            "heartbeat_url": f"http://{ip}:8080/health",
-                            "status": "unknown",
-                            "capabilities": ["api"],
-                            "tags": ["lan", "remote"],
-                            "last_seen": None,
-                        }
-                        lan_agents.append(agent_info)
-                        logger.info(f"✅ Found LAN agent: {ip}")
-
-                    sock.close()
-
-                except Exception:
-                    pass
+            # Scan the LAN port list on every other host, all at once
+            hosts = [subnet + str(i) for i in range(1, 255)]
+            targets = {ip: self.lan_ports for ip in hosts if ip != local_ip}
+            open_ports = await self.scan_hosts(targets)
+
+            for ip, port in sorted(open_ports, key=lambda p: (socket.inet_aton(p[0]), p[1])):
+                agent_info = {
+                    "id": f"lan-{ip.replace('.', '-')}"
+                    + ("" if port == 8080 else f"-{port}"),
+                    "name": f"LAN Agent {ip}",
+                    "type": "Unknown",
+                    "host": ip,
+                    "port": port,
+                    "protocols": ["http-json"],
+                    "heartbeat_url": f"http://{ip}:{port}/health",
+                    "status": "unknown",
+                    "capabilities": ["api"],
+                    "tags": ["lan", "remote"],
+                    "last_seen": None,
+                }
+                lan_agents.append(agent_info)
+                logger.info(f"✅ Found LAN agent: {ip}:{port}")
 
         except Exception as e:
             logger.error(f"LAN scan error: {e}")
 
         return lan_agents
 
-    def discover_agents(self):
-        """Main discovery process"""
-        logger.info("🎯 Starting agent discovery...")
+    def scan_lan_subnet(self):
+        """Scan LAN subnet for potential agents"""
+        return asyncio.run(self.scan_lan_subnet_async())
 
-        # Scan local ports
-        local_agents = self.scan_local_ports()
+    async def discover_agents_async(self):
+        """Main discovery process (local and LAN scans run together)"""
+        logger.info("🎯 Starting agent discovery...")
+        started = time.monotonic()
 
-        # Scan LAN subnet
-        lan_agents = self.scan_lan_subnet()
+        local_agents, lan_agents = await asyncio.gather(
+            self.scan_local_ports_async(), self.scan_lan_subnet_async()
+        )
 
         # Combine results
         self.discovered_agents = local_agents + lan_agents
 
         logger.info(
             f"📊 Discovery complete: {len(self.discovered_agents)} agents found"
+            f" in {time.monotonic() - started:.1f}s"
         )
 
         return self.discovered_agents
 
+    def discover_agents(self):
+        """Main discovery process"""
+        return asyncio.run(self.discover_agents_async())
+
     def write_agents_yaml(self):
         """Write discovered agents to YAML file"""
         try:
@@ -233,10 +260,26 @@ def main():
     parser.add_argument(
         "--sync-library", action="store_true", help="Sync with board.library.yaml"
     )
+    parser.add_argument(
+        "--lan-ports",
+        type=lambda s: [int(p) for p in s.split(",")],
+        default=LAN_PORTS,
+        help="Comma-separated ports to probe on each LAN host",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=256, help="Max connections in flight"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=0.5, help="Connect timeout in seconds"
+    )
 
     args = parser.parse_args()
 
-    discovery = AgentDiscovery()
+    discovery = AgentDiscovery(
+        lan_ports=args.lan_ports,
+        concurrency=args.concurrency,
+        connect_timeout=args.timeout,
+    )
 
     # Run discovery
     discovery.discover_agents()
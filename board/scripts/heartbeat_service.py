@@ -4,9 +4,12 @@
 Periodic status checks & feed for oCopilot Board Orchestrator
 """
 
+import aiohttp
 import argparse
+import asyncio
 import logging
 import psutil
+import sqlite3
 import subprocess
 import time
 import yaml
@@ -20,11 +23,114 @@
 logger = logging.getLogger(__name__)
 
 
+class AgentStatusStore:
+    """Agent status table (SQLite), kept apart from the board.agents.yaml registry
+
+    Each heartbeat cycle is one transaction: agents whose status changed
+    get a full upsert, every other probed agent only has last_seen,
+    latency_ms and checked_at refreshed. Readers see a consistent snapshot
+    at any time.
+    """
+
+    def __init__(self, db_path="config/board.status.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agent_status (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                last_seen TEXT,
+                latency_ms REAL,
+                checked_at TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def load(self):
+        """Return {agent_id: status row}"""
+        rows = self.conn.execute(
+            "SELECT id, status, last_seen, latency_ms, checked_at FROM agent_status"
+        )
+        return {
+            row[0]: {
+                "status": row[1],
+                "last_seen": row[2],
+                "latency_ms": row[3],
+                "checked_at": row[4],
+            }
+            for row in rows
+        }
+
+    def update(self, rows, seen=None):
+        """Upsert {agent_id: status row}; refresh the probe columns of `seen` rows
+
+        Both go in a single transaction.
+        """
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO agent_status (id, status, last_seen, latency_ms, checked_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    last_seen = excluded.last_seen,
+                    latency_ms = excluded.latency_ms,
+                    checked_at = excluded.checked_at
+                """,
+                self._params(rows),
+            )
+            if seen:
+                # status is only written for new rows: transitions go through `rows`
+                self.conn.executemany(
+                    """
+                    INSERT INTO agent_status (id, status, last_seen, latency_ms, checked_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        last_seen = excluded.last_seen,
+                        latency_ms = excluded.latency_ms,
+                        checked_at = excluded.checked_at
+                    """,
+                    self._params(seen),
+                )
+
+    @staticmethod
+    def _params(rows):
+        return [
+            (
+                agent_id,
+                row["status"],
+                row["last_seen"],
+                row["latency_ms"],
+                row["checked_at"],
+            )
+            for agent_id, row in rows.items()
+        ]
+
+    def close(self):
+        self.conn.close()
+
+
 class HeartbeatService:
-    def __init__(self, config_path="config/board.agents.yaml"):
+    def __init__(
+        self,
+        config_path="config/board.agents.yaml",
+        status_db="config/board.status.db",
+        concurrency=100,
+        timeout=5,
+    ):
         self.config_path = config_path
         self.running = False
         self.interval = 15  # seconds
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.status_db = status_db
+        self.store = None  # opened on first agent check, not for one-off probes
+        self.statuses = {}
+        self._agents = []
+        self._agents_mtime = None
 
     def probe_cpu(self):
         """Probe CPU information"""
@@ -166,65 +272,164 @@ def probe_disk(self):
             logger.error(f"Disk probe error: {e}")
             return None
 
-    def check_agent_health(self, agent):
-        """Check health of a specific agent"""
-        try:
-            import requests
-
-            # Try to ping the agent
-            if agent.get("heartbeat_url"):
-                url = agent["heartbeat_url"]
-
-                # Convert ws:// to http:// for health check
-                if url.startswith("ws://"):
-                    url = url.replace("ws://", "http://")
-                elif url.startswith("wss://"):
-                    url = url.replace("wss://", "https://")
-
-                response = requests.get(url, timeout=5)
-                if response.status_code == 200:
-                    return "healthy"
-                else:
-                    return "unhealthy"
-            else:
-                return "unknown"
-
-        except Exception as e:
-            logger.debug(f"Health check error for {agent['id']}: {e}")
-            return "unhealthy"
+    def open_store(self):
+        """Open the status store and load the last known statuses"""
+        if self.store is None:
+            self.store = AgentStatusStore(self.status_db)
+            self.statuses = self.store.load()
+        return self.store
 
-    def update_agent_status(self):
-        """Update status of all agents"""
+    def load_agents(self):
+        """Agent registry from board.agents.yaml, re-read only when the file changes"""
         try:
-            if not Path(self.config_path).exists():
-                return
+            mtime = Path(self.config_path).stat().st_mtime
+        except FileNotFoundError:
+            self._agents, self._agents_mtime = [], None
+            return self._agents
 
+        if mtime != self._agents_mtime:
             with open(self.config_path, "r") as f:
-                agents_data = yaml.safe_load(f)
+                agents_data = yaml.safe_load(f) or {}
+            self._agents = agents_data.get("agents") or []
+            self._agents_mtime = mtime
+            logger.info(f"📋 Loaded {len(self._agents)} agents from {self.config_path}")
+
+        return self._agents
+
+    @staticmethod
+    def health_url(agent):
+        """HTTP URL to probe for an agent, or None"""
+        url = agent.get("heartbeat_url")
+        if not url:
+            return None
+
+        # Convert ws:// to http:// for health check
+        if url.startswith("ws://"):
+            url = url.replace("ws://", "http://", 1)
+        elif url.startswith("wss://"):
+            url = url.replace("wss://", "https://", 1)
+        return url
+
+    async def check_agent_health_async(self, session, agent, semaphore):
+        """Check health of a specific agent; returns (status, latency_ms)"""
+        url = self.health_url(agent)
+        if not url:
+            return "unknown", None
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                # Try to ping the agent
+                async with session.get(url) as response:
+                    await response.read()
+                    status = "healthy" if response.status == 200 else "unhealthy"
+                return status, (time.perf_counter() - start) * 1000
+            except Exception as e:
+                logger.debug(f"Health check error for {agent['id']}: {e}")
+                return "unhealthy", None
+
+    def check_agent_health(self, agent):
+        """Check health of a specific agent"""
 
-            agents = agents_data.get("agents", [])
-            updated_count = 0
+        async def check():
+            async with aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as session:
+                status, _ = await self.check_agent_health_async(
+                    session, agent, asyncio.Semaphore(1)
+                )
+                return status
+
+        return asyncio.run(check())
+
+    async def update_agent_status_async(self, session):
+        """Probe all agents concurrently and record the results
+
+        Returns the number of status changes.
+        """
+        self.open_store()
+        agents = [agent for agent in self.load_agents() if agent.get("id")]
+        if not agents:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *(self.check_agent_health_async(session, agent, semaphore) for agent in agents)
+        )
+
+        now = datetime.now().isoformat()
+        changed, seen = {}, {}
+        for agent, (new_status, latency_ms) in zip(agents, results):
+            previous = self.statuses.get(agent["id"])
+            old_status = previous["status"] if previous else agent.get("status", "unknown")
+            row = {
+                "status": new_status,
+                "last_seen": now if new_status == "healthy"
+                else (previous or {}).get("last_seen"),
+                "latency_ms": latency_ms,
+                "checked_at": now,
+            }
+            self.statuses[agent["id"]] = row
 
-            for agent in agents:
-                old_status = agent.get("status", "unknown")
-                new_status = self.check_agent_health(agent)
+            if old_status != new_status:
+                changed[agent["id"]] = row
+                logger.info(f"📊 Agent {agent['id']}: {old_status} -> {new_status}")
+            else:
+                seen[agent["id"]] = row
 
-                if old_status != new_status:
-                    agent["status"] = new_status
-                    agent["last_seen"] = datetime.now().isoformat()
-                    updated_count += 1
+        await asyncio.to_thread(self.store.update, changed, seen)
+        if changed:
+            logger.info(f"📝 Updated {len(changed)} agent statuses")
 
-                    logger.info(f"📊 Agent {agent['id']}: {old_status} -> {new_status}")
+        return len(changed)
 
-            if updated_count > 0:
-                # Write updated status
-                with open(self.config_path, "w") as f:
-                    yaml.dump(agents_data, f, default_flow_style=False)
+    def update_agent_status(self):
+        """Update status of all agents"""
 
-                logger.info(f"📝 Updated {updated_count} agent statuses")
+        async def update():
+            async with self._session() as session:
+                return await self.update_agent_status_async(session)
 
+        try:
+            self.open_store()
+            return asyncio.run(update())
         except Exception as e:
             logger.error(f"Error updating agent status: {e}")
+            return 0
+
+    def _session(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def _heartbeat_loop(self):
+        loop = asyncio.get_running_loop()
+        next_cycle = loop.time()
+
+        async with self._session() as session:
+            while self.running:
+                try:
+                    # Probe agents while the (blocking) system probes run in threads
+                    _, cpu_info, memory_info = await asyncio.gather(
+                        self.update_agent_status_async(session),
+                        asyncio.to_thread(self.probe_cpu),
+                        asyncio.to_thread(self.probe_memory),
+                    )
+
+                    if cpu_info and memory_info:
+                        logger.info(
+                            f"📊 System: CPU {cpu_info['cpu_percent']:.1f}%, Memory {memory_info['memory_percent']:.1f}%"
+                        )
+                except Exception as e:
+                    logger.error(f"Heartbeat error: {e}")
+
+                # Wait for next cycle; a slow cycle does not push the schedule back
+                next_cycle += self.interval
+                delay = next_cycle - loop.time()
+                if delay < 0:
+                    next_cycle = loop.time()
+                    delay = 0
+                await asyncio.sleep(delay)
 
     def start_heartbeat(self, interval=15):
         """Start periodic heartbeat service"""
@@ -233,28 +438,15 @@ def start_heartbeat(self, interval=15):
 
         logger.info(f"💓 Starting heartbeat service (interval: {interval}s)")
 
-        while self.running:
-            try:
-                # Update agent status
-                self.update_agent_status()
-
-                # Log system metrics
-                cpu_info = self.probe_cpu()
-                memory_info = self.probe_memory()
-
-                logger.info(
-                    f"📊 System: CPU {cpu_info['cpu_percent']:.1f}%, Memory {memory_info['memory_percent']:.1f}%"
-                )
-
-                # Wait for next cycle
-                time.sleep(self.interval)
-
-            except KeyboardInterrupt:
-                logger.info("🛑 Heartbeat service stopped")
-                self.running = False
-            except Exception as e:
-                logger.error(f"Heartbeat error: {e}")
-                time.sleep(self.interval)
+        self.open_store()
+        try:
+            asyncio.run(self._heartbeat_loop())
+        except KeyboardInterrupt:
+            logger.info("🛑 Heartbeat service stopped")
+        finally:
+            self.running = False
+            self.store.close()
+            self.store = None
 
 
 def main():
@@ -267,10 +459,13 @@ def main():
     parser.add_argument(
         "--probe", choices=["cpu", "gpu", "memory", "disk"], help="Run specific probe"
     )
+    parser.add_argument(
+        "--concurrency", type=int, default=100, help="Max agent checks in flight"
+    )
 
     args = parser.parse_args()
 
-    service = HeartbeatService()
+    service = HeartbeatService(concurrency=args.concurrency)
 
     if args.probe:
         if args.probe == "cpu":
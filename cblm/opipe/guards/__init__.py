@@ -4,7 +4,14 @@
 Prevents ADK Custom Agent issues: infinite loops, tool budget exceeded, intermediate output
 """
 
-from .multi_agent_guard import MultiAgentGuard, get_guard, AgentState
+from .multi_agent_guard import (
+    MultiAgentGuard,
+    get_guard,
+    AgentState,
+    BarrierTimeout,
+    GuardRegistry,
+    conversation_guard,
+)
 from .decorators import (
     guard_tool_call,
     guard_subagent,
@@ -27,6 +34,9 @@
     "MultiAgentGuard",
     "get_guard",
     "AgentState",
+    "BarrierTimeout",
+    "GuardRegistry",
+    "conversation_guard",
     "guard_tool_call",
     "guard_subagent",
     "ensure_final_output",
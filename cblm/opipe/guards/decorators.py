@@ -7,7 +7,7 @@
 import functools
 import asyncio
 from typing import Callable
-from .multi_agent_guard import get_guard
+from .multi_agent_guard import get_guard, BarrierTimeout
 
 
 def guard_tool_call(tool_name: str, max_calls: int = 8):
@@ -115,10 +115,13 @@ async def wrapper(*args, **kwargs):
             try:
                 results = await guard.run_subagents_with_barrier(tasks, timeout)
                 return results
-            except asyncio.TimeoutError:
+            except BarrierTimeout as e:
                 return {
                     "error": "barrier_timeout",
                     "reason": "subagents_did_not_complete_in_time",
+                    "partial_results": [
+                        None if isinstance(r, BaseException) else r for r in e.results
+                    ],
                 }
 
         return wrapper
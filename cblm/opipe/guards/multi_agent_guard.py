@@ -5,12 +5,20 @@
 """
 
 import time
+import heapq
 import hashlib
 import asyncio
-from typing import Dict, Tuple, Any
+import itertools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Tuple, Any, Optional, List, Callable
 from dataclasses import dataclass
 from enum import Enum
 
+from .config import GuardConfig, get_current_config
+
 
 class AgentState(Enum):
     IDLE = "idle"
@@ -29,6 +37,59 @@ class ToolCall:
     call_hash: str
 
 
+class DedupCache:
+    """Recent call hashes with heap-ordered expiry (O(log n) insert, O(1) amortized expiry)"""
+
+    def __init__(self):
+        self._expiry: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def _expire(self, now: float):
+        heap, expiry = self._heap, self._expiry
+        while heap and heap[0][0] <= now:
+            ts, call_hash = heapq.heappop(heap)
+            # Skip stale heap entries superseded by a later add()
+            if expiry.get(call_hash) == ts:
+                del expiry[call_hash]
+
+    def contains(self, call_hash: str, now: float) -> bool:
+        self._expire(now)
+        return call_hash in self._expiry
+
+    def add(self, call_hash: str, now: float, window: float):
+        ts = now + window
+        self._expiry[call_hash] = ts
+        heapq.heappush(self._heap, (ts, call_hash))
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+class ToolBudget:
+    """Fixed-window call counter for one tool.
+
+    ``itertools.count`` increments atomically under the GIL, so concurrent
+    callers never need a lock; a window rollover simply swaps in a new counter.
+    """
+
+    __slots__ = ("window_start", "_counter")
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self._counter = itertools.count(1)
+
+    def acquire(self, max_calls: int) -> bool:
+        return next(self._counter) <= max_calls
+
+
+class BarrierTimeout(asyncio.TimeoutError):
+    """Barrier timed out; ``results`` holds finished results and TimeoutError for stragglers"""
+
+    def __init__(self, results: list):
+        super().__init__("subagents_did_not_complete_in_time")
+        self.results = results
+
+
 class MultiAgentGuard:
     """Guard system for multi-agent operations"""
 
@@ -39,17 +100,23 @@ def __init__(
         max_depth: int = 3,
         max_iterations: int = 10,
     ):
-        self.calls: Dict[str, Tuple[int, float]] = {}
+        self.calls: Dict[str, ToolBudget] = {}
         self.ttl = ttl_s
         self.max_calls = max_calls
         self.max_depth = max_depth
         self.max_iterations = max_iterations
 
+        # Per-tool {"max_calls": n, "ttl": s} overriding the defaults above
+        self.tool_limits: Dict[str, Dict[str, Any]] = {}
+
         # Circuit breaker
         self.circuit_breaker: Dict[str, Dict[str, Any]] = {}
+        self.max_failures = 3
+        self.max_timeouts = 2
+        self.circuit_timeout = 30
 
         # Deduplication
-        self.recent_calls: Dict[str, float] = {}
+        self.recent_calls = DedupCache()
         self.dedup_window = 5  # seconds
 
         # State management
@@ -57,6 +124,27 @@ def __init__(
         self.current_depth = 0
         self.current_iterations = 0
 
+        # Partial results of the last barrier run (set on timeout too)
+        self.last_barrier_results: list = []
+
+    @classmethod
+    def from_config(cls, config: Optional[GuardConfig] = None) -> "MultiAgentGuard":
+        """Build a guard from a GuardConfig (default: the CB_ENVIRONMENT one)"""
+        if config is None:
+            config = get_current_config()
+        guard = cls(
+            max_calls=config.max_calls_per_tool,
+            ttl_s=config.tool_ttl_seconds,
+            max_depth=config.max_depth,
+            max_iterations=config.max_iterations,
+        )
+        guard.dedup_window = config.dedup_window_seconds
+        guard.tool_limits = dict(config.tool_overrides or {})
+        guard.max_failures = config.max_failures
+        guard.max_timeouts = config.max_timeouts
+        guard.circuit_timeout = config.circuit_timeout_seconds
+        return guard
+
     def _generate_call_hash(
         self, prompt: str, params: Dict[str, Any], parent_id: str
     ) -> str:
@@ -79,56 +167,45 @@ def allow_tool_call(
         if self._is_circuit_open(tool_name):
             return False
 
-        # Check budget
-        if not self._check_budget(tool_name):
-            return False
+        now = time.time()
 
         # Check deduplication
         call_hash = self._generate_call_hash(prompt, params, parent_id)
-        if self._is_duplicate_call(call_hash):
+        if self._is_duplicate_call(call_hash, now):
             return False
 
         # Check max iterations
         if self.current_iterations >= self.max_iterations:
             return False
 
+        # Check budget (consumes one call from the tool window)
+        if not self._check_budget(tool_name, now):
+            return False
+
         # Record call
-        self.calls[tool_name] = (
-            self.calls.get(tool_name, (0, time.time()))[0] + 1,
-            time.time(),
-        )
-        self.recent_calls[call_hash] = time.time()
+        self.recent_calls.add(call_hash, now, self.dedup_window)
         self.current_iterations += 1
 
         return True
 
-    def _check_budget(self, tool_name: str) -> bool:
-        """Check if tool is within budget"""
-        now = time.time()
-        count, last_reset = self.calls.get(tool_name, (0, now))
+    def _check_budget(self, tool_name: str, now: Optional[float] = None) -> bool:
+        """Take one call from the tool budget; False if the window is exhausted"""
+        if now is None:
+            now = time.time()
+        limits = self.tool_limits.get(tool_name, {})
+        budget = self.calls.get(tool_name)
 
         # Reset if TTL expired
-        if now - last_reset > self.ttl:
-            count = 0
-            last_reset = now
+        if budget is None or now - budget.window_start > limits.get("ttl", self.ttl):
+            budget = self.calls[tool_name] = ToolBudget(now)
 
-        # Check if within budget
-        if count >= self.max_calls:
-            return False
+        return budget.acquire(limits.get("max_calls", self.max_calls))
 
-        self.calls[tool_name] = (count, last_reset)
-        return True
-
-    def _is_duplicate_call(self, call_hash: str) -> bool:
+    def _is_duplicate_call(self, call_hash: str, now: Optional[float] = None) -> bool:
         """Check if call is duplicate within dedup window"""
-        now = time.time()
-
-        # Clean old entries
-        self.recent_calls = {
-            h: t for h, t in self.recent_calls.items() if now - t < self.dedup_window
-        }
-
-        return call_hash in self.recent_calls
+        return self.recent_calls.contains(
+            call_hash, time.time() if now is None else now
+        )
 
     def _is_circuit_open(self, tool_name: str) -> bool:
         """Check if circuit breaker is open for tool"""
@@ -139,12 +216,15 @@ def _is_circuit_open(self, tool_name: str) -> bool:
         now = time.time()
 
         # Reset if timeout expired
-        if now - cb.get("last_failure", 0) > 30:  # 30s timeout
+        if now - cb.get("last_failure", 0) > self.circuit_timeout:
             cb["failures"] = 0
             cb["timeouts"] = 0
 
         # Open circuit if too many failures
-        return cb.get("failures", 0) >= 3 or cb.get("timeouts", 0) >= 2
+        return (
+            cb.get("failures", 0) >= self.max_failures
+            or cb.get("timeouts", 0) >= self.max_timeouts
+        )
 
     def record_tool_failure(self, tool_name: str, is_timeout: bool = False):
         """Record tool failure for circuit breaker"""
@@ -184,37 +264,132 @@ def increment_depth(self) -> bool:
     async def run_subagents_with_barrier(
         self, tasks: list, timeout: float = 30
     ) -> list:
-        """Run subagents with barrier and timeout"""
+        """Run subagents with barrier and timeout.
+
+        Stragglers still running at the deadline are cancelled. Results of the
+        subagents that finished are kept in ``last_barrier_results`` and on the
+        raised ``BarrierTimeout`` (stragglers appear as ``asyncio.TimeoutError``).
+        """
         self.set_state(AgentState.JOIN)
+        futures = [asyncio.ensure_future(t) for t in tasks]
 
         try:
-            results = await asyncio.wait_for(
-                asyncio.gather(*tasks, return_exceptions=True), timeout=timeout
-            )
+            if not futures:
+                self.last_barrier_results = []
+                return []
+            done, pending = await asyncio.wait(futures, timeout=timeout)
+
+            for fut in pending:
+                fut.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            results = []
+            for task, fut in zip(tasks, futures):
+                if fut in pending:
+                    results.append(asyncio.TimeoutError())
+                    # Record timeout for circuit breaker
+                    if hasattr(task, "tool_name"):
+                        self.record_tool_failure(task.tool_name, is_timeout=True)
+                elif fut.cancelled():
+                    results.append(asyncio.CancelledError())
+                elif fut.exception() is not None:
+                    results.append(fut.exception())
+                else:
+                    results.append(fut.result())
+            self.last_barrier_results = results
+
+            if pending:
+                raise BarrierTimeout(results)
             return results
-        except asyncio.TimeoutError:
-            # Record timeout for circuit breaker
-            for task in tasks:
-                if hasattr(task, "tool_name"):
-                    self.record_tool_failure(task.tool_name, is_timeout=True)
+        except asyncio.CancelledError:
+            for fut in futures:
+                fut.cancel()
             raise
         finally:
             self.set_state(AgentState.FINAL)
 
 
-# Global guard instance
-guard = MultiAgentGuard()
+class GuardRegistry:
+    """Per-conversation guards, bounded by LRU size and idle TTL"""
+
+    def __init__(
+        self,
+        factory: Optional[Callable[[], MultiAgentGuard]] = None,
+        max_conversations: int = 10000,
+        idle_ttl_s: float = 3600,
+    ):
+        self.factory = factory or MultiAgentGuard.from_config
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl_s
+        self._guards: "OrderedDict[str, Tuple[MultiAgentGuard, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> MultiAgentGuard:
+        """Get (or create) the guard for a conversation"""
+        now = time.time()
+        with self._lock:
+            entry = self._guards.pop(conversation_id, None)
+            guard = entry[0] if entry else self.factory()
+            self._guards[conversation_id] = (guard, now)
+
+            # Oldest entries sit at the front: evict idle ones, then enforce size
+            while self._guards:
+                oldest_id, (_, last_used) = next(iter(self._guards.items()))
+                if (
+                    len(self._guards) > self.max_conversations
+                    or now - last_used > self.idle_ttl
+                ):
+                    del self._guards[oldest_id]
+                else:
+                    break
+            return guard
+
+    def drop(self, conversation_id: str):
+        """Forget a finished conversation"""
+        with self._lock:
+            self._guards.pop(conversation_id, None)
+
+    def __len__(self) -> int:
+        return len(self._guards)
+
+
+# Global guard instance (used outside of any conversation context)
+guard = MultiAgentGuard.from_config()
+
+# Per-conversation guards
+registry = GuardRegistry()
+_current_guard: ContextVar[Optional[MultiAgentGuard]] = ContextVar(
+    "multi_agent_guard", default=None
+)
 
 
 def get_guard() -> MultiAgentGuard:
-    """Get global guard instance"""
-    return guard
+    """Get the guard of the current conversation, or the global guard"""
+    current = _current_guard.get()
+    return current if current is not None else guard
+
+
+@contextmanager
+def conversation_guard(conversation_id: str, guards: Optional[GuardRegistry] = None):
+    """Bind the conversation's guard to the current context.
+
+    Tasks created inside the block (subagents, tools) inherit it through
+    contextvars, so concurrent conversations never share budgets or dedup state.
+    """
+    conv_guard = (guards if guards is not None else registry).get(conversation_id)
+    token = _current_guard.set(conv_guard)
+    try:
+        yield conv_guard
+    finally:
+        _current_guard.reset(token)
 
 
 # Usage examples:
 """
-# In your agent code:
-guard = get_guard()
+# In your agent code (one guard per conversation):
+with conversation_guard(conversation_id):
+    guard = get_guard()
 
 # Before tool call:
 if not guard.allow_tool_call("search", prompt, params, parent_id):
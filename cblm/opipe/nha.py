@@ -39,6 +39,8 @@ class NHARegistry:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.agents: Dict[str, NHAAgent] = {}
+        self._by_category: Dict[str, List[NHAAgent]] = {}
+        self._by_status: Dict[str, List[NHAAgent]] = {}
         self.setup_logging()
         self.load_agents()
 
@@ -74,6 +76,7 @@ def load_agents(self):
             # Agency/MCC Agents
             self._register_agency_agents()
 
+            self._reindex()
             self.logger.info(f"Loaded {len(self.agents)} NHA agents into registry")
 
         except Exception as e:
@@ -581,17 +584,24 @@ def _register_dev_tool_agents(self):
         for agent in dev_tool_agents:
             self.agents[agent.name] = agent
 
+    def _reindex(self):
+        """Rebuild category/status indexes (once per load or update)"""
+        self._by_category, self._by_status = {}, {}
+        for agent in self.agents.values():
+            self._by_category.setdefault(agent.category, []).append(agent)
+            self._by_status.setdefault(agent.status, []).append(agent)
+
     def get_agent(self, name: str) -> Optional[NHAAgent]:
         """Get agent by name"""
         return self.agents.get(name)
 
     def get_agents_by_category(self, category: str) -> List[NHAAgent]:
         """Get all agents in a category"""
-        return [agent for agent in self.agents.values() if agent.category == category]
+        return list(self._by_category.get(category, ()))
 
     def get_active_agents(self) -> List[NHAAgent]:
         """Get all active agents"""
-        return [agent for agent in self.agents.values() if agent.status == "active"]
+        return list(self._by_status.get("active", ()))
 
     def update_agent(self, name: str, **kwargs) -> bool:
         """Update agent properties"""
@@ -606,6 +616,8 @@ def update_agent(self, name: str, **kwargs) -> bool:
                     setattr(agent, key, value)
 
             agent.last_updated = datetime.now().isoformat()
+            if "category" in kwargs or "status" in kwargs:
+                self._reindex()
             self.logger.info(f"Updated agent {name}")
             return True
 
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Policy What-If Simulator
+- Citește logs/policy-enforcement-YYYYMM.jsonl pe o fereastră de timp
+- Compilează regulile enforcer-ului (status / permission / scope / secret) în matrici NumPy
+- Reevaluează toate cererile față de registry-ul curent și față de fiecare recomandare
+  din policy_recommendations.yaml, într-o singură trecere peste loguri
+- Produce: reports/policy_simulation.json (flip-uri DENY→ALLOW per agent și action)
+
+Usage:
+  python -m cblm.opipe.nha.adaptive.simulator \
+    --logs-dir logs \
+    --window last_7d \
+    --registry-file cblm/opipe/nha/agents.yaml \
+    --recommendations-file cblm/opipe/nha/policy_recommendations.yaml \
+    --out-dir reports
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import yaml
+import numpy as np
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from .collector import iter_audit_files, iter_records
+
+ISO = "%Y-%m-%dT%H:%M:%SZ"
+SIMULATED_ACTIONS = ("add_scope", "add_permission", "add_secret")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Replay audit logs against candidate policy recommendations"
+    )
+    p.add_argument(
+        "--logs-dir", default="logs", help="Directory with policy-enforcement-*.jsonl"
+    )
+    p.add_argument("--out-dir", default="reports", help="Directory for output reports")
+    p.add_argument(
+        "--window",
+        default="last_7d",
+        choices=["last_24h", "last_7d", "all", "absolute"],
+        help="Time window filter",
+    )
+    p.add_argument("--from-ts", help="Absolute start (UTC, e.g. 2025-09-11T00:00:00Z)")
+    p.add_argument("--to-ts", help="Absolute end   (UTC, e.g. 2025-09-12T00:00:00Z)")
+    p.add_argument(
+        "--registry-file",
+        default="cblm/opipe/nha/agents.yaml",
+        help="Path to agents.yaml",
+    )
+    p.add_argument(
+        "--recommendations-file",
+        default="cblm/opipe/nha/policy_recommendations.yaml",
+        help="Path to policy_recommendations.yaml",
+    )
+    return p.parse_args()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# -------------------------
+# Audit log -> coloane codificate
+# -------------------------
+class _Vocab:
+    """String -> cod int stabil (ordinea de apariție)"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class AuditColumns:
+    """Audit window as dictionary-encoded int32 columns.
+
+    Missing scope/secret are encoded as ``len(vocab)`` so the policy matrices
+    can carry an always-true last column for them.
+    """
+
+    def __init__(self):
+        self.agents, self.actions = _Vocab(), _Vocab()
+        self.scopes, self.secrets = _Vocab(), _Vocab()
+        self.agent = self.action = self.scope = self.secret = None
+        self.recorded_deny = None
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Dict[str, Any]],
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> "AuditColumns":
+        cols = cls()
+        agent, action, scope, secret, deny = [], [], [], [], []
+        for rec in records:
+            # ISO Zulu are lățime fixă: comparația de string-uri e comparație de timp
+            ts = rec.get("ts") or ""
+            if (start and ts < start) or (end and ts > end):
+                continue
+            extra = rec.get("extra") or {}
+            sec = None
+            if isinstance(extra, dict):
+                sec = extra.get("secret") or extra.get("require_secret")
+            agent.append(cols.agents.code(rec.get("nha_id", "nha:unknown")))
+            action.append(cols.actions.code(rec.get("action", "unknown")))
+            scope.append(cols.scopes.code(rec["scope"]) if rec.get("scope") else -1)
+            secret.append(cols.secrets.code(sec) if sec else -1)
+            deny.append(rec.get("result") != "ALLOW")
+
+        cols.agent = np.asarray(agent, dtype=np.int32)
+        cols.action = np.asarray(action, dtype=np.int32)
+        cols.scope = np.asarray(scope, dtype=np.int32)
+        cols.secret = np.asarray(secret, dtype=np.int32)
+        cols.scope[cols.scope < 0] = len(cols.scopes)
+        cols.secret[cols.secret < 0] = len(cols.secrets)
+        cols.recorded_deny = np.asarray(deny, dtype=bool)
+        return cols
+
+    def __len__(self) -> int:
+        return 0 if self.agent is None else len(self.agent)
+
+
+# -------------------------
+# Reguli enforcer compilate
+# -------------------------
+class CompiledPolicy:
+    """Regulile din enforcer.enforce_request (mod deny) ca matrici booleene.
+
+    Ordinea și semantica sunt cele din enforcer: agent necunoscut -> DENY,
+    deprecated -> DENY, paused -> doar read:*, apoi permission, scope, secret.
+    """
+
+    def __init__(self, registry: Dict[str, Any], cols: AuditColumns):
+        n_ag, n_act = len(cols.agents), len(cols.actions)
+        n_sc, n_se = len(cols.scopes), len(cols.secrets)
+        self.cols = cols
+        self.known = np.zeros(n_ag, dtype=bool)
+        self.deprecated = np.zeros(n_ag, dtype=bool)
+        self.paused = np.zeros(n_ag, dtype=bool)
+        self.is_read = np.fromiter(
+            (a.startswith("read:") for a in cols.actions.values), dtype=bool, count=n_act
+        )
+        self.perm = np.zeros((n_ag, n_act), dtype=bool)
+        self.scope = np.zeros((n_ag, n_sc + 1), dtype=bool)
+        self.secret = np.zeros((n_ag, n_se + 1), dtype=bool)
+        self.scope[:, n_sc] = True
+        self.secret[:, n_se] = True
+
+        for agent in registry.get("nhas", []):
+            a = cols.agents.index.get(agent.get("id"))
+            if a is None:
+                continue  # agent fără trafic în fereastră
+            status = agent.get("status") or "active"
+            self.known[a] = True
+            self.deprecated[a] = status == "deprecated"
+            self.paused[a] = status == "paused"
+            for perm in agent.get("permissions") or []:
+                self.grant(a, "add_permission", perm)
+            for cap in agent.get("capabilities") or []:
+                for scope in cap.get("scopes") or []:
+                    self.grant(a, "add_scope", scope)
+            for secret in agent.get("secrets") or []:
+                self.grant(a, "add_secret", secret)
+
+    def _target(self, action: str, value: str) -> Tuple[Optional[np.ndarray], Optional[int]]:
+        vocab, matrix = {
+            "add_permission": (self.cols.actions, self.perm),
+            "add_scope": (self.cols.scopes, self.scope),
+            "add_secret": (self.cols.secrets, self.secret),
+        }[action]
+        return matrix, vocab.index.get(value)
+
+    def grant(self, a: int, action: str, value: str) -> bool:
+        """Adaugă un drept agentului a; False dacă valoarea nu apare în loguri"""
+        matrix, col = self._target(action, value)
+        if col is None:
+            return False
+        matrix[a, col] = True
+        return True
+
+    def evaluate(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """ALLOW mask pentru rândurile date (toate dacă rows e None)"""
+        c = self.cols
+        if rows is None:
+            a, act, sc, se = c.agent, c.action, c.scope, c.secret
+        else:
+            a, act, sc, se = c.agent[rows], c.action[rows], c.scope[rows], c.secret[rows]
+        return (
+            self.known[a]
+            & ~self.deprecated[a]
+            & (~self.paused[a] | self.is_read[act])
+            & self.perm[a, act]
+            & self.scope[a, sc]
+            & self.secret[a, se]
+        )
+
+
+# -------------------------
+# Recomandări
+# -------------------------
+def load_recommendations(file_path: Path) -> List[Dict[str, Any]]:
+    """Normalizează ambele formate de policy_recommendations.yaml la o listă plată"""
+    with file_path.open("r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    out: List[Dict[str, Any]] = []
+
+    def add(agent_id: str, rec: Dict[str, Any]) -> None:
+        action = rec.get("action", "")
+        base = {
+            "agent_id": agent_id,
+            "priority": rec.get("priority", "medium"),
+            "rationale": rec.get("rationale", ""),
+        }
+        for kind, single in (("scope", "scopes"), ("permission", "permissions"), ("secret", "secrets")):
+            if action in (f"add_{kind}", f"add_{single}"):
+                values = rec.get(single) or ([rec[kind]] if rec.get(kind) else [])
+                for value in values:
+                    out.append({**base, "action": f"add_{kind}", "target": value})
+                return
+        out.append({**base, "action": action, "target": None})
+
+    # format generat de recommender.write_yaml
+    for agent in (data.get("policy_recommendations") or {}).get("agents", []) or []:
+        for rec in agent.get("recommendations", []) or []:
+            add(agent.get("id"), rec)
+    # format curat manual (listă plată cu id)
+    for rec in data.get("recommendations", []) or []:
+        add(rec.get("id"), rec)
+    return out
+
+
+def _breakdown(cols: AuditColumns, rows: np.ndarray) -> Dict[str, Dict[str, int]]:
+    """{agent: {action: count}} pentru rândurile date"""
+    n_act = max(len(cols.actions), 1)
+    keys = cols.agent[rows].astype(np.int64) * n_act + cols.action[rows]
+    uniq, counts = np.unique(keys, return_counts=True)
+    out: Dict[str, Dict[str, int]] = {}
+    for key, count in zip(uniq.tolist(), counts.tolist()):
+        agent, action = divmod(key, n_act)
+        out.setdefault(cols.agents.values[agent], {})[cols.actions.values[action]] = count
+    return out
+
+
+def simulate(
+    cols: AuditColumns, registry: Dict[str, Any], recommendations: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Evaluează fiecare recomandare (izolat) și toate împreună față de aceeași fereastră"""
+    base = CompiledPolicy(registry, cols)
+    base_allow = base.evaluate()
+    base_deny = ~base_allow
+
+    # rândurile fiecărui agent, o singură sortare
+    order = np.argsort(cols.agent, kind="stable")
+    bounds = np.searchsorted(cols.agent[order], np.arange(len(cols.agents) + 1))
+
+    results = []
+    combined = CompiledPolicy(registry, cols)
+    for rec in recommendations:
+        entry = {**rec, "flips": 0, "flips_by_action": {}}
+        a = cols.agents.index.get(rec["agent_id"])
+        if rec["action"] not in SIMULATED_ACTIONS:
+            entry["status"] = "not_simulated"
+        elif a is None:
+            entry["status"] = "no_traffic"
+        else:
+            matrix, col = base._target(rec["action"], rec["target"])
+            if col is None or matrix[a, col]:
+                entry["status"] = "no_effect"
+            else:
+                # modificare temporară pe rândul agentului, reevaluare doar pe rândurile lui
+                rows = order[bounds[a]:bounds[a + 1]]
+                matrix[a, col] = True
+                flipped = rows[base_deny[rows] & base.evaluate(rows)]
+                matrix[a, col] = False
+                combined.grant(a, rec["action"], rec["target"])
+                entry["status"] = "simulated"
+                entry["flips"] = int(len(flipped))
+                entry["flips_by_action"] = _breakdown(cols, flipped).get(rec["agent_id"], {})
+        results.append(entry)
+
+    combined_flips = np.flatnonzero(base_deny & combined.evaluate())
+    return {
+        "generated_at": _utcnow().strftime(ISO),
+        "total_records": len(cols),
+        "recorded_denies": int(cols.recorded_deny.sum()),
+        "baseline_denies": int(base_deny.sum()),
+        "recommendations": results,
+        "combined": {
+            "flips": int(len(combined_flips)),
+            "remaining_denies": int(base_deny.sum() - len(combined_flips)),
+            "flips_by_agent": _breakdown(cols, combined_flips),
+        },
+    }
+
+
+def write_json(out_dir: Path, data: Dict[str, Any], window: str) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"policy_simulation_{window}.json"
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def main() -> None:
+    from .collector import resolve_window
+
+    args = parse_args()
+    start, end = resolve_window(args)
+    files = list(iter_audit_files(Path(args.logs_dir)))
+    if not files:
+        print("no audit files found")
+        return
+
+    cols = AuditColumns.from_records(
+        iter_records(files), start.strftime(ISO), end.strftime(ISO)
+    )
+    with Path(args.registry_file).open("r", encoding="utf-8") as f:
+        registry = yaml.safe_load(f)
+    recommendations = load_recommendations(Path(args.recommendations_file))
+
+    report = simulate(cols, registry, recommendations)
+    out_json = write_json(Path(args.out_dir), report, args.window)
+    print(f"wrote {out_json}")
+
+    print("\nSimulation Summary:")
+    print(f"- Records replayed: {report['total_records']}")
+    print(f"- Baseline denies: {report['baseline_denies']}")
+    for rec in report["recommendations"]:
+        print(
+            f"- {rec['agent_id']} {rec['action']} {rec['target'] or ''}: "
+            f"{rec['flips']} DENY→ALLOW ({rec['status']})"
+        )
+    print(f"- All recommendations combined: {report['combined']['flips']} flips")
+
+
+if __name__ == "__main__":
+    main()
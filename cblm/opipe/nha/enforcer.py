@@ -2,11 +2,14 @@
 # Paznic cu baston: orice NHA care iese din linii e oprit pe loc, logat și raportat
 
 from __future__ import annotations
+import hashlib
 import json
 import os
 import time
 import uuid
 import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -94,7 +97,7 @@ def _audit_write(record: dict) -> None:
         pass
 
 
-def _audit(
+def _audit_record(
     nha_id: str,
     action: str,
     result: str,
@@ -102,7 +105,8 @@ def _audit(
     *,
     scope: Optional[str],
     extra: Optional[dict],
-) -> None:
+    trace_id: Optional[str] = None,
+) -> dict:
     rec = {
         "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         "nha_id": nha_id,
@@ -111,11 +115,28 @@ def _audit(
         "reason": reason,
         "policy_version": POLICY_VERSION,
         "registry_version": _cache_version,
-        "trace_id": str(uuid.uuid4()),
+        "trace_id": trace_id or str(uuid.uuid4()),
         "scope": scope,
         "extra": extra or {},
     }
-    _audit_write(rec)
+    return rec
+
+
+def _audit(
+    nha_id: str,
+    action: str,
+    result: str,
+    reason: str,
+    *,
+    scope: Optional[str],
+    extra: Optional[dict],
+    trace_id: Optional[str] = None,
+) -> None:
+    _audit_write(
+        _audit_record(
+            nha_id, action, result, reason, scope=scope, extra=extra, trace_id=trace_id
+        )
+    )
 
 
 # -------------------------
@@ -185,162 +206,134 @@ def check_permission(nha_id: str, action: str) -> bool:
     return ok and _permits_action(ag, action)
 
 
-def enforce_request(
-    nha_id: str,
+def _decide(
+    ag: Optional[NHA],
     action: str,
-    payload: dict,
-    *,
-    scope: Optional[str] = None,
-    require_secret: Optional[str] = None,
-    extras: Optional[dict] = None,
-) -> EnforcementResult:
-    """
-    Gate unic pentru orice acțiune.
-    - action: ex "rag:ingest" sau "run.invoker"
-    - scope: dacă acțiunea are și scope (ex write:rag)
-    - require_secret: dacă acțiunea cere secret (ex HMAC key)
-    """
-    ag = _get_agent(nha_id)
+    scope: Optional[str],
+    require_secret: Optional[str],
+) -> Tuple[bool, str, str]:
+    """Decizia pură (allowed, decision, reason), fără audit"""
     if ag is None:
         # agent necunoscut
         if FAIL_CLOSED or DENY_BY_DEFAULT:
-            _audit(nha_id, action, "DENY", "unknown_agent", scope=scope, extra=extras)
-            return EnforcementResult(
-                False,
-                "DENY",
-                "unknown_agent",
-                POLICY_VERSION,
-                str(uuid.uuid4()),
-                nha_id,
-                action,
-                scope,
-                extras,
-            )
+            return False, "DENY", "unknown_agent"
         if ALLOW_WARN:
-            _audit(nha_id, action, "WARN", "unknown_agent", scope=scope, extra=extras)
-            return EnforcementResult(
-                True,
-                "WARN",
-                "unknown_agent",
-                POLICY_VERSION,
-                str(uuid.uuid4()),
-                nha_id,
-                action,
-                scope,
-                extras,
-            )
+            return True, "WARN", "unknown_agent"
+        return False, "DENY", "unknown_agent"
 
     # status
     ok, reason = _status_allows(ag, action)
     if not ok:
-        _audit(nha_id, action, "DENY", reason, scope=scope, extra=extras)
-        return EnforcementResult(
-            False,
-            "DENY",
-            reason,
-            POLICY_VERSION,
-            str(uuid.uuid4()),
-            nha_id,
-            action,
-            scope,
-            extras,
-        )
+        return False, "DENY", reason
 
     # permission-level action
     if not _permits_action(ag, action):
         if ALLOW_WARN:
-            _audit(
-                nha_id,
-                action,
-                "WARN",
-                "permission_not_allowed",
-                scope=scope,
-                extra=extras,
-            )
-            return EnforcementResult(
-                True,
-                "WARN",
-                "permission_not_allowed",
-                POLICY_VERSION,
-                str(uuid.uuid4()),
-                nha_id,
-                action,
-                scope,
-                extras,
-            )
-        _audit(
-            nha_id, action, "DENY", "permission_not_allowed", scope=scope, extra=extras
-        )
-        return EnforcementResult(
-            False,
-            "DENY",
-            "permission_not_allowed",
-            POLICY_VERSION,
-            str(uuid.uuid4()),
-            nha_id,
-            action,
-            scope,
-            extras,
-        )
+            return True, "WARN", "permission_not_allowed"
+        return False, "DENY", "permission_not_allowed"
 
     # optional scope
     if scope and not _has_scope(ag, scope):
         if ALLOW_WARN:
-            _audit(
-                nha_id, action, "WARN", "scope_not_allowed", scope=scope, extra=extras
-            )
-            return EnforcementResult(
-                True,
-                "WARN",
-                "scope_not_allowed",
-                POLICY_VERSION,
-                str(uuid.uuid4()),
-                nha_id,
-                action,
-                scope,
-                extras,
-            )
-        _audit(nha_id, action, "DENY", "scope_not_allowed", scope=scope, extra=extras)
-        return EnforcementResult(
-            False,
-            "DENY",
-            "scope_not_allowed",
-            POLICY_VERSION,
-            str(uuid.uuid4()),
-            nha_id,
-            action,
-            scope,
-            extras,
-        )
+            return True, "WARN", "scope_not_allowed"
+        return False, "DENY", "scope_not_allowed"
 
     # optional secret
     if require_secret and not _has_secret(ag, require_secret):
-        _audit(nha_id, action, "DENY", "secret_not_allowed", scope=scope, extra=extras)
-        return EnforcementResult(
-            False,
-            "DENY",
-            "secret_not_allowed",
-            POLICY_VERSION,
-            str(uuid.uuid4()),
-            nha_id,
-            action,
-            scope,
-            extras,
-        )
+        return False, "DENY", "secret_not_allowed"
 
     # all good
-    _audit(nha_id, action, "ALLOW", "ok", scope=scope, extra=extras)
-    return EnforcementResult(
-        True,
-        "ALLOW",
-        "ok",
+    return True, "ALLOW", "ok"
+
+
+def _audit_extra(extras: Optional[dict], require_secret: Optional[str]) -> dict:
+    # secretul cerut ajunge în audit (collector/simulator îl citesc din extra)
+    if not require_secret:
+        return extras or {}
+    return {**(extras or {}), "require_secret": require_secret}
+
+
+# -------------------------
+# Memo per request
+# -------------------------
+def _extras_key(extras: Optional[dict]) -> Optional[str]:
+    # extras intră în audit și în rezultat: contexte diferite nu se memoizează împreună
+    if not extras:
+        return None
+    blob = json.dumps(extras, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+_memo: ContextVar[Optional[Dict[tuple, EnforcementResult]]] = ContextVar(
+    "nha_decision_memo", default=None
+)
+
+
+@contextmanager
+def decision_memo():
+    """
+    Memo de decizii pe durata unui request / flow run.
+    Verificările repetate (același agent, action, scope, secret, extras) sunt gratuite:
+    fără lookup sub lock și fără a doua scriere în audit.
+    """
+    if _memo.get() is not None:
+        # memo deja activ (ex: middleware + cod downstream) -> refolosim
+        yield _memo.get()
+        return
+    token = _memo.set({})
+    try:
+        yield _memo.get()
+    finally:
+        _memo.reset(token)
+
+
+def enforce_request(
+    nha_id: str,
+    action: str,
+    payload: dict,
+    *,
+    scope: Optional[str] = None,
+    require_secret: Optional[str] = None,
+    extras: Optional[dict] = None,
+) -> EnforcementResult:
+    """
+    Gate unic pentru orice acțiune.
+    - action: ex "rag:ingest" sau "run.invoker"
+    - scope: dacă acțiunea are și scope (ex write:rag)
+    - require_secret: dacă acțiunea cere secret (ex HMAC key)
+    """
+    memo = _memo.get()
+    key = (nha_id, action, scope, require_secret, _extras_key(extras), _cache_version)
+    if memo is not None and key in memo:
+        return memo[key]
+
+    allowed, decision, reason = _decide(
+        _get_agent(nha_id), action, scope, require_secret
+    )
+    trace_id = str(uuid.uuid4())
+    _audit(
+        nha_id,
+        action,
+        decision,
+        reason,
+        scope=scope,
+        extra=_audit_extra(extras, require_secret),
+        trace_id=trace_id,
+    )
+    res = EnforcementResult(
+        allowed,
+        decision,
+        reason,
         POLICY_VERSION,
-        str(uuid.uuid4()),
+        trace_id,
         nha_id,
         action,
         scope,
         extras,
     )
+    if memo is not None:
+        memo[key] = res
+    return res
 
 
 # -------------------------
@@ -2,8 +2,7 @@
 # Generates JSON, Markdown, and other artifacts from agents.yaml
 
 import sys
-import os
-from registry import load_yaml, dump_json, dump_markdown, dump_by_category
+from registry import load_yaml_cached, export_artifacts
 
 
 def main():
@@ -11,40 +10,32 @@ def main():
     try:
         # Load registry
         print("📋 Loading NHA registry...")
-        reg = load_yaml("cblm/opipe/nha/agents.yaml")
+        reg = load_yaml_cached("cblm/opipe/nha/agents.yaml")
 
-        # Ensure output directory exists
-        os.makedirs("cblm/opipe/nha/out", exist_ok=True)
-
-        # Generate artifacts
-        print("📄 Generating JSON artifact...")
-        dump_json(reg, "cblm/opipe/nha/out/registry.json")
-
-        print("📝 Generating Markdown artifact...")
-        dump_markdown(reg, "cblm/opipe/nha/out/registry.md")
-
-        print("📊 Generating category breakdown...")
-        dump_by_category(reg, "cblm/opipe/nha/out/by-category.md")
+        # Generate artifacts only if agents.yaml changed (--force to rebuild)
+        print("📄 Generating artifacts...")
+        changed = export_artifacts(
+            "cblm/opipe/nha/agents.yaml",
+            "cblm/opipe/nha/out",
+            force="--force" in sys.argv,
+        )
 
         # Generate summary
-        print("\n✅ NHA Registry Artifacts Generated Successfully!")
+        if changed:
+            print("\n✅ NHA Registry Artifacts Generated Successfully!")
+        else:
+            print("\n✅ NHA Registry Artifacts up to date (source hash unchanged)")
         print(f"📊 Total Agents: {len(reg.nhas)}")
         print("📁 Output Directory: cblm/opipe/nha/out/")
-        print("📄 Files Generated:")
-        print("   - registry.json")
+        print("📄 Files:")
+        print("   - registry.json (+ .sha256, .sig/.cert if cosign is configured)")
         print("   - registry.md")
         print("   - by-category.md")
 
         # Show category breakdown
-        categories = {}
-        for nha in reg.nhas:
-            if nha.category not in categories:
-                categories[nha.category] = 0
-            categories[nha.category] += 1
-
         print("\n📈 Category Breakdown:")
-        for category, count in sorted(categories.items()):
-            print(f"   - {category.replace('_', ' ').title()}: {count}")
+        for category, nhas in sorted(reg.index.by_category.items()):
+            print(f"   - {category.replace('_', ' ').title()}: {len(nhas)}")
 
         return True
 
@@ -4,7 +4,7 @@
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Dict, Callable, Any
-from .enforcer import enforce_request
+from .enforcer import enforce_request, decision_memo
 
 
 class NhaEnforcementMiddleware(BaseHTTPMiddleware):
@@ -23,6 +23,12 @@ def __init__(self, app, *, action_resolver: Callable[[Request], Dict[str, Any]])
         self.action_resolver = action_resolver
 
     async def dispatch(self, request: Request, call_next):
+        # Memo de decizii pe durata request-ului: verificările repetate din
+        # handler (enforce_request) nu mai ating cache-ul sau auditul
+        with decision_memo():
+            return await self._dispatch(request, call_next)
+
+    async def _dispatch(self, request: Request, call_next):
         # Resolve action context from request
         ctx = await self._resolve(request)
 
@@ -1,9 +1,13 @@
 # CoolBits.ai @oPipe - NHA Registry Canonical
 # Single source of truth for all Non-Human Agents
 
-from dataclasses import dataclass, field
-from typing import List, Literal, Optional
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, List, Literal, Optional
+import hashlib
 import json
+import os
+import shutil
+import subprocess
 import yaml
 import sys
 from pathlib import Path
@@ -67,10 +71,99 @@ class NHA:
     notes: str = ""
 
 
+class RegistryIndex:
+    """Secondary indexes over Registry.nhas, built once per load"""
+
+    def __init__(self, nhas: List[NHA]):
+        self.source = nhas
+        self.size = len(nhas)
+        self.by_id: Dict[str, NHA] = {}
+        self.by_name: Dict[str, NHA] = {}
+        self.by_category: Dict[str, List[NHA]] = {}
+        self.by_owner: Dict[str, List[NHA]] = {}
+        self.by_status: Dict[str, List[NHA]] = {}
+        self.by_tag: Dict[str, List[NHA]] = {}
+
+        for nha in nhas:
+            self.by_id[nha.id] = nha
+            self.by_name[nha.name] = nha
+            # dict-urile păstrează ordinea din agents.yaml
+            self.by_category.setdefault(nha.category, []).append(nha)
+            self.by_owner.setdefault(nha.owner, []).append(nha)
+            self.by_status.setdefault(nha.status, []).append(nha)
+            for tag in nha.tags:
+                self.by_tag.setdefault(tag, []).append(nha)
+
+
 @dataclass
 class Registry:
     version: str
     nhas: List[NHA]
+    _index: Optional[RegistryIndex] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def index(self) -> RegistryIndex:
+        """Lazy index; dropped by add/remove/update, rebuilt if nhas was replaced or resized"""
+        idx = self._index
+        if idx is None or idx.source is not self.nhas or idx.size != len(self.nhas):
+            self._index = RegistryIndex(self.nhas)
+        return self._index
+
+    def reindex(self) -> RegistryIndex:
+        self._index = RegistryIndex(self.nhas)
+        return self._index
+
+    def add(self, nha: NHA) -> None:
+        """Append an NHA; id and name stay unique"""
+        if nha.id in self.index.by_id:
+            raise ValueError(f"Duplicate id: {nha.id}")
+        if nha.name in self.index.by_name:
+            raise ValueError(f"Duplicate name: {nha.name}")
+        self.nhas.append(nha)
+        self._index = None
+
+    def remove(self, nha_id: str) -> NHA:
+        """Remove an NHA by id and return it"""
+        nha = self.index.by_id.get(nha_id)
+        if nha is None:
+            raise KeyError(nha_id)
+        self.nhas.remove(nha)
+        self._index = None
+        return nha
+
+    def update(self, nha_id: str, **changes) -> NHA:
+        """Edit an NHA in place (same object, e.g. cached by the enforcer)"""
+        nha = self.index.by_id.get(nha_id)
+        if nha is None:
+            raise KeyError(nha_id)
+        unknown = set(changes) - {f.name for f in fields(NHA)}
+        if unknown:
+            raise ValueError(f"Unknown NHA fields: {', '.join(sorted(unknown))}")
+        for key in ("id", "name"):
+            other = getattr(self.index, f"by_{key}").get(changes.get(key))
+            if other is not None and other is not nha:
+                raise ValueError(f"Duplicate {key}: {changes[key]}")
+        for key, value in changes.items():
+            setattr(nha, key, value)
+        self._index = None
+        return nha
+
+
+_load_cache: Dict[str, tuple] = {}
+
+
+def load_yaml_cached(path: str) -> Registry:
+    """load_yaml memoized on (path, mtime, size); validate/sync tooling reads the same file many times"""
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    hit = _load_cache.get(path)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    reg = load_yaml(path)
+    _load_cache[path] = (key, reg)
+    return reg
 
 
 def load_yaml(path: str) -> Registry:
@@ -115,7 +208,9 @@ def load_yaml(path: str) -> Registry:
 
         nhas.append(NHA(**nha_data))
 
-    return Registry(version=data.get("version", "dev"), nhas=nhas)
+    reg = Registry(version=data.get("version", "dev"), nhas=nhas)
+    reg.reindex()
+    return reg
 
 
 def dump_json(reg: Registry, out: str = "cblm/opipe/nha/out/registry.json"):
@@ -153,14 +248,7 @@ def dump_markdown(reg: Registry, out: str = "cblm/opipe/nha/out/registry.md"):
 
 """
 
-    # Group by category
-    categories = {}
-    for nha in reg.nhas:
-        if nha.category not in categories:
-            categories[nha.category] = []
-        categories[nha.category].append(nha)
-
-    for category, nhas in categories.items():
+    for category, nhas in reg.index.by_category.items():
         md_content += f"### {category.replace('_', ' ').title()}\n"
         md_content += f"**Count**: {len(nhas)}\n\n"
 
@@ -189,14 +277,7 @@ def dump_by_category(reg: Registry, out: str = "cblm/opipe/nha/out/by-category.m
 
 """
 
-    # Group by category
-    categories = {}
-    for nha in reg.nhas:
-        if nha.category not in categories:
-            categories[nha.category] = []
-        categories[nha.category].append(nha)
-
-    for category, nhas in sorted(categories.items()):
+    for category, nhas in sorted(reg.index.by_category.items()):
         md_content += f"## {category.replace('_', ' ').title()}\n\n"
 
         # Create table
@@ -222,25 +303,32 @@ def dump_by_category(reg: Registry, out: str = "cblm/opipe/nha/out/by-category.m
 
 def get_nha_by_id(reg: Registry, nha_id: str) -> Optional[NHA]:
     """Get NHA by ID"""
-    for nha in reg.nhas:
-        if nha.id == nha_id:
-            return nha
-    return None
+    return reg.index.by_id.get(nha_id)
+
+
+def get_nha_by_name(reg: Registry, name: str) -> Optional[NHA]:
+    """Get NHA by name (ex: "@oPyGPT03")"""
+    return reg.index.by_name.get(name)
 
 
 def get_nhas_by_category(reg: Registry, category: Category) -> List[NHA]:
     """Get all NHAs in a category"""
-    return [nha for nha in reg.nhas if nha.category == category]
+    return list(reg.index.by_category.get(category, ()))
 
 
 def get_nhas_by_owner(reg: Registry, owner: str) -> List[NHA]:
     """Get all NHAs owned by a specific owner"""
-    return [nha for nha in reg.nhas if nha.owner == owner]
+    return list(reg.index.by_owner.get(owner, ()))
+
+
+def get_nhas_by_tag(reg: Registry, tag: str) -> List[NHA]:
+    """Get all NHAs carrying a tag (ex: "env:prod")"""
+    return list(reg.index.by_tag.get(tag, ()))
 
 
 def get_active_nhas(reg: Registry) -> List[NHA]:
     """Get all active NHAs"""
-    return [nha for nha in reg.nhas if nha.status == "active"]
+    return list(reg.index.by_status.get("active", ()))
 
 
 def validate_registry(reg: Registry) -> List[str]:
@@ -268,6 +356,99 @@ def validate_registry(reg: Registry) -> List[str]:
     return errors
 
 
+# -------------------------
+# Export incremental
+# -------------------------
+EXPORT_FILES = ("registry.json", "registry.md", "by-category.md")
+MANIFEST_FILE = ".export-manifest.json"
+
+
+def source_hash(path: str) -> str:
+    """sha256 over agents.yaml + this module (a generator change also invalidates outputs)"""
+    h = hashlib.sha256()
+    for p in (path, __file__):
+        with open(p, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def cosign_sign(json_path: Path) -> bool:
+    """Sign registry.json with cosign if available (COSIGN_KEY); False if skipped"""
+    key = os.getenv("COSIGN_KEY")
+    if not key or not shutil.which("cosign"):
+        return False
+    subprocess.run(
+        [
+            "cosign",
+            "sign-blob",
+            "--yes",
+            "--key",
+            key,
+            "--output-signature",
+            f"{json_path}.sig",
+            "--output-certificate",
+            f"{json_path}.cert",
+            str(json_path),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return True
+
+
+def export_artifacts(
+    path: str = "cblm/opipe/nha/agents.yaml",
+    out_dir: str = "cblm/opipe/nha/out",
+    force: bool = False,
+    signer: Optional[Callable[[Path], bool]] = cosign_sign,
+) -> bool:
+    """
+    Regenerate registry.json / registry.md / by-category.md / registry.json.sha256
+    (+ .sig/.cert via signer) only when the source hash changed.
+    Returns True if artifacts were regenerated.
+    """
+    out = Path(out_dir)
+    manifest_path = out / MANIFEST_FILE
+    digest = source_hash(path)
+
+    if not force and manifest_path.exists():
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("source_sha256") == digest and all(
+            (out / name).exists() for name in EXPORT_FILES
+        ):
+            return False
+
+    out.mkdir(parents=True, exist_ok=True)
+    reg = load_yaml_cached(path)
+    dump_json(reg, str(out / "registry.json"))
+    dump_markdown(reg, str(out / "registry.md"))
+    dump_by_category(reg, str(out / "by-category.md"))
+
+    json_path = out / "registry.json"
+    with open(json_path, "rb") as f:
+        artifact_sha = hashlib.sha256(f.read()).hexdigest().upper()
+    (out / "registry.json.sha256").write_text(artifact_sha + "\n", encoding="utf-8")
+    signed = bool(signer and signer(json_path))
+
+    manifest_path.write_text(
+        json.dumps(
+            {
+                "source": path,
+                "source_sha256": digest,
+                "registry_sha256": artifact_sha,
+                "signed": signed,
+                "count": len(reg.nhas),
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    return True
+
+
 if __name__ == "__main__":
     try:
         reg = load_yaml("cblm/opipe/nha/agents.yaml")
@@ -280,13 +461,14 @@ def validate_registry(reg: Registry) -> List[str]:
                 print(f"  - {error}")
             sys.exit(1)
 
-        # Generate artifacts
-        dump_json(reg)
-        dump_markdown(reg)
-        dump_by_category(reg)
+        # Generate artifacts (skip if agents.yaml unchanged)
+        changed = export_artifacts(force="--force" in sys.argv)
 
         print(f"✅ Registry loaded: {len(reg.nhas)} agents")
-        print("✅ Artifacts generated in cblm/opipe/nha/out/")
+        if changed:
+            print("✅ Artifacts generated in cblm/opipe/nha/out/")
+        else:
+            print("✅ Artifacts up to date in cblm/opipe/nha/out/")
 
     except Exception as e:
         print(f"❌ Error: {e}")
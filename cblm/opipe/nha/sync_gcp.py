@@ -7,7 +7,7 @@
 import subprocess
 import argparse
 from pathlib import Path
-from registry import load_yaml
+from registry import load_yaml_cached as load_yaml
 
 
 def run_gcloud_command(cmd, dry_run=False):
@@ -7,6 +7,7 @@
 
 from ..enforcer import (
     enforce_request,
+    decision_memo,
     reload_registry,
     check_capability,
     check_secret,
@@ -293,6 +294,59 @@ def test_audit_stats(self):
         assert "total_records" in stats
 
 
+class TestDecisionMemo:
+    """Test the per-request decision memo"""
+
+    def setup_method(self):
+        TestEnforcer.setup_method(self)
+
+    def test_decision_memo_skips_repeated_checks(self):
+        """Repeated checks inside one request hit the memo"""
+        with patch("cblm.opipe.nha.enforcer.load_yaml") as mock_load:
+            mock_load.return_value = self.test_registry
+            reload_registry()
+
+            with patch("cblm.opipe.nha.enforcer._audit_write") as mock_write:
+                with decision_memo():
+                    first = enforce_request(
+                        "nha:test-agent", "run.invoker", {}, scope="read:test"
+                    )
+                    again = enforce_request(
+                        "nha:test-agent", "run.invoker", {}, scope="read:test"
+                    )
+                assert again is first
+                assert mock_write.call_count == 1
+
+                # în afara memo-ului fiecare verificare e auditată
+                enforce_request("nha:test-agent", "run.invoker", {}, scope="read:test")
+                assert mock_write.call_count == 2
+
+    def test_decision_memo_keys_on_extras(self):
+        """Checks with a different audit context are not served from the memo"""
+        with patch("cblm.opipe.nha.enforcer.load_yaml") as mock_load:
+            mock_load.return_value = self.test_registry
+            reload_registry()
+
+            with patch("cblm.opipe.nha.enforcer._audit_write") as mock_write:
+                with decision_memo():
+                    a = enforce_request(
+                        "nha:test-agent", "run.invoker", {}, extras={"path": "/a", "n": 1}
+                    )
+                    same = enforce_request(
+                        "nha:test-agent", "run.invoker", {}, extras={"n": 1, "path": "/a"}
+                    )
+                    b = enforce_request(
+                        "nha:test-agent", "run.invoker", {}, extras={"path": "/b", "n": 1}
+                    )
+                assert same is a
+                assert b is not a and b.extra == {"path": "/b", "n": 1}
+                assert mock_write.call_count == 2
+                assert [c.args[0]["extra"]["path"] for c in mock_write.call_args_list] == [
+                    "/a",
+                    "/b",
+                ]
+
+
 class TestEnforcementModes:
     """Test different enforcement modes"""
 
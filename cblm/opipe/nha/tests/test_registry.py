@@ -0,0 +1,115 @@
+# CoolBits.ai @oPipe - NHA Registry Index & Export Tests
+
+import shutil
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from ..registry import (
+    load_yaml,
+    load_yaml_cached,
+    export_artifacts,
+    get_nha_by_id,
+    get_nha_by_name,
+    get_nhas_by_category,
+    get_nhas_by_owner,
+    get_nhas_by_tag,
+    get_active_nhas,
+)
+
+AGENTS_YAML = Path(__file__).resolve().parents[1] / "agents.yaml"
+
+
+class TestRegistryIndex:
+    """Indexed lookups match a full scan"""
+
+    def setup_method(self):
+        self.reg = load_yaml(str(AGENTS_YAML))
+
+    def test_lookups_match_scan(self):
+        first = self.reg.nhas[0]
+        assert get_nha_by_id(self.reg, first.id) is first
+        assert get_nha_by_name(self.reg, first.name) is first
+        assert get_nha_by_id(self.reg, "nha:missing") is None
+
+        for category in {n.category for n in self.reg.nhas}:
+            assert get_nhas_by_category(self.reg, category) == [
+                n for n in self.reg.nhas if n.category == category
+            ]
+        assert get_nhas_by_owner(self.reg, first.owner) == [
+            n for n in self.reg.nhas if n.owner == first.owner
+        ]
+        assert get_active_nhas(self.reg) == [
+            n for n in self.reg.nhas if n.status == "active"
+        ]
+        tag = first.tags[0]
+        assert get_nhas_by_tag(self.reg, tag) == [
+            n for n in self.reg.nhas if tag in n.tags
+        ]
+
+    def test_returned_lists_do_not_alias_index(self):
+        category = self.reg.nhas[0].category
+        get_nhas_by_category(self.reg, category).clear()
+        assert get_nhas_by_category(self.reg, category)
+
+    def test_mutations_keep_index_current(self):
+        first = self.reg.nhas[0]
+        self.reg.update(first.id, status="paused", tags=["env:test"])
+        assert first not in get_active_nhas(self.reg)
+        assert get_nhas_by_tag(self.reg, "env:test") == [first]
+
+        # același număr de agenți după remove + add: indexul nu poate rămâne vechi
+        clone = replace(first, id="nha:clone", name="@clone", status="active")
+        assert self.reg.remove(first.id) is first
+        self.reg.add(clone)
+        assert get_nha_by_id(self.reg, first.id) is None
+        assert get_nha_by_name(self.reg, "@clone") is clone
+
+        with pytest.raises(ValueError):
+            self.reg.add(replace(clone, id="nha:other"))
+        with pytest.raises(ValueError):
+            self.reg.update(clone.id, name=self.reg.nhas[0].name)
+        with pytest.raises(ValueError):
+            self.reg.update(clone.id, colour="red")
+        with pytest.raises(KeyError):
+            self.reg.remove(first.id)
+
+        # o listă nouă de aceeași lungime e reindexată
+        self.reg.nhas = [replace(n, owner="platform-x") for n in self.reg.nhas]
+        assert get_nhas_by_owner(self.reg, "platform-x") == self.reg.nhas
+
+    def test_cached_load_reused(self, tmp_path):
+        src = tmp_path / "agents.yaml"
+        shutil.copy(AGENTS_YAML, src)
+        assert load_yaml_cached(str(src)) is load_yaml_cached(str(src))
+
+
+class TestIncrementalExport:
+    """Artifacts regenerate only when agents.yaml changes"""
+
+    def test_skip_when_unchanged(self, tmp_path):
+        src = tmp_path / "agents.yaml"
+        out = tmp_path / "out"
+        shutil.copy(AGENTS_YAML, src)
+
+        assert export_artifacts(str(src), str(out), signer=None)
+        for name in ("registry.json", "registry.md", "by-category.md", "registry.json.sha256"):
+            assert (out / name).exists()
+        mtime = (out / "registry.json").stat().st_mtime_ns
+
+        assert not export_artifacts(str(src), str(out), signer=None)
+        assert (out / "registry.json").stat().st_mtime_ns == mtime
+
+        # o modificare în sursă sau --force regenerează
+        src.write_text(src.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+        assert export_artifacts(str(src), str(out), signer=None)
+        assert export_artifacts(str(src), str(out), force=True, signer=None)
+
+    def test_missing_output_triggers_rebuild(self, tmp_path):
+        src = tmp_path / "agents.yaml"
+        out = tmp_path / "out"
+        shutil.copy(AGENTS_YAML, src)
+        export_artifacts(str(src), str(out), signer=None)
+        (out / "registry.md").unlink()
+        assert export_artifacts(str(src), str(out), signer=None)
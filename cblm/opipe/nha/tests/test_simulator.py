@@ -0,0 +1,121 @@
+# CoolBits.ai @oPipe - Policy What-If Simulator Tests
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cblm.opipe.nha.adaptive.simulator import (
+    AuditColumns,
+    load_recommendations,
+    simulate,
+)
+
+
+REGISTRY = {
+    "version": "test",
+    "nhas": [
+        {
+            "id": "nha:rag-worker",
+            "status": "active",
+            "permissions": ["rag:ingest", "rag:query"],
+            "capabilities": [{"name": "rag", "scopes": ["read:rag"]}],
+            "secrets": [],
+        },
+        {
+            "id": "nha:paused",
+            "status": "paused",
+            "permissions": ["read:logs", "write:logs"],
+            "capabilities": [],
+        },
+    ],
+}
+
+
+def _rec(nha_id, action, scope=None, result="DENY", ts="2025-09-11T10:00:00Z", **extra):
+    return {
+        "ts": ts,
+        "nha_id": nha_id,
+        "action": action,
+        "scope": scope,
+        "result": result,
+        "extra": extra,
+    }
+
+
+RECORDS = (
+    [_rec("nha:rag-worker", "rag:ingest", "write:rag") for _ in range(5)]
+    + [_rec("nha:rag-worker", "rag:query", "read:rag", result="ALLOW")]
+    + [_rec("nha:rag-worker", "rag:export") for _ in range(2)]
+    + [_rec("nha:paused", "write:logs") for _ in range(3)]
+    + [_rec("nha:unknown", "rag:ingest", "write:rag")]
+    + [_rec("nha:rag-worker", "rag:ingest", "write:rag", ts="2025-08-01T00:00:00Z")]
+)
+
+
+def test_window_filter_and_baseline():
+    cols = AuditColumns.from_records(RECORDS, start="2025-09-01T00:00:00Z")
+    assert len(cols) == len(RECORDS) - 1
+    report = simulate(cols, REGISTRY, [])
+    assert report["baseline_denies"] == 11
+    assert report["combined"]["flips"] == 0
+
+
+def test_flips_per_recommendation():
+    cols = AuditColumns.from_records(RECORDS, start="2025-09-01T00:00:00Z")
+    recs = [
+        {"agent_id": "nha:rag-worker", "action": "add_scope", "target": "write:rag"},
+        {"agent_id": "nha:rag-worker", "action": "add_permission", "target": "rag:export"},
+        # paused agent: doar read:* trece, permisiunea nu schimbă nimic
+        {"agent_id": "nha:paused", "action": "add_permission", "target": "write:logs"},
+        {"agent_id": "nha:unknown", "action": "add_scope", "target": "write:rag"},
+        {"agent_id": "nha:rag-worker", "action": "add_scope", "target": "write:never"},
+        {"agent_id": "nha:rag-worker", "action": "review_agent_policy", "target": None},
+    ]
+    report = simulate(cols, REGISTRY, recs)
+    by = [(r["status"], r["flips"]) for r in report["recommendations"]]
+    assert by == [
+        ("simulated", 5),
+        ("simulated", 2),
+        ("no_effect", 0),
+        ("simulated", 0),
+        ("no_effect", 0),
+        ("not_simulated", 0),
+    ]
+    assert report["recommendations"][0]["flips_by_action"] == {"rag:ingest": 5}
+    assert report["combined"]["flips"] == 7
+    assert report["combined"]["flips_by_agent"] == {
+        "nha:rag-worker": {"rag:ingest": 5, "rag:export": 2}
+    }
+
+
+def test_load_both_recommendation_formats(tmp_path):
+    path = tmp_path / "recs.yaml"
+    path.write_text(
+        """
+policy_recommendations:
+  agents:
+    - id: nha:a
+      recommendations:
+        - action: add_scope
+          scope: write:rag
+          priority: high
+recommendations:
+  - id: nha:b
+    action: add_scopes
+    scopes: [write:rag, read:documents]
+  - id: nha:b
+    action: add_secret
+    secret: nha/b/key
+  - id: nha:unknown
+    action: investigate
+""",
+        encoding="utf-8",
+    )
+    recs = load_recommendations(path)
+    assert [(r["agent_id"], r["action"], r["target"]) for r in recs] == [
+        ("nha:a", "add_scope", "write:rag"),
+        ("nha:b", "add_scope", "write:rag"),
+        ("nha:b", "add_scope", "read:documents"),
+        ("nha:b", "add_secret", "nha/b/key"),
+        ("nha:unknown", "investigate", None),
+    ]
@@ -3,7 +3,8 @@
 
 import sys
 import yaml
-from registry import load_yaml, validate_registry
+from collections import Counter
+from registry import load_yaml_cached as load_yaml, validate_registry
 import jsonschema
 
 
@@ -89,16 +90,16 @@ def validate_unique_constraints():
         reg = load_yaml("cblm/opipe/nha/agents.yaml")
 
         # Check for duplicate IDs
-        ids = [nha.id for nha in reg.nhas]
-        if len(ids) != len(set(ids)):
-            duplicates = [id for id in ids if ids.count(id) > 1]
+        ids = Counter(nha.id for nha in reg.nhas)
+        duplicates = [id for id, count in ids.items() if count > 1]
+        if duplicates:
             print(f"[ERROR] Duplicate IDs found: {duplicates}")
             return False
 
         # Check for duplicate names
-        names = [nha.name for nha in reg.nhas]
-        if len(names) != len(set(names)):
-            duplicates = [name for name in names if names.count(name) > 1]
+        names = Counter(nha.name for nha in reg.nhas)
+        duplicates = [name for name, count in names.items() if count > 1]
+        if duplicates:
             print(f"[ERROR] Duplicate names found: {duplicates}")
             return False
 
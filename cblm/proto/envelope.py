@@ -1,6 +1,7 @@
 # cblm/proto/envelope.py
 from __future__ import annotations
 import hmac, hashlib, os, time, json, secrets
+from collections import OrderedDict
 from dataclasses import dataclass, asdict
 from typing import Any, Dict, Optional
 
@@ -37,16 +38,65 @@ def sign(env: Envelope, key_env: str) -> Envelope:
     env.sig = sig
     return env
 
-def verify(env: Envelope, key_env: str, replay_db: Optional[set[str]] = None) -> None:
+class ReplayCache:
+    """Nonce-uri vazute recent, cu memorie limitata (interfata de set: `in`, `add`).
+
+    Un nonce e tinut minte `max_age_s`; `check_fresh` accepta doar envelopes
+    care expira in fereastra asta (0 < ttl_s <= max_age_s), deci un nonce
+    scos dupa varsta nu mai poate trece verificarea de TTL. Cand `max_size`
+    scoate un nonce inca valid, `floor_ts` urca la `ts`-ul lui: envelopes
+    cu `ts <= floor_ts` sunt respinse (fereastra de replay se inchide).
+    """
+
+    def __init__(self, max_age_s: float = 600.0, max_size: int = 100_000):
+        self.max_age_s, self.max_size = max_age_s, max_size
+        self.floor_ts = float("-inf")
+        self._seen: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __contains__(self, nonce: str) -> bool:
+        return nonce in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, nonce: str, ts: Optional[float] = None) -> None:
+        now = time.monotonic()
+        self._seen[nonce] = (now, time.time() if ts is None else ts)
+        self._seen.move_to_end(nonce)
+        cutoff = now - self.max_age_s
+        while self._seen:
+            oldest, (seen_at, env_ts) = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                if len(self._seen) <= self.max_size:
+                    break
+                # scos inainte sa expire: replay-ul lui trebuie respins pe ts
+                self.floor_ts = max(self.floor_ts, env_ts)
+            del self._seen[oldest]
+
+def check_fresh(env: Envelope, replay_db: Optional[set[str]] = None) -> None:
     # ttl
     now = time.time()
     if env.ttl_s and now - env.ts > env.ttl_s:
         raise ValueError("Envelope expired")
     # replay
     if replay_db is not None:
+        if isinstance(replay_db, ReplayCache):
+            # envelope-ul trebuie sa expire inainte ca nonce-ul sa fie uitat
+            if not 0 < env.ttl_s <= replay_db.max_age_s:
+                raise ValueError("Envelope TTL outside replay window")
+            if env.ts + env.ttl_s > now + replay_db.max_age_s:
+                raise ValueError("Envelope timestamp in the future")
+            if env.ts <= replay_db.floor_ts:
+                raise ValueError("Envelope older than replay window")
         if env.nonce in replay_db:
             raise ValueError("Replay detected")
-        replay_db.add(env.nonce)
+        if isinstance(replay_db, ReplayCache):
+            replay_db.add(env.nonce, env.ts)
+        else:
+            replay_db.add(env.nonce)
+
+def verify(env: Envelope, key_env: str, replay_db: Optional[set[str]] = None) -> None:
+    check_fresh(env, replay_db)
     # hmac
     expected = sign(Envelope(**{**env.to_dict(), "sig": None}), key_env).sig
     if not hmac.compare_digest(env.sig or "", expected or ""):
@@ -1,6 +1,9 @@
 # cblm/proto/iimsibis.py
 from .envelope import new_envelope, sign, verify, Envelope as IimsibisEnvelope
+from . import transport
 VER = "iimsibis-0.1"; KEY_ENV = "IIMSIBIS_HMAC_KEY"
 def make_event(src, dst, body, agent_type="human"): return new_envelope(VER, "event", src, dst, body, agent_type=agent_type)
 def sign_env(env): return sign(env, KEY_ENV)
 def verify_env(env, replay_db=None): return verify(env, KEY_ENV, replay_db=replay_db)
+async def connect(host, port, **kw): return await transport.connect(host, port, KEY_ENV, **kw)
+async def serve(handler, host, port, **kw): return await transport.serve(handler, host, port, KEY_ENV, **kw)
@@ -1,5 +1,7 @@
 # cblm/proto/opipe.py
 from .envelope import new_envelope, sign, verify, Envelope as PipeEnvelope
+from . import transport
+from .transport import Channel
 
 VER = "opipe-0.1"
 KEY_ENV = "OPIPE_HMAC_KEY"
@@ -12,3 +14,9 @@ def sign_env(env: PipeEnvelope) -> PipeEnvelope:
 
 def verify_env(env: PipeEnvelope, replay_db=None) -> None:
     return verify(env, KEY_ENV, replay_db=replay_db)
+
+async def connect(host: str, port: int, **kw) -> Channel:
+    return await transport.connect(host, port, KEY_ENV, **kw)
+
+async def serve(handler, host: str, port: int, **kw):
+    return await transport.serve(handler, host, port, KEY_ENV, **kw)
@@ -0,0 +1,307 @@
+# cblm/proto/transport.py
+# Transport persistent pentru Envelope (opipe / iimsibis / oilluminate).
+#
+# Frame pe fir:  [u32 len][u8 kind][payload]        (len = lungimea payload-ului)
+#   BATCH  payload = sig_hex(64) + json([env, ...])  -> un singur HMAC pe tot batch-ul
+#   CREDIT payload = u32 n                           -> peer-ul ne permite inca n envelopes
+#
+# O conexiune per peer: request/response multiplexate pe `corr`, flow control pe credite.
+from __future__ import annotations
+import asyncio, hmac, hashlib, json, struct
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .envelope import Envelope, ReplayCache, _secret, check_fresh
+
+BATCH = 1
+CREDIT = 2
+_HDR = struct.Struct(">IB")
+_U32 = struct.Struct(">I")
+_SIG_LEN = 64
+MAX_FRAME = 16 * 1024 * 1024
+
+_CLOSED = object()
+
+def encode_frame(kind: int, payload: bytes) -> bytes:
+    if len(payload) > MAX_FRAME:
+        raise ValueError(f"Frame too large: {len(payload)} bytes")
+    return _HDR.pack(len(payload), kind) + payload
+
+def encode_envelope(env: Envelope) -> bytes:
+    data = json.dumps(env.to_dict(include_sig=False), separators=(",", ":")).encode("utf-8")
+    if _SIG_LEN + len(data) + 2 > MAX_FRAME:
+        raise ValueError(f"Envelope too large: {len(data)} bytes")
+    return data
+
+def encode_batch(envs: list[Envelope], key: bytes) -> bytes:
+    return encode_batch_raw([encode_envelope(e) for e in envs], key)
+
+def encode_batch_raw(items: list[bytes], key: bytes) -> bytes:
+    """Batch din envelopes deja serializate (acelasi format ca json.dumps pe lista)."""
+    data = b"[" + b",".join(items) + b"]"
+    sig = hmac.new(key, data, hashlib.sha256).hexdigest().encode("ascii")
+    return encode_frame(BATCH, sig + data)
+
+def _fit(items: list[bytes], start: int, limit: int) -> int:
+    """Cate items de la `start` (max `limit`, minim 1) incap intr-un frame BATCH."""
+    size, n = _SIG_LEN + 1, 0
+    while n < limit:
+        size += len(items[start + n]) + 1  # virgula / paranteza de inchidere
+        if n and size > MAX_FRAME:
+            break
+        n += 1
+    return n
+
+def decode_batch(payload: bytes, key: bytes) -> list[Envelope]:
+    sig, data = payload[:_SIG_LEN], payload[_SIG_LEN:]
+    expected = hmac.new(key, data, hashlib.sha256).hexdigest().encode("ascii")
+    if not hmac.compare_digest(sig, expected):
+        raise ValueError("Bad batch HMAC signature")
+    return [Envelope(**d) for d in json.loads(data)]
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    length, kind = _HDR.unpack(await reader.readexactly(_HDR.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame too large: {length} bytes")
+    return kind, await reader.readexactly(length)
+
+
+class Channel:
+    """Conexiune persistenta cu un peer: batching, multiplexare pe corr, credite.
+
+    `window` = cate envelopes poate avea peer-ul in zbor catre noi inainte sa astepte credit.
+    Envelopes nu poarta `sig` individual; integritatea e data de HMAC-ul batch-ului.
+    TTL si replay (nonce) se verifica per envelope la receptie.
+    """
+
+    def __init__(self, reader, writer, key_env: str, window: int = 256, max_batch: int = 64,
+                 max_delay: float = 0.002, replay_db: Optional[set[str]] = None):
+        self._reader, self._writer = reader, writer
+        self._key = _secret(key_env)
+        self.window, self.max_batch, self.max_delay = window, max_batch, max_delay
+        self._replay_db = replay_db if replay_db is not None else ReplayCache()
+        self._outq: asyncio.Queue = asyncio.Queue(maxsize=window * 4)
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._credits = 0
+        self._credit_evt = asyncio.Event()
+        self._unacked = 0
+        self._tasks: list[asyncio.Task] = []
+        self.closed = False
+        self.error: Optional[BaseException] = None
+
+    async def start(self) -> "Channel":
+        self._grant(self.window)
+        self._tasks = [asyncio.create_task(self._read_loop()), asyncio.create_task(self._write_loop())]
+        return self
+
+    # --- API ---
+    async def send(self, env: Envelope) -> None:
+        if self.closed:
+            raise ConnectionError("Channel closed")
+        # serializat aici: un payload invalid sau prea mare esueaza la apelant, nu in writer
+        await self._outq.put(encode_envelope(env))
+        if self.closed:  # writer-ul a murit cat asteptam loc in coada
+            raise ConnectionError("Channel closed") from self.error
+
+    async def request(self, env: Envelope, timeout: float = 30.0) -> Envelope:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[env.id] = fut
+        try:
+            await self.send(env)
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self._pending.pop(env.id, None)
+
+    async def reply(self, req: Envelope, env: Envelope) -> None:
+        env.corr = req.id
+        await self.send(env)
+
+    async def recv(self) -> Envelope:
+        env = await self._inbox.get()
+        if env is _CLOSED:
+            self._inbox.put_nowait(_CLOSED)  # ramane inchis pentru urmatorii cititori
+            raise ConnectionError("Channel closed") from self.error
+        self._consumed(1)
+        return env
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Envelope:
+        try:
+            return await self.recv()
+        except ConnectionError:
+            raise StopAsyncIteration
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        # flush ce e deja in coada, cat timp avem credit
+        if not self._outq.empty() and not self._tasks[1].done():
+            try:
+                await asyncio.wait_for(self._outq.join(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+        self._shutdown(None)
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    # --- intern ---
+    def _grant(self, n: int) -> None:
+        self._writer.write(encode_frame(CREDIT, _U32.pack(n)))
+
+    def _consumed(self, n: int) -> None:
+        self._unacked += n
+        if self._unacked >= max(1, self.window // 2) and not self.closed:
+            self._grant(self._unacked)
+            self._unacked = 0
+
+    def _shutdown(self, exc: Optional[BaseException]) -> None:
+        if self.closed:
+            return
+        self.closed, self.error = True, exc
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("Channel closed"))
+        self._inbox.put_nowait(_CLOSED)
+        self._credit_evt.set()
+        # deblocheaza send()-urile care asteapta loc in coada
+        while not self._outq.empty():
+            self._outq.get_nowait()
+            self._outq.task_done()
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                kind, payload = await read_frame(self._reader)
+                if kind == CREDIT:
+                    self._credits += _U32.unpack(payload)[0]
+                    self._credit_evt.set()
+                elif kind == BATCH:
+                    for env in decode_batch(payload, self._key):
+                        check_fresh(env, self._replay_db)
+                        fut = self._pending.get(env.corr) if env.corr else None
+                        if fut is not None and not fut.done():
+                            fut.set_result(env)
+                            self._consumed(1)
+                        else:
+                            self._inbox.put_nowait(env)
+                else:
+                    raise ValueError(f"Unknown frame kind: {kind}")
+        except asyncio.CancelledError:
+            raise
+        except asyncio.IncompleteReadError:
+            self._shutdown(None)
+        except Exception as e:  # fail-closed: HMAC/TTL/replay invalid inchide conexiunea
+            self._shutdown(e)
+            self._writer.close()
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                batch = [await self._outq.get()]
+                self._drain_into(batch)
+                if len(batch) < self.max_batch and self.max_delay > 0:
+                    await asyncio.sleep(self.max_delay)
+                    self._drain_into(batch)
+                sent = 0
+                while sent < len(batch):
+                    while self._credits <= 0:
+                        if self.closed:
+                            return
+                        self._credit_evt.clear()
+                        await self._credit_evt.wait()
+                    n = _fit(batch, sent, min(self._credits, len(batch) - sent))
+                    self._writer.write(encode_batch_raw(batch[sent:sent + n], self._key))
+                    self._credits -= n
+                    sent += n
+                    await self._writer.drain()
+                for _ in batch:
+                    self._outq.task_done()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # orice eroare in writer inchide canalul, altfel request() ar astepta pana la timeout
+            self._shutdown(e)
+            self._writer.close()
+
+    def _drain_into(self, batch: list) -> None:
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._outq.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+
+async def connect(host: str, port: int, key_env: str, ssl=None, **kw: Any) -> Channel:
+    reader, writer = await asyncio.open_connection(host, port, ssl=ssl)
+    return await Channel(reader, writer, key_env, **kw).start()
+
+async def serve(handler: Callable[[Channel], Awaitable[None]], host: str, port: int, key_env: str,
+                ssl=None, **kw: Any) -> asyncio.AbstractServer:
+    async def _on_conn(reader, writer):
+        ch = await Channel(reader, writer, key_env, **kw).start()
+        try:
+            await handler(ch)
+        finally:
+            await ch.close()
+    return await asyncio.start_server(_on_conn, host, port, ssl=ssl)
+
+
+class ChannelPool:
+    """Un singur Channel per peer (host, port), refolosit de toti agentii din proces."""
+
+    def __init__(self, key_env: str, ssl=None, **kw: Any):
+        self.key_env, self.ssl, self.kw = key_env, ssl, kw
+        self._channels: Dict[Tuple[str, int], Channel] = {}
+        self._locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+
+    async def get(self, host: str, port: int) -> Channel:
+        key = (host, port)
+        ch = self._channels.get(key)
+        if ch is not None and not ch.closed:
+            return ch
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            ch = self._channels.get(key)
+            if ch is None or ch.closed:
+                ch = self._channels[key] = await connect(host, port, self.key_env, ssl=self.ssl, **self.kw)
+            return ch
+
+    async def close(self) -> None:
+        channels, self._channels = list(self._channels.values()), {}
+        await asyncio.gather(*(ch.close() for ch in channels), return_exceptions=True)
+
+
+# --- loopback (teste / agenti in acelasi proces) ---
+class _LoopbackWriter:
+    def __init__(self, peer: asyncio.StreamReader):
+        self._peer, self._closing = peer, False
+
+    def write(self, data: bytes) -> None:
+        if not self._closing:
+            self._peer.feed_data(data)
+
+    async def drain(self) -> None:
+        await asyncio.sleep(0)
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        if not self._closing:
+            self._closing = True
+            self._peer.feed_eof()
+
+    async def wait_closed(self) -> None:
+        return None
+
+async def loopback_pair(key_env: str, **kw: Any) -> Tuple[Channel, Channel]:
+    ra, rb = asyncio.StreamReader(), asyncio.StreamReader()
+    a = Channel(ra, _LoopbackWriter(rb), key_env, **kw)
+    b = Channel(rb, _LoopbackWriter(ra), key_env, **kw)
+    return await a.start(), await b.start()
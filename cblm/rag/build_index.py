@@ -1,18 +1,27 @@
 #!/usr/bin/env python3
 # cblm/rag/build_index.py - Build RAG local index
+#
+# Incremental: each source (panel state, wall post, board charter, doc file)
+# is hashed into cblm/rag/store/{panel}.manifest.json; only sources whose
+# sha256 changed are re-chunked and re-embedded. Vectors live in a float32
+# {panel}.npy (row i <-> chunks[i] in {panel}.json), readable via mmap.
 
 import json
 import os
 from pathlib import Path
-from str import s_read_text, s_write_text_atomic, stable_uuid
+import numpy as np
+from str import s_read_text, s_write_text_atomic, s_sha256_hex, stable_uuid
 import andrei
 
+EMBEDDING_DIM = 128
+MANIFEST_VERSION = 1
+
 def build_fake_embedding(text: str) -> list:
     """Create fake embedding for M18 (deterministic hash-based)."""
-    # Simple hash-based fake embedding for M18
-    hash_val = hash(text) % 1000000
+    # sha256, not hash(): str hashes are salted per process
+    hash_val = int(s_sha256_hex(text)[:8], 16) % 1000000
     embedding = []
-    for i in range(128):  # 128-dim embedding
+    for i in range(EMBEDDING_DIM):  # 128-dim embedding
         val = (hash_val + i * 7919) % 1000 / 1000.0  # Normalize to 0-1
         embedding.append(val)
     return embedding
@@ -22,88 +31,181 @@ def chunk_text(text: str, chunk_size: int = 500) -> list:
     words = text.split()
     chunks = []
     current_chunk = []
-    
+    current_len = 0  # len(' '.join(current_chunk)), tracked incrementally
+
     for word in words:
+        current_len += len(word) + (1 if current_chunk else 0)
         current_chunk.append(word)
-        if len(' '.join(current_chunk)) > chunk_size:
+        if current_len > chunk_size:
             chunks.append(' '.join(current_chunk))
             current_chunk = []
-    
+            current_len = 0
+
     if current_chunk:
         chunks.append(' '.join(current_chunk))
-    
+
     return chunks
 
-def build_panel_index(panel: str):
-    """Build RAG index for a specific panel."""
-    print(f"Building RAG index for {panel}...")
-    
-    # Collect content sources
-    content_sources = []
-    
+def store_paths(panel: str) -> dict:
+    """JSON index, vector file and manifest for a panel."""
+    rag_path = andrei.get_rag_path(panel)
+    base = os.path.splitext(rag_path)[0]
+    return {
+        "index": rag_path,
+        "vectors": base + ".npy",
+        "manifest": base + ".manifest.json",
+    }
+
+def load_panel_vectors(panel: str, mmap: bool = True) -> np.ndarray:
+    """Panel vectors (rows aligned with the JSON chunks), memory-mapped by default."""
+    return np.load(store_paths(panel)["vectors"], mmap_mode="r" if mmap else None)
+
+def collect_sources(panel: str, previous: dict) -> dict:
+    """Map source key -> {"text", "sha256", ...}; unchanged doc files are not re-read."""
+    sources = {}
+
+    def add(key, text, **extra):
+        sources[key] = {"text": text, "sha256": s_sha256_hex(text), **extra}
+
     # 1. Panel state
     if os.path.exists("panel/state.json"):
         state_text = s_read_text("panel/state.json")
-        content_sources.append(f"Panel State: {state_text}")
-    
+        add("state", f"Panel State: {state_text}")
+
     # 2. Wall content
     wall_path = andrei.get_wall_path(panel)
     if os.path.exists(wall_path):
         wall_data = json.loads(s_read_text(wall_path))
-        for post in wall_data.get("posts", []):
-            content_sources.append(f"Wall Post: {post.get('text', '')}")
-    
+        for i, post in enumerate(wall_data.get("posts", [])):
+            text = f"Wall Post: {post.get('text', '')}"
+            # content hash in the key: posts sharing an id stay separate sources
+            base = key = f"wall:{post.get('id', i)}:{s_sha256_hex(text)[:12]}"
+            n = 1
+            while key in sources:  # exact repost: keep it, don't merge
+                n += 1
+                key = f"{base}#{n}"
+            add(key, text)
+
     # 3. Board content
     board_path = andrei.get_board_path(panel)
     if os.path.exists(board_path):
         board_data = json.loads(s_read_text(board_path))
-        content_sources.append(f"Board Charter: {board_data.get('charter', '')}")
-    
+        add("board", f"Board Charter: {board_data.get('charter', '')}")
+
     # 4. Documentation (if exists)
     docs_path = f"sites/{panel}/docs"
     if os.path.exists(docs_path):
-        for doc_file in Path(docs_path).glob("*.md"):
-            content_sources.append(f"Documentation: {s_read_text(str(doc_file))}")
-    
-    # Build index
+        for doc_file in sorted(Path(docs_path).glob("*.md")):
+            key = f"doc:{doc_file.name}"
+            st = doc_file.stat()
+            old = previous.get(key)
+            if old and old.get("mtime_ns") == st.st_mtime_ns and old.get("size") == st.st_size:
+                sources[key] = {**old, "text": None}  # stat unchanged: skip the read
+                continue
+            add(key, f"Documentation: {s_read_text(str(doc_file))}",
+                mtime_ns=st.st_mtime_ns, size=st.st_size)
+
+    return sources
+
+def _load_previous(paths: dict) -> tuple:
+    """Previous manifest, chunks and vectors; empty when missing or stale."""
+    try:
+        manifest = json.loads(s_read_text(paths["manifest"]))
+        index = json.loads(s_read_text(paths["index"]))
+        # read fully, not mmap: the same .npy is replaced at the end of the build,
+        # which fails on Windows while a mapping is open
+        vectors = np.load(paths["vectors"])
+    except (OSError, ValueError):
+        return {}, [], None
+    if manifest.get("version") != MANIFEST_VERSION or len(vectors) != len(index.get("chunks", [])):
+        return {}, [], None
+    return manifest.get("sources", {}), index["chunks"], vectors
+
+def _write_npy_atomic(path: str, vectors: np.ndarray) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, vectors)
+    os.replace(tmp_path, path)
+
+def build_panel_index(panel: str, force: bool = False) -> bool:
+    """Build RAG index for a specific panel. Returns False when nothing changed."""
+    print(f"Building RAG index for {panel}...")
+    paths = store_paths(panel)
+
+    previous, old_chunks, old_vectors = ({}, [], None) if force else _load_previous(paths)
+    sources = collect_sources(panel, previous)
+
+    changed = [k for k, src in sources.items()
+               if k not in previous or previous[k]["sha256"] != src["sha256"]]
+    removed = [k for k in previous if k not in sources]
+    if old_vectors is not None and not changed and not removed:
+        print(f"✓ RAG index for {panel} up to date ({len(old_chunks)} chunks)")
+        return False
+
+    # Rows of unchanged sources are reused as-is (no re-chunk, no re-embed)
+    old_rows = {}
+    for row, chunk in enumerate(old_chunks):
+        old_rows.setdefault(chunk.get("metadata", {}).get("source_key"), []).append(row)
+
+    chunks, blocks, manifest_sources = [], [], {}
+    for key, src in sources.items():
+        entry = {k: v for k, v in src.items() if k != "text"}
+        if key not in changed:
+            rows = old_rows.get(key, [])
+            chunks.extend(old_chunks[r] for r in rows)
+            blocks.append(np.asarray(old_vectors[rows], dtype=np.float32))
+        else:
+            new = []
+            for chunk in chunk_text(src["text"]):
+                new.append(build_fake_embedding(chunk))
+                chunks.append({
+                    "id": stable_uuid("chunk", panel, chunk[:50]),
+                    "text": chunk,
+                    "source": "local",
+                    "metadata": {"panel": panel, "source_key": key},
+                })
+            if new:
+                blocks.append(np.asarray(new, dtype=np.float32))
+        manifest_sources[key] = entry
+
+    vectors = (np.concatenate(blocks) if blocks
+               else np.zeros((0, EMBEDDING_DIM), dtype=np.float32))
+
     index_data = {
         "panel": panel,
-        "chunks": [],
+        "chunks": chunks,
         "metadata": {
-            "total_chunks": 0,
-            "total_sources": len(content_sources),
-            "build_timestamp": andrei.ts_now_iso() if hasattr(andrei, 'ts_now_iso') else "2025-01-01T00:00:00Z"
+            "total_chunks": len(chunks),
+            "total_sources": len(sources),
+            "build_timestamp": andrei.ts_now_iso() if hasattr(andrei, 'ts_now_iso') else "2025-01-01T00:00:00Z",
+            "vectors": os.path.basename(paths["vectors"]),
+            "embedding_dim": EMBEDDING_DIM,
         }
     }
-    
-    # Process each content source
-    for source_text in content_sources:
-        chunks = chunk_text(source_text)
-        for chunk in chunks:
-            chunk_data = {
-                "id": stable_uuid("chunk", panel, chunk[:50]),
-                "text": chunk,
-                "embedding": build_fake_embedding(chunk),
-                "source": "local",
-                "metadata": {"panel": panel}
-            }
-            index_data["chunks"].append(chunk_data)
-    
-    index_data["metadata"]["total_chunks"] = len(index_data["chunks"])
-    
-    # Save index
-    rag_path = andrei.get_rag_path(panel)
-    s_write_text_atomic(rag_path, json.dumps(index_data, indent=2))
-    print(f"✓ Built RAG index for {panel}: {len(index_data['chunks'])} chunks")
+
+    # Save index: vectors first, manifest last (a crash leaves a stale manifest -> full rebuild)
+    _write_npy_atomic(paths["vectors"], vectors)
+    s_write_text_atomic(paths["index"], json.dumps(index_data, ensure_ascii=False, separators=(",", ":")))
+    s_write_text_atomic(paths["manifest"], json.dumps(
+        {"version": MANIFEST_VERSION, "panel": panel, "sources": manifest_sources},
+        separators=(",", ":")))
+    print(f"✓ Built RAG index for {panel}: {len(chunks)} chunks "
+          f"({len(changed)} changed, {len(removed)} removed sources)")
+    return True
 
 def main():
     """Main RAG build function."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Build RAG local index")
+    parser.add_argument("--force", action="store_true", help="Ignore manifest and rebuild everything")
+    args = parser.parse_args()
+
     print("RAG Build: Starting local index construction...")
-    
+
     # Build index for each panel
     for panel in andrei.PANELS:
-        build_panel_index(panel)
-    
+        build_panel_index(panel, force=args.force)
+
     print("RAG Build: Local index construction completed!")
 
 if __name__ == "__main__":
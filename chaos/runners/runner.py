@@ -1,13 +1,15 @@
 # CoolBits.ai Chaos Engineering - Unified Experiment Runner
 # Single entrypoint that launches, measures, and decides pass/fail
 
+import argparse
+import asyncio
 import json
 import sys
 import time
 import yaml
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from injectors_windows import (
@@ -19,8 +21,13 @@
     SLOValidator,
     AutoHealManager,
     ChaosMonitor,
+    SLOMeasurement,
     SLOThresholds,
 )
+from slo_stream import DEFAULT_TARGET_URL, LoadGenerator, SLOStream, measure_slo
+
+# Scenarios that stress a resource shared by everything on the host
+HOST_RESOURCES = {"cpu_spike": "cpu", "mem_leak": "memory"}
 
 
 class ChaosRunner:
@@ -126,8 +133,74 @@ def _check_error_budget(self) -> bool:
             self.logger.error(f"Error budget check failed: {e}")
             return False
 
+    def _target_url(self, scenario: Dict[str, Any]) -> str:
+        """Health URL the load generator measures for this scenario"""
+        target = scenario["targets"][0]
+        if target.get("health_url"):
+            return target["health_url"]
+        if "port" in target:
+            return f"http://localhost:{target['port']}/_stcore/health"
+        return DEFAULT_TARGET_URL
+
+    async def _measure(self, scenario: Dict[str, Any]) -> SLOMeasurement:
+        """Short concurrent SLO sample of the scenario's target"""
+        load = scenario.get("load", {})
+        sample = await measure_slo(
+            self._target_url(scenario),
+            samples=load.get("samples", 100),
+            rps=load.get("sample_rps", 50.0),
+            timeout_s=load.get("timeout_s", 5.0),
+        )
+        return SLOMeasurement(timestamp=datetime.now(), **sample)
+
+    def _abort_reason(
+        self, scenario: Dict[str, Any], stream: SLOStream
+    ) -> Optional[str]:
+        """Why the experiment must stop now, or None while SLOs hold"""
+        load = scenario.get("load", {})
+        snapshot = stream.snapshot()
+        if snapshot["sample_size"] < load.get("min_samples", 20):
+            return None
+
+        # Stop once both the short window and the whole run burn the
+        # error budget faster than the rollback trigger allows
+        error_budget = scenario["slo"]["error_rate"]
+        rollback = scenario.get("rollback", {})
+        max_burn = rollback.get(
+            "max_burn_rate",
+            rollback.get("trigger_threshold", 0.05) / error_budget if error_budget else 0,
+        )
+        burn = stream.burn_rates(error_budget)
+        if max_burn and burn["short"] >= max_burn and burn["long"] >= max_burn:
+            return (
+                f"burn rate {burn['short']:.1f}x (run {burn['long']:.1f}x) "
+                f">= {max_burn:.1f}x"
+            )
+
+        thresholds = SLOThresholds(
+            p95_ms=scenario["slo"]["p95_ms"],
+            error_rate=scenario["slo"]["error_rate"],
+            availability=0.99,
+        )
+        current = SLOMeasurement(timestamp=datetime.now(), **snapshot)
+        if self.auto_heal_manager.check_auto_heal(
+            scenario["targets"][0]["service"], current, thresholds
+        ):
+            return f"p95 {current.p95_ms:.0f}ms / error rate {current.error_rate:.3f}"
+        return None
+
     def run_experiment(self, scenario: Dict[str, Any]) -> Dict[str, Any]:
         """Run chaos experiment"""
+        return asyncio.run(self.run_experiment_async(scenario))
+
+    async def run_experiment_async(self, scenario: Dict[str, Any]) -> Dict[str, Any]:
+        """Run chaos experiment with streaming SLO checks during injection
+
+        Load is generated against the target for the whole injection and
+        every sample updates the SLO stream; the injection is stopped
+        (and rolled back) on the first evaluation where the budget burn
+        or auto-heal thresholds are crossed.
+        """
         try:
             self.logger.info(f"Starting chaos experiment: {scenario['name']}")
 
@@ -150,108 +223,127 @@ def run_experiment(self, scenario: Dict[str, Any]) -> Dict[str, Any]:
                 "stop": None,
                 "verdict": "UNKNOWN",
                 "slo_before": {},
+                "slo_during": {},
                 "slo_after": {},
                 "actions": [],
                 "reason": "",
             }
+            service = scenario["targets"][0]["service"]
+            load_config = scenario.get("load", {})
 
             # Measure baseline SLO
             self.logger.info("Measuring baseline SLO")
-            baseline_slo = self.slo_validator.fetch_slo_window(
-                scenario["targets"][0]["service"], minutes=5
-            )
+            baseline_slo = await self._measure(scenario)
             result["slo_before"] = {
                 "p95_ms": baseline_slo.p95_ms,
                 "error_rate": baseline_slo.error_rate,
                 "availability": baseline_slo.availability,
             }
-            # Log SLO measurement (Windows-compatible)
 
             # Create and start injector
             injector = self.create_injector(scenario)
 
-            if not injector.start():
+            if not await asyncio.to_thread(injector.start):
                 result["verdict"] = "FAIL"
                 result["reason"] = "Failed to start injection"
                 result["stop"] = time.time()
                 return result
 
             # Verify injection
-            if not injector.verify_injection():
+            if not await asyncio.to_thread(injector.verify_injection):
                 result["verdict"] = "FAIL"
                 result["reason"] = "Injection verification failed"
-                injector.stop()
+                await asyncio.to_thread(injector.stop)
                 result["stop"] = time.time()
                 return result
 
-            # Wait for experiment duration
+            # Generate load and stream SLOs for the experiment duration
             target_duration = scenario["targets"][0].get("duration_s", 180)
             self.logger.info(f"Running experiment for {target_duration} seconds")
 
-            # Monitor during experiment
-            experiment_start = time.time()
-            safety_check_interval = 30  # Check safety every 30 seconds
+            stream = SLOStream(window_s=load_config.get("window_s", 30.0))
+            load = LoadGenerator(
+                self._target_url(scenario),
+                rps=load_config.get("rps", 20.0),
+                stream=stream,
+                timeout_s=load_config.get("timeout_s", 5.0),
+            )
+            stop_load = asyncio.Event()
+            load_task = asyncio.create_task(load.run(stop=stop_load))
+
+            evaluation_interval = load_config.get("evaluation_interval_s", 1.0)
+            safety_check_interval = 5  # injector safety guard cadence (seconds)
+            experiment_start = time.monotonic()
+            next_safety_check = experiment_start
+            abort_reason = None
+
+            try:
+                while time.monotonic() - experiment_start < target_duration:
+                    await asyncio.sleep(evaluation_interval)
+
+                    if time.monotonic() >= next_safety_check:
+                        next_safety_check += safety_check_interval
+                        if not await asyncio.to_thread(injector.safety_guard):
+                            abort_reason = "Safety guard triggered"
+                            break
+
+                    abort_reason = self._abort_reason(scenario, stream)
+                    if abort_reason:
+                        break
+            finally:
+                stop_load.set()
+
+            elapsed = time.monotonic() - experiment_start
+            result["slo_during"] = {
+                **stream.snapshot(),
+                "requests": stream.total_requests,
+                "errors": stream.total_errors,
+                "elapsed_s": round(elapsed, 1),
+            }
 
-            while time.time() - experiment_start < target_duration:
-                # Check safety guard
-                if not injector.safety_guard():
-                    result["verdict"] = "FAIL"
-                    result["reason"] = "Safety guard triggered"
-                    injector.stop()
-                    result["stop"] = time.time()
-                    return result
+            # Stop injection (first thing on abort: shortest blast radius)
+            await asyncio.to_thread(injector.stop)
+            await load_task
 
-                # Check if auto-heal should be triggered
-                current_slo = self.slo_validator.fetch_slo_window(
-                    scenario["targets"][0]["service"], minutes=2
-                )
+            if abort_reason == "Safety guard triggered":
+                result["verdict"] = "FAIL"
+                result["reason"] = abort_reason
+                result["stop"] = time.time()
+                self.monitor.end_experiment(scenario["name"], result["verdict"])
+                return result
 
-                # Check auto-heal with Windows-compatible manager
-                slo_thresholds = SLOThresholds(
-                    p95_ms=scenario["slo"]["p95_ms"],
-                    error_rate=scenario["slo"]["error_rate"],
-                    availability=0.99,
+            if abort_reason:
+                self.logger.warning(
+                    f"Aborting {scenario['name']} after {elapsed:.1f}s: {abort_reason}"
                 )
+                result["actions"].append(f"early_abort: {abort_reason}")
 
-                if self.auto_heal_manager.check_auto_heal(
-                    scenario["targets"][0]["service"], current_slo, slo_thresholds
-                ):
-                    self.logger.warning("Auto-heal triggered")
-
-                    # Execute rollback
-                    rollback_success = self.auto_heal_manager.execute_rollback(
-                        scenario["targets"][0]["service"]
-                    )
-                    result["actions"].append(
-                        f"canary_rollback: {'SUCCESS' if rollback_success else 'FAILED'}"
-                    )
-
-                    if not rollback_success:
-                        result["verdict"] = "FAIL"
-                        result["reason"] = "Auto-heal failed"
-                        injector.stop()
-                        result["stop"] = time.time()
-                        return result
-
-                time.sleep(safety_check_interval)
+                # Execute rollback
+                rollback_success = await asyncio.to_thread(
+                    self.auto_heal_manager.execute_rollback, service
+                )
+                result["actions"].append(
+                    f"canary_rollback: {'SUCCESS' if rollback_success else 'FAILED'}"
+                )
 
-            # Stop injection
-            injector.stop()
+                if not rollback_success:
+                    result["verdict"] = "FAIL"
+                    result["reason"] = "Auto-heal failed"
+                    result["stop"] = time.time()
+                    self.monitor.end_experiment(scenario["name"], result["verdict"])
+                    return result
 
             # Wait for system to stabilize
-            time.sleep(30)
+            await asyncio.sleep(scenario.get("safety", {}).get("stabilize_s", 30))
 
             # Measure final SLO
             self.logger.info("Measuring final SLO")
-            final_slo = self.slo_validator.fetch_slo_window(
-                scenario["targets"][0]["service"], minutes=5
-            )
+            final_slo = await self._measure(scenario)
             result["slo_after"] = {
                 "p95_ms": final_slo.p95_ms,
                 "error_rate": final_slo.error_rate,
                 "availability": final_slo.availability,
             }
-            # Log final SLO measurement (Windows-compatible)
 
             # Determine verdict
             slo_thresholds = SLOThresholds(
@@ -261,10 +353,14 @@ def run_experiment(self, scenario: Dict[str, Any]) -> Dict[str, Any]:
             )
 
             verdict = self.slo_validator.slo_ok(final_slo, slo_thresholds)
-            result["verdict"] = "PASS" if verdict else "FAIL"
-            result["reason"] = (
-                "SLO thresholds met" if verdict else "SLO thresholds violated"
-            )
+            if abort_reason:
+                result["verdict"] = "FAIL"
+                result["reason"] = f"Aborted during injection: {abort_reason}"
+            else:
+                result["verdict"] = "PASS" if verdict else "FAIL"
+                result["reason"] = (
+                    "SLO thresholds met" if verdict else "SLO thresholds violated"
+                )
 
             result["stop"] = time.time()
 
@@ -320,6 +416,18 @@ def generate_report(self, scenario: Dict[str, Any], result: Dict[str, Any]) -> s
             self.logger.error(f"Failed to generate report: {e}")
             return f"# Chaos Experiment Report: {scenario['name']}\n\nError generating report: {e}"
 
+    def _save_report(self, scenario: Dict[str, Any], result: Dict[str, Any]):
+        """Generate and save the markdown report for one experiment"""
+        report = self.generate_report(scenario, result)
+
+        report_file = f"chaos/reports/{scenario['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+        os.makedirs("chaos/reports", exist_ok=True)
+
+        with open(report_file, "w") as f:
+            f.write(report)
+
+        self.logger.info(f"Report saved: {report_file}")
+
     def run(self, scenario_file: str) -> Dict[str, Any]:
         """Main entry point for running chaos experiments"""
         try:
@@ -329,19 +437,8 @@ def run(self, scenario_file: str) -> Dict[str, Any]:
             # Run experiment
             result = self.run_experiment(scenario)
 
-            # Generate report (Windows-compatible)
-            report = self.generate_report(scenario, result)
-
-            # Save report
-            report_file = f"chaos/reports/{scenario['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-            import os
-
-            os.makedirs("chaos/reports", exist_ok=True)
-
-            with open(report_file, "w") as f:
-                f.write(report)
-
-            self.logger.info(f"Report saved: {report_file}")
+            # Generate and save report (Windows-compatible)
+            self._save_report(scenario, result)
 
             return result
 
@@ -354,23 +451,102 @@ def run(self, scenario_file: str) -> Dict[str, Any]:
                 "stop": time.time(),
             }
 
+    def conflicts(self, a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        """Whether two scenarios would interfere if run side by side
+
+        They conflict when they hit the same service, measure the same
+        health URL (an SLO breach could not be attributed), stress the
+        same host resource, or either one is marked ``exclusive``.
+        """
+        if a.get("exclusive") or b.get("exclusive"):
+            return True
+        services_a = {t["service"] for t in a["targets"]}
+        services_b = {t["service"] for t in b["targets"]}
+        if services_a & services_b:
+            return True
+        if self._target_url(a) == self._target_url(b):
+            return True
+        resource = HOST_RESOURCES.get(a["name"])
+        return resource is not None and resource == HOST_RESOURCES.get(b["name"])
+
+    def plan_waves(
+        self, scenarios: List[Dict[str, Any]], max_parallel: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Group scenarios into waves of mutually compatible experiments"""
+        waves: List[List[Dict[str, Any]]] = []
+        for scenario in scenarios:
+            for wave in waves:
+                if len(wave) < max_parallel and not any(
+                    self.conflicts(scenario, other) for other in wave
+                ):
+                    wave.append(scenario)
+                    break
+            else:
+                waves.append([scenario])
+        return waves
+
+    async def _run_wave(self, wave: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await asyncio.gather(
+            *(self.run_experiment_async(scenario) for scenario in wave)
+        )
+
+    def run_many(
+        self, scenario_files: List[str], max_parallel: int = 1
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run several scenarios, compatible ones in parallel
+
+        Each experiment keeps its own injector, load generator and SLO
+        stream, so an abort in one never stops another.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        scenarios = []
+        for scenario_file in scenario_files:
+            try:
+                scenarios.append(self.load_scenario(scenario_file))
+            except Exception as e:
+                results[scenario_file] = {
+                    "verdict": "FAIL",
+                    "reason": f"Runner failed: {e}",
+                    "start": time.time(),
+                    "stop": time.time(),
+                }
+
+        for wave in self.plan_waves(scenarios, max_parallel):
+            self.logger.info(
+                f"Running wave: {', '.join(s['name'] for s in wave)}"
+            )
+            for scenario, result in zip(wave, asyncio.run(self._run_wave(wave))):
+                self._save_report(scenario, result)
+                results[scenario["name"]] = result
+
+        return results
+
 
 def main():
     """Main function for command line usage"""
-    if len(sys.argv) != 2:
-        print("Usage: python runner.py <scenario_file>")
-        sys.exit(1)
-
-    scenario_file = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Run chaos experiments")
+    parser.add_argument("scenario_files", nargs="+", help="scenario YAML files")
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="max experiments running at once (compatible scenarios only)",
+    )
+    args = parser.parse_args()
 
     runner = ChaosRunner()
-    result = runner.run(scenario_file)
+    if len(args.scenario_files) == 1:
+        result = runner.run(args.scenario_files[0])
+        verdicts = [result["verdict"]]
+    else:
+        result = runner.run_many(args.scenario_files, max_parallel=args.parallel)
+        verdicts = [r["verdict"] for r in result.values()]
 
     # Print result as JSON
     print(json.dumps(result, indent=2))
 
     # Exit with appropriate code
-    sys.exit(0 if result["verdict"] == "PASS" else 1)
+    sys.exit(0 if all(v == "PASS" for v in verdicts) else 1)
 
 
 if __name__ == "__main__":
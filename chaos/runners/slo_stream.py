@@ -0,0 +1,165 @@
+# CoolBits.ai Chaos Engineering - Async SLO Measurement Engine
+# Concurrent load generation with streaming SLO computation
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+DEFAULT_TARGET_URL = os.environ.get(
+    "CHAOS_TARGET_URL", "http://localhost:8501/_stcore/health"
+)
+
+
+class SLOStream:
+    """Rolling SLO statistics, updated as each sample arrives
+
+    The window covers the last ``window_s`` seconds (all samples when
+    None); lifetime totals are kept alongside so a burn rate can be read
+    over both the short window and the whole run.
+    """
+
+    def __init__(self, window_s: Optional[float] = 30.0):
+        self.window_s = window_s
+        self.samples: deque = deque()  # (monotonic time, latency_ms, error)
+        self.window_errors = 0
+        self.total_requests = 0
+        self.total_errors = 0
+
+    def record(self, latency_ms: float, error: bool, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self.samples.append((now, latency_ms, error))
+        self.total_requests += 1
+        if error:
+            self.window_errors += 1
+            self.total_errors += 1
+        self._trim(now)
+
+    def _trim(self, now: float):
+        if self.window_s is None:
+            return
+        cutoff = now - self.window_s
+        while self.samples and self.samples[0][0] < cutoff:
+            if self.samples.popleft()[2]:
+                self.window_errors -= 1
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """p95 / error rate / availability over the current window"""
+        self._trim(time.monotonic() if now is None else now)
+        sample_size = len(self.samples)
+        if sample_size:
+            latencies = sorted(s[1] for s in self.samples)
+            p95_ms = latencies[min(int(sample_size * 0.95), sample_size - 1)]
+            error_rate = self.window_errors / sample_size
+        else:
+            p95_ms, error_rate = 0.0, 0.0
+        return {
+            "p95_ms": p95_ms,
+            "error_rate": error_rate,
+            "availability": 1.0 - error_rate,
+            "sample_size": sample_size,
+        }
+
+    def burn_rates(self, error_budget: float) -> Dict[str, float]:
+        """Error-budget burn over the short window and over the whole run"""
+        if error_budget <= 0:
+            return {"short": 0.0, "long": 0.0}
+        short = self.window_errors / len(self.samples) if self.samples else 0.0
+        long = self.total_errors / self.total_requests if self.total_requests else 0.0
+        return {"short": short / error_budget, "long": long / error_budget}
+
+
+class LoadGenerator:
+    """Open-loop HTTP load at a fixed rate, feeding an SLOStream
+
+    Requests are started on schedule whether or not earlier ones have
+    finished (up to ``max_in_flight``), so a slow target shows up as
+    latency instead of silently lowering the offered rate. Requests that
+    cannot start because the limit is reached count as errors.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        rps: float = 20.0,
+        stream: Optional[SLOStream] = None,
+        max_in_flight: int = 200,
+        timeout_s: float = 5.0,
+    ):
+        self.url = url
+        self.rps = rps
+        self.stream = stream if stream is not None else SLOStream()
+        self.max_in_flight = max_in_flight
+        self.timeout_s = timeout_s
+        self.shed = 0
+
+    async def run(
+        self,
+        duration_s: Optional[float] = None,
+        max_requests: Optional[int] = None,
+        stop: Optional[asyncio.Event] = None,
+    ):
+        """Generate load until the duration, request count or stop event"""
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.rps
+        pending: set = set()
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout_s)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            started = loop.time()
+            sent = 0
+            while not (stop and stop.is_set()):
+                if duration_s is not None and loop.time() - started >= duration_s:
+                    break
+                if max_requests is not None and sent >= max_requests:
+                    break
+
+                if len(pending) >= self.max_in_flight:
+                    self.shed += 1
+                    self.stream.record(self.timeout_s * 1000, True)
+                else:
+                    task = asyncio.create_task(self._request(session))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                sent += 1
+
+                delay = started + sent * interval - loop.time()
+                if delay > 0:
+                    if stop:
+                        try:
+                            await asyncio.wait_for(stop.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await asyncio.sleep(delay)
+
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _request(self, session: aiohttp.ClientSession):
+        start = time.perf_counter()
+        try:
+            async with session.get(self.url) as response:
+                await response.read()
+                error = response.status >= 500
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            error = True
+        self.stream.record((time.perf_counter() - start) * 1000, error)
+
+
+async def measure_slo(
+    url: str = DEFAULT_TARGET_URL,
+    samples: int = 100,
+    rps: float = 50.0,
+    timeout_s: float = 5.0,
+) -> Dict[str, Any]:
+    """One-shot SLO sample: ``samples`` requests sent concurrently at ``rps``"""
+    stream = SLOStream(window_s=None)
+    await LoadGenerator(url, rps=rps, stream=stream, timeout_s=timeout_s).run(
+        max_requests=samples
+    )
+    return stream.snapshot()
@@ -1,6 +1,7 @@
 # CoolBits.ai Chaos Engineering - SLO Validators and Auto-heal
 # SLO gates, auto-heal, and monitoring integration
 
+import asyncio
 import requests
 import time
 import json
@@ -9,6 +10,8 @@
 from dataclasses import dataclass
 from datetime import datetime
 
+from slo_stream import DEFAULT_TARGET_URL, measure_slo
+
 
 @dataclass
 class SLOThresholds:
@@ -58,48 +61,12 @@ def fetch_slo_window(self, service: str, minutes: int = 10) -> SLOMeasurement:
                 f"Fetching SLO metrics for {service} over {minutes} minutes"
             )
 
-            # Simulate SLO measurement
-            response_times = []
-            errors = 0
-            total_requests = 0
-
-            # Make sample requests
-            for _ in range(100):  # Sample 100 requests
-                try:
-                    start_time = time.time()
-                    response = requests.get(
-                        "http://localhost:8501/_stcore/health", timeout=5
-                    )
-                    end_time = time.time()
-
-                    response_time_ms = (end_time - start_time) * 1000
-                    response_times.append(response_time_ms)
-
-                    if response.status_code >= 500:
-                        errors += 1
-
-                    total_requests += 1
-
-                except requests.exceptions.RequestException:
-                    errors += 1
-                    total_requests += 1
-
-                time.sleep(0.1)  # Small delay between requests
-
-            # Calculate metrics
-            if response_times:
-                response_times.sort()
-                p95_index = int(len(response_times) * 0.95)
-                p95_ms = (
-                    response_times[p95_index]
-                    if p95_index < len(response_times)
-                    else response_times[-1]
-                )
-            else:
-                p95_ms = 0
-
-            error_rate = errors / total_requests if total_requests > 0 else 0
-            availability = 1.0 - error_rate
+            # Sample 100 requests, sent concurrently at 50 rps
+            sample = asyncio.run(measure_slo(DEFAULT_TARGET_URL, samples=100, rps=50.0))
+            p95_ms = sample["p95_ms"]
+            error_rate = sample["error_rate"]
+            availability = sample["availability"]
+            total_requests = sample["sample_size"]
 
             measurement = SLOMeasurement(
                 p95_ms=p95_ms,
@@ -13,6 +13,7 @@ class FeatureFlags:
     def __init__(self, config_file: str = "feature-flags.json"):
         self.config_file = Path(config_file)
         self.flags = self._load_default_flags()
+        self._config_mtime = None
         self._load_config()
 
     def _load_default_flags(self) -> Dict[str, Any]:
@@ -34,6 +35,7 @@ def _load_default_flags(self) -> Dict[str, Any]:
             "enable_performance_monitoring": False,
             "enable_error_tracking": False,
             "enable_uptime_monitoring": False,
+            "enable_continuous_profiling": False,
             # Development features
             "enable_debug_mode": False,
             "enable_hot_reload": False,
@@ -65,6 +67,7 @@ def _load_config(self):
         """Load configuration from file or environment"""
         if self.config_file.exists():
             try:
+                self._config_mtime = self.config_file.stat().st_mtime
                 with open(self.config_file, "r") as f:
                     config = json.load(f)
                     self.flags.update(config)
@@ -78,6 +81,18 @@ def _load_config(self):
                 value = os.environ[env_var].lower()
                 self.flags[flag_name] = value in ("true", "1", "yes", "on")
 
+    def refresh(self) -> bool:
+        """Reload if the config file changed on disk (flags toggled by another process)"""
+        try:
+            mtime = self.config_file.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self._config_mtime:
+            return False
+        self.flags = self._load_default_flags()
+        self._load_config()
+        return True
+
     def is_enabled(self, flag_name: str) -> bool:
         """Check if a feature flag is enabled"""
         return self.flags.get(flag_name, False)
@@ -123,6 +138,7 @@ def _save_config(self):
         try:
             with open(self.config_file, "w") as f:
                 json.dump(self.flags, f, indent=2)
+            self._config_mtime = self.config_file.stat().st_mtime
         except Exception as e:
             print(f"⚠️  Error saving feature flags config: {e}")
 
@@ -7,19 +7,23 @@
 Date: September 6, 2025
 """
 
-import json
 import logging
 import aiohttp
-import sqlite3
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import uuid
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 
+from rag_core import (
+    PartitionedVectorIndex,
+    Retriever,
+    SQLiteStore,
+    sentence_transformer_embedder,
+)
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,6 +36,7 @@ class RAGConfig(BaseModel):
     gpu_enabled: bool = True
     embedding_model: str = "all-MiniLM-L6-v2"
     db_path: str = "rag_system.db"
+    vector_search: bool = False  # hybrid FTS + embeddings (needs sentence-transformers)
 
 
 config = RAGConfig()
@@ -75,256 +80,34 @@ class DocumentRequest(BaseModel):
     metadata: Dict[str, Any] = {}
 
 
-# Database setup
-class RAGDatabase:
-    def __init__(self, db_path: str):
-        self.db_path = db_path
-        self.init_database()
-
-    def init_database(self):
-        """Initialize SQLite database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create documents table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS documents (
-                id TEXT PRIMARY KEY,
-                domain_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                doc_type TEXT DEFAULT 'general',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                embedding_id TEXT,
-                metadata TEXT DEFAULT '{}'
-            )
-        """
-        )
-
-        # Create embeddings table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS embeddings (
-                id TEXT PRIMARY KEY,
-                document_id TEXT NOT NULL,
-                domain_id TEXT NOT NULL,
-                embedding_vector TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (document_id) REFERENCES documents (id)
-            )
-        """
-        )
-
-        # Create chat_history table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS chat_history (
-                id TEXT PRIMARY KEY,
-                domain_id TEXT NOT NULL,
-                user_message TEXT NOT NULL,
-                assistant_response TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                metadata TEXT DEFAULT '{}'
-            )
-        """
-        )
-
-        conn.commit()
-        conn.close()
-        logger.info("✅ Database initialized successfully")
-
-    def add_document(self, doc: Document) -> str:
-        """Add document to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT INTO documents (id, domain_id, title, content, doc_type, metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
-            (
-                doc.id,
-                doc.domain_id,
-                doc.title,
-                doc.content,
-                doc.doc_type,
-                json.dumps(doc.metadata),
-            ),
-        )
-
-        conn.commit()
-        conn.close()
-        return doc.id
-
-    def get_documents(self, domain_id: str) -> List[Document]:
-        """Get all documents for a domain"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, domain_id, title, content, doc_type, created_at, updated_at, embedding_id, metadata
-            FROM documents WHERE domain_id = ?
-            ORDER BY created_at DESC
-        """,
-            (domain_id,),
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        documents = []
-        for row in rows:
-            doc = Document(
-                id=row[0],
-                domain_id=row[1],
-                title=row[2],
-                content=row[3],
-                doc_type=row[4],
-                created_at=datetime.fromisoformat(row[5]),
-                updated_at=datetime.fromisoformat(row[6]),
-                embedding_id=row[7],
-                metadata=json.loads(row[8]) if row[8] else {},
-            )
-            documents.append(doc)
-
-        return documents
-
-    def get_document(self, doc_id: str) -> Optional[Document]:
-        """Get specific document"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, domain_id, title, content, doc_type, created_at, updated_at, embedding_id, metadata
-            FROM documents WHERE id = ?
-        """,
-            (doc_id,),
-        )
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            return Document(
-                id=row[0],
-                domain_id=row[1],
-                title=row[2],
-                content=row[3],
-                doc_type=row[4],
-                created_at=datetime.fromisoformat(row[5]),
-                updated_at=datetime.fromisoformat(row[6]),
-                embedding_id=row[7],
-                metadata=json.loads(row[8]) if row[8] else {},
-            )
-        return None
-
-    def update_document(
-        self, doc_id: str, title: str, content: str, doc_type: str = None
-    ) -> bool:
-        """Update document"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        if doc_type:
-            cursor.execute(
-                """
-                UPDATE documents 
-                SET title = ?, content = ?, doc_type = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """,
-                (title, content, doc_type, doc_id),
-            )
-        else:
-            cursor.execute(
-                """
-                UPDATE documents 
-                SET title = ?, content = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """,
-                (title, content, doc_id),
-            )
-
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return success
-
-    def delete_document(self, doc_id: str) -> bool:
-        """Delete document"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-        success = cursor.rowcount > 0
-
-        conn.commit()
-        conn.close()
-        return success
-
-    def add_chat_message(
-        self, domain_id: str, user_message: str, assistant_response: str
-    ) -> str:
-        """Add chat message to history"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        chat_id = str(uuid.uuid4())
-        cursor.execute(
-            """
-            INSERT INTO chat_history (id, domain_id, user_message, assistant_response)
-            VALUES (?, ?, ?, ?)
-        """,
-            (chat_id, domain_id, user_message, assistant_response),
-        )
-
-        conn.commit()
-        conn.close()
-        return chat_id
-
-    def get_chat_history(self, domain_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Get chat history for domain"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, user_message, assistant_response, timestamp
-            FROM chat_history 
-            WHERE domain_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """,
-            (domain_id, limit),
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        history = []
-        for row in rows:
-            history.append(
-                {
-                    "id": row[0],
-                    "user_message": row[1],
-                    "assistant_response": row[2],
-                    "timestamp": row[3],
-                }
-            )
-
-        return history
+def to_document(row: Dict[str, Any]) -> Document:
+    return Document(
+        id=row["id"],
+        domain_id=row["domain"],
+        title=row["title"],
+        content=row["content"],
+        doc_type=row["doc_type"] or "general",
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+        metadata=row["metadata"],
+    )
 
 
 # Global RAG manager
 class FunctionalRAGManager:
     def __init__(self):
-        self.db = RAGDatabase(config.db_path)
+        self.store = SQLiteStore(config.db_path)
+        embed_fn = (
+            sentence_transformer_embedder(config.embedding_model)
+            if config.vector_search
+            else None
+        )
+        self.retriever = Retriever(
+            self.store,
+            vector=PartitionedVectorIndex(self.store) if embed_fn else None,
+            embed_fn=embed_fn,
+        )
         self.domains: Dict[str, Dict] = {}
-        self.embeddings_cache: Dict[str, Any] = {}
 
     async def initialize_domains(self):
         """Initialize all domains from team system"""
@@ -350,7 +133,7 @@ async def initialize_domains(self):
                             "xai": role_data["api_keys"]["xai_key"],
                             "openai": role_data["api_keys"]["openai_key"],
                         },
-                        "documents_count": len(self.db.get_documents(domain_id)),
+                        "documents_count": self.store.count({"domain": domain_id}),
                         "last_updated": datetime.now().isoformat(),
                         "status": "active",
                     }
@@ -366,7 +149,7 @@ async def initialize_domains(self):
                             "xai": industry_data["api_keys"]["xai_key"],
                             "openai": industry_data["api_keys"]["openai_key"],
                         },
-                        "documents_count": len(self.db.get_documents(domain_id)),
+                        "documents_count": self.store.count({"domain": domain_id}),
                         "last_updated": datetime.now().isoformat(),
                         "status": "active",
                     }
@@ -382,24 +165,20 @@ def add_document(
         self, domain_id: str, title: str, content: str, doc_type: str = "general"
     ) -> str:
         """Add document to domain"""
-        doc_id = str(uuid.uuid4())
-        doc = Document(
-            id=doc_id,
-            domain_id=domain_id,
-            title=title,
-            content=content,
-            doc_type=doc_type,
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            metadata={"source": "admin_panel", "added_by": "user"},
+        doc_id = self.retriever.add(
+            {
+                "domain": domain_id,
+                "title": title,
+                "content": content,
+                "doc_type": doc_type,
+                "metadata": {"source": "admin_panel", "added_by": "user"},
+            }
         )
 
-        doc_id = self.db.add_document(doc)
-
         # Update domain document count
         if domain_id in self.domains:
-            self.domains[domain_id]["documents_count"] = len(
-                self.db.get_documents(domain_id)
+            self.domains[domain_id]["documents_count"] = self.store.count(
+                {"domain": domain_id}
             )
             self.domains[domain_id]["last_updated"] = datetime.now().isoformat()
 
@@ -408,60 +187,53 @@ def add_document(
 
     def get_documents(self, domain_id: str) -> List[Document]:
         """Get documents for domain"""
-        return self.db.get_documents(domain_id)
+        return [to_document(row) for row in self.store.find({"domain": domain_id})]
 
     def update_document(
         self, doc_id: str, title: str, content: str, doc_type: str = None
     ) -> bool:
         """Update document"""
-        return self.db.update_document(doc_id, title, content, doc_type)
+        return self.retriever.update(
+            doc_id, title=title, content=content, doc_type=doc_type
+        )
 
     def delete_document(self, doc_id: str) -> bool:
         """Delete document"""
-        return self.db.delete_document(doc_id)
+        return self.retriever.delete(doc_id)
+
+    def get_chat_history(self, domain_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get chat history for domain"""
+        return [
+            {
+                "id": row["id"],
+                "user_message": row["user_message"],
+                "assistant_response": row["assistant_response"],
+                "timestamp": row["timestamp"],
+            }
+            for row in self.store.chat_history(domain_id, limit)
+        ]
 
     def search_documents(
         self, domain_id: str, query: str, max_results: int = 5
     ) -> List[Dict[str, Any]]:
-        """Search documents using simple text matching"""
-        documents = self.db.get_documents(domain_id)
+        """Search documents (FTS, fused with vector search when enabled)"""
         results = []
-
-        query_words = query.lower().split()
-
-        for doc in documents:
-            content_words = doc.content.lower().split()
-            title_words = doc.title.lower().split()
-
-            # Calculate relevance score
-            content_matches = sum(1 for word in query_words if word in content_words)
-            title_matches = sum(1 for word in query_words if word in title_words)
-
-            total_matches = content_matches + (
-                title_matches * 2
-            )  # Title matches weighted more
-            relevance_score = total_matches / len(query_words) if query_words else 0
-
-            if relevance_score > 0:
-                results.append(
-                    {
-                        "document_id": doc.id,
-                        "title": doc.title,
-                        "content": (
-                            doc.content[:200] + "..."
-                            if len(doc.content) > 200
-                            else doc.content
-                        ),
-                        "doc_type": doc.doc_type,
-                        "relevance_score": relevance_score,
-                        "created_at": doc.created_at.isoformat(),
-                        "updated_at": doc.updated_at.isoformat(),
-                    }
-                )
-
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return results[:max_results]
+        for hit in self.retriever.search(
+            query, k=max_results, filters={"domain": domain_id}
+        ):
+            content = hit["content"]
+            results.append(
+                {
+                    "document_id": hit["id"],
+                    "title": hit["title"],
+                    "content": content[:200] + "..." if len(content) > 200 else content,
+                    "doc_type": hit["doc_type"],
+                    "relevance_score": hit["score"],
+                    "created_at": hit["created_at"],
+                    "updated_at": hit["updated_at"],
+                }
+            )
+        return results
 
     async def query_domain(
         self, domain_id: str, query: str, use_api: bool = True
@@ -517,7 +289,7 @@ async def _generate_api_response(
                 response = f"[Local Response for {domain['domain_name']}]:\n\nBased on {domain['domain_type']} knowledge base:\n\nQuery: {query}\n\nContext from documents:\n{context[:500]}...\n\nThis response is generated using the local knowledge base for {domain['domain_name']}."
 
             # Save to chat history
-            self.db.add_chat_message(domain_id, query, response)
+            self.store.add_chat_message(domain_id, query, response)
 
             return response
 
@@ -551,6 +323,9 @@ async def startup_event():
     """Initialize RAG system on startup"""
     logger.info("🚀 Starting CoolBits.ai Complete Functional RAG System")
     await rag_manager.initialize_domains()
+    backfilled = rag_manager.retriever.backfill_vectors()
+    if backfilled:
+        logger.info(f"✅ Embedded {backfilled} documents for vector search")
     logger.info(f"✅ Initialized {len(rag_manager.domains)} functional RAG domains")
 
 
@@ -726,7 +501,7 @@ async def get_chat_history(domain_id: str, limit: int = 50):
     if domain_id not in rag_manager.domains:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
 
-    history = rag_manager.db.get_chat_history(domain_id, limit)
+    history = rag_manager.get_chat_history(domain_id, limit)
 
     return {
         "domain_id": domain_id,
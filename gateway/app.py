@@ -1,6 +1,7 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import hmac
 import os
 import logging
 from typing import Optional, List, Dict, Any
@@ -11,11 +12,14 @@
 # Import local modules
 from models import ChatRequest, ChatResponse, RAGQueryRequest, RAGQueryResponse, NHAInvokeRequest, NHAInvokeResponse, InvocationsResponse, LedgerBalance, FlowCreate, FlowResponse, FlowRunRequest, FlowRunResponse, RunEventResponse, FlowRunDetails, MetricsSnapshot
 from deps import get_openai, get_anthropic, get_redis, get_db_session
-from rag import search_rag_chunks
+from rag import search_rag_chunks, get_embedding
+from query_cache import SemanticQueryCache, redis_generation_fn
 from nha import queue_nha_invocation, extract_nha_mentions, CB_TARIFF
 from ledger import debit_cbt, get_balance
 from orchestrator import queue_flow_run, process_flow_run, ORCH_ENABLED
 from metrics import get_metrics_snapshot, export_prometheus_metrics, record_nha_invocation, record_rag_query, record_flow_run, record_flow_node, record_error
+from tracing import tracer, extract, format_traceparent, current_trace_uuid, TRACEPARENT
+from profiler import install as install_profiler, profiling_enabled, render as render_profile, clamp_capture_seconds, PROFILER_ADMIN_TOKEN, PROFILE_FLAG
 from rate_limiter import check_rate_limit
 from circuit_breaker import call_with_breaker, is_circuit_open, CircuitBreakerOpenException
 from auth import get_google_auth_url, exchange_code_for_token, get_user_info, generate_magic_link, verify_magic_link, create_session_token, verify_session_token, generate_csrf_token, verify_csrf_token, generate_pkce_pair
@@ -27,6 +31,21 @@
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _redis_or_none():
+    try:
+        return get_redis()
+    except Exception:
+        return None
+
+# Repeated /v1/rag/query questions per panel; ingest on a panel invalidates it
+rag_query_cache = SemanticQueryCache(generation_fn=redis_generation_fn(_redis_or_none()))
+
+# Stage histograms from the workers are merged in through Redis for /metrics
+tracer.attach_redis(_redis_or_none())
+
+# Sampling profiler (idle until enable_continuous_profiling is switched on)
+profiler = install_profiler("gateway")
+
 app = FastAPI(
     title="CoolBits Gateway API",
     description="M19 Gateway API for chat, RAG, and agent services",
@@ -67,6 +86,24 @@ async def rate_limit_middleware(request: Request, call_next):
     
     return response
 
+# Tracing middleware (registered last, so it wraps rate limiting too)
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    """Server span per request, continuing an incoming traceparent"""
+    with tracer.span(
+        f"http {request.method}",
+        parent=extract(request.headers),
+        kind="server",
+        attributes={"http.method": request.method, "http.target": request.url.path}
+    ) as span:
+        response = await call_next(request)
+        # Name by route template, not raw path, to keep histogram stages bounded
+        route = request.scope.get("route")
+        span.name = f"http {request.method} {getattr(route, 'path', 'unmatched')}"
+        span.set_attribute("http.status_code", response.status_code)
+        response.headers[TRACEPARENT] = format_traceparent(span.context)
+    return response
+
 # Environment variables
 DB_DSN = os.getenv("DB_DSN", "postgresql://localhost/coolbits_dev")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -94,7 +131,7 @@ async def health():
 
 @app.post("/v1/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    trace_id = str(uuid.uuid4())
+    trace_id = current_trace_uuid()
     logger.info(f"Chat request {trace_id}: model={request.model}, messages={len(request.messages)}")
     
     try:
@@ -118,21 +155,32 @@ async def chat(request: ChatRequest):
 
 @app.post("/v1/rag/query", response_model=RAGQueryResponse)
 async def rag_query(request: RAGQueryRequest):
-    trace_id = str(uuid.uuid4())
+    trace_id = current_trace_uuid()
     logger.info(f"RAG query {trace_id}: panel={request.panel}, q='{request.q}', k={request.k}")
     
     try:
-        db = get_db_session()
         openai_client = get_openai()
         
-        answers = search_rag_chunks(
-            db=db,
-            panel=request.panel,
-            query=request.q,
-            k=request.k,
-            min_score=0.15,  # Default min score
-            openai_client=openai_client
+        def search(query_embedding):
+            db = get_db_session()
+            try:
+                return search_rag_chunks(
+                    db=db,
+                    panel=request.panel,
+                    query=request.q,
+                    k=request.k,
+                    min_score=0.15,  # Default min score
+                    openai_client=openai_client,
+                    query_embedding=query_embedding
+                )
+            finally:
+                db.close()
+        
+        answers, tier = rag_query_cache.get_or_compute(
+            request.panel, request.q, search, variant=str(request.k),
+            embed=lambda q: get_embedding(q, openai_client)
         )
+        logger.info(f"RAG query {trace_id}: cache {tier}")
         
         return RAGQueryResponse(
             answers=answers,
@@ -144,7 +192,7 @@ async def rag_query(request: RAGQueryRequest):
 
 @app.post("/v1/nha/invoke", response_model=NHAInvokeResponse)
 async def nha_invoke(request: NHAInvokeRequest):
-    trace_id = str(uuid.uuid4())
+    trace_id = current_trace_uuid()
     logger.info(f"NHA invoke {trace_id}: {request.post}")
     
     start_time = time.time()
@@ -284,7 +332,7 @@ async def get_ledger_balance(ref: str):
 async def metrics_snapshot():
     """Observability V3 metrics endpoint"""
     try:
-        return get_metrics_snapshot()
+        return {**get_metrics_snapshot(), "rag_query_cache": rag_query_cache.stats()}
     except Exception as e:
         logger.error(f"Metrics error: {e}")
         return {
@@ -292,12 +340,35 @@ async def metrics_snapshot():
             "timestamp": datetime.utcnow().isoformat()
         }
 
+def require_admin(request: Request):
+    """Admin session JWT, or the PROFILER_ADMIN_TOKEN bearer token"""
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+    if PROFILER_ADMIN_TOKEN and hmac.compare_digest(token.encode(), PROFILER_ADMIN_TOKEN.encode()):
+        return {"role": "admin"}
+    try:
+        session = verify_session_token(token)
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    if session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return session
+
+@app.get("/v1/admin/profile")
+async def capture_profile(seconds: float = 10, format: str = "collapsed", admin: Dict[str, Any] = Depends(require_admin)):
+    """Sample this worker process for `seconds`; collapsed stacks or speedscope JSON"""
+    if not profiling_enabled():
+        raise HTTPException(status_code=403, detail=f"Profiling is disabled ({PROFILE_FLAG})")
+    session = await profiler.capture_async(clamp_capture_seconds(seconds))
+    body, content_type = render_profile(session, format, f"gateway-{os.getpid()}")
+    return PlainTextResponse(body, media_type=content_type)
+
 @app.get("/metrics")
 async def prometheus_metrics():
     """Prometheus metrics endpoint"""
     try:
-        from fastapi.responses import PlainTextResponse
-        return PlainTextResponse(export_prometheus_metrics())
+        return PlainTextResponse(export_prometheus_metrics() + "\n" + tracer.export_prometheus())
     except Exception as e:
         logger.error(f"Prometheus metrics error: {e}")
         return PlainTextResponse(f"# Error: {e}")
@@ -688,7 +759,7 @@ async def run_flow(flow_id: str, request: FlowRunRequest):
             run_id=run_id,
             flow_id=flow_id,
             status="queued",
-            trace_id=str(uuid.uuid4())
+            trace_id=current_trace_uuid()
         )
         
     except HTTPException:
@@ -10,6 +10,8 @@
 import openai
 from .db import RAGChunk, RAGEmbedding, get_db_session
 from .deps import get_openai
+from .rag import invalidate_query_cache
+from .profiler import install as install_profiler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -85,6 +87,8 @@ def process_batch(chunks: List[RAGChunk], openai_client=None) -> int:
             db.add(rag_embedding)
         
         db.commit()
+        # newly embedded chunks are searchable: drop cached answers for their panels
+        invalidate_query_cache({chunk.panel for chunk in chunks})
         logger.info(f"Processed {len(embeddings)} embeddings")
         return len(embeddings)
         
@@ -148,4 +152,5 @@ def run_embedding_worker():
     logger.info(f"Embedding worker completed. Total processed: {total_processed}")
 
 if __name__ == "__main__":
+    install_profiler("embed_worker")
     run_embedding_worker()
@@ -6,6 +6,8 @@
 import sys
 from typing import Dict, Any
 from .deps import get_redis, get_db_session
+from .tracing import tracer, extract, stream_lag_ms
+from .profiler import install as install_profiler
 from .orchestrator import process_flow_run
 
 logging.basicConfig(level=logging.INFO)
@@ -47,6 +49,9 @@ def _setup_redis(self):
                 if "BUSYGROUP" not in str(e):
                     logger.warning(f"Consumer group creation: {e}")
             
+            # Publish stage histograms for the gateway's /metrics
+            tracer.attach_redis(self.redis_client, source=self.consumer_name)
+            
             return True
         except Exception as e:
             logger.error(f"Redis setup failed: {e}")
@@ -73,7 +78,8 @@ def _get_pending_jobs(self) -> list:
                         "flow_id": fields.get(b"flow_id", b"").decode(),
                         "version": fields.get(b"version", b"").decode(),
                         "mode": fields.get(b"mode", b"live").decode(),
-                        "trace_id": fields.get(b"trace_id", b"").decode()
+                        "trace_id": fields.get(b"trace_id", b"").decode(),
+                        "traceparent": fields.get(b"traceparent", b"").decode()
                     }
                     jobs.append(job)
             
@@ -98,18 +104,30 @@ def _process_job(self, job: Dict[str, Any]) -> bool:
         
         logger.info(f"Processing job {job['id']}: flow {flow_id}, run {run_id}, mode {mode}")
         
-        try:
-            # Process with timeout
-            start_time = time.time()
-            result = process_flow_run(run_id)
-            took_ms = int((time.time() - start_time) * 1000)
-            
-            logger.info(f"Job {job['id']} completed in {took_ms}ms: {result}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Job {job['id']} failed: {e}")
-            return False
+        # Time spent in flows:jobs before this worker picked the job up
+        queue_wait_ms = stream_lag_ms(job["id"])
+        if queue_wait_ms is not None:
+            tracer.observe("flow_worker.queue_wait", queue_wait_ms)
+        
+        with tracer.span(
+            "flow_worker.job",
+            parent=extract(job),
+            kind="consumer",
+            attributes={"run_id": run_id, "flow_id": flow_id, "queue_wait_ms": queue_wait_ms or 0.0}
+        ) as span:
+            try:
+                # Process with timeout
+                start_time = time.time()
+                result = process_flow_run(run_id)
+                took_ms = int((time.time() - start_time) * 1000)
+                
+                logger.info(f"Job {job['id']} completed in {took_ms}ms: {result}")
+                return True
+                
+            except Exception as e:
+                span.record_error(e)
+                logger.error(f"Job {job['id']} failed: {e}")
+                return False
     
     def run(self):
         """Main worker loop"""
@@ -158,6 +176,7 @@ def run(self):
 
 def main():
     """Main entry point"""
+    install_profiler("flow_worker")
     worker = FlowWorker()
     worker.run()
 
@@ -8,6 +8,7 @@
 from datetime import datetime
 from .deps import get_openai, get_anthropic, get_redis
 from .db import Invocation, Comment, Post, get_db_session
+from .tracing import tracer, inject
 
 logger = logging.getLogger(__name__)
 
@@ -251,7 +252,7 @@ def queue_nha_invocation(
                 "agent_id": agent_id,
                 "trace_id": trace_id
             }
-            redis_client.xadd("nha:jobs", job_data)
+            redis_client.xadd("nha:jobs", inject(job_data))
             logger.info(f"Queued NHA invocation {invocation_id}")
         
         return invocation_id
@@ -293,7 +294,8 @@ def process_nha_invocation(invocation_id: str) -> Dict[str, Any]:
         
         # Process
         start_time = time.time()
-        result = adapter.process({"text": post.text})
+        with tracer.span(f"nha.adapter.{invocation.agent_id}", attributes={"invocation_id": invocation_id}):
+            result = adapter.process({"text": post.text})
         took_ms = int((time.time() - start_time) * 1000)
         
         # Add timing to result
@@ -11,6 +11,7 @@
 from .nha import get_nha_adapter, CB_TARIFF
 from .rag import search_rag_chunks
 from .metrics import record_flow_run, record_flow_node
+from .tracing import tracer, inject, current_trace_uuid
 
 logger = logging.getLogger(__name__)
 
@@ -438,7 +439,7 @@ def queue_flow_run(flow_id: str, version: int, mode: str, trigger_ref: Dict[str,
     """Queue flow run"""
     
     run_id = str(uuid.uuid4())
-    trace_id = str(uuid.uuid4())
+    trace_id = current_trace_uuid()
     
     # Create flow run record
     db = get_db_session()
@@ -465,7 +466,7 @@ def queue_flow_run(flow_id: str, version: int, mode: str, trigger_ref: Dict[str,
                 "mode": mode,
                 "trace_id": trace_id
             }
-            redis_client.xadd("flows:jobs", job_data)
+            redis_client.xadd("flows:jobs", inject(job_data))
             logger.info(f"Queued flow run {run_id}")
         
         return run_id
@@ -575,7 +576,8 @@ def process_node(node_id: str):
             db.flush()
             
             try:
-                result = connector.run(node_outputs, context)
+                with tracer.span(f"flow.node.{node_type}", attributes={"run_id": run_id, "node_id": node_id}):
+                    result = connector.run(node_outputs, context)
                 took_ms = int((time.time() - start_time) * 1000)
                 
                 # Update node cache
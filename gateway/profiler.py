@@ -0,0 +1,558 @@
+# Sampling profiler: on-demand captures and periodic snapshots
+#
+# A SIGPROF interval timer (process CPU time, POSIX main thread) or a
+# sampler thread (everywhere else) records the Python stack of every
+# thread that used CPU since the previous sample, tagged with the thread
+# name and the asyncio task running on it. Samples go to every open ProfileSession; with no session open the
+# timer is disarmed, so an idle profiler costs nothing. Sampling backs off
+# on its own if it ever exceeds PROFILE_MAX_OVERHEAD of run time.
+#
+# Output is collapsed stacks (flamegraph.pl, speedscope import) or
+# speedscope JSON. Everything is gated by the `enable_continuous_profiling`
+# feature flag, re-read at runtime: from the repo-level feature_flags module
+# when it is importable, else from the JSON file at PROFILE_FLAGS_FILE (the
+# gateway image mounts feature-flags.json there).
+#
+# Stdlib only, so the gateway image, the workers and the root servers can
+# all use it.
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import signal
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "auto")  # auto | signal | thread
+PROFILE_MAX_OVERHEAD = float(os.getenv("PROFILE_MAX_OVERHEAD", "0.02"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SNAPSHOT_S = float(os.getenv("PROFILE_SNAPSHOT_S", "60"))
+PROFILE_RETENTION = int(os.getenv("PROFILE_RETENTION", "120"))  # snapshots kept per service
+PROFILE_RETENTION_H = float(os.getenv("PROFILE_RETENTION_H", "24"))
+PROFILE_FLAG_POLL_S = float(os.getenv("PROFILE_FLAG_POLL_S", "10"))
+PROFILE_FLAGS_FILE = os.getenv("PROFILE_FLAGS_FILE", "feature-flags.json")
+PROFILER_ADMIN_PORT = int(os.getenv("PROFILER_ADMIN_PORT", "0"))
+PROFILER_ADMIN_TOKEN = os.getenv("PROFILER_ADMIN_TOKEN", "")
+
+PROFILE_FLAG = "enable_continuous_profiling"
+MAX_CAPTURE_S = 120
+MAX_STACK_DEPTH = 128
+MAX_INTERVAL_S = 1.0
+
+# Leaf frames of parked threads, used to skip idle threads where per-thread
+# CPU clocks are unavailable; (function, file name)
+IDLE_LEAVES = {
+    ("select", "selectors.py"),
+    ("poll", "selectors.py"),
+    ("wait", "threading.py"),
+    ("_wait_for_tstate_lock", "threading.py"),
+    ("get", "queue.py"),
+    ("accept", "socket.py"),
+    ("_worker", "thread.py"),
+    ("serve_forever", "socketserver.py"),
+}
+
+
+class FlagFile:
+    """Flags from a feature-flags.json file, re-read when its mtime changes
+
+    Same semantics as FeatureFlags.refresh(): the file is the runtime
+    switch, COOLBITS_<FLAG> in the environment overrides it. A file that
+    fails to parse (caught mid-write) keeps the last good values and is
+    retried on the next refresh.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.flags: Dict[str, Any] = {}
+        self._mtime: Optional[float] = None
+
+    def refresh(self) -> bool:
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            changed = self._mtime is not None
+            self.flags, self._mtime = {}, None
+            return changed
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                flags = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot read feature flags from {self.path}: {e}")
+            return False
+        self.flags = flags if isinstance(flags, dict) else {}
+        self._mtime = mtime
+        return True
+
+    def is_enabled(self, flag_name: str) -> bool:
+        value = os.getenv("COOLBITS_" + flag_name.upper())
+        if value is not None:
+            return value.lower() in ("true", "1", "yes", "on")
+        return bool(self.flags.get(flag_name, False))
+
+
+_flag_file = FlagFile(PROFILE_FLAGS_FILE)
+
+
+def profiling_enabled() -> bool:
+    """Current value of the enable_continuous_profiling feature flag"""
+    try:
+        from feature_flags import feature_flags
+    except ImportError:
+        # The gateway image ships without the repo-level feature_flags module
+        feature_flags = _flag_file
+    feature_flags.refresh()
+    return feature_flags.is_enabled(PROFILE_FLAG)
+
+
+def _running_tasks() -> Dict[int, str]:
+    """{thread id: label of the asyncio task currently running on it}"""
+    labels = {}
+    for loop, task in list(getattr(asyncio.tasks, "_current_tasks", {}).items()):
+        thread_id = getattr(loop, "_thread_id", None)
+        if thread_id is None or task is None:
+            continue
+        name = task.get_name()
+        if name.startswith("Task-"):
+            # auto-generated names are unique per task; the coroutine aggregates
+            name = getattr(task.get_coro(), "__qualname__", name)
+        labels[thread_id] = name
+    return labels
+
+
+def _thread_cpu_s(ident: int) -> Optional[float]:
+    """CPU time consumed by a thread, or None where the platform cannot tell"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    parts = Path(path).parts
+    short = "/".join(parts[-2:]) if len(parts) > 1 else path
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+
+
+class ProfileSession:
+    """Samples collected between open_session() and close_session()"""
+
+    def __init__(self, interval_ms: float):
+        self.counts: Dict[Tuple[str, str, tuple], int] = {}
+        self.interval_ms = interval_ms
+        self.started = time.time()
+        self.ended: Optional[float] = None
+
+    def add(self, key: Tuple[str, str, tuple]):
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    @property
+    def samples(self) -> int:
+        return sum(self._items_snapshot().values())
+
+    def _items_snapshot(self) -> Dict[Tuple[str, str, tuple], int]:
+        # a sample may still land while a just-closed session is copied
+        for _ in range(10):
+            try:
+                return dict(self.counts)
+            except RuntimeError:
+                time.sleep(0.001)
+        return dict(self.counts)
+
+    def _stacks(self) -> List[Tuple[List[str], int, str]]:
+        """(root-to-leaf labels, count, thread) per distinct stack"""
+        stacks = []
+        for (thread, task, codes), count in self._items_snapshot().items():
+            labels = [f"thread:{thread}"]
+            if task:
+                labels.append(f"task:{task}")
+            labels.extend(_frame_label(code) for code in reversed(codes))
+            stacks.append((labels, count, thread))
+        stacks.sort(key=lambda s: -s[1])
+        return stacks
+
+    def collapsed(self) -> str:
+        """Collapsed stacks: `frame;frame;frame count` per line"""
+        return "\n".join(f"{';'.join(labels)} {count}" for labels, count, _ in self._stacks()) + "\n"
+
+    def speedscope(self, name: str = "profile") -> Dict[str, Any]:
+        """speedscope file format, one sampled profile per thread"""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[str, int] = {}
+        profiles: Dict[str, Dict[str, Any]] = {}
+        for labels, count, thread in self._stacks():
+            stack = []
+            for label in labels[1:]:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                stack.append(index[label])
+            profile = profiles.setdefault(thread, {
+                "type": "sampled", "name": f"thread:{thread}", "unit": "none",
+                "startValue": 0, "endValue": 0, "samples": [], "weights": [],
+            })
+            profile["samples"].append(stack)
+            profile["weights"].append(count)
+            profile["endValue"] += count
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "coolbits-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+
+class SamplingProfiler:
+    """Process-wide stack sampler feeding any open ProfileSession"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, mode: str = PROFILE_MODE,
+                 max_overhead: float = PROFILE_MAX_OVERHEAD, include_idle: bool = False):
+        self.base_interval = interval_ms / 1000
+        self.interval = self.base_interval
+        self.requested_mode = mode
+        self.mode = "thread"
+        self.max_overhead = max_overhead
+        self.include_idle = include_idle
+        self.sessions: Tuple[ProfileSession, ...] = ()  # replaced, never mutated
+        self.lock = threading.Lock()
+        self.sample_s = 0.0
+        self.samples = 0
+        self._armed_at: Optional[float] = None
+        self._thread_names: Dict[int, str] = {}
+        self._thread_cpu: Dict[int, float] = {}
+        self._names_at = 0.0
+        self._stop: Optional[threading.Event] = None
+
+    def install_signal_handler(self) -> str:
+        """Use SIGPROF when possible; must run on the main thread. Returns the mode"""
+        if self.requested_mode == "thread" or not hasattr(signal, "setitimer"):
+            return self.mode
+        if threading.current_thread() is not threading.main_thread():
+            return self.mode
+        if signal.getsignal(signal.SIGPROF) not in (signal.SIG_DFL, None):
+            logger.warning("SIGPROF already has a handler, profiler uses a sampler thread")
+            return self.mode
+        signal.signal(signal.SIGPROF, self._on_signal)
+        self.mode = "signal"
+        return self.mode
+
+    def overhead(self) -> float:
+        """Share of wall time spent sampling since the timer was armed"""
+        if self._armed_at is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._armed_at
+        return self.sample_s / elapsed if elapsed > 0 else 0.0
+
+    def open_session(self) -> ProfileSession:
+        session = ProfileSession(self.interval * 1000)
+        with self.lock:
+            self.sessions = self.sessions + (session,)
+            if len(self.sessions) == 1:
+                self._arm()
+        return session
+
+    def close_session(self, session: ProfileSession) -> ProfileSession:
+        with self.lock:
+            self.sessions = tuple(s for s in self.sessions if s is not session)
+            if not self.sessions:
+                self._disarm()
+        session.ended = time.time()
+        return session
+
+    def capture(self, seconds: float) -> ProfileSession:
+        session = self.open_session()
+        try:
+            time.sleep(seconds)
+        finally:
+            self.close_session(session)
+        return session
+
+    async def capture_async(self, seconds: float) -> ProfileSession:
+        session = self.open_session()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.close_session(session)
+        return session
+
+    def _arm(self):
+        self.interval = self.base_interval
+        self.sample_s = 0.0
+        self.samples = 0
+        self._armed_at = time.perf_counter()
+        if self.mode == "signal":
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._stop = threading.Event()
+            threading.Thread(target=self._thread_loop, args=(self._stop,),
+                             name="profile-sampler", daemon=True).start()
+
+    def _disarm(self):
+        if self.mode == "signal":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        elif self._stop is not None:
+            self._stop.set()
+        self._armed_at = None
+
+    def _on_signal(self, signum, frame):
+        self._sample(frame, threading.get_ident())
+
+    def _thread_loop(self, stop: threading.Event):
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            self._sample(None, own)
+
+    def _sample(self, own_frame, own_ident: int):
+        sessions = self.sessions
+        if not sessions:
+            return
+        start = time.perf_counter()
+
+        frames = sys._current_frames()
+        if own_frame is not None:
+            frames[own_ident] = own_frame  # signal mode: the interrupted frame
+        else:
+            frames.pop(own_ident, None)  # thread mode: not the sampler itself
+        tasks = _running_tasks()
+        if start - self._names_at > 1.0:
+            self._thread_names = {t.ident: t.name for t in threading.enumerate()}
+            self._thread_cpu = {i: c for i, c in self._thread_cpu.items() if i in frames}
+            self._names_at = start
+
+        for ident, frame in frames.items():
+            check_leaf = False
+            if not self.include_idle:
+                # skip threads that used no CPU since the last sample (blocked in
+                # sleep, I/O or a lock, which the Python frames cannot show)
+                cpu = _thread_cpu_s(ident)
+                if cpu is None:
+                    check_leaf = True
+                else:
+                    last = self._thread_cpu.get(ident)
+                    self._thread_cpu[ident] = cpu
+                    if last is None or cpu <= last:
+                        continue
+            codes = []
+            while frame is not None and len(codes) < MAX_STACK_DEPTH:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            if not codes:
+                continue
+            if check_leaf:
+                leaf = codes[0]
+                if (leaf.co_name, os.path.basename(leaf.co_filename)) in IDLE_LEAVES:
+                    continue
+            key = (self._thread_names.get(ident, str(ident)), tasks.get(ident, ""), tuple(codes))
+            for session in sessions:
+                session.add(key)
+
+        self.samples += 1
+        self.sample_s += time.perf_counter() - start
+        if self.samples % 100 == 0:
+            self._adapt()
+
+    def _adapt(self):
+        """Halve the sampling rate while over the overhead budget"""
+        if self.overhead() <= self.max_overhead or self.interval >= MAX_INTERVAL_S:
+            return
+        self.interval = min(self.interval * 2, MAX_INTERVAL_S)
+        logger.info(f"Profiler over {self.max_overhead:.0%} overhead, interval now {self.interval * 1000:.0f}ms")
+        if self.mode == "signal":
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+
+class SnapshotWriter:
+    """Background snapshots to disk while the feature flag is on
+
+    Every `snapshot_s` the current session is written to
+    `<directory>/<source>-<timestamp>.collapsed`. Any snapshot in the
+    directory older than `retention_h` is deleted, whichever process wrote
+    it; beyond that `retention` files are kept per `service`, across the
+    pids of its past and present processes.
+    """
+
+    def __init__(self, profiler: SamplingProfiler, source: str, directory: str = PROFILE_DIR,
+                 snapshot_s: float = PROFILE_SNAPSHOT_S, retention: int = PROFILE_RETENTION,
+                 retention_h: float = PROFILE_RETENTION_H,
+                 flag_fn: Callable[[], bool] = profiling_enabled,
+                 poll_s: float = PROFILE_FLAG_POLL_S, service: Optional[str] = None):
+        self.profiler = profiler
+        self.source = source
+        self.service = service or source
+        # <service>[-<pid>]-<timestamp>
+        self._own = re.compile(re.escape(self.service) + r"(?:-\d+)?-(\d{8}T\d{6})")
+        self.directory = Path(directory)
+        self.snapshot_s = snapshot_s
+        self.retention = retention
+        self.retention_h = retention_h
+        self.flag_fn = flag_fn
+        self.poll_s = poll_s
+        self.session: Optional[ProfileSession] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._loop, name="profile-snapshots", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        next_snapshot = 0.0
+        while not self._stop.is_set():
+            try:
+                next_snapshot = self.tick(time.monotonic(), next_snapshot)
+            except Exception as e:
+                logger.warning(f"Profile snapshot failed: {e}")
+            self._stop.wait(self.poll_s)
+        if self.session is not None:
+            self.profiler.close_session(self.session)
+
+    def tick(self, now: float, next_snapshot: float) -> float:
+        """One scheduler step; returns when the next snapshot is due"""
+        enabled = self.flag_fn()
+        if enabled and self.session is None:
+            self.session = self.profiler.open_session()
+            return now + self.snapshot_s
+        if not enabled and self.session is not None:
+            self.write(self.profiler.close_session(self.session))
+            self.session = None
+            return next_snapshot
+        if self.session is not None and now >= next_snapshot:
+            # open the next session first so the timer is not disarmed in between
+            finished, self.session = self.session, self.profiler.open_session()
+            self.write(self.profiler.close_session(finished))
+            return now + self.snapshot_s
+        return next_snapshot
+
+    def write(self, session: ProfileSession) -> Optional[Path]:
+        if not session.counts:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.utcfromtimestamp(session.started).strftime("%Y%m%dT%H%M%S")
+        path = self.directory / f"{self.source}-{stamp}.collapsed"
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(session.collapsed())
+        os.replace(tmp, path)
+        self.prune()
+        return path
+
+    def prune(self):
+        cutoff = time.time() - self.retention_h * 3600
+        own = []
+        for path in self.directory.glob("*.collapsed"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            match = self._own.fullmatch(path.stem)
+            if match:
+                own.append((match.group(1), path.name, path))
+        own.sort()
+        for _, _, path in own[:max(len(own) - self.retention, 0)]:
+            path.unlink(missing_ok=True)
+
+
+def render(session: ProfileSession, fmt: str, name: str) -> Tuple[str, str]:
+    """(body, content type) for a capture in `collapsed` or `speedscope` format"""
+    if fmt == "speedscope":
+        return json.dumps(session.speedscope(name)), "application/json"
+    return session.collapsed(), "text/plain; charset=utf-8"
+
+
+def clamp_capture_seconds(seconds: float) -> float:
+    return min(max(seconds, 0.1), MAX_CAPTURE_S)
+
+
+class _AdminHandler(BaseHTTPRequestHandler):
+    """GET /debug/profile?seconds=N&format=collapsed|speedscope (Bearer token)"""
+
+    server_version = "coolbits-profiler"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/debug/profile":
+            return self._reply(404, "not found\n")
+        supplied = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), PROFILER_ADMIN_TOKEN.encode()):
+            return self._reply(401, "unauthorized\n")
+        if not profiling_enabled():
+            return self._reply(403, f"profiling disabled ({PROFILE_FLAG})\n")
+        query = parse_qs(url.query)
+        try:
+            seconds = clamp_capture_seconds(float(query.get("seconds", ["10"])[0]))
+        except ValueError:
+            return self._reply(400, "seconds must be a number\n")
+        session = profiler.capture(seconds)
+        body, content_type = render(session, query.get("format", ["collapsed"])[0], self.server.source)
+        self._reply(200, body, content_type)
+
+    def _reply(self, status: int, body: str, content_type: str = "text/plain; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info("profiler admin: " + format % args)
+
+
+def start_admin_server(source: str, port: int = PROFILER_ADMIN_PORT,
+                       host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Loopback admin endpoint for processes without an HTTP app (workers)"""
+    if not PROFILER_ADMIN_TOKEN:
+        logger.warning("PROFILER_ADMIN_PORT set without PROFILER_ADMIN_TOKEN, admin endpoint not started")
+        return None
+    server = ThreadingHTTPServer((host, port), _AdminHandler)
+    server.daemon_threads = True
+    server.source = source
+    threading.Thread(target=server.serve_forever, name="profile-admin", daemon=True).start()
+    logger.info(f"Profiler admin endpoint on http://{host}:{server.server_address[1]}/debug/profile")
+    return server
+
+
+# Global profiler
+profiler = SamplingProfiler()
+_installed = False
+
+
+def install(source: str, admin_port: int = PROFILER_ADMIN_PORT) -> SamplingProfiler:
+    """Process start-up hook: call once from the main thread
+
+    Installs the SIGPROF handler (the timer stays disarmed until a session
+    opens), starts the flag-driven snapshot writer and, when admin_port is
+    set, the loopback admin endpoint.
+    """
+    global _installed
+    if _installed:
+        return profiler
+    _installed = True
+    service, source = source, f"{source}-{os.getpid()}"
+    mode = profiler.install_signal_handler()
+    SnapshotWriter(profiler, source, service=service).start()
+    if admin_port:
+        start_admin_server(source, admin_port)
+    logger.info(f"Profiler installed ({mode} mode), gated by {PROFILE_FLAG}")
+    return profiler
@@ -0,0 +1,273 @@
+# Semantic query-result cache for RAG and industry query endpoints
+import os
+import json
+import time
+import itertools
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "1") == "1"
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "5000"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_SIM_THRESHOLD = float(os.getenv("QUERY_CACHE_SIM_THRESHOLD", "0.95"))
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", "3600"))
+QUERY_CACHE_GEN_CHECK_S = float(os.getenv("QUERY_CACHE_GEN_CHECK_S", "1.0"))
+
+GENERATION_PREFIX = "qcache:gen:"
+EVICTION_SAMPLE = 8  # LRU-tail entries considered; the least-hit one is evicted
+
+Key = Tuple[str, str, str]  # (namespace, variant, normalized query)
+
+def normalize_query(query: str) -> str:
+    """Case/whitespace-insensitive form used for exact-tier keys"""
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+def _unit(vector) -> Optional[np.ndarray]:
+    if vector is None:
+        return None
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else None
+
+class _Entry:
+    __slots__ = ("value", "vector", "size", "hits", "expires")
+
+    def __init__(self, value, vector, size, expires):
+        self.value = value
+        self.vector = vector
+        self.size = size
+        self.hits = 0
+        self.expires = expires
+
+class SemanticQueryCache:
+    """Two-tier response cache: exact normalized query, then nearest embedding
+
+    Entries live in a namespace (panel, space or industry; the unit of
+    invalidation) and a variant (k, provider, ...; never shared across).
+    The semantic tier serves a cached value when the new query's embedding
+    has cosine similarity >= ``threshold`` to a cached query's embedding.
+
+    Size is bounded by entry count and approximate bytes. Eviction takes
+    the least-hit of the ``EVICTION_SAMPLE`` least recently used entries,
+    so one-off queries go before popular ones. With ``generation_fn``,
+    a namespace is dropped when its shared generation changes, at most
+    ``generation_check_s`` after another process published an ingest.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 max_bytes: int = QUERY_CACHE_MAX_BYTES,
+                 threshold: float = QUERY_CACHE_SIM_THRESHOLD,
+                 ttl_s: float = QUERY_CACHE_TTL_S,
+                 generation_fn: Optional[Callable[[str], int]] = None,
+                 generation_check_s: float = QUERY_CACHE_GEN_CHECK_S,
+                 enabled: bool = QUERY_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.generation_fn = generation_fn
+        self.generation_check_s = generation_check_s
+        self.enabled = enabled
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        # (namespace, variant) -> (keys, unit-vector matrix), rebuilt lazily
+        self._vectors: Dict[Tuple[str, str], Optional[Tuple[List[Key], np.ndarray]]] = {}
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._epochs: Dict[str, int] = {}  # per namespace ("*": all), bumped on invalidate
+        self._bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                         "evictions": 0, "invalidations": 0}
+        _caches.add(self)
+
+    # -- lookups --
+    def get(self, namespace: str, query: str, variant: str = "") -> Optional[Any]:
+        """Exact-tier lookup on the normalized query"""
+        if not self.enabled:
+            return None
+        self._check_generation(namespace)
+        key = (namespace, variant, normalize_query(query))
+        with self.lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            self.counters["exact_hits"] += 1
+            return entry.value
+
+    def get_similar(self, namespace: str, embedding, variant: str = "") -> Optional[Any]:
+        """Semantic-tier lookup: value of the nearest cached query above threshold"""
+        vector = _unit(embedding)
+        if not self.enabled or vector is None:
+            return None
+        self._check_generation(namespace)
+        with self.lock:
+            index = self._vector_index(namespace, variant)
+            if index is None:
+                return None
+            keys, matrix = index
+            if matrix.shape[1] != vector.shape[0]:
+                return None
+            sims = matrix @ vector
+            for i in np.argsort(-sims)[:4]:
+                if sims[i] < self.threshold:
+                    break
+                entry = self._live(keys[i])
+                if entry is not None:
+                    entry.hits += 1
+                    self._entries.move_to_end(keys[i])
+                    self.counters["semantic_hits"] += 1
+                    return entry.value
+            return None
+
+    def get_or_compute(self, namespace: str, query: str, compute: Callable[[Any], Any],
+                       variant: str = "", embed: Optional[Callable[[str], Any]] = None
+                       ) -> Tuple[Any, str]:
+        """(value, tier) with tier "exact", "semantic" or "miss"
+
+        ``embed(query)`` runs only after an exact miss. Its result goes to
+        ``compute(embedding)`` on a full miss, so the caller's search can
+        reuse the embedding instead of computing it twice.
+        """
+        value = self.get(namespace, query, variant)
+        if value is not None:
+            return value, "exact"
+        embedding = embed(query) if (embed and self.enabled) else None
+        value = self.get_similar(namespace, embedding, variant)
+        if value is not None:
+            # alias the paraphrase so a repeat is an exact hit
+            self.put(namespace, query, value, variant)
+            return value, "semantic"
+        with self.lock:
+            self.counters["misses"] += 1
+            epoch = self._epoch(namespace)
+        value = compute(embedding)
+        # skip the put if an ingest invalidated the namespace mid-compute
+        self.put(namespace, query, value, variant, embedding, epoch=epoch)
+        return value, "miss"
+
+    # -- writes --
+    def put(self, namespace: str, query: str, value: Any, variant: str = "",
+            embedding=None, epoch: Optional[Tuple[int, int]] = None) -> None:
+        if not self.enabled or value is None:
+            return
+        key = (namespace, variant, normalize_query(query))
+        vector = _unit(embedding)
+        size = len(json.dumps(value, default=str)) + len(key[2]) + (vector.nbytes if vector is not None else 0)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if epoch is not None and epoch != self._epoch(namespace):
+                return
+            self._remove(key)
+            self._entries[key] = _Entry(value, vector, size, time.monotonic() + self.ttl_s)
+            self._bytes += size
+            if vector is not None:
+                self._vectors[(namespace, variant)] = None
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, namespace: Optional[str] = None) -> int:
+        """Drop every entry in ``namespace`` (all entries when None)"""
+        with self.lock:
+            keys = [k for k in self._entries if namespace is None or k[0] == namespace]
+            for key in keys:
+                self._remove(key)
+            scope = "*" if namespace is None else namespace
+            self._epochs[scope] = self._epochs.get(scope, 0) + 1
+            self.counters["invalidations"] += 1
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.counters["exact_hits"] + self.counters["semantic_hits"] + self.counters["misses"]
+            hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                **self.counters,
+            }
+
+    # -- internals (lock held) --
+    def _epoch(self, namespace: str) -> Tuple[int, int]:
+        return self._epochs.get("*", 0), self._epochs.get(namespace, 0)
+
+    def _live(self, key: Key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires < time.monotonic():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: Key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            if entry.vector is not None:
+                self._vectors[(key[0], key[1])] = None
+
+    def _evict(self) -> None:
+        sample = list(itertools.islice(self._entries, EVICTION_SAMPLE))
+        victim = min(sample, key=lambda k: self._entries[k].hits)
+        self._remove(victim)
+        self.counters["evictions"] += 1
+
+    def _vector_index(self, namespace: str, variant: str):
+        part = (namespace, variant)
+        if self._vectors.get(part) is None:
+            keys = [k for k, e in self._entries.items()
+                    if k[0] == namespace and k[1] == variant and e.vector is not None]
+            if not keys:
+                self._vectors.pop(part, None)
+                return None
+            self._vectors[part] = (keys, np.vstack([self._entries[k].vector for k in keys]))
+        return self._vectors[part]
+
+    def _check_generation(self, namespace: str) -> None:
+        if self.generation_fn is None:
+            return
+        now = time.monotonic()
+        seen = self._generations.get(namespace)
+        if seen and now - seen[1] < self.generation_check_s:
+            return
+        try:
+            current = self.generation_fn(namespace)
+        except Exception as e:
+            logger.warning(f"Query cache generation check failed: {e}")
+            return
+        if seen and seen[0] != current:
+            self.invalidate(namespace)
+        self._generations[namespace] = (current, now)
+
+# Local caches, so an ingest in this process invalidates them immediately
+_caches: "weakref.WeakSet[SemanticQueryCache]" = weakref.WeakSet()
+
+def redis_generation_fn(client) -> Optional[Callable[[str], int]]:
+    """Shared per-namespace generation counter read from Redis"""
+    if client is None:
+        return None
+    return lambda namespace: int(client.get(GENERATION_PREFIX + namespace) or 0)
+
+def notify_ingest(namespaces: Iterable[str], redis_client=None) -> None:
+    """Invalidate cached results for namespaces whose index changed
+
+    Local caches are cleared now; other workers see the bumped Redis
+    generation on their next generation check.
+    """
+    for namespace in set(namespaces):
+        for cache in list(_caches):
+            cache.invalidate(namespace)
+        if redis_client is not None:
+            try:
+                redis_client.incr(GENERATION_PREFIX + namespace)
+            except Exception as e:
+                logger.warning(f"Failed to publish cache invalidation for {namespace}: {e}")
@@ -1,12 +1,15 @@
 # RAG implementation with pgvector
 import logging
 import os
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from .db import RAGChunk, RAGEmbedding
-from .deps import get_openai
+from .deps import get_openai, get_redis
+from .query_cache import notify_ingest
+from .rerank import RAG_RERANK, RAG_RERANK_CANDIDATES, get_reranker
 
 logger = logging.getLogger(__name__)
 
@@ -33,12 +36,31 @@ def search_rag_chunks(
     query: str,
     k: int = RAG_TOPK,
     min_score: float = RAG_MIN_SCORE,
-    openai_client=None
+    openai_client=None,
+    timings: Optional[Dict[str, float]] = None,
+    rerank: Optional[bool] = None,
+    query_embedding: Optional[List[float]] = None
 ) -> List[Dict[str, Any]]:
-    """Search RAG chunks using pgvector"""
+    """Search RAG chunks using pgvector
+    
+    With ``rerank`` (default: RAG_RERANK), the top RAG_RERANK_CANDIDATES
+    chunks are rescored by the cross-encoder and the best ``k`` returned,
+    so callers can ask for a smaller k at the same recall.
+    
+    When ``timings`` is given, per-stage wall time in ms is recorded into
+    it (embed_ms, ann_ms, fetch_ms, rerank_ms) for the evaluation harness.
+    A precomputed ``query_embedding`` (e.g. from the query cache lookup)
+    skips the embedding call.
+    """
+    timings = timings if timings is not None else {}
+    reranker = get_reranker() if (RAG_RERANK if rerank is None else rerank) else None
+    n_candidates = max(k, RAG_RERANK_CANDIDATES) if reranker else k
     
     # Get query embedding
-    query_embedding = get_embedding(query, openai_client)
+    t0 = time.perf_counter()
+    if query_embedding is None:
+        query_embedding = get_embedding(query, openai_client)
+    timings["embed_ms"] = (time.perf_counter() - t0) * 1000
     
     try:
         # pgvector similarity search with cosine similarity
@@ -59,14 +81,17 @@ def search_rag_chunks(
             LIMIT :k
         """)
         
+        t0 = time.perf_counter()
         result = db.execute(query_sql, {
             "query_embedding": str(query_embedding),
             "panel": panel,
-            "k_candidates": k * 4,  # Get more candidates for filtering
+            "k_candidates": n_candidates * 4,  # Get more candidates for filtering
             "min_score": min_score,
-            "k": k
+            "k": n_candidates
         })
+        timings["ann_ms"] = (time.perf_counter() - t0) * 1000
         
+        t0 = time.perf_counter()
         answers = []
         for row in result:
             answers.append({
@@ -76,6 +101,12 @@ def search_rag_chunks(
                 "meta": row.meta,
                 "chunk_id": row.chunk_id
             })
+        timings["fetch_ms"] = (time.perf_counter() - t0) * 1000
+        
+        if reranker and answers:
+            t0 = time.perf_counter()
+            answers = reranker.rerank(query, answers, k)
+            timings["rerank_ms"] = (time.perf_counter() - t0) * 1000
         
         return answers
         
@@ -98,6 +129,14 @@ def search_rag_chunks(
             for chunk in chunks
         ]
 
+def invalidate_query_cache(panels) -> None:
+    """Drop cached /v1/rag/query results for panels whose chunks changed"""
+    try:
+        redis_client = get_redis()
+    except Exception:
+        redis_client = None
+    notify_ingest(panels, redis_client)
+
 def ingest_text_to_rag(
     db: Session,
     panel: str,
@@ -129,6 +168,7 @@ def ingest_text_to_rag(
     db.add(rag_embedding)
     
     db.commit()
+    invalidate_query_cache([panel])
     
     logger.info(f"Ingested RAG chunk {chunk.id} for panel {panel}")
     return str(chunk.id)
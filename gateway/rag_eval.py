@@ -1,16 +1,25 @@
 # RAG Connect & Eval harness for M20.4
 import os
+import io
+import copy
 import json
+import queue
+import asyncio
 import logging
+import functools
 import hashlib
+import itertools
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 import yaml
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Iterator, Callable
 from pathlib import Path
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, desc
 import numpy as np
-from sklearn.metrics import ndcg_score
 import requests
 from bs4 import BeautifulSoup
 
@@ -21,27 +30,74 @@
 EVAL_THRESHOLD_NDCG = float(os.getenv("EVAL_THRESHOLD_NDCG", "0.70"))
 EVAL_THRESHOLD_RECALL = float(os.getenv("EVAL_THRESHOLD_RECALL", "0.85"))
 EVAL_THRESHOLD_P95 = float(os.getenv("EVAL_THRESHOLD_P95", "300"))
+INGEST_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", "256"))
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "4"))
+EVAL_MAX_P95_REGRESSION = float(os.getenv("EVAL_MAX_P95_REGRESSION", "0.10"))  # +10% p95
+EVAL_MAX_NDCG_DROP = float(os.getenv("EVAL_MAX_NDCG_DROP", "0.02"))
+
+def iter_text_chunks(text: str, chunk_size: int, chunk_overlap: int = 0) -> Iterator[Tuple[int, str]]:
+    """Yield (offset, chunk) windows over text without materializing the list"""
+    step = max(chunk_size - chunk_overlap, 1)
+    for i in range(0, len(text), step):
+        chunk_text = text[i:i + chunk_size]
+        if chunk_text.strip():
+            yield i, chunk_text
+
+def content_sha(data) -> str:
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
 
 class RAGConnector:
-    """Base class for RAG connectors"""
+    """Base class for RAG connectors
+    
+    Connectors are generators: ``iter_chunks`` yields chunk dicts one at a
+    time so ingestion memory stays flat. ``state`` is the connector's sync
+    state persisted on RAGSource.config (file hashes, ETags); ``since`` is
+    RAGSource.last_sync. Counters go into ``stats``.
+    
+    Per-source entries live under ``state[STATE_SECTION]``; ``source_uri``
+    maps an entry key to the ``source_uri`` of its chunks, so the manager
+    can drop entries of sources that failed to store and delete chunks of
+    sources that disappeared.
+    """
+    
+    STATE_SECTION = ""
     
     def __init__(self, name: str):
         self.name = name
     
+    def source_uri(self, key: str) -> str:
+        """source_uri of the chunks recorded under a state entry key"""
+        return key
+    
     def connect(self, config: Dict[str, Any]) -> bool:
         """Test connection to source"""
         raise NotImplementedError
     
-    def ingest(self, config: Dict[str, Any], org_id: str, space: str) -> List[Dict[str, Any]]:
-        """Ingest content from source"""
+    def iter_chunks(self, config: Dict[str, Any], org_id: str, space: str,
+                    since: Optional[datetime] = None,
+                    state: Optional[Dict[str, Any]] = None,
+                    stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chunks from source"""
         raise NotImplementedError
+    
+    def ingest(self, config: Dict[str, Any], org_id: str, space: str) -> List[Dict[str, Any]]:
+        """Ingest content from source (materialized; prefer iter_chunks)"""
+        return list(self.iter_chunks(config, org_id, space))
 
 class FSLocalConnector(RAGConnector):
     """Local filesystem connector"""
     
+    EXTENSIONS = ('.txt', '.md', '.json')
+    STATE_SECTION = "files"
+    
     def __init__(self):
         super().__init__("fs_local")
     
+    def source_uri(self, key: str) -> str:
+        return f"file://{key}"
+    
     def connect(self, config: Dict[str, Any]) -> bool:
         """Test filesystem access"""
         try:
@@ -50,122 +106,363 @@ def connect(self, config: Dict[str, Any]) -> bool:
         except:
             return False
     
-    def ingest(self, config: Dict[str, Any], org_id: str, space: str) -> List[Dict[str, Any]]:
-        """Ingest files from local directory"""
-        chunks = []
+    def _walk(self, root: str, unreadable: Optional[List[str]] = None) -> Iterator[os.DirEntry]:
+        """Iterative scandir walk (stat comes with the dir entry)"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file() and entry.name.endswith(self.EXTENSIONS):
+                            yield entry
+            except OSError as e:
+                logger.warning(f"Failed to list {e.filename}: {e}")
+                if unreadable is not None:
+                    unreadable.append(directory)
+    
+    def iter_chunks(self, config: Dict[str, Any], org_id: str, space: str,
+                    since: Optional[datetime] = None,
+                    state: Optional[Dict[str, Any]] = None,
+                    stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chunks from files changed since the last sync"""
         path = Path(config.get("path", ""))
+        state = state if state is not None else {}
+        stats = stats if stats is not None else {}
+        file_hashes = state.setdefault("files", {})
+        since_ts = since.timestamp() if since else None
         
         if not path.exists():
-            return chunks
+            return
+        
+        chunk_size = config.get("chunk_size", 1000)
+        chunk_overlap = config.get("chunk_overlap", 200)
+        seen = set()
+        unreadable: List[str] = []
         
-        for file_path in path.rglob("*"):
-            if file_path.is_file() and file_path.suffix in ['.txt', '.md', '.json']:
+        for entry in self._walk(str(path), unreadable):
+            file_path = Path(entry.path)
+            key = str(file_path)
+            seen.add(key)
+            try:
+                # mtime older than last_sync and already hashed: unchanged
+                if since_ts and key in file_hashes and entry.stat().st_mtime <= since_ts:
+                    stats["files_skipped"] = stats.get("files_skipped", 0) + 1
+                    continue
+                
+                data = file_path.read_bytes()
+                sha = content_sha(data)
+                if file_hashes.get(key) == sha:  # touched, same bytes
+                    stats["files_skipped"] = stats.get("files_skipped", 0) + 1
+                    continue
+                content = data.decode('utf-8')
+            except Exception as e:
+                logger.warning(f"Failed to read {file_path}: {e}")
+                continue
+            
+            stats["files_changed"] = stats.get("files_changed", 0) + 1
+            for i, chunk_text in iter_text_chunks(content, chunk_size, chunk_overlap):
+                yield {
+                    "content": chunk_text,
+                    "source_uri": f"file://{file_path}",
+                    "chunk_id": f"{file_path.stem}_{i}",
+                    "metadata": {
+                        "file_path": str(file_path),
+                        "chunk_index": i // (chunk_size - chunk_overlap),
+                        "content_sha": sha,
+                        "org_id": org_id,
+                        "space": space
+                    }
+                }
+            # recorded only after the consumer took every chunk of the file
+            file_hashes[key] = sha
+        
+        for key in set(file_hashes) - seen:
+            # under a directory that failed to list is not a deletion
+            if not any(key.startswith(d + os.sep) for d in unreadable):
+                del file_hashes[key]
+
+class AsyncPageFetcher:
+    """Bounded concurrent HTTP fetcher with pooling and conditional GETs
+    
+    Runs an aiohttp session on a private event loop thread and hands
+    results to the (synchronous) consumer through a bounded queue, so a
+    slow consumer applies backpressure instead of buffering the site.
+    """
+    
+    _DONE = object()
+    
+    def __init__(self, concurrency: int = 16, timeout: float = 10.0, queue_size: int = 64):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.queue_size = queue_size
+    
+    def iter_pages(self, urls: Iterable[str], cache: Dict[str, Dict[str, str]]
+                   ) -> Iterator[Tuple[str, int, Optional[bytes], Dict[str, str]]]:
+        """Yield (url, status, body, validators) in completion order; body is None on 304"""
+        results: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=lambda: asyncio.run(self._run(iter(urls), cache, results, stop)),
+            name="rag-fetcher", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is self._DONE:
+                    break
+                yield item
+        finally:
+            stop.set()
+            while thread.is_alive():  # unblock a producer waiting on a full queue
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+    
+    async def _run(self, urls: Iterator[str], cache, results: "queue.Queue", stop: threading.Event):
+        async def put(item):
+            while not stop.is_set():
                 try:
-                    content = file_path.read_text(encoding='utf-8')
-                    
-                    # Split into chunks
-                    chunk_size = config.get("chunk_size", 1000)
-                    chunk_overlap = config.get("chunk_overlap", 200)
-                    
-                    for i in range(0, len(content), chunk_size - chunk_overlap):
-                        chunk_text = content[i:i + chunk_size]
-                        if chunk_text.strip():
-                            chunks.append({
-                                "content": chunk_text,
-                                "source_uri": f"file://{file_path}",
-                                "chunk_id": f"{file_path.stem}_{i}",
-                                "metadata": {
-                                    "file_path": str(file_path),
-                                    "chunk_index": i // (chunk_size - chunk_overlap),
-                                    "org_id": org_id,
-                                    "space": space
-                                }
-                            })
+                    results.put_nowait(item)
+                    return
+                except queue.Full:
+                    await asyncio.sleep(0.01)
+        
+        async def worker(session):
+            for url in urls:  # shared iterator: each URL goes to exactly one worker
+                if stop.is_set():
+                    return
+                headers = {}
+                validators = cache.get(url, {})
+                if validators.get("etag"):
+                    headers["If-None-Match"] = validators["etag"]
+                if validators.get("last_modified"):
+                    headers["If-Modified-Since"] = validators["last_modified"]
+                try:
+                    async with session.get(url, headers=headers) as resp:
+                        body = await resp.read() if resp.status == 200 else None
+                        await put((url, resp.status, body, {
+                            "etag": resp.headers.get("ETag", ""),
+                            "last_modified": resp.headers.get("Last-Modified", ""),
+                        }))
                 except Exception as e:
-                    logger.warning(f"Failed to read {file_path}: {e}")
+                    logger.warning(f"Failed to fetch {url}: {e}")
+                    await put((url, 0, None, {}))
         
-        return chunks
+        try:
+            import aiohttp
+            
+            connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                await asyncio.gather(*(worker(session) for _ in range(self.concurrency)))
+        except Exception as e:
+            logger.error(f"Page fetcher failed: {e}")
+        finally:
+            await put(self._DONE)
 
 class HTTPSitemapConnector(RAGConnector):
     """HTTP sitemap connector"""
     
+    STATE_SECTION = "pages"
+    
     def __init__(self):
         super().__init__("http_sitemap")
+        self.session = requests.Session()
     
     def connect(self, config: Dict[str, Any]) -> bool:
         """Test HTTP access"""
         try:
             url = config.get("base_url", "")
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             return response.status_code == 200
         except:
             return False
     
-    def ingest(self, config: Dict[str, Any], org_id: str, space: str) -> List[Dict[str, Any]]:
-        """Ingest content from sitemap"""
-        chunks = []
+    def _iter_sitemap(self, sitemap_url: str, since: Optional[datetime],
+                      stats: Dict[str, int], depth: int = 0) -> Iterator[str]:
+        """Stream page URLs from a sitemap (or sitemap index), skipping lastmod <= since"""
+        response = self.session.get(sitemap_url, timeout=30)
+        if response.status_code != 200:
+            return
+        
+        nested = []
+        for _, elem in ET.iterparse(io.BytesIO(response.content), events=("end",)):
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag not in ("url", "sitemap"):
+                continue
+            fields = {child.tag.rsplit('}', 1)[-1]: (child.text or "").strip() for child in elem}
+            elem.clear()
+            loc = fields.get("loc")
+            if not loc:
+                continue
+            if tag == "sitemap":
+                nested.append(loc)
+                continue
+            lastmod = _parse_lastmod(fields.get("lastmod"))
+            if since and lastmod and lastmod <= since:
+                stats["pages_skipped"] = stats.get("pages_skipped", 0) + 1
+                continue
+            yield loc
+        
+        if depth < 2:
+            for loc in nested:
+                yield from self._iter_sitemap(loc, since, stats, depth + 1)
+    
+    def iter_chunks(self, config: Dict[str, Any], org_id: str, space: str,
+                    since: Optional[datetime] = None,
+                    state: Optional[Dict[str, Any]] = None,
+                    stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream chunks from pages changed since the last sync"""
         base_url = config.get("base_url", "")
         sitemap_url = config.get("sitemap_url", f"{base_url}/sitemap.xml")
+        chunk_size = config.get("chunk_size", 1000)
+        state = state if state is not None else {}
+        stats = stats if stats is not None else {}
+        pages = state.setdefault("pages", {})
+        
+        fetcher = AsyncPageFetcher(
+            concurrency=config.get("concurrency", 16),
+            timeout=config.get("timeout", 10),
+        )
         
         try:
-            # Parse sitemap
-            response = requests.get(sitemap_url, timeout=30)
-            if response.status_code != 200:
-                return chunks
-            
-            soup = BeautifulSoup(response.content, 'xml')
-            urls = soup.find_all('url')
-            
-            for url_elem in urls[:config.get("max_pages", 50)]:  # Limit for dev
-                loc = url_elem.find('loc')
-                if loc:
-                    page_url = loc.text
-                    
-                    try:
-                        page_response = requests.get(page_url, timeout=10)
-                        if page_response.status_code == 200:
-                            page_soup = BeautifulSoup(page_response.content, 'html.parser')
-                            
-                            # Extract text content
-                            text_content = page_soup.get_text(separator=' ', strip=True)
-                            
-                            # Split into chunks
-                            chunk_size = config.get("chunk_size", 1000)
-                            for i in range(0, len(text_content), chunk_size):
-                                chunk_text = text_content[i:i + chunk_size]
-                                if chunk_text.strip():
-                                    chunks.append({
-                                        "content": chunk_text,
-                                        "source_uri": page_url,
-                                        "chunk_id": f"{hashlib.md5(page_url.encode()).hexdigest()[:8]}_{i}",
-                                        "metadata": {
-                                            "page_url": page_url,
-                                            "chunk_index": i // chunk_size,
-                                            "org_id": org_id,
-                                            "space": space
-                                        }
-                                    })
-                    except Exception as e:
-                        logger.warning(f"Failed to fetch {page_url}: {e}")
+            urls = itertools.islice(self._iter_sitemap(sitemap_url, since, stats),
+                                    config.get("max_pages", 50))  # Limit for dev
+            for page_url, status, body, validators in fetcher.iter_pages(urls, pages):
+                if status == 304:
+                    stats["pages_not_modified"] = stats.get("pages_not_modified", 0) + 1
+                    continue
+                if status != 200 or body is None:
+                    stats["pages_failed"] = stats.get("pages_failed", 0) + 1
+                    continue
+                
+                sha = content_sha(body)
+                if pages.get(page_url, {}).get("sha") == sha:
+                    stats["pages_not_modified"] = stats.get("pages_not_modified", 0) + 1
+                    pages[page_url].update(validators)
+                    continue
+                
+                page_soup = BeautifulSoup(body, 'html.parser')
+                
+                # Extract text content
+                text_content = page_soup.get_text(separator=' ', strip=True)
+                url_hash = hashlib.md5(page_url.encode()).hexdigest()[:8]
+                
+                stats["pages_changed"] = stats.get("pages_changed", 0) + 1
+                for i, chunk_text in iter_text_chunks(text_content, chunk_size):
+                    yield {
+                        "content": chunk_text,
+                        "source_uri": page_url,
+                        "chunk_id": f"{url_hash}_{i}",
+                        "metadata": {
+                            "page_url": page_url,
+                            "chunk_index": i // chunk_size,
+                            "content_sha": sha,
+                            "org_id": org_id,
+                            "space": space
+                        }
+                    }
+                pages[page_url] = {**validators, "sha": sha}
                         
         except Exception as e:
             logger.error(f"Failed to parse sitemap: {e}")
-        
-        return chunks
+
+def _parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Sitemap <lastmod> (W3C datetime) as naive UTC, like RAGSource.last_sync"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
 
 class RAGIngestionManager:
-    """RAG ingestion manager for M20.4"""
+    """RAG ingestion manager for M20.4
     
-    def __init__(self, db: Session):
+    Chunks stream from the connector into fixed-size batches; each batch
+    is embedded in one call and bulk-inserted. Sources that changed have
+    their previous chunks replaced; sources that disappeared have them
+    deleted. A source with a failed batch keeps no sync state, and the run
+    does not advance ``last_sync``, so the next run ingests it again.
+    """
+    
+    def __init__(self, db: Session, openai_client=None, batch_size: int = INGEST_BATCH_SIZE):
         self.db = db
+        self.openai_client = openai_client
+        self.batch_size = batch_size
         self.connectors = {
             "fs_local": FSLocalConnector(),
             "http_sitemap": HTTPSitemapConnector()
         }
     
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """One embedding request per batch; deterministic fallback offline"""
+        from .embed_worker import fake_embed, EMBED_MODEL, EMBED_DIM
+        
+        if self.openai_client:
+            try:
+                response = self.openai_client.embeddings.create(model=EMBED_MODEL, input=texts)
+                return [item.embedding for item in response.data]
+            except Exception as e:
+                logger.error(f"Batch embedding error, using fallback: {e}")
+        return [fake_embed(text, EMBED_DIM) for text in texts]
+    
+    def _store_batch(self, batch: List[Dict[str, Any]], org_id: str, space: str,
+                     replaced: set) -> int:
+        from .db import RAGChunk
+        
+        # First chunk of a changed source in this run: drop its old chunks
+        stale = {chunk["source_uri"] for chunk in batch} - replaced
+        if stale:
+            self._delete_chunks(org_id, space, stale)
+        
+        embeddings = self._embed_batch([chunk["content"] for chunk in batch])
+        now = datetime.utcnow()
+        self.db.bulk_insert_mappings(RAGChunk, [
+            {
+                "org_id": org_id,
+                "space": space,
+                "content": chunk["content"],
+                "source_uri": chunk["source_uri"],
+                "chunk_id": chunk["chunk_id"],
+                "metadata": chunk["metadata"],
+                "embedding": embedding,
+                "created_at": now
+            }
+            for chunk, embedding in zip(batch, embeddings)
+        ])
+        self.db.commit()
+        # only once committed: after a rollback the next batch deletes again
+        replaced |= stale
+        return len(batch)
+    
+    def _delete_chunks(self, org_id: str, space: str, source_uris) -> None:
+        from .db import RAGChunk
+        
+        self.db.query(RAGChunk).filter(
+            and_(
+                RAGChunk.org_id == org_id,
+                RAGChunk.space == space,
+                RAGChunk.source_uri.in_(list(source_uris))
+            )
+        ).delete(synchronize_session=False)
+    
     def ingest_from_source(self, source: str, config: Dict[str, Any], 
-                          org_id: str, space: str) -> Dict[str, Any]:
-        """Ingest content from specified source"""
+                          org_id: str, space: str,
+                          source_id: Optional[str] = None) -> Dict[str, Any]:
+        """Ingest content from specified source
+        
+        With ``source_id`` the RAGSource row supplies ``last_sync`` and the
+        persisted sync state, and both are updated after a successful run.
+        """
         if source not in self.connectors:
             raise ValueError(f"Unknown connector: {source}")
         
@@ -175,50 +472,191 @@ def ingest_from_source(self, source: str, config: Dict[str, Any],
         if not connector.connect(config):
             raise ConnectionError(f"Failed to connect to {source}")
         
-        # Ingest content
-        chunks = connector.ingest(config, org_id, space)
+        rag_source = None
+        since = None
+        state: Dict[str, Any] = {}
+        if source_id:
+            from .db import RAGSource
+            rag_source = self.db.query(RAGSource).filter(RAGSource.id == source_id).first()
+            if rag_source:
+                since = rag_source.last_sync
+                # deep copy: config is a plain JSON column, so mutating the loaded
+                # dicts in place would make the new value compare equal to the
+                # committed one and the UPDATE would be skipped
+                state = copy.deepcopy((rag_source.config or {}).get("_sync_state", {}))
         
-        # Store chunks in database
-        stored_count = 0
-        for chunk in chunks:
-            try:
-                from .db import RAGChunk
-                
-                # Check for duplicates
-                existing = self.db.query(RAGChunk).filter(
-                    and_(
-                        RAGChunk.org_id == org_id,
-                        RAGChunk.source_uri == chunk["source_uri"],
-                        RAGChunk.chunk_id == chunk["chunk_id"]
-                    )
-                ).first()
-                
-                if not existing:
-                    rag_chunk = RAGChunk(
-                        org_id=org_id,
-                        space=space,
-                        content=chunk["content"],
-                        source_uri=chunk["source_uri"],
-                        chunk_id=chunk["chunk_id"],
-                        metadata=chunk["metadata"],
-                        created_at=datetime.utcnow()
-                    )
-                    
-                    self.db.add(rag_chunk)
-                    stored_count += 1
-                    
-            except Exception as e:
-                logger.warning(f"Failed to store chunk: {e}")
+        started = datetime.utcnow()
+        stats: Dict[str, int] = {}
+        ingested = stored = 0
+        replaced: set = set()
+        failed: set = set()
+        previous = dict(state.get(connector.STATE_SECTION, {}))
+        batch: List[Dict[str, Any]] = []
         
-        self.db.commit()
+        # Stream: connector -> batch -> embed -> bulk insert
+        for chunk in connector.iter_chunks(config, org_id, space, since=since, state=state, stats=stats):
+            batch.append(chunk)
+            ingested += 1
+            if len(batch) >= self.batch_size:
+                stored += self._store_with_rollback(batch, org_id, space, replaced, failed)
+                batch = []
+        if batch:
+            stored += self._store_with_rollback(batch, org_id, space, replaced, failed)
+        
+        entries = state.setdefault(connector.STATE_SECTION, {})
+        removed = self._remove_deleted_sources(connector, entries, previous, org_id, space)
+        for key in [k for k in entries if connector.source_uri(k) in failed]:
+            del entries[key]  # no hash/validators: re-ingested next run
+        if stored or replaced or removed:
+            from .rag import invalidate_query_cache
+            invalidate_query_cache([space])
+        
+        if rag_source:
+            if not failed:
+                rag_source.last_sync = started
+            rag_source.config = {**(rag_source.config or {}), "_sync_state": state}
+            self.db.commit()
         
         return {
             "source": source,
-            "chunks_ingested": len(chunks),
-            "chunks_stored": stored_count,
+            "chunks_ingested": ingested,
+            "chunks_stored": stored,
+            "sources_replaced": len(replaced),
+            "sources_removed": len(removed),
+            "sources_failed": len(failed),
+            "stats": stats,
             "org_id": org_id,
             "space": space
         }
+    
+    def _store_with_rollback(self, batch, org_id, space, replaced, failed) -> int:
+        try:
+            return self._store_batch(batch, org_id, space, replaced)
+        except Exception as e:
+            logger.warning(f"Failed to store batch of {len(batch)} chunks: {e}")
+            self.db.rollback()
+            failed.update(chunk["source_uri"] for chunk in batch)
+            return 0
+    
+    def _remove_deleted_sources(self, connector, entries, previous, org_id, space) -> List[str]:
+        """Delete chunks of sources whose state entry the connector dropped"""
+        gone = [key for key in previous if key not in entries]
+        if not gone:
+            return []
+        source_uris = [connector.source_uri(key) for key in gone]
+        try:
+            self._delete_chunks(org_id, space, source_uris)
+            self.db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to delete chunks of {len(gone)} removed sources: {e}")
+            self.db.rollback()
+            for key in gone:  # still missing next run, so the delete is retried
+                entries[key] = previous[key]
+            return []
+        return source_uris
+
+# --- Evaluation metrics & benchmark helpers ---------------------------------
+
+# search_fn(db, query, space, top_k, timings) -> chunks; fills timings with *_ms stages
+SearchFn = Callable[[Session, str, str, int, Dict[str, float]], List[Dict[str, Any]]]
+
+def default_search(db: Session, query: str, space: str, top_k: int,
+                   timings: Dict[str, float], rerank: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """pgvector search for a space (spaces map to panels in search_rag_chunks)"""
+    from .rag import search_rag_chunks
+    from .deps import get_openai
+    
+    try:
+        openai_client = get_openai()
+    except Exception:
+        openai_client = None
+    return search_rag_chunks(db, space, query, k=top_k, openai_client=openai_client,
+                             timings=timings, rerank=rerank)
+
+def graded_relevance(item: Dict[str, Any]) -> Dict[str, float]:
+    """Golden item -> {doc id: grade}
+    
+    ``relevance: {id: grade}`` gives graded judgements; a plain ``ideal``
+    list counts every listed id as grade 1.
+    """
+    if item.get("relevance"):
+        return {str(doc_id): float(grade) for doc_id, grade in item["relevance"].items()}
+    return {str(doc_id): 1.0 for doc_id in item.get("ideal", [])}
+
+def retrieved_doc_ids(chunks: List[Dict[str, Any]], relevance: Dict[str, float]) -> List[str]:
+    """Judged id for each retrieved chunk (doc_id, source or chunk_id), deduplicated"""
+    ids, seen = [], set()
+    for chunk in chunks:
+        meta = chunk.get("meta") or chunk.get("metadata") or {}
+        candidates = [meta.get("doc_id"), chunk.get("source"), chunk.get("source_uri"),
+                      chunk.get("chunk_id")]
+        candidates = [str(c) for c in candidates if c]
+        doc_id = next((c for c in candidates if c in relevance), candidates[0] if candidates else "")
+        if doc_id not in seen:
+            seen.add(doc_id)
+            ids.append(doc_id)
+    return ids
+
+def retrieval_metrics(retrieved: List[str], relevance: Dict[str, float], k: int) -> Dict[str, float]:
+    """Graded nDCG@k (exponential gain), MRR and recall@k
+
+    A repeated id counts at its first rank only, so nDCG stays within [0, 1].
+    """
+    top = list(dict.fromkeys(retrieved))[:k]
+    gains = np.array([relevance.get(doc_id, 0.0) for doc_id in top])
+    dcg = float(((2 ** gains - 1) / np.log2(np.arange(2, len(top) + 2))).sum())
+    ideal = np.sort(np.array(list(relevance.values())))[::-1][:k]
+    idcg = float(((2 ** ideal - 1) / np.log2(np.arange(2, len(ideal) + 2))).sum())
+    
+    first_hit = next((rank for rank, gain in enumerate(gains, 1) if gain > 0), None)
+    relevant = {doc_id for doc_id, grade in relevance.items() if grade > 0}
+    return {
+        "ndcg": dcg / idcg if idcg > 0 else 0.0,
+        "mrr": 1.0 / first_hit if first_hit else 0.0,
+        "recall": len(relevant & set(top)) / len(relevant) if relevant else 0.0,
+    }
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    arr = np.asarray(values)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"count": len(values), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "mean": float(arr.mean()), "max": float(arr.max())}
+
+def stage_summary(samples: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """p50/p95 per stage (embed, ann, rerank, fetch, ...) plus queueing"""
+    stages: Dict[str, List[float]] = {}
+    for sample in samples:
+        for name, ms in sample.get("stages", {}).items():
+            stages.setdefault(name, []).append(ms)
+        stages.setdefault("queue_ms", []).append(sample.get("queue_ms", 0.0))
+    return {name: latency_summary(values) for name, values in stages.items()}
+
+def compare_metrics(baseline: Dict[str, Any], candidate: Dict[str, Any],
+                    baseline_name: str = "A", candidate_name: str = "B") -> Dict[str, Any]:
+    """Deltas candidate - baseline; regression when p95 or nDCG move past the gates"""
+    deltas = {
+        key: float(candidate.get(key, 0.0)) - float(baseline.get(key, 0.0))
+        for key in ("avg_ndcg", "avg_recall", "avg_mrr", "p50_latency_ms", "p95_latency_ms")
+    }
+    base_p95 = float(baseline.get("p95_latency_ms", 0.0))
+    p95_regressed = base_p95 > 0 and deltas["p95_latency_ms"] > base_p95 * EVAL_MAX_P95_REGRESSION
+    ndcg_regressed = deltas["avg_ndcg"] < -EVAL_MAX_NDCG_DROP
+    return {
+        "baseline": baseline_name,
+        "candidate": candidate_name,
+        "available": True,
+        "deltas": deltas,
+        "p95_regressed": p95_regressed,
+        "ndcg_regressed": ndcg_regressed,
+        "regression": p95_regressed or ndcg_regressed,
+    }
+
+def write_json(result: Dict[str, Any], path: str) -> None:
+    """Machine-readable output for CI gating"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(result, indent=2, default=str), encoding='utf-8')
 
 class RAGEvaluationManager:
     """RAG evaluation manager for M20.4"""
@@ -252,90 +690,82 @@ def load_golden_set(self, org_id: str, space: str) -> List[Dict[str, Any]]:
         with open(golden_set_path, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
     
-    def evaluate_rag(self, org_id: str, space: str, top_k: int = 5) -> Dict[str, Any]:
-        """Evaluate RAG performance"""
+    def evaluate_rag(self, org_id: str, space: str, top_k: int = 5,
+                     concurrency: int = EVAL_CONCURRENCY, qps: Optional[float] = None,
+                     warm_runs: int = 1, variant: str = RAG_VARIANT,
+                     search_fn: Optional[SearchFn] = None,
+                     session_factory: Optional[Callable[[], Session]] = None,
+                     cache_reset: Optional[Callable[[], None]] = None,
+                     rerank: Optional[bool] = None) -> Dict[str, Any]:
+        """Evaluate RAG quality and latency
+        
+        The golden set runs once cold (after ``cache_reset`` when given)
+        and ``warm_runs`` more times, each pass on ``concurrency`` worker
+        threads, optionally paced to ``qps`` (open loop: latency includes
+        queueing). Quality metrics come from the cold pass.
+        
+        ``rerank`` turns the cross-encoder stage on or off for the default
+        search (None: RAG_RERANK); run it as a separate variant and use
+        ``compare_variants`` to measure its gain. Its score cache is
+        cleared before the cold pass.
+        """
+        from .rerank import RAG_RERANK, get_reranker
+        
         golden_set = self.load_golden_set(org_id, space)
+        reranker = get_reranker() if (RAG_RERANK if rerank is None else rerank) else None
+        if search_fn is None:
+            search_fn = functools.partial(default_search, rerank=reranker is not None)
+        if reranker and cache_reset is None:
+            cache_reset = reranker.clear_cache
+        
+        if cache_reset:
+            cache_reset()
+        cold, cold_wall = self._run_pass(golden_set, space, top_k, concurrency, qps,
+                                         search_fn, session_factory)
+        warm, warm_wall = [], 0.0
+        for _ in range(warm_runs):
+            samples, wall = self._run_pass(golden_set, space, top_k, concurrency, qps,
+                                           search_fn, session_factory)
+            warm.extend(samples)
+            warm_wall += wall
         
         results = []
-        total_latency = []
+        for item, sample in zip(golden_set, cold):
+            relevance = graded_relevance(item)
+            entry = {
+                "qid": item["qid"],
+                "query": item["query"],
+                "latency_ms": sample["latency_ms"],
+                "stages": sample["stages"],
+            }
+            if "error" in sample:
+                entry.update(error=sample["error"], mrr=0.0, ndcg=0.0, recall=0.0, retrieved_ids=[])
+            else:
+                retrieved_ids = retrieved_doc_ids(sample["chunks"], relevance)
+                entry["retrieved_ids"] = retrieved_ids
+                entry.update(retrieval_metrics(retrieved_ids, relevance, top_k))
+            results.append(entry)
         
-        for item in golden_set:
-            qid = item["qid"]
-            query = item["query"]
-            ideal = item["ideal"]
-            
-            # Query RAG system
-            start_time = datetime.utcnow()
-            
-            try:
-                from .rag import search_rag_chunks
-                chunks = search_rag_chunks(query, org_id, space, top_k)
-                
-                latency_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
-                total_latency.append(latency_ms)
-                
-                # Calculate metrics
-                retrieved_ids = [chunk.get("chunk_id", "") for chunk in chunks]
-                
-                # Calculate relevance scores (simplified)
-                relevance_scores = []
-                for chunk_id in retrieved_ids:
-                    if chunk_id in ideal:
-                        relevance_scores.append(1.0)
-                    else:
-                        relevance_scores.append(0.0)
-                
-                # Calculate MRR
-                mrr = 0.0
-                for i, score in enumerate(relevance_scores):
-                    if score > 0:
-                        mrr = 1.0 / (i + 1)
-                        break
-                
-                # Calculate nDCG
-                ndcg = ndcg_score([ideal], [relevance_scores], k=top_k)
-                
-                # Calculate Recall
-                recall = len(set(retrieved_ids) & set(ideal)) / len(ideal) if ideal else 0.0
-                
-                results.append({
-                    "qid": qid,
-                    "query": query,
-                    "retrieved_ids": retrieved_ids,
-                    "mrr": mrr,
-                    "ndcg": ndcg,
-                    "recall": recall,
-                    "latency_ms": latency_ms
-                })
-                
-            except Exception as e:
-                logger.error(f"Failed to evaluate query {qid}: {e}")
-                results.append({
-                    "qid": qid,
-                    "query": query,
-                    "error": str(e),
-                    "mrr": 0.0,
-                    "ndcg": 0.0,
-                    "recall": 0.0,
-                    "latency_ms": 0.0
-                })
-        
-        # Calculate aggregate metrics
-        mrr_scores = [r["mrr"] for r in results if "error" not in r]
-        ndcg_scores = [r["ndcg"] for r in results if "ndcg" in r]
-        recall_scores = [r["recall"] for r in results if "recall" in r]
-        
-        avg_mrr = np.mean(mrr_scores) if mrr_scores else 0.0
-        avg_ndcg = np.mean(ndcg_scores) if ndcg_scores else 0.0
-        avg_recall = np.mean(recall_scores) if recall_scores else 0.0
-        
-        p50_latency = np.percentile(total_latency, 50) if total_latency else 0.0
-        p95_latency = np.percentile(total_latency, 95) if total_latency else 0.0
+        # Calculate aggregate metrics (failed queries score 0)
+        ok = [r for r in results if "error" not in r]
+        cold_latency = latency_summary([s["latency_ms"] for s in cold if "error" not in s])
+        warm_latency = latency_summary([s["latency_ms"] for s in warm if "error" not in s])
+        # gate on the worse of cold and warm tails
+        p95_latency = max(cold_latency["p95"], warm_latency["p95"])
+        
+        aggregate = {
+            "avg_mrr": float(np.mean([r["mrr"] for r in results])) if results else 0.0,
+            "avg_ndcg": float(np.mean([r["ndcg"] for r in results])) if results else 0.0,
+            "avg_recall": float(np.mean([r["recall"] for r in results])) if results else 0.0,
+            "p50_latency_ms": cold_latency["p50"] if not warm else warm_latency["p50"],
+            "p95_latency_ms": p95_latency,
+            "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        }
         
         # Check SLO compliance
         slo_passed = (
-            avg_ndcg >= EVAL_THRESHOLD_NDCG and
-            avg_recall >= EVAL_THRESHOLD_RECALL and
+            aggregate["avg_ndcg"] >= EVAL_THRESHOLD_NDCG and
+            aggregate["avg_recall"] >= EVAL_THRESHOLD_RECALL and
             p95_latency <= EVAL_THRESHOLD_P95
         )
         
@@ -344,14 +774,22 @@ def evaluate_rag(self, org_id: str, space: str, top_k: int = 5) -> Dict[str, Any
             "space": space,
             "top_k": top_k,
             "timestamp": datetime.utcnow().isoformat(),
-            "variant": RAG_VARIANT,
+            "variant": variant,
+            "rerank": reranker.info() if reranker else None,
             "results": results,
-            "aggregate_metrics": {
-                "avg_mrr": float(avg_mrr),
-                "avg_ndcg": float(avg_ndcg),
-                "avg_recall": float(avg_recall),
-                "p50_latency_ms": float(p50_latency),
-                "p95_latency_ms": float(p95_latency)
+            "aggregate_metrics": aggregate,
+            "latency": {
+                "cold": cold_latency,
+                "warm": warm_latency,
+                "stages": stage_summary(cold + warm),
+            },
+            "load": {
+                "concurrency": concurrency,
+                "target_qps": qps,
+                "achieved_qps": (len(cold) + len(warm)) / (cold_wall + warm_wall)
+                                if cold_wall + warm_wall > 0 else 0.0,
+                "warm_runs": warm_runs,
+                "queries": len(golden_set),
             },
             "slo_compliance": {
                 "ndcg_threshold": EVAL_THRESHOLD_NDCG,
@@ -366,6 +804,79 @@ def evaluate_rag(self, org_id: str, space: str, top_k: int = 5) -> Dict[str, Any
         
         return evaluation_result
     
+    def _run_pass(self, golden_set, space, top_k, concurrency, qps, search_fn,
+                  session_factory) -> Tuple[List[Dict[str, Any]], float]:
+        """One pass over the golden set; samples come back in golden-set order"""
+        if session_factory is None and concurrency <= 1:
+            session_factory = lambda: self.db
+        elif session_factory is None:
+            from .deps import get_db_session
+            session_factory = get_db_session
+        
+        local = threading.local()
+        opened: List[Session] = []
+        
+        def run_query(item, scheduled):
+            if not hasattr(local, "db"):
+                local.db = session_factory()
+                if local.db is not self.db:
+                    opened.append(local.db)
+            started = time.perf_counter()
+            stages: Dict[str, float] = {}
+            sample = {"qid": item["qid"], "stages": stages,
+                      "queue_ms": (started - scheduled) * 1000}
+            try:
+                sample["chunks"] = search_fn(local.db, item["query"], space, top_k, stages)
+            except Exception as e:
+                logger.error(f"Failed to evaluate query {item['qid']}: {e}")
+                sample["error"] = str(e)
+            # open loop: measured from the scheduled send time
+            sample["latency_ms"] = (time.perf_counter() - scheduled) * 1000
+            return sample
+        
+        t0 = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+                futures = []
+                for i, item in enumerate(golden_set):
+                    scheduled = t0 + i / qps if qps else time.perf_counter()
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    futures.append(pool.submit(run_query, item, scheduled))
+                samples = [f.result() for f in futures]
+        finally:
+            for db in opened:
+                db.close()
+        return samples, time.perf_counter() - t0
+    
+    def latest_runs_by_variant(self, org_id: str, space: str) -> Dict[str, Dict[str, Any]]:
+        """Most recent EvalRun metrics per variant"""
+        from .db import EvalRun
+        
+        runs = self.db.query(EvalRun).filter(
+            and_(EvalRun.org_id == org_id, EvalRun.space == space)
+        ).order_by(desc(EvalRun.created_at)).limit(50).all()
+        
+        latest: Dict[str, Dict[str, Any]] = {}
+        for run in runs:
+            latest.setdefault(run.variant, {
+                "metrics": run.metrics or {},
+                "slo_passed": run.slo_passed,
+                "created_at": run.created_at.isoformat() if run.created_at else None,
+            })
+        return latest
+    
+    def compare_variants(self, org_id: str, space: str,
+                         baseline: str = "A", candidate: str = "B") -> Dict[str, Any]:
+        """A/B comparison of the latest EvalRuns of two variants"""
+        latest = self.latest_runs_by_variant(org_id, space)
+        if baseline not in latest or candidate not in latest:
+            return {"baseline": baseline, "candidate": candidate, "available": False,
+                    "regression": False}
+        return compare_metrics(latest[baseline]["metrics"], latest[candidate]["metrics"],
+                               baseline, candidate)
+    
     def _store_evaluation_result(self, result: Dict[str, Any]):
         """Store evaluation result in database"""
         try:
@@ -464,3 +975,45 @@ def _generate_query_results_html(self, results: List[Dict[str, Any]]) -> str:
             </div>
             """
         return html
+
+def main():
+    """CLI: run the benchmark, write JSON, exit non-zero on SLO failure or A/B regression"""
+    import argparse
+    import sys
+    from .deps import get_db_session
+    
+    parser = argparse.ArgumentParser(description="RAG retrieval benchmark")
+    parser.add_argument("--org", required=True)
+    parser.add_argument("--space", default="default")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY)
+    parser.add_argument("--qps", type=float, default=None)
+    parser.add_argument("--warm-runs", type=int, default=1)
+    parser.add_argument("--variant", default=RAG_VARIANT)
+    parser.add_argument("--rerank", action=argparse.BooleanOptionalAction, default=None,
+                        help="force the cross-encoder rerank stage on/off (default: RAG_RERANK)")
+    parser.add_argument("--compare-to", help="baseline variant to gate against (latest EvalRun)")
+    parser.add_argument("--out", default="reports/rag_eval.json")
+    args = parser.parse_args()
+    
+    db = get_db_session()
+    try:
+        manager = RAGEvaluationManager(db)
+        result = manager.evaluate_rag(args.org, args.space, top_k=args.top_k,
+                                      concurrency=args.concurrency, qps=args.qps,
+                                      warm_runs=args.warm_runs, variant=args.variant,
+                                      rerank=args.rerank)
+        failed = not result["slo_compliance"]["passed"]
+        if args.compare_to:
+            result["comparison"] = manager.compare_variants(
+                args.org, args.space, baseline=args.compare_to, candidate=args.variant)
+            failed = failed or result["comparison"]["regression"]
+    finally:
+        db.close()
+    
+    write_json(result, args.out)
+    print(json.dumps({"passed": not failed, **result["aggregate_metrics"]}))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# Second-stage cross-encoder reranking for RAG retrieval
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+RAG_RERANK = os.getenv("RAG_RERANK", "0") == "1"
+RAG_RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RAG_RERANK_BACKEND = os.getenv("RAG_RERANK_BACKEND", "torch")  # torch or onnx
+RAG_RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "32"))
+RAG_RERANK_BUDGET_MS = float(os.getenv("RAG_RERANK_BUDGET_MS", "80"))
+RAG_RERANK_BATCH_SIZE = int(os.getenv("RAG_RERANK_BATCH_SIZE", "16"))
+RAG_RERANK_CACHE_SIZE = int(os.getenv("RAG_RERANK_CACHE_SIZE", "20000"))
+
+def query_hash(query: str) -> str:
+    return hashlib.sha1(" ".join(query.split()).lower().encode("utf-8")).hexdigest()
+
+class CrossEncoderReranker:
+    """Rescore first-stage candidates with a CPU cross-encoder
+
+    Candidates are scored in batches in first-stage order. The per-pair
+    cost is tracked as a moving average, and scoring stops once the next
+    batch would overrun ``budget_ms``. That truncates N adaptively, so the
+    unscored tail keeps its first-stage order below the reranked head.
+    Scores are cached per (query hash, chunk id), so repeated queries only
+    pay for chunks they have not seen.
+    """
+
+    def __init__(self, model_name: str = RAG_RERANK_MODEL, backend: str = RAG_RERANK_BACKEND,
+                 budget_ms: float = RAG_RERANK_BUDGET_MS, batch_size: int = RAG_RERANK_BATCH_SIZE,
+                 cache_size: int = RAG_RERANK_CACHE_SIZE, predict=None):
+        self.model_name = model_name
+        self.backend = backend
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        # predict(pairs) -> scores; defaults to the cross-encoder model
+        self._predict = predict or self._load_model()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._pair_ms: Optional[float] = None
+        self.lock = threading.Lock()
+        self.stats = {"scored": 0, "cache_hits": 0, "truncated": 0}
+
+    def _load_model(self):
+        from sentence_transformers import CrossEncoder
+
+        kwargs = {"device": "cpu"}
+        if self.backend != "torch":
+            kwargs["backend"] = self.backend  # onnx / openvino (sentence-transformers >= 3.2)
+        model = CrossEncoder(self.model_name, **kwargs)
+        return lambda pairs: model.predict(pairs, batch_size=len(pairs),
+                                           show_progress_bar=False)
+
+    def warmup(self) -> None:
+        """Score one pair so model load/first-call cost stays out of request budgets"""
+        self._score_batch([("warmup", "warmup")])
+
+    def clear_cache(self) -> None:
+        with self.lock:
+            self._cache.clear()
+
+    def _score_batch(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        t0 = time.perf_counter()
+        scores = [float(s) for s in self._predict(pairs)]
+        per_pair = (time.perf_counter() - t0) * 1000 / len(pairs)
+        with self.lock:
+            self._pair_ms = per_pair if self._pair_ms is None else 0.8 * self._pair_ms + 0.2 * per_pair
+        return scores
+
+    def rerank(self, query: str, candidates: List[Dict[str, Any]], k: int,
+               budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Top-k candidates by cross-encoder score (``rerank_score``), within budget"""
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        deadline = time.perf_counter() + budget_ms / 1000
+        qhash = query_hash(query)
+
+        scores: Dict[int, float] = {}
+        pending = []
+        with self.lock:
+            for i, chunk in enumerate(candidates):
+                key = (qhash, str(chunk.get("chunk_id")))
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+                else:
+                    pending.append(i)
+            self.stats["cache_hits"] += len(scores)
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            remaining_ms = (deadline - time.perf_counter()) * 1000
+            if self._pair_ms is not None:
+                fits = int(remaining_ms / max(self._pair_ms, 1e-3))
+                batch = batch[:max(fits, 0)]
+            if not batch or remaining_ms <= 0:
+                with self.lock:
+                    self.stats["truncated"] += 1
+                break
+            batch_scores = self._score_batch([(query, candidates[i]["text"]) for i in batch])
+            with self.lock:
+                for i, score in zip(batch, batch_scores):
+                    scores[i] = score
+                    self._cache[(qhash, str(candidates[i].get("chunk_id")))] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                self.stats["scored"] += len(batch)
+
+        head = sorted(scores, key=lambda i: scores[i], reverse=True)
+        tail = [i for i in range(len(candidates)) if i not in scores]
+        return [{**candidates[i], "rerank_score": scores.get(i)} for i in head + tail][:k]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "budget_ms": self.budget_ms,
+            "candidates": RAG_RERANK_CANDIDATES,
+            "pair_ms": self._pair_ms,
+            "cache_entries": len(self._cache),
+            **self.stats,
+        }
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_failed = False
+_reranker_lock = threading.Lock()
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Process-wide reranker (loaded and warmed once), or None if unavailable"""
+    global _reranker, _reranker_failed
+    if _reranker is not None or _reranker_failed:
+        return _reranker
+    with _reranker_lock:
+        if _reranker is None and not _reranker_failed:
+            try:
+                reranker = CrossEncoderReranker()
+                reranker.warmup()
+                _reranker = reranker
+                logger.info(f"Loaded reranker {RAG_RERANK_MODEL} ({RAG_RERANK_BACKEND})")
+            except Exception as e:
+                _reranker_failed = True
+                logger.warning(f"Reranker unavailable, using first-stage ranking: {e}")
+    return _reranker
@@ -0,0 +1,439 @@
+# Tracing and per-stage latency histograms for the gateway pipeline
+#
+# Span context follows W3C Trace Context: a `traceparent` value
+# (00-<trace id>-<span id>-<flags>) travels in HTTP headers and in Redis
+# stream message fields, so one trace covers gateway -> nha:jobs /
+# flows:jobs -> nha_worker / flow_worker. Every finished span feeds the
+# stage histograms behind /metrics; only sampled spans are recorded and
+# exported (OTLP/JSON lines to a file, or OTLP/HTTP to a collector).
+#
+# Stdlib only, so the gateway image and the workers can both import it.
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import logging
+import threading
+import urllib.request
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")  # none | file | otlp
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_FLUSH_S = float(os.getenv("TRACE_FLUSH_S", "5"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "coolbits-gateway")
+
+TRACEPARENT = "traceparent"
+STAGE_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+HISTOGRAM_KEY_PREFIX = "telemetry:hist:"
+HISTOGRAM_TTL_S = 60
+
+# OTLP span kinds
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+
+
+class SpanContext:
+    """Identity of a span as carried between processes"""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id  # 32 hex chars
+        self.span_id = span_id  # 16 hex chars
+        self.sampled = sampled
+
+    def __repr__(self) -> str:
+        return f"SpanContext({format_traceparent(self)})"
+
+
+_current: ContextVar[Optional[SpanContext]] = ContextVar("trace_span", default=None)
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128) or 1:032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64) or 1:016x}"
+
+
+def format_traceparent(context: SpanContext) -> str:
+    """W3C traceparent header value for a span context"""
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+def parse_traceparent(value: Any) -> Optional[SpanContext]:
+    """Parse a traceparent value (str or bytes); None when absent or malformed"""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("ascii", "ignore")
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        if int(parts[1], 16) == 0 or int(parts[2], 16) == 0:
+            return None
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return SpanContext(parts[1].lower(), parts[2].lower(), bool(flags & 1))
+
+
+def current_context() -> Optional[SpanContext]:
+    """Span context active in this thread / asyncio task"""
+    return _current.get()
+
+
+def current_trace_uuid() -> str:
+    """Active trace id in UUID form (the format of the DB trace_id columns)
+
+    Falls back to a fresh uuid4 outside of a span, so callers can use it
+    wherever they used to mint a trace id.
+    """
+    context = _current.get()
+    if context is None:
+        return str(uuid.uuid4())
+    return str(uuid.UUID(hex=context.trace_id))
+
+
+def inject(carrier: Dict[str, Any], context: Optional[SpanContext] = None) -> Dict[str, Any]:
+    """Add `traceparent` to HTTP headers or stream message fields"""
+    context = context or _current.get()
+    if context is not None:
+        carrier[TRACEPARENT] = format_traceparent(context)
+    return carrier
+
+
+def extract(carrier: Any) -> Optional[SpanContext]:
+    """Span context from HTTP headers or stream message fields (str or bytes keys)"""
+    if carrier is None:
+        return None
+    value = carrier.get(TRACEPARENT)
+    if value is None and isinstance(carrier, dict):
+        value = carrier.get(TRACEPARENT.encode())
+    return parse_traceparent(value)
+
+
+def stream_lag_ms(message_id: Any, now: Optional[float] = None) -> Optional[float]:
+    """Time since a Redis stream entry was added, from its `<ms>-<seq>` id"""
+    if isinstance(message_id, bytes):
+        message_id = message_id.decode("ascii", "ignore")
+    try:
+        added_ms = int(str(message_id).split("-", 1)[0])
+    except ValueError:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, now * 1000 - added_ms)
+
+
+class Span:
+    """One timed operation; created by Tracer.span()"""
+
+    __slots__ = ("name", "stage", "context", "parent_id", "kind", "attributes",
+                 "start_ns", "end_ns", "_start_perf", "duration_ms", "error")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str],
+                 kind: str, attributes: Optional[Dict[str, Any]], stage: Optional[str]):
+        self.name = name
+        self.stage = stage
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self._start_perf = time.perf_counter()
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start_perf) * 1000
+        self.end_ns = self.start_ns + int(self.duration_ms * 1e6)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON span"""
+        return {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 0},
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class StageHistograms:
+    """Fixed-bucket latency histograms per pipeline stage (Prometheus style)
+
+    state()/merge_state() let workers publish their histograms through
+    Redis so the gateway's /metrics covers the whole pipeline.
+    """
+
+    def __init__(self, buckets: Iterable[float] = STAGE_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counts: Dict[str, List[int]] = {}  # last slot is +Inf
+        self.sums: Dict[str, float] = {}
+
+    def observe(self, stage: str, duration_ms: float):
+        index = bisect_left(self.buckets, duration_ms)
+        with self.lock:
+            counts = self.counts.get(stage)
+            if counts is None:
+                counts = self.counts[stage] = [0] * (len(self.buckets) + 1)
+                self.sums[stage] = 0.0
+            counts[index] += 1
+            self.sums[stage] += duration_ms
+
+    def state(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {stage: {"counts": list(counts), "sum": self.sums[stage]}
+                    for stage, counts in self.counts.items()}
+
+    def merge_state(self, state: Dict[str, Dict[str, Any]]):
+        with self.lock:
+            for stage, data in state.items():
+                counts = self.counts.get(stage)
+                if counts is None:
+                    counts = self.counts[stage] = [0] * (len(self.buckets) + 1)
+                    self.sums[stage] = 0.0
+                if len(data["counts"]) != len(counts):
+                    continue  # published with different buckets
+                for i, n in enumerate(data["counts"]):
+                    counts[i] += n
+                self.sums[stage] += data["sum"]
+
+    def export_prometheus(self, metric: str = "stage_duration_ms") -> str:
+        lines = [f"# HELP {metric} Duration of pipeline stages in milliseconds",
+                 f"# TYPE {metric} histogram"]
+        for stage, data in sorted(self.state().items()):
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), data["counts"]):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{label}"}} {data["sum"]:.3f}')
+            lines.append(f'{metric}_count{{stage="{label}"}} {cumulative}')
+        return "\n".join(lines)
+
+
+class FileSpanExporter:
+    """Append batches as OTLP/JSON lines (readable by the collector's otlpjsonfile receiver)"""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+
+    def export(self, payload: Dict[str, Any]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OTLPHTTPExporter:
+    """POST batches to an OTLP/HTTP collector (JSON encoding)"""
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, payload: Dict[str, Any]):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload, separators=(",", ":")).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def build_exporter(kind: str = TRACE_EXPORTER):
+    """Exporter for TRACE_EXPORTER; None disables span recording"""
+    if kind == "file":
+        return FileSpanExporter()
+    if kind == "otlp":
+        return OTLPHTTPExporter()
+    if kind not in ("", "none"):
+        logger.warning(f"Unknown TRACE_EXPORTER {kind!r}, spans will not be exported")
+    return None
+
+
+class Tracer:
+    """Creates spans, keeps stage histograms and ships sampled spans
+
+    Finished sampled spans go to a bounded buffer (oldest dropped when
+    full); a daemon thread flushes it to the exporter every
+    TRACE_FLUSH_S and, when a Redis client is attached, publishes this
+    process's histograms for the gateway to merge.
+    """
+
+    def __init__(self, service: str = SERVICE_NAME, sample_rate: float = TRACE_SAMPLE_RATE,
+                 exporter=None, buffer_size: int = TRACE_BUFFER_SIZE,
+                 flush_s: float = TRACE_FLUSH_S):
+        self.service = service
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.histograms = StageHistograms()
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.flush_s = flush_s
+        self.redis_client = None
+        self.source = f"{socket.gethostname()}-{os.getpid()}"
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+             parent: Optional[SpanContext] = None, kind: str = "internal",
+             stage: Optional[str] = None):
+        """Time a block as a child of `parent` (default: the active span)
+
+        The histogram stage defaults to the span name at exit, so a name
+        refined inside the block (e.g. the matched route) is used.
+        """
+        if parent is None:
+            parent = _current.get()
+        if parent is None:
+            context = SpanContext(_new_trace_id(), _new_span_id(),
+                                  random.random() < self.sample_rate)
+        else:
+            context = SpanContext(parent.trace_id, _new_span_id(), parent.sampled)
+        span = Span(name, context, parent.span_id if parent else None, kind, attributes, stage)
+
+        token = _current.set(context)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.finish()
+            self.histograms.observe(span.stage or span.name, span.duration_ms)
+            if context.sampled and self.exporter is not None:
+                self._record(span)
+
+    def observe(self, stage: str, duration_ms: float):
+        """Feed a duration measured elsewhere (e.g. queue wait) into the histograms"""
+        self.histograms.observe(stage, duration_ms)
+
+    def _record(self, span: Span):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(span)
+        self._ensure_flusher()
+
+    def attach_redis(self, redis_client, source: Optional[str] = None):
+        """Publish this process's histograms to Redis every flush interval"""
+        self.redis_client = redis_client
+        if source:
+            self.source = source
+        if redis_client is not None:
+            self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="trace-flush",
+                                                 daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_s)
+            try:
+                self.flush()
+                self.publish_histograms()
+            except Exception as e:
+                logger.warning(f"Telemetry flush failed: {e}")
+
+    def flush(self) -> int:
+        """Export buffered spans; returns how many were sent"""
+        spans = []
+        while self.buffer:
+            try:
+                spans.append(self.buffer.popleft())
+            except IndexError:
+                break
+        if not spans or self.exporter is None:
+            return 0
+        self.exporter.export(self.otlp_payload(spans))
+        return len(spans)
+
+    def otlp_payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({
+                    "service.name": self.service,
+                    "service.instance.id": self.source,
+                })},
+                "scopeSpans": [{
+                    "scope": {"name": "coolbits.tracing"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+
+    def publish_histograms(self):
+        if self.redis_client is None:
+            return
+        self.redis_client.set(HISTOGRAM_KEY_PREFIX + self.source,
+                              json.dumps(self.histograms.state()), ex=HISTOGRAM_TTL_S)
+
+    def export_prometheus(self) -> str:
+        """Stage histograms of this process plus every process publishing to Redis"""
+        if self.redis_client is None:
+            return self.histograms.export_prometheus()
+
+        merged = StageHistograms(self.histograms.buckets)
+        merged.merge_state(self.histograms.state())
+        try:
+            own_key = HISTOGRAM_KEY_PREFIX + self.source
+            keys = [key for key in self.redis_client.scan_iter(match=HISTOGRAM_KEY_PREFIX + "*")
+                    if (key.decode() if isinstance(key, bytes) else key) != own_key]
+            for raw in (self.redis_client.mget(keys) if keys else []):
+                if raw:
+                    merged.merge_state(json.loads(raw))
+        except Exception as e:
+            logger.warning(f"Could not merge remote stage histograms: {e}")
+        return merged.export_prometheus()
+
+
+# Global tracer
+tracer = Tracer(exporter=build_exporter())
@@ -9,17 +9,41 @@
 
 import os
 import json
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass
 from datetime import datetime
 
-# GPU Processing
-import torch
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss
+
+from gateway.profiler import install as install_profiler
+
+# GPU Processing (optional: GPU-less nodes can run ONNX Runtime without torch)
+try:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    HAS_TORCH = True
+except ImportError:
+    torch = None
+    SentenceTransformer = None
+    HAS_TORCH = False
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+
+    HAS_ONNX = True
+except ImportError:
+    HAS_ONNX = False
+
 import chromadb
 from chromadb.config import Settings
 
@@ -50,6 +74,18 @@ class RAGConfig:
     embedding_dimension: int = 384
     batch_size: int = 32
 
+    # Embedding Service (CPU-first)
+    embedding_backend: str = "sentence_transformers"  # or "onnx"
+    onnx_model_dir: str = "./models/all-MiniLM-L6-v2-onnx"
+    quantize_int8: bool = True  # dynamic int8 quantization on CPU
+    cpu_threads: int = 0  # 0 = library default
+    max_seq_length: int = 256
+    max_batch_size: int = 64  # dynamic batching across requests
+    max_batch_wait_ms: float = 5.0
+    embedding_cache_size: int = 10000
+    embedding_service_url: str = ""  # e.g. http://localhost:8088 (shared per host)
+    embedding_service_port: int = 8088
+
     # Vector Database
     vector_db_type: str = "faiss"  # or "chromadb"
     index_path: str = "./rag_indexes"
@@ -67,8 +103,10 @@ class GPUMonitor:
     """GPU Memory and Performance Monitor"""
 
     def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.gpu_available = torch.cuda.is_available()
+        self.gpu_available = HAS_TORCH and torch.cuda.is_available()
+        self.device = (
+            torch.device("cuda" if self.gpu_available else "cpu") if HAS_TORCH else "cpu"
+        )
 
     def get_gpu_info(self) -> Dict[str, Any]:
         """Get GPU information and status"""
@@ -179,64 +217,344 @@ def chunk_document(
         return [chunk for chunk in chunks if chunk]
 
 
+def content_hash(text: str) -> str:
+    """Stable id for a chunk: same text -> same id across calls and processes"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def faiss_id(text_hash: str) -> int:
+    """63-bit FAISS id derived from a content hash"""
+    return int(text_hash[:16], 16) & 0x7FFF_FFFF_FFFF_FFFF
+
+
+class EmbeddingCache:
+    """Bounded LRU of recent embeddings keyed by content hash"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._items.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = vector
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class OnnxEncoder:
+    """Sentence embeddings with ONNX Runtime (mean pooling + L2 norm)"""
+
+    def __init__(self, config: RAGConfig):
+        if not HAS_ONNX:
+            raise ImportError("Install onnxruntime and tokenizers for the onnx backend")
+
+        model_dir = Path(config.onnx_model_dir)
+        model_path = model_dir / "model.onnx"
+        if config.quantize_int8:
+            quantized = model_dir / "model_quantized.onnx"
+            if not quantized.exists():
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                logging.info(f"Quantizing {model_path} to int8")
+                quantize_dynamic(
+                    str(model_path), str(quantized), weight_type=QuantType.QInt8
+                )
+            model_path = quantized
+
+        options = ort.SessionOptions()
+        if config.cpu_threads:
+            options.intra_op_num_threads = config.cpu_threads
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=config.max_seq_length)
+        self.tokenizer.enable_padding()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+class DynamicBatcher:
+    """Coalesces concurrent embed requests into one model call
+
+    Requests wait at most ``max_wait_ms`` for company; a batch is cut
+    early once it reaches ``max_batch`` texts. Model calls run on one
+    worker thread so the event loop stays free and calls never overlap.
+    """
+
+    def __init__(self, encode_fn, max_batch: int, max_wait_ms: float):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._pending_texts = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, texts: List[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._pending_texts += len(texts)
+
+        if self._pending_texts >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_texts = self._pending, [], 0
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[List[str], asyncio.Future]]):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        loop = asyncio.get_running_loop()
+        try:
+            embeddings = await loop.run_in_executor(
+                self._executor, self.encode_fn, texts
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(texts)
+        offset = 0
+        for request_texts, future in batch:
+            if not future.done():
+                future.set_result(embeddings[offset : offset + len(request_texts)])
+            offset += len(request_texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
 class EmbeddingGenerator:
-    """GPU-accelerated embedding generation"""
+    """CPU-first embedding generation with batching and an LRU cache"""
 
     def __init__(self, config: RAGConfig):
         self.config = config
         self.gpu_monitor = GPUMonitor()
         self.model = None
+        self.on_gpu = False
+        self.cache = EmbeddingCache(config.embedding_cache_size)
+        self._batcher: Optional[DynamicBatcher] = None
         self._load_model()
 
     def _load_model(self):
-        """Load sentence transformer model on GPU"""
+        """Load the embedding model (ONNX or sentence-transformers)"""
         try:
-            logging.info(f"Loading embedding model: {self.config.embedding_model}")
+            logging.info(
+                f"Loading embedding model: {self.config.embedding_model} "
+                f"({self.config.embedding_backend})"
+            )
+            if self.config.embedding_backend == "onnx":
+                self.model = OnnxEncoder(self.config)
+                logging.info("✅ ONNX Runtime model loaded on CPU")
+                return
+
+            if not HAS_TORCH:
+                raise ImportError(
+                    "Install torch and sentence-transformers, or use the onnx backend"
+                )
             self.model = SentenceTransformer(self.config.embedding_model)
+            self.model.max_seq_length = self.config.max_seq_length
 
             if self.gpu_monitor.gpu_available and self.config.gpu_enabled:
                 self.model = self.model.to(self.gpu_monitor.device)
+                self.on_gpu = True
                 logging.info(f"✅ Model loaded on GPU: {self.gpu_monitor.device}")
+                return
+
+            if self.config.cpu_threads:
+                torch.set_num_threads(self.config.cpu_threads)
+            if self.config.quantize_int8:
+                self.model = torch.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                logging.info("✅ Model loaded on CPU (int8 dynamic quantization)")
             else:
-                logging.warning("⚠️ Model loaded on CPU (GPU not available)")
+                logging.info("✅ Model loaded on CPU")
 
         except Exception as e:
             logging.error(f"Error loading model: {e}")
             raise
 
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Raw model call, chunked by batch_size"""
+        if isinstance(self.model, OnnxEncoder):
+            return np.vstack(
+                [
+                    self.model.encode(texts[i : i + self.config.batch_size])
+                    for i in range(0, len(texts), self.config.batch_size)
+                ]
+            )
+
+        embeddings = self.model.encode(
+            texts,
+            batch_size=self.config.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        if self.on_gpu:
+            self.gpu_monitor.clear_cache()
+        return np.asarray(embeddings, dtype=np.float32)
+
     def generate_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Generate embeddings for texts using GPU"""
+        """Generate embeddings, serving repeated texts from the LRU cache"""
         try:
             if not self.model:
                 raise ValueError("Model not loaded")
 
-            # Process in batches to manage GPU memory
-            embeddings = []
-            batch_size = self.config.batch_size
+            keys = [content_hash(text) for text in texts]
+            vectors: Dict[str, np.ndarray] = {}
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key in vectors or key in missing:
+                    continue
+                cached = self.cache.get(key)
+                if cached is None:
+                    missing[key] = text
+                else:
+                    vectors[key] = cached
+
+            if missing:
+                encoded = self._encode(list(missing.values()))
+                for key, vector in zip(missing, encoded):
+                    self.cache.put(key, vector.copy())
+                    vectors[key] = vector
+
+            all_embeddings = np.vstack([vectors[key] for key in keys])
+
+            logging.info(
+                f"✅ Generated {len(all_embeddings)} embeddings ({len(missing)} computed)"
+            )
+            return all_embeddings
 
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i : i + batch_size]
+        except Exception as e:
+            logging.error(f"Error generating embeddings: {e}")
+            raise
 
-                # Generate embeddings
-                batch_embeddings = self.model.encode(
-                    batch_texts, convert_to_numpy=True, show_progress_bar=False
-                )
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Async embedding through the cross-request dynamic batcher"""
+        if self._batcher is None:
+            self._batcher = DynamicBatcher(
+                self.generate_embeddings,
+                self.config.max_batch_size,
+                self.config.max_batch_wait_ms,
+            )
+        return await self._batcher.submit(texts)
 
-                embeddings.append(batch_embeddings)
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.config.embedding_backend,
+            "device": "cuda" if self.on_gpu else "cpu",
+            "quantized": self.config.quantize_int8 and not self.on_gpu,
+            "cache": self.cache.stats(),
+            "batching": self._batcher.stats() if self._batcher else {},
+        }
 
-                # Clear cache periodically
-                if i % (batch_size * 4) == 0:
-                    self.gpu_monitor.clear_cache()
 
-            # Concatenate all embeddings
-            all_embeddings = np.vstack(embeddings)
+class EmbeddingClient:
+    """Client for the host's shared embedding service (see create_embedding_app)"""
 
-            logging.info(f"✅ Generated {len(all_embeddings)} embeddings")
-            return all_embeddings
+    def __init__(self, config: RAGConfig):
+        import requests
 
-        except Exception as e:
-            logging.error(f"Error generating embeddings: {e}")
-            raise
+        self.config = config
+        self.url = config.embedding_service_url.rstrip("/")
+        self.session = requests.Session()
+
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        response = self.session.post(
+            f"{self.url}/embed", json={"texts": texts}, timeout=30
+        )
+        response.raise_for_status()
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.generate_embeddings, texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "remote", "url": self.url}
+
+
+def create_embedding_app(generator: EmbeddingGenerator) -> FastAPI:
+    """Embedding microservice: one model per host, shared by local processes"""
+    app = FastAPI(title="CoolBits.ai Embedding Service", version="1.0.0")
+
+    @app.post("/embed")
+    async def embed(request: Dict[str, List[str]]):
+        texts = request.get("texts", [])
+        if not texts:
+            return {"embeddings": [], "model": generator.config.embedding_model}
+        embeddings = await generator.embed(texts)
+        return {
+            "embeddings": embeddings.tolist(),
+            "model": generator.config.embedding_model,
+        }
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "healthy",
+            "model": generator.config.embedding_model,
+            "embedding": generator.stats(),
+        }
+
+    return app
 
 
 class VectorDatabase:
@@ -260,6 +578,24 @@ def _init_faiss(self):
         self.index = None
         self.documents = []
         self.metadata = []
+        self.ids = []  # content hash per row
+        self.rows: Dict[int, int] = {}  # faiss id -> row
+
+    @staticmethod
+    def _dedupe(
+        documents: List[str], embeddings: np.ndarray, metadata: List[Dict]
+    ) -> Tuple[List[str], List[str], np.ndarray, List[Dict]]:
+        """Content-hash ids, keeping the first copy of repeated chunks"""
+        seen = {}
+        for i, document in enumerate(documents):
+            seen.setdefault(content_hash(document), i)
+        keep = list(seen.values())
+        return (
+            list(seen.keys()),
+            [documents[i] for i in keep],
+            embeddings[keep],
+            [metadata[i] for i in keep],
+        )
 
     def _init_chromadb(self):
         """Initialize ChromaDB"""
@@ -288,46 +624,53 @@ def add_documents(
     def _add_to_faiss(
         self, documents: List[str], embeddings: np.ndarray, metadata: List[Dict] = None
     ):
-        """Add to FAISS index"""
+        """Add to FAISS index (re-adding an existing chunk is a no-op)"""
         if self.index is None:
-            # Create new index
+            # Create new index; inner product for cosine similarity
             dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatIP(
-                dimension
-            )  # Inner product for cosine similarity
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+
+        ids, documents, embeddings, metadata = self._dedupe(
+            documents, embeddings, metadata or [{} for _ in documents]
+        )
+        new = [i for i, h in enumerate(ids) if faiss_id(h) not in self.rows]
+        if not new:
+            return
 
         # Normalize embeddings for cosine similarity
+        embeddings = np.ascontiguousarray(embeddings[new], dtype=np.float32)
         faiss.normalize_L2(embeddings)
 
         # Add to index
-        self.index.add(embeddings.astype("float32"))
+        int_ids = np.array([faiss_id(ids[i]) for i in new], dtype=np.int64)
+        self.index.add_with_ids(embeddings, int_ids)
 
         # Store documents and metadata
-        self.documents.extend(documents)
-        if metadata:
-            self.metadata.extend(metadata)
-        else:
-            self.metadata.extend([{}] * len(documents))
+        for i, int_id in zip(new, int_ids.tolist()):
+            self.rows[int_id] = len(self.documents)
+            self.ids.append(ids[i])
+            self.documents.append(documents[i])
+            self.metadata.append(metadata[i])
 
-        logging.info(f"✅ Added {len(documents)} documents to FAISS index")
+        logging.info(f"✅ Added {len(new)} documents to FAISS index")
 
     def _add_to_chromadb(
         self, documents: List[str], embeddings: np.ndarray, metadata: List[Dict] = None
     ):
         """Add to ChromaDB"""
-        # Convert embeddings to list format
-        embeddings_list = embeddings.tolist()
-
         # Prepare metadata
         if metadata is None:
             metadata = [{"index": i} for i in range(len(documents))]
 
-        # Add to collection
-        self.collection.add(
+        # Content-hash ids: upsert keeps earlier adds instead of overwriting doc_0..
+        ids, documents, embeddings, metadata = self._dedupe(
+            documents, embeddings, metadata
+        )
+        self.collection.upsert(
             documents=documents,
-            embeddings=embeddings_list,
+            embeddings=embeddings.tolist(),
             metadatas=metadata,
-            ids=[f"doc_{i}" for i in range(len(documents))],
+            ids=ids,
         )
 
         logging.info(f"✅ Added {len(documents)} documents to ChromaDB")
@@ -348,22 +691,22 @@ def _search_faiss(self, query_embedding: np.ndarray, top_k: int) -> List[Dict]:
             return []
 
         # Normalize query embedding
-        query_embedding = query_embedding.reshape(1, -1)
+        query_embedding = np.array(query_embedding, dtype=np.float32).reshape(1, -1)
         faiss.normalize_L2(query_embedding)
 
         # Search
-        scores, indices = self.index.search(query_embedding.astype("float32"), top_k)
+        scores, ids = self.index.search(query_embedding, top_k)
 
         results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx < len(self.documents):
+        for score, int_id in zip(scores[0].tolist(), ids[0].tolist()):
+            row = self.rows.get(int_id)
+            if row is not None:
                 results.append(
                     {
-                        "document": self.documents[idx],
+                        "id": self.ids[row],
+                        "document": self.documents[row],
                         "score": float(score),
-                        "metadata": (
-                            self.metadata[idx] if idx < len(self.metadata) else {}
-                        ),
+                        "metadata": self.metadata[row],
                     }
                 )
 
@@ -393,7 +736,14 @@ def save_index(self, name: str):
             faiss.write_index(self.index, str(self.index_path / f"{name}.faiss"))
             # Save documents and metadata
             with open(self.index_path / f"{name}_docs.json", "w") as f:
-                json.dump({"documents": self.documents, "metadata": self.metadata}, f)
+                json.dump(
+                    {
+                        "ids": self.ids,
+                        "documents": self.documents,
+                        "metadata": self.metadata,
+                    },
+                    f,
+                )
         elif self.config.vector_db_type == "chromadb":
             # ChromaDB auto-persists
             pass
@@ -407,6 +757,21 @@ def load_index(self, name: str):
                 data = json.load(f)
                 self.documents = data["documents"]
                 self.metadata = data["metadata"]
+                self.ids = data.get("ids") or [content_hash(d) for d in self.documents]
+
+            if not isinstance(self.index, faiss.IndexIDMap2):
+                # positional index from before content-hash ids: rewrap, dropping the
+                # repeated chunks it allowed so ids and vectors stay row-aligned
+                vectors = self.index.reconstruct_n(0, self.index.ntotal)
+                self.ids, self.documents, vectors, self.metadata = self._dedupe(
+                    self.documents, vectors, self.metadata
+                )
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+                self.index.add_with_ids(
+                    np.ascontiguousarray(vectors, dtype=np.float32),
+                    np.array([faiss_id(h) for h in self.ids], dtype=np.int64),
+                )
+            self.rows = {faiss_id(h): row for row, h in enumerate(self.ids)}
 
 
 class LocalRAGSystem:
@@ -416,7 +781,12 @@ def __init__(self, config: RAGConfig):
         self.config = config
         self.gpu_monitor = GPUMonitor()
         self.document_processor = DocumentProcessor(config)
-        self.embedding_generator = EmbeddingGenerator(config)
+        # Reuse the host's embedding service when configured (one model per host)
+        self.embedding_generator = (
+            EmbeddingClient(config)
+            if config.embedding_service_url
+            else EmbeddingGenerator(config)
+        )
         self.vector_db = VectorDatabase(config)
 
         # Initialize FastAPI
@@ -453,6 +823,7 @@ async def health_check():
                     "vector_db_type": self.config.vector_db_type,
                     "gpu_enabled": self.config.gpu_enabled,
                 },
+                "embedding": self.embedding_generator.stats(),
             }
 
         @self.app.post("/documents/upload")
@@ -470,7 +841,7 @@ async def upload_document(file: UploadFile = File(...)):
                 chunks = self.document_processor.chunk_document(text)
 
                 # Generate embeddings
-                embeddings = self.embedding_generator.generate_embeddings(chunks)
+                embeddings = await self.embedding_generator.embed(chunks)
 
                 # Add to vector database
                 metadata = [
@@ -500,9 +871,7 @@ async def search_documents(query: Dict[str, str]):
                 top_k = query.get("top_k", self.config.top_k)
 
                 # Generate query embedding
-                query_embedding = self.embedding_generator.generate_embeddings(
-                    [query_text]
-                )[0]
+                query_embedding = (await self.embedding_generator.embed([query_text]))[0]
 
                 # Search vector database
                 results = self.vector_db.search(query_embedding, top_k)
@@ -553,14 +922,42 @@ def run(self):
 
 def main():
     """Main function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CoolBits.ai Local RAG System")
+    parser.add_argument(
+        "--serve-embeddings",
+        action="store_true",
+        help="Run only the shared embedding service for this host",
+    )
+    parser.add_argument("--backend", choices=["sentence_transformers", "onnx"])
+    parser.add_argument("--embedding-service-url", default="")
+    args = parser.parse_args()
+
     # Setup logging
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     )
 
+    # Sampling profiler, switched on by the enable_continuous_profiling flag
+    install_profiler("local-rag-embeddings" if args.serve_embeddings else "local-rag")
+
     # Configuration
     config = RAGConfig()
+    if args.backend:
+        config.embedding_backend = args.backend
+    if args.embedding_service_url:
+        config.embedding_service_url = args.embedding_service_url
+
+    if args.serve_embeddings:
+        uvicorn.run(
+            create_embedding_app(EmbeddingGenerator(config)),
+            host=config.api_host,
+            port=config.embedding_service_port,
+            log_level="info",
+        )
+        return
 
     # Create and run RAG system
     rag_system = LocalRAGSystem(config)
@@ -16,6 +16,8 @@
 from pydantic import BaseModel
 import uvicorn
 
+from rag_core import Retriever, SQLiteStore
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,6 +29,7 @@ class RAGConfig(BaseModel):
     max_domains: int = 100
     gpu_enabled: bool = True
     embedding_model: str = "all-MiniLM-L6-v2"
+    db_path: str = "multi_domain_rag.db"
 
 
 config = RAGConfig()
@@ -38,7 +41,6 @@ class DomainRAG(BaseModel):
     domain_name: str
     domain_type: str  # "role" or "industry"
     api_keys: Dict[str, str]  # xAI and OpenAI keys
-    documents: List[str]
     embeddings_count: int = 0
     last_updated: datetime
     status: str = "active"
@@ -63,8 +65,10 @@ class QueryResponse(BaseModel):
 # Global RAG manager
 class MultiDomainRAGManager:
     def __init__(self):
+        # documents live in the shared rag_core store, not in each DomainRAG
+        self.store = SQLiteStore(config.db_path)
+        self.retriever = Retriever(self.store)
         self.domains: Dict[str, DomainRAG] = {}
-        self.embeddings_cache: Dict[str, Any] = {}
         self.api_clients: Dict[str, Dict[str, Any]] = {}
 
     async def initialize_domains(self):
@@ -91,9 +95,9 @@ async def initialize_domains(self):
                             "xai": role_data["api_keys"]["xai_key"],
                             "openai": role_data["api_keys"]["openai_key"],
                         },
-                        documents=self._get_role_documents(role_data),
                         last_updated=datetime.now(),
                     )
+                    self._seed_documents(domain_id, self._get_role_documents(role_data))
 
                 # Create RAG domains for industries
                 for industry_id, industry_data in industries_data["industries"].items():
@@ -106,15 +110,49 @@ async def initialize_domains(self):
                             "xai": industry_data["api_keys"]["xai_key"],
                             "openai": industry_data["api_keys"]["openai_key"],
                         },
-                        documents=self._get_industry_documents(industry_data),
                         last_updated=datetime.now(),
                     )
+                    self._seed_documents(
+                        domain_id, self._get_industry_documents(industry_data)
+                    )
 
                 logger.info(f"✅ Initialized {len(self.domains)} RAG domains")
 
         except Exception as e:
             logger.error(f"❌ Error initializing domains: {e}")
 
+    def _seed_documents(self, domain_id: str, documents: List[str]):
+        """Upsert generated documents under stable ids (restarts don't duplicate)"""
+        self.retriever.add_many(
+            [
+                {
+                    "id": f"{domain_id}_doc_{i}",
+                    "domain": domain_id,
+                    "title": f"{domain_id} knowledge {i}",
+                    "content": doc,
+                    "doc_type": "generated",
+                }
+                for i, doc in enumerate(documents)
+            ]
+        )
+
+    def add_document(self, domain_id: str, document: str) -> str:
+        """Store a user-added document in a domain"""
+        return self.retriever.add(
+            {
+                "domain": domain_id,
+                "title": document[:80],
+                "content": document,
+                "source": "api",
+            }
+        )
+
+    def get_documents(self, domain_id: str) -> List[str]:
+        return [row["content"] for row in self.store.find({"domain": domain_id})]
+
+    def count_documents(self, domain_id: str) -> int:
+        return self.store.count({"domain": domain_id})
+
     def _get_role_documents(self, role_data: Dict) -> List[str]:
         """Generate domain-specific documents for roles"""
         documents = []
@@ -257,28 +295,19 @@ async def query_domain(
         )
 
     def _search_documents(self, domain: DomainRAG, query: str) -> List[Dict[str, Any]]:
-        """Search documents for relevant content"""
+        """Full-text search within the domain's documents"""
         results = []
-
-        for i, doc in enumerate(domain.documents):
-            # Simple keyword matching (in real implementation, use semantic search)
-            query_words = query.lower().split()
-            doc_words = doc.lower().split()
-
-            matches = sum(1 for word in query_words if word in doc_words)
-            if matches > 0:
-                results.append(
-                    {
-                        "document_id": f"{domain.domain_id}_doc_{i}",
-                        "content": doc[:200] + "..." if len(doc) > 200 else doc,
-                        "relevance_score": matches / len(query_words),
-                        "domain": domain.domain_name,
-                    }
-                )
-
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return results[:5]
+        for hit in self.retriever.search(query, k=5, filters={"domain": domain.domain_id}):
+            doc = hit["content"]
+            results.append(
+                {
+                    "document_id": hit["id"],
+                    "content": doc[:200] + "..." if len(doc) > 200 else doc,
+                    "relevance_score": hit["score"],
+                    "domain": domain.domain_name,
+                }
+            )
+        return results
 
     async def _call_api(
         self, domain: DomainRAG, query: str, context_docs: List[Dict]
@@ -345,13 +374,14 @@ async def health_check():
 @app.get("/domains")
 async def list_domains():
     """List all available RAG domains"""
+    counts = rag_manager.store.count_by("domain")
     return {
         "domains": [
             {
                 "domain_id": domain.domain_id,
                 "domain_name": domain.domain_name,
                 "domain_type": domain.domain_type,
-                "documents_count": len(domain.documents),
+                "documents_count": counts.get(domain.domain_id, 0),
                 "embeddings_count": domain.embeddings_count,
                 "last_updated": domain.last_updated.isoformat(),
                 "status": domain.status,
@@ -377,7 +407,7 @@ async def get_domain(domain_id: str):
             "xai_configured": bool(domain.api_keys.get("xai")),
             "openai_configured": bool(domain.api_keys.get("openai")),
         },
-        "documents": domain.documents,
+        "documents": rag_manager.get_documents(domain_id),
         "embeddings_count": domain.embeddings_count,
         "last_updated": domain.last_updated.isoformat(),
         "status": domain.status,
@@ -415,11 +445,12 @@ async def get_domain_documents(domain_id: str):
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
 
     domain = rag_manager.domains[domain_id]
+    documents = rag_manager.get_documents(domain_id)
     return {
         "domain_id": domain_id,
         "domain_name": domain.domain_name,
-        "documents": domain.documents,
-        "total_documents": len(domain.documents),
+        "documents": documents,
+        "total_documents": len(documents),
     }
 
 
@@ -430,13 +461,13 @@ async def add_document(domain_id: str, document: str):
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
 
     domain = rag_manager.domains[domain_id]
-    domain.documents.append(document)
+    rag_manager.add_document(domain_id, document)
     domain.last_updated = datetime.now()
 
     return {
         "status": "success",
         "message": f"Document added to {domain.domain_name}",
-        "total_documents": len(domain.documents),
+        "total_documents": rag_manager.count_documents(domain_id),
     }
 
 
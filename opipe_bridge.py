@@ -21,6 +21,9 @@
 import hashlib
 import base64
 import ipaddress
+import functools
+import socket
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -135,9 +138,14 @@ def verify_request(
 
 
 class IPAllowlist:
-    """IP allowlist checker"""
+    """IP allowlist checker
 
-    def __init__(self, allowlist_cidrs: List[str]):
+    CIDRs are compiled into one hash set of network prefixes per prefix
+    length (a flattened radix trie), so a lookup costs one set probe per
+    distinct length, longest first. Recent decisions are kept in an LRU.
+    """
+
+    def __init__(self, allowlist_cidrs: List[str], cache_size: int = 65536):
         self.allowed_networks = []
         for cidr in allowlist_cidrs:
             try:
@@ -145,49 +153,94 @@ def __init__(self, allowlist_cidrs: List[str]):
             except ValueError as e:
                 logger.error(f"Invalid CIDR {cidr}: {e}")
 
+        # family bits -> [(prefix_len, {network >> host_bits})], longest prefix first
+        self._tables: Dict[int, List[Tuple[int, set]]] = {}
+        for bits in (32, 128):
+            by_len: Dict[int, set] = {}
+            for network in self.allowed_networks:
+                if network.max_prefixlen == bits:
+                    by_len.setdefault(network.prefixlen, set()).add(
+                        int(network.network_address) >> (bits - network.prefixlen)
+                    )
+            self._tables[bits] = sorted(by_len.items(), reverse=True)
+        self._decide = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    @staticmethod
+    def _parse(ip: str) -> Optional[Tuple[int, int]]:
+        for family, bits in ((socket.AF_INET, 32), (socket.AF_INET6, 128)):
+            try:
+                return int.from_bytes(socket.inet_pton(family, ip), "big"), bits
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def _match(self, ip: str) -> bool:
+        parsed = self._parse(ip.strip())
+        if parsed is None:
+            return False
+        value, bits = parsed
+        # IPv4-mapped IPv6 matches IPv4 rules for the embedded address, and IPv6 rules as is
+        if bits == 128 and value >> 32 == 0xFFFF and self._lookup(value & 0xFFFFFFFF, 32):
+            return True
+        return self._lookup(value, bits)
+
+    def _lookup(self, value: int, bits: int) -> bool:
+        return any(value >> (bits - plen) in prefixes for plen, prefixes in self._tables[bits])
+
     def is_allowed(self, ip: str) -> bool:
         """Check if IP is in allowlist"""
-        try:
-            client_ip = ipaddress.ip_address(ip)
-            return any(client_ip in network for network in self.allowed_networks)
-        except ValueError:
-            return False
+        return self._decide(ip)
 
 
 class RateLimiter:
-    """Rate limiter with burst support"""
+    """GCRA rate limiter: ``rps`` sustained, up to ``burst`` back-to-back
+
+    Per client state is one float, the theoretical arrival time (TAT). A
+    request is allowed when TAT - now <= (burst - 1) / rps, then TAT moves
+    one emission interval forward. Clients are sharded across locks, and
+    each shard keeps clients in access order so idle ones (whose bucket
+    has fully refilled for ``idle_ttl`` seconds) are evicted from the
+    front in O(1) amortized.
+    """
 
-    def __init__(self, rps: int, burst: int):
+    def __init__(self, rps: int, burst: int, shards: int = 64, idle_ttl: float = 60.0):
         self.rps = rps
-        self.burst = burst
-        self.requests = {}  # client_id -> [timestamps]
-        self.lock = threading.Lock()
+        self.burst = max(burst, 1)
+        self.interval = 1.0 / rps
+        self.tolerance = (self.burst - 1) * self.interval
+        self.idle_ttl = idle_ttl
+        self._shards = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def check(self, client_id: str) -> Tuple[bool, float]:
+        """(allowed, retry_after seconds)"""
+        now = time.monotonic()
+        index = hash(client_id) % len(self._shards)
+        shard = self._shards[index]
+
+        with self._locks[index]:
+            tat = max(shard.get(client_id, now), now)
+            allowed = tat - now <= self.tolerance
+            if allowed:
+                shard[client_id] = tat + self.interval
+            # a new client is always allowed, so client_id is present here
+            shard.move_to_end(client_id)
+
+            # Evict idle clients from the least recently seen end
+            while shard:
+                oldest, oldest_tat = next(iter(shard.items()))
+                if oldest_tat + self.idle_ttl >= now:
+                    break
+                del shard[oldest]
+
+        return allowed, 0.0 if allowed else tat - now - self.tolerance
 
     def is_allowed(self, client_id: str) -> bool:
         """Check if request is within rate limits"""
-        current_time = time.time()
-
-        with self.lock:
-            if client_id not in self.requests:
-                self.requests[client_id] = []
-
-            # Clean old requests
-            cutoff = current_time - 1.0  # Last second
-            self.requests[client_id] = [
-                t for t in self.requests[client_id] if t > cutoff
-            ]
-
-            # Check burst limit
-            if len(self.requests[client_id]) >= self.burst:
-                return False
+        return self.check(client_id)[0]
 
-            # Check RPS limit
-            if len(self.requests[client_id]) >= self.rps:
-                return False
-
-            # Add current request
-            self.requests[client_id].append(current_time)
-            return True
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
 
 
 class OPipeBridge:
@@ -251,7 +304,8 @@ def before_request():
 
             # Check rate limits
             client_id = request.headers.get("X-Client-Id", "unknown")
-            if not self.rate_limiter.is_allowed(client_id):
+            allowed, retry_after = self.rate_limiter.check(client_id)
+            if not allowed:
                 return (
                     jsonify(
                         {
@@ -262,6 +316,7 @@ def before_request():
                         }
                     ),
                     429,
+                    {"Retry-After": str(max(1, int(retry_after + 0.999)))},
                 )
 
             # Verify HMAC authentication
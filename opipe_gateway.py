@@ -12,12 +12,15 @@
 Company: COOL BITS SRL
 """
 
+import itertools
 import json
 import logging
+import os
 import time
 import uuid
 import re
 import unicodedata
+from functools import partial
 from typing import Dict, Any
 from datetime import datetime
 
@@ -44,6 +47,73 @@
 )
 logger = logging.getLogger("oPipe")
 
+# Codec limits and logging sample
+MAX_PAYLOAD_BYTES = 10 * 1024 * 1024  # 10MB limit
+# json (default), or opt-in orjson / msgspec / auto (first installed). The
+# fast backends encode NaN as null, serialize datetime/UUID that json rejects
+# and decode integers beyond 64 bits differently; decode falls back to json
+# for the input they reject (NaN, 1e400, lone surrogates).
+OPIPE_JSON_BACKEND = os.getenv("OPIPE_JSON_BACKEND", "json")
+OPIPE_LOG_EVERY = int(os.getenv("OPIPE_LOG_EVERY", "100"))  # log 1 in N calls, 0 = errors only
+
+# Control characters except newlines, tabs and carriage returns
+CONTROL_CHARS_RE = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
+
+
+def _select_json_backend(name: str):
+    """(name, dumps -> bytes|str, loads, decode errors) for the configured backend"""
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+
+            return "orjson", orjson.dumps, orjson.loads, (orjson.JSONDecodeError,)
+        except ImportError:
+            if name == "orjson":
+                logger.warning("OPIPE_JSON_BACKEND=orjson but orjson is not installed")
+    if name in ("auto", "msgspec"):
+        try:
+            import msgspec
+
+            return (
+                "msgspec",
+                msgspec.json.encode,
+                msgspec.json.decode,
+                (msgspec.DecodeError,),
+            )
+        except ImportError:
+            if name == "msgspec":
+                logger.warning("OPIPE_JSON_BACKEND=msgspec but msgspec is not installed")
+    return (
+        "json",
+        partial(json.dumps, ensure_ascii=False, separators=(",", ":")),
+        json.loads,
+        (json.JSONDecodeError,),
+    )
+
+
+JSON_BACKEND, _json_dumps, _json_loads, _JSON_DECODE_ERRORS = _select_json_backend(
+    OPIPE_JSON_BACKEND
+)
+_calls = itertools.count(1)
+
+
+def _sampled() -> bool:
+    """True for one call in OPIPE_LOG_EVERY; errors are always logged"""
+    return OPIPE_LOG_EVERY > 0 and next(_calls) % OPIPE_LOG_EVERY == 0
+
+
+def _trace_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+def _utf8_size(text: str) -> int:
+    """UTF-8 byte length, encoding only when the string is not ASCII
+
+    Raises UnicodeEncodeError (a ValueError) on lone surrogates, like the
+    size check always did.
+    """
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
 
 class OPipeGateway:
     """
@@ -81,6 +151,9 @@ def sanitize_str(input_str: str) -> str:
     """
     Clean and normalize input string for safe processing
 
+    ASCII input skips NFKC (it is already normalized), and printable input
+    skips the control-character pass; the output matches the full path.
+
     Args:
         input_str: Raw input string to sanitize
 
@@ -94,34 +167,43 @@ def sanitize_str(input_str: str) -> str:
     if not isinstance(input_str, str):
         raise TypeError(f"Expected string, got {type(input_str).__name__}")
 
-    # Generate trace ID for this operation
-    trace_id = str(uuid.uuid4())[:8]
-    start_time = time.time()
+    sampled = _sampled()
+    start_time = time.perf_counter() if sampled else 0.0
 
     try:
+        is_ascii = input_str.isascii()
+
         # Unicode normalization
-        normalized = unicodedata.normalize("NFKC", input_str)
+        normalized = input_str if is_ascii else unicodedata.normalize("NFKC", input_str)
 
         # Remove control characters except newlines and tabs
-        cleaned = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", normalized)
-
-        # Remove excessive whitespace
-        cleaned = re.sub(r"\s+", " ", cleaned).strip()
+        if normalized.isprintable():
+            # no control characters, and the only whitespace is " "
+            cleaned = normalized
+            if "  " in cleaned or cleaned[:1] == " " or cleaned[-1:] == " ":
+                cleaned = " ".join(cleaned.split())
+        else:
+            cleaned = CONTROL_CHARS_RE.sub("", normalized)
+            # Remove excessive whitespace (same set as regex \s)
+            cleaned = " ".join(cleaned.split())
 
-        # Validate UTF-8 encoding
-        cleaned.encode("utf-8")
+        # Validate UTF-8 encoding (lone surrogates)
+        if not is_ascii:
+            cleaned.encode("utf-8")
 
-        # Log operation
-        latency_ms = int((time.time() - start_time) * 1000)
-        logger.info(f"[{trace_id}] sanitize_str completed - latency: {latency_ms}ms")
+        if sampled:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            logger.info(
+                f"[{_trace_id()}] sanitize_str completed - latency: {latency_ms:.3f}ms"
+            )
 
         return cleaned
 
     except UnicodeError as e:
-        logger.error(f"[{trace_id}] Unicode error in sanitize_str: {e}")
+        logger.error(f"[{_trace_id()}] Unicode error in sanitize_str: {e}")
         raise ValueError(f"Invalid Unicode in input: {e}")
     except Exception as e:
-        logger.error(f"[{trace_id}] Error in sanitize_str: {e}")
+        logger.error(f"[{_trace_id()}] Error in sanitize_str: {e}")
         raise
 
 
@@ -129,6 +211,10 @@ def encode_payload(obj: Dict[str, Any]) -> str:
     """
     Encode dictionary to JSON string with strict validation
 
+    Uses the JSON_BACKEND selected at import (compact, non-ASCII kept
+    as-is), falling back to the stdlib for objects the backend rejects.
+    The default json backend keeps the original output byte for byte.
+
     Args:
         obj: Dictionary to encode
 
@@ -142,30 +228,43 @@ def encode_payload(obj: Dict[str, Any]) -> str:
     if not isinstance(obj, dict):
         raise TypeError(f"Expected dict, got {type(obj).__name__}")
 
-    trace_id = str(uuid.uuid4())[:8]
-    start_time = time.time()
+    sampled = _sampled()
+    start_time = time.perf_counter() if sampled else 0.0
 
     try:
-        # Validate payload size
-        json_str = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        try:
+            encoded = _json_dumps(obj)
+        except TypeError:
+            if JSON_BACKEND == "json":
+                raise
+            # e.g. non-str keys or ints beyond 64 bits
+            encoded = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
-        if len(json_str.encode("utf-8")) > 10 * 1024 * 1024:  # 10MB limit
-            raise ValueError("Payload too large (>10MB)")
+        # Validate payload size
+        if isinstance(encoded, bytes):
+            payload_size = len(encoded)
+            if payload_size > MAX_PAYLOAD_BYTES:
+                raise ValueError("Payload too large (>10MB)")
+            json_str = encoded.decode("utf-8")
+        else:
+            json_str = encoded
+            payload_size = _utf8_size(json_str)
+            if payload_size > MAX_PAYLOAD_BYTES:
+                raise ValueError("Payload too large (>10MB)")
 
-        # Log operation
-        latency_ms = int((time.time() - start_time) * 1000)
-        payload_size = len(json_str.encode("utf-8"))
-        logger.info(
-            f"[{trace_id}] encode_payload completed - size: {payload_size}B, latency: {latency_ms}ms"
-        )
+        if sampled:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            logger.info(
+                f"[{_trace_id()}] encode_payload completed - size: {payload_size}B, latency: {latency_ms:.3f}ms"
+            )
 
         return json_str
 
     except (TypeError, ValueError) as e:
-        logger.error(f"[{trace_id}] Serialization error in encode_payload: {e}")
+        logger.error(f"[{_trace_id()}] Serialization error in encode_payload: {e}")
         raise ValueError(f"Cannot serialize payload: {e}")
     except Exception as e:
-        logger.error(f"[{trace_id}] Error in encode_payload: {e}")
+        logger.error(f"[{_trace_id()}] Error in encode_payload: {e}")
         raise
 
 
@@ -186,34 +285,40 @@ def decode_payload(txt: str) -> Dict[str, Any]:
     if not isinstance(txt, str):
         raise TypeError(f"Expected string, got {type(txt).__name__}")
 
-    trace_id = str(uuid.uuid4())[:8]
-    start_time = time.time()
+    sampled = _sampled()
+    start_time = time.perf_counter() if sampled else 0.0
 
     try:
         # Validate input size
-        if len(txt.encode("utf-8")) > 10 * 1024 * 1024:  # 10MB limit
+        payload_size = _utf8_size(txt)
+        if payload_size > MAX_PAYLOAD_BYTES:
             raise ValueError("Payload too large (>10MB)")
 
         # Decode JSON
-        obj = json.loads(txt)
+        try:
+            obj = _json_loads(txt)
+        except _JSON_DECODE_ERRORS:
+            if JSON_BACKEND == "json":
+                raise
+            # e.g. NaN, 1e400 or lone surrogates, which json accepts
+            obj = json.loads(txt)
 
         if not isinstance(obj, dict):
             raise ValueError("Decoded payload must be a dictionary")
 
-        # Log operation
-        latency_ms = int((time.time() - start_time) * 1000)
-        payload_size = len(txt.encode("utf-8"))
-        logger.info(
-            f"[{trace_id}] decode_payload completed - size: {payload_size}B, latency: {latency_ms}ms"
-        )
+        if sampled:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            logger.info(
+                f"[{_trace_id()}] decode_payload completed - size: {payload_size}B, latency: {latency_ms:.3f}ms"
+            )
 
         return obj
 
-    except json.JSONDecodeError as e:
-        logger.error(f"[{trace_id}] JSON decode error: {e}")
+    except (json.JSONDecodeError, *_JSON_DECODE_ERRORS) as e:
+        logger.error(f"[{_trace_id()}] JSON decode error: {e}")
         raise ValueError(f"Invalid JSON: {e}")
     except Exception as e:
-        logger.error(f"[{trace_id}] Error in decode_payload: {e}")
+        logger.error(f"[{_trace_id()}] Error in decode_payload: {e}")
         raise
 
 
@@ -308,16 +413,25 @@ def route_request(path: str, body: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
+# Test corpora (shared with scripts/opipe_codec_bench.py)
+LARGE_PAYLOAD = {
+    "content": "x" * (1024 * 1024),  # 1MB of data
+    "metadata": {"size": "large", "test": True},
+}
+
+SPECIAL_CHARACTERS = {
+    "unicode": "🚀 Hello 世界! ñáéíóú",
+    "control_chars": "Line1\nLine2\tTabbed",
+    "symbols": "!@#$%^&*()_+-=[]{}|;:,.<>?",
+    "mixed": "Mix: 中文 + English + 123 + 🎯",
+}
+
+
 # Test functions for large payloads and special characters
 def test_large_payload():
     """Test with payload >1MB"""
-    large_data = {
-        "content": "x" * (1024 * 1024),  # 1MB of data
-        "metadata": {"size": "large", "test": True},
-    }
-
     try:
-        encoded = encode_payload(large_data)
+        encoded = encode_payload(LARGE_PAYLOAD)
         decoded = decode_payload(encoded)
         print(f"Large payload test: SUCCESS - {len(encoded)} bytes")
         return True
@@ -328,15 +442,8 @@ def test_large_payload():
 
 def test_special_characters():
     """Test with special characters and Unicode"""
-    special_data = {
-        "unicode": "🚀 Hello 世界! ñáéíóú",
-        "control_chars": "Line1\nLine2\tTabbed",
-        "symbols": "!@#$%^&*()_+-=[]{}|;:,.<>?",
-        "mixed": "Mix: 中文 + English + 123 + 🎯",
-    }
-
     try:
-        for key, value in special_data.items():
+        for key, value in SPECIAL_CHARACTERS.items():
             sanitized = sanitize_str(value)
             print(f"Special chars test ({key}): SUCCESS")
         return True
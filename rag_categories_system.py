@@ -9,10 +9,8 @@
 
 import json
 import logging
-import sqlite3
 from typing import Dict, List, Any
 from datetime import datetime
-import uuid
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
@@ -20,6 +18,8 @@
 from pydantic import BaseModel
 import uvicorn
 
+from rag_core import Retriever, SQLiteStore
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,6 +29,7 @@
 class RAGConfig(BaseModel):
     base_port: int = 8097
     max_documents: int = 1000
+    db_path: str = "rag_system.db"
     categories: List[str] = [
         "u-rag",  # User
         "b-rag",  # Business
@@ -58,40 +59,13 @@ class RAGCategory(BaseModel):
     last_updated: str
 
 
-# Database setup
-def init_database():
-    """Initialize SQLite database for RAG system"""
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    # Create documents table
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS documents (
-            id TEXT PRIMARY KEY,
-            title TEXT NOT NULL,
-            content TEXT NOT NULL,
-            category TEXT NOT NULL,
-            source TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            metadata TEXT NOT NULL
-        )
-    """
-    )
+# Storage: shared rag_core store, filters pushed into indexed SQL
+store = SQLiteStore(config.db_path)
+retriever = Retriever(store)
 
-    # Create categories table
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS categories (
-            name TEXT PRIMARY KEY,
-            description TEXT NOT NULL,
-            document_count INTEGER DEFAULT 0,
-            last_updated TEXT NOT NULL
-        )
-    """
-    )
 
-    # Insert default categories with descriptions
+def init_categories():
+    """Register default categories (existing rows are kept)"""
     category_descriptions = {
         "u-rag": "User-focused RAG - User experience, interface, and user-related content",
         "b-rag": "Business RAG - Business strategy, operations, and business intelligence",
@@ -103,21 +77,12 @@ def init_database():
         description = category_descriptions.get(
             category, f"RAG category for {category}"
         )
-        cursor.execute(
-            """
-            INSERT OR IGNORE INTO categories (name, description, document_count, last_updated)
-            VALUES (?, ?, 0, ?)
-        """,
-            (category, description, datetime.now().isoformat()),
-        )
+        store.upsert_collection(category, "category", category, description, overwrite=False)
 
-    conn.commit()
-    conn.close()
-    logger.info("✅ RAG database initialized")
+    logger.info("✅ RAG categories registered")
 
 
-# Initialize database
-init_database()
+init_categories()
 
 # FastAPI app
 app = FastAPI(
@@ -135,95 +100,43 @@ def init_database():
     allow_headers=["*"],
 )
 
-# Global storage
-documents: Dict[str, Document] = {}
-categories: Dict[str, RAGCategory] = {}
-
-
-def load_documents_from_db():
-    """Load documents from database"""
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM documents")
-    rows = cursor.fetchall()
-
-    for row in rows:
-        try:
-            # Handle corrupted or empty JSON metadata
-            metadata_str = row[6] if row[6] else "{}"
-            if not metadata_str.strip():
-                metadata_str = "{}"
-
-            metadata = json.loads(metadata_str)
-        except (json.JSONDecodeError, TypeError):
-            # If JSON is corrupted, use empty metadata
-            logger.warning(
-                f"Corrupted JSON metadata for document {row[0]}, using empty metadata"
-            )
-            metadata = {}
-
-        doc = Document(
-            id=row[0],
-            title=row[1],
-            content=row[2],
-            category=row[3],
-            source=row[4],
-            created_at=row[5],
-            metadata=metadata,
-        )
-        documents[doc.id] = doc
-
-    conn.close()
-    logger.info(f"✅ Loaded {len(documents)} documents from database")
-
-
-def load_categories_from_db():
-    """Load categories from database"""
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM categories")
-    rows = cursor.fetchall()
 
-    for row in rows:
-        try:
-            # Handle corrupted data with proper type conversion
-            name = row[0] if row[0] else "unknown"
-            description = row[1] if row[1] else ""
+def to_document(row: Dict[str, Any]) -> Document:
+    return Document(
+        id=row["id"],
+        title=row["title"],
+        content=row["content"],
+        category=row["category"] or "",
+        source=row["source"] or "",
+        created_at=row["created_at"],
+        metadata=row["metadata"],
+    )
 
-            # Convert document_count to int, default to 0 if invalid
-            try:
-                document_count = int(row[2]) if row[2] else 0
-            except (ValueError, TypeError):
-                document_count = 0
 
-            # Convert last_updated to string, default to current time if invalid
-            try:
-                last_updated = str(row[3]) if row[3] else datetime.now().isoformat()
-            except (ValueError, TypeError):
-                last_updated = datetime.now().isoformat()
+def load_categories() -> Dict[str, RAGCategory]:
+    """Categories with live document counts (one GROUP BY)"""
+    stats = store.summary_by("category")
+    categories = {}
+    for collection in store.collections(kind="category"):
+        summary = stats.get(collection["id"], {})
+        categories[collection["id"]] = RAGCategory(
+            name=collection["id"],
+            description=collection["description"] or "",
+            document_count=summary.get("count", 0),
+            last_updated=summary.get("last_updated") or collection["created_at"],
+        )
+    return categories
 
-            cat = RAGCategory(
-                name=name,
-                description=description,
-                document_count=document_count,
-                last_updated=last_updated,
-            )
-            categories[cat.name] = cat
-        except Exception as e:
-            logger.warning(
-                f"Error loading category {row[0] if row[0] else 'unknown'}: {e}"
-            )
-            continue
 
-    conn.close()
-    logger.info(f"✅ Loaded {len(categories)} categories from database")
+def require_category(category: str, status_code: int = 400):
+    collection = store.collection(category)
+    if not collection or collection["kind"] != "category":
+        raise HTTPException(status_code=status_code, detail=f"Category {category} not found")
 
 
-# Load data on startup
-load_documents_from_db()
-load_categories_from_db()
+def save_document(**fields) -> Document:
+    doc_id = retriever.add(fields)
+    return to_document(store.get(doc_id))
 
 
 # API Endpoints
@@ -236,11 +149,12 @@ async def root():
 @app.get("/api")
 async def api_root():
     """API root endpoint"""
+    categories = load_categories()
     return {
         "service": "CoolBits.ai RAG Categories System",
         "version": "1.0.0",
         "status": "healthy",
-        "total_documents": len(documents),
+        "total_documents": store.count(),
         "total_categories": len(categories),
         "categories": list(categories.keys()),
     }
@@ -253,8 +167,8 @@ async def health():
         "status": "healthy",
         "service": "CoolBits.ai RAG Categories System",
         "version": "1.0.0",
-        "total_documents": len(documents),
-        "total_categories": len(categories),
+        "total_documents": store.count(),
+        "total_categories": len(store.collections(kind="category")),
         "timestamp": datetime.now().isoformat(),
     }
 
@@ -280,6 +194,7 @@ async def options_categories():
 @app.get("/api/categories")
 async def get_categories():
     """Get all RAG categories"""
+    categories = load_categories()
     return {
         "categories": list(categories.values()),
         "total_categories": len(categories),
@@ -287,19 +202,20 @@ async def get_categories():
 
 
 @app.get("/api/categories/{category_name}")
-async def get_category(category_name: str):
+async def get_category(category_name: str, limit: int = 100, offset: int = 0):
     """Get specific category with documents"""
+    categories = load_categories()
     if category_name not in categories:
         raise HTTPException(
             status_code=404, detail=f"Category {category_name} not found"
         )
 
-    category_docs = [doc for doc in documents.values() if doc.category == category_name]
+    category_docs = store.find({"category": category_name}, limit=limit, offset=offset)
 
     return {
         "category": categories[category_name],
-        "documents": category_docs,
-        "document_count": len(category_docs),
+        "documents": [to_document(row) for row in category_docs],
+        "document_count": categories[category_name].document_count,
     }
 
 
@@ -320,59 +236,17 @@ class TrainingDiscussion(BaseModel):
 @app.post("/api/documents")
 async def create_document(doc_data: DocumentCreate):
     """Create a new document"""
-    if doc_data.category not in categories:
-        raise HTTPException(
-            status_code=400, detail=f"Category {doc_data.category} not found"
-        )
+    require_category(doc_data.category)
 
-    doc_id = str(uuid.uuid4())
-    doc = Document(
-        id=doc_id,
+    doc = save_document(
         title=doc_data.title,
         content=doc_data.content,
         category=doc_data.category,
         source=doc_data.source,
-        created_at=datetime.now().isoformat(),
         metadata=json.loads(doc_data.metadata),
     )
 
-    # Save to database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO documents (id, title, content, category, source, created_at, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            doc.id,
-            doc.title,
-            doc.content,
-            doc.category,
-            doc.source,
-            doc.created_at,
-            json.dumps(doc.metadata),
-        ),
-    )
-
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count + 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), doc_data.category),
-    )
-
-    conn.commit()
-    conn.close()
-
-    documents[doc_id] = doc
-    categories[doc_data.category].document_count += 1
-    categories[doc_data.category].last_updated = datetime.now().isoformat()
-
-    logger.info(f"✅ Created document {doc_id} in category {doc_data.category}")
+    logger.info(f"✅ Created document {doc.id} in category {doc_data.category}")
 
     return {"document": doc, "status": "created"}
 
@@ -382,8 +256,7 @@ async def upload_document(
     file: UploadFile = File(...), category: str = "b-rag", title: str = None
 ):
     """Upload a document file"""
-    if category not in categories:
-        raise HTTPException(status_code=400, detail=f"Category {category} not found")
+    require_category(category)
 
     content = await file.read()
     content_str = content.decode("utf-8")
@@ -393,14 +266,11 @@ async def upload_document(
             file.filename or f"Document {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         )
 
-    doc_id = str(uuid.uuid4())
-    doc = Document(
-        id=doc_id,
+    doc = save_document(
         title=title,
         content=content_str,
         category=category,
         source=f"upload:{file.filename}",
-        created_at=datetime.now().isoformat(),
         metadata={
             "filename": file.filename,
             "file_size": len(content),
@@ -408,103 +278,59 @@ async def upload_document(
         },
     )
 
-    # Save to database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO documents (id, title, content, category, source, created_at, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            doc.id,
-            doc.title,
-            doc.content,
-            doc.category,
-            doc.source,
-            doc.created_at,
-            json.dumps(doc.metadata),
-        ),
-    )
-
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count + 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), category),
-    )
-
-    conn.commit()
-    conn.close()
-
-    documents[doc_id] = doc
-    categories[category].document_count += 1
-    categories[category].last_updated = datetime.now().isoformat()
-
-    logger.info(f"✅ Uploaded document {doc_id} to category {category}")
+    logger.info(f"✅ Uploaded document {doc.id} to category {category}")
 
     return {"document": doc, "status": "uploaded"}
 
 
 @app.get("/api/documents")
-async def get_documents(category: str = None, limit: int = 100):
+async def get_documents(category: str = None, limit: int = 100, offset: int = 0):
     """Get documents, optionally filtered by category"""
-    if category and category not in categories:
-        raise HTTPException(status_code=400, detail=f"Category {category} not found")
-
-    docs = list(documents.values())
     if category:
-        docs = [doc for doc in docs if doc.category == category]
+        require_category(category)
+
+    docs = store.find({"category": category}, limit=limit, offset=offset)
 
-    docs = docs[:limit]
+    return {
+        "documents": [to_document(row) for row in docs],
+        "total_documents": len(docs),
+        "category": category,
+    }
 
-    return {"documents": docs, "total_documents": len(docs), "category": category}
+
+@app.get("/api/search")
+async def search_documents(q: str, category: str = None, limit: int = 10):
+    """Full-text search, optionally within a category"""
+    hits = retriever.search(q, k=limit, filters={"category": category})
+
+    return {
+        "query": q,
+        "results": [{"document": to_document(hit), "score": hit["score"]} for hit in hits],
+        "total_results": len(hits),
+        "category": category,
+    }
 
 
 @app.get("/api/documents/{doc_id}")
 async def get_document(doc_id: str):
     """Get specific document"""
-    if doc_id not in documents:
+    row = store.get(doc_id)
+    if not row:
         raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
 
-    return {"document": documents[doc_id]}
+    return {"document": to_document(row)}
 
 
 @app.delete("/api/documents/{doc_id}")
 async def delete_document(doc_id: str):
     """Delete a document"""
-    if doc_id not in documents:
+    row = store.get(doc_id)
+    if not row:
         raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
 
-    doc = documents[doc_id]
-    category = doc.category
-
-    # Remove from database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count - 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), category),
-    )
-
-    conn.commit()
-    conn.close()
-
-    del documents[doc_id]
-    categories[category].document_count -= 1
-    categories[category].last_updated = datetime.now().isoformat()
+    retriever.delete(doc_id)
 
-    logger.info(f"✅ Deleted document {doc_id} from category {category}")
+    logger.info(f"✅ Deleted document {doc_id} from category {row['category']}")
 
     return {"status": "deleted", "document_id": doc_id}
 
@@ -512,40 +338,14 @@ async def delete_document(doc_id: str):
 @app.post("/api/categories")
 async def create_category(name: str, description: str = None):
     """Create a new RAG category"""
-    if name in categories:
+    if store.collection(name):
         raise HTTPException(status_code=400, detail=f"Category {name} already exists")
 
     if not description:
         description = f"RAG category for {name}"
 
-    category = RAGCategory(
-        name=name,
-        description=description,
-        document_count=0,
-        last_updated=datetime.now().isoformat(),
-    )
-
-    # Save to database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO categories (name, description, document_count, last_updated)
-        VALUES (?, ?, ?, ?)
-    """,
-        (
-            category.name,
-            category.description,
-            category.document_count,
-            category.last_updated,
-        ),
-    )
-
-    conn.commit()
-    conn.close()
-
-    categories[name] = category
+    store.upsert_collection(name, "category", name, description)
+    category = load_categories()[name]
 
     logger.info(f"✅ Created category {name}")
 
@@ -556,10 +356,7 @@ async def create_category(name: str, description: str = None):
 @app.post("/api/process-training-discussion")
 async def process_training_discussion(discussion_data: TrainingDiscussion):
     """Process a training discussion and save it to RAG"""
-    if discussion_data.category not in categories:
-        raise HTTPException(
-            status_code=400, detail=f"Category {discussion_data.category} not found"
-        )
+    require_category(discussion_data.category)
 
     # Extract key information from discussion
     lines = discussion_data.discussion_content.strip().split("\n")
@@ -584,15 +381,11 @@ async def process_training_discussion(discussion_data: TrainingDiscussion):
             ):
                 participants.append(line.strip())
 
-    # Create document
-    doc_id = str(uuid.uuid4())
-    doc = Document(
-        id=doc_id,
+    doc = save_document(
         title=f"{discussion_data.session_title} - {topic}",
         content=discussion_data.discussion_content,
         category=discussion_data.category,
         source="training-discussion",
-        created_at=datetime.now().isoformat(),
         metadata={
             "session_title": discussion_data.session_title,
             "topic": topic,
@@ -602,44 +395,8 @@ async def process_training_discussion(discussion_data: TrainingDiscussion):
         },
     )
 
-    # Save to database
-    conn = sqlite3.connect("rag_system.db")
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO documents (id, title, content, category, source, created_at, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            doc.id,
-            doc.title,
-            doc.content,
-            doc.category,
-            doc.source,
-            doc.created_at,
-            json.dumps(doc.metadata),
-        ),
-    )
-
-    # Update category count
-    cursor.execute(
-        """
-        UPDATE categories SET document_count = document_count + 1, last_updated = ?
-        WHERE name = ?
-    """,
-        (datetime.now().isoformat(), discussion_data.category),
-    )
-
-    conn.commit()
-    conn.close()
-
-    documents[doc_id] = doc
-    categories[discussion_data.category].document_count += 1
-    categories[discussion_data.category].last_updated = datetime.now().isoformat()
-
     logger.info(
-        f"✅ Processed training discussion {doc_id} in category {discussion_data.category}"
+        f"✅ Processed training discussion {doc.id} in category {discussion_data.category}"
     )
 
     return {"document": doc, "status": "processed", "metadata": doc.metadata}
@@ -0,0 +1,48 @@
+"""
+RAG Core - shared retrieval library for the CoolBits.ai RAG services
+
+Storage (SQLite/Postgres), a shared chunker and pluggable lexical/vector
+indexes; the root-level RAG servers are thin FastAPI adapters over it.
+"""
+
+from .chunking import chunk_text, iter_chunks
+from .indexes import (
+    KeywordIndex,
+    LexicalIndex,
+    PartitionedVectorIndex,
+    PostgresFTSIndex,
+    SQLiteFTSIndex,
+    VectorIndex,
+    default_lexical_index,
+    sentence_transformer_embedder,
+)
+from .retriever import Retriever, reciprocal_rank_fusion
+from .storage import (
+    FILTER_FIELDS,
+    DocumentStore,
+    PostgresStore,
+    SQLiteStore,
+    now_iso,
+    open_store,
+)
+
+__all__ = [
+    "chunk_text",
+    "iter_chunks",
+    "KeywordIndex",
+    "LexicalIndex",
+    "PartitionedVectorIndex",
+    "PostgresFTSIndex",
+    "SQLiteFTSIndex",
+    "VectorIndex",
+    "default_lexical_index",
+    "sentence_transformer_embedder",
+    "Retriever",
+    "reciprocal_rank_fusion",
+    "FILTER_FIELDS",
+    "DocumentStore",
+    "PostgresStore",
+    "SQLiteStore",
+    "now_iso",
+    "open_store",
+]
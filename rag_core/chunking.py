@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+RAG Core - Shared chunker
+CoolBits.ai - Unified retrieval library
+
+Word-window chunking with overlap; linear in the text length.
+"""
+
+from typing import Iterator, List
+
+DEFAULT_CHUNK_WORDS = 200
+DEFAULT_OVERLAP_WORDS = 40
+
+
+def iter_chunks(
+    text: str,
+    chunk_words: int = DEFAULT_CHUNK_WORDS,
+    overlap_words: int = DEFAULT_OVERLAP_WORDS,
+) -> Iterator[str]:
+    """Yield overlapping windows of ``chunk_words`` words"""
+    words = (text or "").split()
+    if not words:
+        return
+    step = max(chunk_words - overlap_words, 1)
+    for start in range(0, len(words), step):
+        yield " ".join(words[start : start + chunk_words])
+        if start + chunk_words >= len(words):
+            return
+
+
+def chunk_text(
+    text: str,
+    chunk_words: int = DEFAULT_CHUNK_WORDS,
+    overlap_words: int = DEFAULT_OVERLAP_WORDS,
+) -> List[str]:
+    """List form of iter_chunks"""
+    return list(iter_chunks(text, chunk_words, overlap_words))
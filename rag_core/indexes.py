@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+RAG Core - Lexical and vector indexes
+CoolBits.ai - Unified retrieval library
+
+Indexes return ranked ``(doc_id, score)`` pairs; filters are pushed into
+the store's SQL so only the matching slice is ever scored.
+"""
+
+import logging
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .storage import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+Hits = List[Tuple[str, float]]
+EmbedFn = Callable[[Sequence[str]], np.ndarray]
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(query: str) -> List[str]:
+    """Lowercased word tokens, deduplicated in order"""
+    return list(dict.fromkeys(TERM_RE.findall((query or "").lower())))
+
+
+# -- lexical --
+class LexicalIndex(ABC):
+    def __init__(self, store: DocumentStore):
+        self.store = store
+
+    def install(self) -> None:
+        """Create index structures (idempotent)"""
+
+    @abstractmethod
+    def search(
+        self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> Hits:
+        ...
+
+
+class SQLiteFTSIndex(LexicalIndex):
+    """FTS5 external-content index over rag_documents, ranked by BM25"""
+
+    TABLE = "rag_documents_fts"
+
+    def __init__(self, store: DocumentStore, title_weight: float = 2.0):
+        super().__init__(store)
+        self.title_weight = title_weight
+
+    def install(self) -> None:
+        exists = self.store.query(
+            "SELECT name FROM sqlite_master WHERE name = ?", (self.TABLE,)
+        )
+        t = self.TABLE
+        self.store.execute_script(
+            [
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {t} USING fts5("
+                "title, content, content='rag_documents', content_rowid='rowid')",
+                "CREATE TRIGGER IF NOT EXISTS rag_documents_fts_ai AFTER INSERT ON rag_documents BEGIN "
+                f"INSERT INTO {t} (rowid, title, content) VALUES (new.rowid, new.title, new.content); END",
+                "CREATE TRIGGER IF NOT EXISTS rag_documents_fts_ad AFTER DELETE ON rag_documents BEGIN "
+                f"INSERT INTO {t} ({t}, rowid, title, content) "
+                "VALUES ('delete', old.rowid, old.title, old.content); END",
+                "CREATE TRIGGER IF NOT EXISTS rag_documents_fts_au AFTER UPDATE ON rag_documents BEGIN "
+                f"INSERT INTO {t} ({t}, rowid, title, content) "
+                "VALUES ('delete', old.rowid, old.title, old.content); "
+                f"INSERT INTO {t} (rowid, title, content) VALUES (new.rowid, new.title, new.content); END",
+            ]
+        )
+        if not exists:
+            # index rows written before the triggers existed (e.g. migrated data)
+            self.store.execute(f"INSERT INTO {t} ({t}) VALUES ('rebuild')")
+
+    def search(
+        self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> Hits:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        where, params = self.store.where(filters, alias="d")
+        t = self.TABLE
+        sql = (
+            f"SELECT d.id AS id, bm25({t}, {self.title_weight}, 1.0) AS rank "
+            f"FROM {t} JOIN rag_documents d ON d.rowid = {t}.rowid "
+            f"WHERE {t} MATCH ?"
+        )
+        if where:
+            sql += f" AND {where}"
+        rows = self.store.query(sql + " ORDER BY rank LIMIT ?", [match] + params + [k])
+        return [(row["id"], -float(row["rank"])) for row in rows]
+
+
+class KeywordIndex(LexicalIndex):
+    """Term-overlap scoring in SQL (title hits count double); any SQL backend"""
+
+    def search(
+        self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> Hits:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        score_terms, params = [], []
+        for term in terms:
+            score_terms.append(
+                "(CASE WHEN LOWER(title) LIKE ? THEN 2 ELSE 0 END + "
+                "CASE WHEN LOWER(content) LIKE ? THEN 1 ELSE 0 END)"
+            )
+            params += [f"%{term}%", f"%{term}%"]
+        where, filter_params = self.store.where(filters)
+        sql = f"SELECT id, ({' + '.join(score_terms)}) AS score FROM rag_documents"
+        if where:
+            sql += f" WHERE {where}"
+        rows = self.store.query(
+            f"SELECT id, score FROM ({sql}) scored WHERE score > 0 "
+            "ORDER BY score DESC LIMIT ?",
+            params + filter_params + [k],
+        )
+        return [(row["id"], row["score"] / len(terms)) for row in rows]
+
+
+class PostgresFTSIndex(LexicalIndex):
+    """tsvector (title weighted A) with a GIN index, ranked by ts_rank"""
+
+    def install(self) -> None:
+        self.store.execute_script(
+            [
+                "ALTER TABLE rag_documents ADD COLUMN IF NOT EXISTS tsv tsvector "
+                "GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(content, '')), 'B')) STORED",
+                "CREATE INDEX IF NOT EXISTS idx_rag_documents_tsv "
+                "ON rag_documents USING GIN (tsv)",
+            ]
+        )
+
+    def search(
+        self, query: str, k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> Hits:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        tsquery = " | ".join(terms)
+        where, params = self.store.where(filters)
+        sql = (
+            "SELECT id, ts_rank(tsv, to_tsquery('simple', ?)) AS rank "
+            "FROM rag_documents WHERE tsv @@ to_tsquery('simple', ?)"
+        )
+        if where:
+            sql += f" AND {where}"
+        rows = self.store.query(
+            sql + " ORDER BY rank DESC LIMIT ?", [tsquery, tsquery] + params + [k]
+        )
+        return [(row["id"], float(row["rank"])) for row in rows]
+
+
+def default_lexical_index(store: DocumentStore) -> LexicalIndex:
+    """Best lexical index the backend supports, installed"""
+    if store.backend == "postgres":
+        index: LexicalIndex = PostgresFTSIndex(store)
+    else:
+        index = SQLiteFTSIndex(store)
+    try:
+        index.install()
+        return index
+    except sqlite3.OperationalError as e:  # SQLite built without FTS5
+        logger.warning(f"FTS5 unavailable ({e}); using keyword index")
+        return KeywordIndex(store)
+
+
+# -- vector --
+class VectorIndex(ABC):
+    @abstractmethod
+    def add(self, doc: Dict[str, Any], vectors: np.ndarray) -> None:
+        ...
+
+    @abstractmethod
+    def remove(self, doc_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def search(
+        self, vector: np.ndarray, k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> Hits:
+        ...
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class PartitionedVectorIndex(VectorIndex):
+    """Cosine search over chunk vectors kept in the store
+
+    A partition is the vector slice for one filter set (usually a single
+    domain or category), loaded on first query with the filters pushed
+    into SQL. At most ``max_partitions`` stay in memory (LRU), so resident
+    size follows the active partitions, not the corpus.
+    """
+
+    def __init__(self, store: DocumentStore, max_partitions: int = 16):
+        self.store = store
+        self.max_partitions = max_partitions
+        self._partitions: "OrderedDict[Tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+
+    @staticmethod
+    def _key(filters: Optional[Dict[str, Any]]) -> Tuple:
+        return tuple(sorted((k, v) for k, v in (filters or {}).items() if v is not None))
+
+    def _partition(self, filters: Optional[Dict[str, Any]]):
+        key = self._key(filters)
+        if key in self._partitions:
+            self._partitions.move_to_end(key)
+            return self._partitions[key]
+        ids, matrix = self.store.load_vectors(dict(key))
+        self._partitions[key] = (ids, matrix)
+        while len(self._partitions) > self.max_partitions:
+            self._partitions.popitem(last=False)
+        return ids, matrix
+
+    def add(self, doc: Dict[str, Any], vectors: np.ndarray) -> None:
+        vectors = normalize_rows(vectors)
+        self.store.put_vectors(doc["id"], vectors)
+        self.remove(doc["id"])
+        for key, (ids, matrix) in list(self._partitions.items()):
+            if all(doc.get(field) == value for field, value in key):
+                new_ids = np.concatenate([ids, np.array([doc["id"]] * len(vectors), dtype=object)])
+                new_matrix = vectors if matrix.size == 0 else np.vstack([matrix, vectors])
+                self._partitions[key] = (new_ids, new_matrix)
+
+    def remove(self, doc_id: str) -> None:
+        for key, (ids, matrix) in list(self._partitions.items()):
+            keep = ids != doc_id
+            if not keep.all():
+                self._partitions[key] = (ids[keep], matrix[keep])
+
+    def search(
+        self, vector: np.ndarray, k: int = 10, filters: Optional[Dict[str, Any]] = None
+    ) -> Hits:
+        ids, matrix = self._partition(filters)
+        if not len(ids):
+            return []
+        scores = matrix @ normalize_rows(vector)[0]
+        # over-fetch chunks so k distinct documents survive the max-per-doc merge
+        n = min(len(scores), k * 4)
+        top = np.argpartition(-scores, n - 1)[:n]
+        hits: Dict[str, float] = {}
+        for i in top[np.argsort(-scores[top])]:
+            hits.setdefault(ids[i], float(scores[i]))
+            if len(hits) == k:
+                break
+        return list(hits.items())
+
+
+def sentence_transformer_embedder(model_name: str) -> Optional[EmbedFn]:
+    """Embedding function backed by sentence-transformers, or None if not installed"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning("sentence-transformers not installed; vector search disabled")
+        return None
+    model = SentenceTransformer(model_name)
+
+    def embed(texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(
+            model.encode(list(texts), normalize_embeddings=True), dtype=np.float32
+        )
+
+    return embed
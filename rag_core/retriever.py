@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+RAG Core - Retriever
+CoolBits.ai - Unified retrieval library
+
+Store + optional lexical/vector indexes behind one add/update/delete/search
+API. With both indexes, rankings are fused with reciprocal rank fusion.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .chunking import DEFAULT_CHUNK_WORDS, DEFAULT_OVERLAP_WORDS, chunk_text
+from .indexes import EmbedFn, Hits, LexicalIndex, VectorIndex, default_lexical_index
+from .storage import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: List[Hits], k: int = RRF_K) -> Hits:
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda hit: hit[1], reverse=True)
+
+
+class Retriever:
+    def __init__(
+        self,
+        store: DocumentStore,
+        lexical: Union[LexicalIndex, str, None] = "auto",
+        vector: Optional[VectorIndex] = None,
+        embed_fn: Optional[EmbedFn] = None,
+        chunk_words: int = DEFAULT_CHUNK_WORDS,
+        overlap_words: int = DEFAULT_OVERLAP_WORDS,
+    ):
+        if vector is not None and embed_fn is None:
+            raise ValueError("A vector index needs an embed_fn")
+        self.store = store
+        self.lexical = default_lexical_index(store) if lexical == "auto" else lexical
+        self.vector = vector
+        self.embed_fn = embed_fn
+        self.chunk_words = chunk_words
+        self.overlap_words = overlap_words
+
+    # -- writes --
+    def _embed_document(self, doc: Dict[str, Any]) -> None:
+        chunks = chunk_text(
+            f"{doc.get('title', '')} {doc.get('content', '')}",
+            self.chunk_words,
+            self.overlap_words,
+        )
+        if chunks:
+            self.vector.add(doc, self.embed_fn(chunks))
+
+    def add(self, doc: Dict[str, Any]) -> str:
+        return self.add_many([doc])[0]
+
+    def add_many(self, docs: List[Dict[str, Any]]) -> List[str]:
+        docs = [dict(doc) for doc in docs]
+        for doc, doc_id in zip(docs, self.store.add_many(docs)):
+            doc["id"] = doc_id
+            if self.vector is not None:
+                self._embed_document(doc)
+        return [doc["id"] for doc in docs]
+
+    def update(self, doc_id: str, **fields) -> bool:
+        if not self.store.update(doc_id, **fields):
+            return False
+        if self.vector is not None and ({"title", "content"} & set(fields)):
+            self._embed_document(self.store.get(doc_id))
+        return True
+
+    def delete(self, doc_id: str) -> bool:
+        if self.vector is not None:
+            self.vector.remove(doc_id)
+        return self.store.delete(doc_id)
+
+    def backfill_vectors(self, batch_size: int = 256) -> int:
+        """Embed documents that have no vectors yet (migrated or pre-index rows)"""
+        if self.vector is None:
+            return 0
+        done = 0
+        while True:
+            ids = self.store.ids_without_vectors(batch_size)
+            if not ids:
+                return done
+            for doc in self.store.get_many(ids).values():
+                self._embed_document(doc)
+            done += len(ids)
+
+    # -- reads --
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        min_score: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-k documents (with ``score``) matching query within filters
+
+        ``min_score`` is a floor on vector similarity, applied before fusion
+        (fused scores are rank-based); it has no effect without a vector index.
+        """
+        rankings: List[Hits] = []
+        if self.lexical is not None:
+            rankings.append(self.lexical.search(query, k * 2, filters))
+        if self.vector is not None:
+            query_vector = np.asarray(self.embed_fn([query]), dtype=np.float32)
+            vector_hits = self.vector.search(query_vector, k * 2, filters)
+            if min_score is not None:
+                vector_hits = [hit for hit in vector_hits if hit[1] >= min_score]
+            rankings.append(vector_hits)
+
+        hits = rankings[0] if len(rankings) == 1 else reciprocal_rank_fusion(rankings)
+        hits = hits[:k]
+
+        docs = self.store.get_many([doc_id for doc_id, _ in hits])
+        results = []
+        for doc_id, score in hits:
+            if doc_id in docs:
+                results.append({**docs[doc_id], "score": score})
+        return results
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+RAG Core - Document storage
+CoolBits.ai - Unified retrieval library
+
+One document table for every RAG service (domains, categories and
+subcategories are indexed columns), chunk vectors, collections (domains /
+categories) and chat history. Filters are pushed into indexed SQL; nothing
+is held in memory per document.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import psycopg2
+
+    HAS_PSYCOPG2 = True
+except ImportError:
+    HAS_PSYCOPG2 = False
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_FIELDS = (
+    "id",
+    "domain",
+    "category",
+    "subcategory",
+    "item",
+    "doc_type",
+    "title",
+    "content",
+    "source",
+    "created_at",
+    "updated_at",
+    "metadata",
+)
+FILTER_FIELDS = ("domain", "category", "subcategory", "item", "doc_type", "source")
+UPDATE_FIELDS = tuple(f for f in DOCUMENT_FIELDS if f not in ("id", "created_at"))
+
+# legacy per-service `documents` columns -> unified columns
+LEGACY_DOCUMENT_COLUMNS = {
+    "id": "id",
+    "domain_id": "domain",
+    "category": "category",
+    "subcategory": "subcategory",
+    "item": "item",
+    "doc_type": "doc_type",
+    "title": "title",
+    "content": "content",
+    "source": "source",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "metadata": "metadata",
+}
+
+IN_CHUNK = 500  # ids per IN (...) clause
+
+
+def now_iso() -> str:
+    return datetime.now().isoformat()
+
+
+class DocumentStore(ABC):
+    """SQL document store; subclasses supply the connection and DDL"""
+
+    backend = ""
+    placeholder = "?"
+    blob_type = "BLOB"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+        self.execute_script(self._schema())
+
+    # -- connection --
+    @abstractmethod
+    def _connect(self):
+        ...
+
+    def _schema(self) -> List[str]:
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS rag_documents (
+                id TEXT PRIMARY KEY,
+                domain TEXT,
+                category TEXT,
+                subcategory TEXT,
+                item TEXT,
+                doc_type TEXT DEFAULT 'general',
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                source TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                metadata TEXT DEFAULT '{}'
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_rag_documents_domain "
+            "ON rag_documents (domain, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_rag_documents_category "
+            "ON rag_documents (category, subcategory, item, created_at)",
+            f"""
+            CREATE TABLE IF NOT EXISTS rag_vectors (
+                doc_id TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                embedding {self.blob_type} NOT NULL,
+                PRIMARY KEY (doc_id, chunk)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rag_collections (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                description TEXT,
+                config TEXT DEFAULT '{}',
+                created_at TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rag_chat_history (
+                id TEXT PRIMARY KEY,
+                collection_id TEXT NOT NULL,
+                user_message TEXT NOT NULL,
+                assistant_response TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                metadata TEXT DEFAULT '{}'
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_rag_chat_collection "
+            "ON rag_chat_history (collection_id, timestamp)",
+            "CREATE TABLE IF NOT EXISTS rag_meta (key TEXT PRIMARY KEY, value TEXT)",
+        ]
+
+    def _sql(self, sql: str) -> str:
+        return sql if self.placeholder == "?" else sql.replace("?", self.placeholder)
+
+    def _run(self, fn):
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                result = fn(cursor)
+                self._conn.commit()
+                return result
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run a write; returns rowcount"""
+
+        def _execute(cursor):
+            cursor.execute(self._sql(sql), tuple(params))
+            return cursor.rowcount
+
+        return self._run(_execute)
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> None:
+        self._run(lambda cursor: cursor.executemany(self._sql(sql), list(rows)))
+
+    def execute_script(self, statements: Iterable[str]) -> None:
+        def _script(cursor):
+            for statement in statements:
+                cursor.execute(statement)
+
+        self._run(_script)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Run a read; rows as dicts"""
+
+        def _query(cursor):
+            cursor.execute(self._sql(sql), tuple(params))
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+        return self._run(_query)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -- filters --
+    @staticmethod
+    def where(
+        filters: Optional[Dict[str, Any]], alias: str = ""
+    ) -> Tuple[str, List[Any]]:
+        """``AND``-joined equality/IN predicates on indexed columns"""
+        prefix = f"{alias}." if alias else ""
+        clauses, params = [], []
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unsupported filter field: {field}")
+            if isinstance(value, (list, tuple, set)):
+                values = list(value)
+                clauses.append(f"{prefix}{field} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{prefix}{field} = ?")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    # -- documents --
+    @staticmethod
+    def _decode(row: Dict[str, Any]) -> Dict[str, Any]:
+        if isinstance(row.get("metadata"), str):
+            row["metadata"] = json.loads(row["metadata"]) if row["metadata"] else {}
+        return row
+
+    @staticmethod
+    def _encode(doc: Dict[str, Any]) -> Tuple[Any, ...]:
+        now = now_iso()
+        doc.setdefault("id", str(uuid.uuid4()))
+        doc.setdefault("doc_type", "general")
+        doc.setdefault("created_at", now)
+        doc.setdefault("updated_at", doc["created_at"])
+        values = {**doc, "metadata": json.dumps(doc.get("metadata") or {})}
+        return tuple(values.get(field) for field in DOCUMENT_FIELDS)
+
+    def add(self, doc: Dict[str, Any]) -> str:
+        """Insert or replace a document; returns its id"""
+        return self.add_many([doc])[0]
+
+    def add_many(self, docs: Iterable[Dict[str, Any]]) -> List[str]:
+        docs = [dict(doc) for doc in docs]
+        rows = [self._encode(doc) for doc in docs]
+        updates = ", ".join(f"{field} = excluded.{field}" for field in UPDATE_FIELDS)
+        self.executemany(
+            f"INSERT INTO rag_documents ({', '.join(DOCUMENT_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(DOCUMENT_FIELDS))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}",
+            rows,
+        )
+        return [doc["id"] for doc in docs]
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.query("SELECT * FROM rag_documents WHERE id = ?", (doc_id,))
+        return self._decode(rows[0]) if rows else None
+
+    def get_many(self, doc_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        docs = {}
+        doc_ids = list(doc_ids)
+        for start in range(0, len(doc_ids), IN_CHUNK):
+            chunk = doc_ids[start : start + IN_CHUNK]
+            for row in self.query(
+                f"SELECT * FROM rag_documents WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ):
+                docs[row["id"]] = self._decode(row)
+        return docs
+
+    def find(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        columns: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Documents matching filters, newest first"""
+        where, params = self.where(filters)
+        fields = ", ".join(columns) if columns else "*"
+        sql = f"SELECT {fields} FROM rag_documents"
+        if where:
+            sql += f" WHERE {where}"
+        sql += " ORDER BY created_at DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return [self._decode(row) for row in self.query(sql, params)]
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        where, params = self.where(filters)
+        sql = "SELECT COUNT(*) AS n FROM rag_documents"
+        if where:
+            sql += f" WHERE {where}"
+        return int(self.query(sql, params)[0]["n"])
+
+    def summary_by(
+        self, field: str, filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """{value: {"count", "last_updated"}} for an indexed column"""
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unsupported group field: {field}")
+        where, params = self.where(filters)
+        sql = (
+            f"SELECT {field} AS key, COUNT(*) AS n, MAX(updated_at) AS last_updated "
+            "FROM rag_documents"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" GROUP BY {field}"
+        return {
+            row["key"]: {"count": int(row["n"]), "last_updated": row["last_updated"]}
+            for row in self.query(sql, params)
+        }
+
+    def count_by(
+        self, field: str, filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, int]:
+        """{value: document count} for an indexed column"""
+        return {key: s["count"] for key, s in self.summary_by(field, filters).items()}
+
+    def filter_ids(
+        self, doc_ids: Sequence[str], filters: Optional[Dict[str, Any]]
+    ) -> set:
+        """Subset of doc_ids that match filters"""
+        where, params = self.where(filters)
+        if not where:
+            return set(doc_ids)
+        matched = set()
+        doc_ids = list(doc_ids)
+        for start in range(0, len(doc_ids), IN_CHUNK):
+            chunk = doc_ids[start : start + IN_CHUNK]
+            rows = self.query(
+                f"SELECT id FROM rag_documents WHERE id IN "
+                f"({', '.join('?' * len(chunk))}) AND {where}",
+                chunk + params,
+            )
+            matched.update(row["id"] for row in rows)
+        return matched
+
+    def update(self, doc_id: str, **fields) -> bool:
+        unknown = set(fields) - set(UPDATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported update fields: {sorted(unknown)}")
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if "metadata" in fields:
+            fields["metadata"] = json.dumps(fields["metadata"])
+        fields.setdefault("updated_at", now_iso())
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        return (
+            self.execute(
+                f"UPDATE rag_documents SET {assignments} WHERE id = ?",
+                list(fields.values()) + [doc_id],
+            )
+            > 0
+        )
+
+    def delete(self, doc_id: str) -> bool:
+        def _delete(cursor):
+            cursor.execute(self._sql("DELETE FROM rag_vectors WHERE doc_id = ?"), (doc_id,))
+            cursor.execute(self._sql("DELETE FROM rag_documents WHERE id = ?"), (doc_id,))
+            return cursor.rowcount > 0
+
+        return self._run(_delete)
+
+    # -- vectors --
+    def put_vectors(self, doc_id: str, vectors: np.ndarray) -> None:
+        """Replace a document's chunk vectors (float32 blobs)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        def _put(cursor):
+            cursor.execute(self._sql("DELETE FROM rag_vectors WHERE doc_id = ?"), (doc_id,))
+            cursor.executemany(
+                self._sql("INSERT INTO rag_vectors (doc_id, chunk, embedding) VALUES (?, ?, ?)"),
+                [(doc_id, i, vector.tobytes()) for i, vector in enumerate(vectors)],
+            )
+
+        self._run(_put)
+
+    def load_vectors(
+        self, filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc id per row, float32 matrix) for documents matching filters"""
+        where, params = self.where(filters, alias="d")
+        sql = (
+            "SELECT v.doc_id AS doc_id, v.embedding AS embedding FROM rag_vectors v "
+            "JOIN rag_documents d ON d.id = v.doc_id"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        rows = self.query(sql + " ORDER BY v.doc_id, v.chunk", params)
+        if not rows:
+            return np.array([], dtype=object), np.zeros((0, 0), dtype=np.float32)
+        ids = np.array([row["doc_id"] for row in rows], dtype=object)
+        matrix = np.vstack(
+            [np.frombuffer(bytes(row["embedding"]), dtype=np.float32) for row in rows]
+        )
+        return ids, matrix
+
+    def vector_doc_ids(self, filters: Optional[Dict[str, Any]] = None) -> Set[str]:
+        """Ids of documents matching filters that have stored vectors"""
+        where, params = self.where(filters, alias="d")
+        sql = (
+            "SELECT DISTINCT v.doc_id AS doc_id FROM rag_vectors v "
+            "JOIN rag_documents d ON d.id = v.doc_id"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        return {row["doc_id"] for row in self.query(sql, params)}
+
+    def ids_without_vectors(self, limit: int = 1000) -> List[str]:
+        rows = self.query(
+            "SELECT d.id AS id FROM rag_documents d "
+            "LEFT JOIN rag_vectors v ON v.doc_id = d.id AND v.chunk = 0 "
+            "WHERE v.doc_id IS NULL LIMIT ?",
+            (limit,),
+        )
+        return [row["id"] for row in rows]
+
+    # -- collections (domains, categories) --
+    def upsert_collection(
+        self,
+        collection_id: str,
+        kind: str,
+        name: str,
+        description: str = "",
+        config: Optional[Dict[str, Any]] = None,
+        overwrite: bool = True,
+    ) -> None:
+        conflict = (
+            "DO UPDATE SET kind = excluded.kind, name = excluded.name, "
+            "description = excluded.description, config = excluded.config"
+            if overwrite
+            else "DO NOTHING"
+        )
+        self.execute(
+            "INSERT INTO rag_collections (id, kind, name, description, config, created_at) "
+            f"VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) {conflict}",
+            (collection_id, kind, name, description, json.dumps(config or {}), now_iso()),
+        )
+
+    def collections(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM rag_collections"
+        params: List[Any] = []
+        if kind:
+            sql += " WHERE kind = ?"
+            params.append(kind)
+        rows = self.query(sql + " ORDER BY created_at DESC", params)
+        for row in rows:
+            row["config"] = json.loads(row["config"]) if row["config"] else {}
+        return rows
+
+    def collection(self, collection_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.query("SELECT * FROM rag_collections WHERE id = ?", (collection_id,))
+        if not rows:
+            return None
+        rows[0]["config"] = json.loads(rows[0]["config"]) if rows[0]["config"] else {}
+        return rows[0]
+
+    # -- chat history --
+    def add_chat_message(
+        self,
+        collection_id: str,
+        user_message: str,
+        assistant_response: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        message_id = str(uuid.uuid4())
+        self.execute(
+            "INSERT INTO rag_chat_history "
+            "(id, collection_id, user_message, assistant_response, timestamp, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                message_id,
+                collection_id,
+                user_message,
+                assistant_response,
+                now_iso(),
+                json.dumps(metadata or {}),
+            ),
+        )
+        return message_id
+
+    def chat_history(self, collection_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self.query(
+            "SELECT * FROM rag_chat_history WHERE collection_id = ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            (collection_id, limit),
+        )
+        return [self._decode(row) for row in rows]
+
+    # -- meta --
+    def get_meta(self, key: str) -> Optional[str]:
+        rows = self.query("SELECT value FROM rag_meta WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.execute(
+            "INSERT INTO rag_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+
+class SQLiteStore(DocumentStore):
+    """SQLite backend: one WAL connection per process, serialized by a lock"""
+
+    backend = "sqlite"
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA busy_timeout=5000",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    def __init__(self, db_path: str, migrate_legacy: bool = True):
+        self.db_path = db_path
+        super().__init__()
+        if migrate_legacy:
+            self.migrate_legacy()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def migrate_legacy(self) -> int:
+        """One-time copy of the per-service tables
+
+        documents/domains/categories, plus the functional service's
+        chat_history and embeddings tables.
+        """
+        if self.get_meta("legacy_migrated"):
+            return 0
+        tables = {
+            row["name"]
+            for row in self.query("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        migrated = 0
+
+        if "documents" in tables:
+            rows = self.query("SELECT * FROM documents")
+            docs = []
+            for row in rows:
+                doc = {
+                    LEGACY_DOCUMENT_COLUMNS[k]: v
+                    for k, v in row.items()
+                    if k in LEGACY_DOCUMENT_COLUMNS and v is not None
+                }
+                if isinstance(doc.get("metadata"), str):
+                    doc["metadata"] = json.loads(doc["metadata"] or "{}")
+                if row.get("vertex_metadata"):
+                    doc.setdefault("metadata", {})["_vertex"] = json.loads(row["vertex_metadata"])
+                for field in ("created_at", "updated_at"):
+                    if field in doc:  # CURRENT_TIMESTAMP -> ISO, so ordering stays lexical
+                        doc[field] = str(doc[field]).replace(" ", "T")
+                docs.append(doc)
+            self.add_many(docs)
+            migrated += len(docs)
+            # vertex-style JSON embeddings become chunk-0 vectors
+            for row in rows:
+                if row.get("vertex_embedding"):
+                    vector = np.asarray(json.loads(row["vertex_embedding"]), dtype=np.float32)
+                    self.put_vectors(row["id"], vector[None, :])
+
+        if "domains" in tables:
+            for row in self.query("SELECT * FROM domains"):
+                config = json.loads(row.get("vertex_config") or "{}")
+                self.upsert_collection(
+                    row["id"], row["domain_type"], row["name"],
+                    row.get("description") or "", config, overwrite=False,
+                )
+
+        if "categories" in tables:
+            for row in self.query("SELECT * FROM categories"):
+                config = {}
+                if row.get("subcategories"):
+                    config["subcategories"] = json.loads(row["subcategories"])
+                if row.get("display_name"):
+                    config["display_name"] = row["display_name"]
+                self.upsert_collection(
+                    row["name"], "category", row.get("display_name") or row["name"],
+                    row.get("description") or "", config, overwrite=False,
+                )
+
+        if "embeddings" in tables:
+            # JSON vectors per document, in insertion order -> chunk rows
+            chunks: Dict[str, List[Any]] = {}
+            for row in self.query("SELECT * FROM embeddings ORDER BY created_at, rowid"):
+                chunks.setdefault(row["document_id"], []).append(json.loads(row["embedding_vector"]))
+            known = set(self.get_many(list(chunks)))
+            for doc_id, vectors in chunks.items():
+                if doc_id in known:
+                    self.put_vectors(doc_id, np.asarray(vectors, dtype=np.float32))
+
+        if "chat_history" in tables:
+            self.executemany(
+                "INSERT INTO rag_chat_history "
+                "(id, collection_id, user_message, assistant_response, timestamp, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO NOTHING",
+                [
+                    (
+                        row["id"],
+                        row["domain_id"],
+                        row["user_message"],
+                        row["assistant_response"],
+                        str(row.get("timestamp") or now_iso()).replace(" ", "T"),
+                        row.get("metadata") or "{}",
+                    )
+                    for row in self.query("SELECT * FROM chat_history")
+                ],
+            )
+
+        self.set_meta("legacy_migrated", now_iso())
+        if migrated:
+            logger.info(f"✅ Migrated {migrated} legacy documents into {self.db_path}")
+        return migrated
+
+
+class PostgresStore(DocumentStore):
+    """Postgres backend (psycopg2)"""
+
+    backend = "postgres"
+    placeholder = "%s"
+    blob_type = "BYTEA"
+
+    def __init__(self, dsn: str):
+        if not HAS_PSYCOPG2:
+            raise ImportError("psycopg2 is required for PostgresStore")
+        self.dsn = dsn
+        super().__init__()
+
+    def _connect(self):
+        return psycopg2.connect(self.dsn)
+
+
+def open_store(url: str) -> DocumentStore:
+    """``postgresql://...`` -> PostgresStore, anything else is a SQLite path"""
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresStore(url)
+    return SQLiteStore(url)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+oPipe® Codec Microbenchmark
+===========================
+
+Times sanitize_str / encode_payload / decode_payload from opipe_gateway
+on the LARGE_PAYLOAD and SPECIAL_CHARACTERS test corpora, for every JSON
+backend that is installed, next to the previous per-call implementation
+(uuid4 trace id + INFO log per call, re-encoding for size checks,
+uncompiled regexes). Log records are formatted to /dev/null so their
+cost is counted without flooding the terminal.
+
+    python scripts/opipe_codec_bench.py --repeat 2000
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import unicodedata
+import uuid
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import opipe_gateway as gw  # noqa: E402
+
+logger = logging.getLogger("oPipe")
+
+
+# -- previous implementation, kept here as the baseline --
+def legacy_sanitize_str(input_str: str) -> str:
+    trace_id = str(uuid.uuid4())[:8]
+    start_time = time.time()
+    normalized = unicodedata.normalize("NFKC", input_str)
+    cleaned = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", normalized)
+    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    cleaned.encode("utf-8")
+    latency_ms = int((time.time() - start_time) * 1000)
+    logger.info(f"[{trace_id}] sanitize_str completed - latency: {latency_ms}ms")
+    return cleaned
+
+
+def legacy_encode_payload(obj: Dict[str, Any]) -> str:
+    trace_id = str(uuid.uuid4())[:8]
+    start_time = time.time()
+    json_str = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    if len(json_str.encode("utf-8")) > 10 * 1024 * 1024:
+        raise ValueError("Payload too large (>10MB)")
+    latency_ms = int((time.time() - start_time) * 1000)
+    payload_size = len(json_str.encode("utf-8"))
+    logger.info(
+        f"[{trace_id}] encode_payload completed - size: {payload_size}B, latency: {latency_ms}ms"
+    )
+    return json_str
+
+
+def legacy_decode_payload(txt: str) -> Dict[str, Any]:
+    trace_id = str(uuid.uuid4())[:8]
+    start_time = time.time()
+    if len(txt.encode("utf-8")) > 10 * 1024 * 1024:
+        raise ValueError("Payload too large (>10MB)")
+    obj = json.loads(txt)
+    latency_ms = int((time.time() - start_time) * 1000)
+    payload_size = len(txt.encode("utf-8"))
+    logger.info(
+        f"[{trace_id}] decode_payload completed - size: {payload_size}B, latency: {latency_ms}ms"
+    )
+    return obj
+
+
+def per_call_us(fn: Callable[[], Any], repeat: int) -> float:
+    fn()  # warm up
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return round(best * 1e6, 2)
+
+
+def bench(repeat: int, large_repeat: int) -> Dict[str, Dict[str, float]]:
+    large = gw.LARGE_PAYLOAD
+    large_txt = legacy_encode_payload(large)
+    strings = list(gw.SPECIAL_CHARACTERS.values())
+    # a typical small bridged request body
+    small = {"path": "/gpu/inference", "strings": gw.SPECIAL_CHARACTERS, "n": 42}
+    small_txt = legacy_encode_payload(small)
+
+    def cases(sanitize, encode, decode):
+        return {
+            "sanitize_special": per_call_us(lambda: [sanitize(s) for s in strings], repeat),
+            "encode_small": per_call_us(lambda: encode(small), repeat),
+            "decode_small": per_call_us(lambda: decode(small_txt), repeat),
+            "encode_large": per_call_us(lambda: encode(large), large_repeat),
+            "decode_large": per_call_us(lambda: decode(large_txt), large_repeat),
+        }
+
+    results = {"legacy": cases(legacy_sanitize_str, legacy_encode_payload, legacy_decode_payload)}
+    for backend in ("json", "orjson", "msgspec"):
+        selected = gw._select_json_backend(backend)
+        if selected[0] != backend:
+            continue  # not installed
+        gw.JSON_BACKEND, gw._json_dumps, gw._json_loads, gw._JSON_DECODE_ERRORS = selected
+        assert gw.encode_payload(small) == small_txt
+        assert gw.decode_payload(small_txt) == small
+        results[backend] = cases(gw.sanitize_str, gw.encode_payload, gw.decode_payload)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="oPipe codec microbenchmark")
+    parser.add_argument("--repeat", type=int, default=2000, help="iterations for small inputs")
+    parser.add_argument("--large-repeat", type=int, default=20, help="iterations for the 1MB payload")
+    parser.add_argument("--log-every", type=int, default=gw.OPIPE_LOG_EVERY,
+                        help="OPIPE_LOG_EVERY for the new codec (1 = log every call)")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.StreamHandler(open(os.devnull, "w")))
+    gw.OPIPE_LOG_EVERY = args.log_every
+
+    report = {
+        "unit": "us per call (sanitize_special: all 4 strings)",
+        "log_every": args.log_every,
+        "results": bench(args.repeat, args.large_repeat),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+CoolBits.ai WebSocket Hub Load Test
+===================================
+
+Starts a SessionHub behind a local uvicorn server, connects thousands of
+websocket clients spread over sessions (optionally a few that never
+read), publishes timestamped broadcasts and reports per-recipient and
+whole-broadcast latency percentiles.
+
+    python scripts/ws_hub_loadtest.py --clients 2000 --sessions 20 --messages 200
+
+Needs the `websockets` package; raise the open-files limit (ulimit -n)
+above the client count.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+import uvicorn
+import websockets
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from andy_ws_hub import SessionHub, SlowConsumerPolicy  # noqa: E402
+
+
+def build_app(hub: SessionHub) -> FastAPI:
+    app = FastAPI()
+
+    @app.websocket("/ws/{session_id}")
+    async def ws(websocket: WebSocket, session_id: str):
+        await hub.connect(websocket, session_id)
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            hub.disconnect(websocket, session_id)
+
+    return app
+
+
+class Server:
+    """uvicorn on a background thread; publish() runs on its loop"""
+
+    def __init__(self, hub: SessionHub, port: int):
+        config = uvicorn.Config(
+            build_app(hub), host="127.0.0.1", port=port, log_level="warning",
+            ws_max_queue=1024, backlog=8192,
+        )
+        self.server = uvicorn.Server(config)
+        self.hub = hub
+        self.loop: asyncio.AbstractEventLoop = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def publish(self, session_id: str, message: Dict) -> int:
+        return asyncio.run_coroutine_threadsafe(
+            self.hub.publish(session_id, message), self.loop
+        ).result()
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(max(values)), 3)}
+
+
+async def client(url: str, latencies: Dict[int, List[float]], ready: asyncio.Event,
+                 expected: int, slow: bool, counters: Dict[str, int]):
+    try:
+        async with websockets.connect(url, max_queue=None if not slow else 1,
+                                      open_timeout=60) as ws:
+            counters["connected"] += 1
+            if counters["connected"] == expected:
+                ready.set()
+            if slow:
+                await asyncio.sleep(3600)  # never read: the server-side queue fills
+            async for raw in ws:
+                frame = json.loads(raw)
+                if frame.get("type") == "stop":
+                    return
+                latencies[frame["seq"]].append(time.perf_counter() * 1000 - frame["sent_ms"])
+    except (websockets.ConnectionClosed, OSError):
+        counters["closed"] += 1
+
+
+async def run(args) -> Dict:
+    hub = SessionHub(queue_size=args.queue_size, policy=SlowConsumerPolicy(args.policy),
+                     send_timeout=args.send_timeout)
+    server = Server(hub, args.port)
+    server.start()
+
+    latencies: Dict[int, List[float]] = defaultdict(list)
+    counters = {"connected": 0, "closed": 0}
+    ready = asyncio.Event()
+    total = args.clients + args.slow_clients
+    tasks = []
+    for i in range(total):
+        url = f"ws://127.0.0.1:{args.port}/ws/s{i % args.sessions}"
+        tasks.append(asyncio.create_task(
+            client(url, latencies, ready, total, i >= args.clients, counters)))
+        if i % 200 == 199:
+            await asyncio.sleep(0.05)  # stay under the accept backlog
+    await asyncio.wait_for(ready.wait(), timeout=120)
+
+    loop = asyncio.get_running_loop()
+    interval = 1.0 / args.rate if args.rate else 0.0
+    payload = "x" * args.payload_bytes
+    started = time.perf_counter()
+    for seq in range(args.messages):
+        message = {"type": "message", "seq": seq, "sent_ms": time.perf_counter() * 1000,
+                   "content": payload}
+        await loop.run_in_executor(None, server.publish, f"s{seq % args.sessions}", message)
+        if interval:
+            await asyncio.sleep(interval)
+    await asyncio.sleep(args.drain_s)
+    elapsed = time.perf_counter() - started
+
+    per_recipient = [ms for values in latencies.values() for ms in values]
+    per_broadcast = [max(values) for values in latencies.values() if values]
+    for session in range(args.sessions):
+        await loop.run_in_executor(None, server.publish, f"s{session}", {"type": "stop"})
+    await asyncio.sleep(0.5)
+    for task in tasks:
+        task.cancel()
+    info = hub.info()
+    server.stop()
+
+    return {
+        "clients": args.clients,
+        "slow_clients": args.slow_clients,
+        "sessions": args.sessions,
+        "messages": args.messages,
+        "frames_delivered": len(per_recipient),
+        "frames_per_s": round(len(per_recipient) / elapsed, 1) if elapsed else 0.0,
+        "recipient_latency": percentiles(per_recipient),
+        "broadcast_latency": percentiles(per_broadcast),
+        "hub": info,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SessionHub websocket fan-out load test")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--slow-clients", type=int, default=0,
+                        help="extra clients that never read (exercise the slow-consumer policy)")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50.0, help="broadcasts per second (0: flat out)")
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--policy", default="disconnect", choices=[p.value for p in SlowConsumerPolicy])
+    parser.add_argument("--send-timeout", type=float, default=5.0)
+    parser.add_argument("--drain-s", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,18 +7,17 @@
 Date: September 6, 2025
 """
 
-import json
 import logging
-import sqlite3
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-import uuid
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 
+from rag_core import Retriever, SQLiteStore
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -50,275 +49,25 @@ class QueryRequest(BaseModel):
     max_results: int = 5
 
 
-# Database setup
-class SimpleRAGDatabase:
-    def __init__(self, db_path: str = "simple_rag.db"):
-        self.db_path = db_path
-        self.init_database()
-
-    def init_database(self):
-        """Initialize SQLite database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create documents table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS documents (
-                id TEXT PRIMARY KEY,
-                domain_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                doc_type TEXT DEFAULT 'general',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                metadata TEXT DEFAULT '{}'
-            )
-        """
-        )
-
-        # Create domains table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS domains (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                domain_type TEXT NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """
-        )
-
-        conn.commit()
-        conn.close()
-        logger.info("✅ Database initialized successfully")
-
-    def add_domain(
-        self, domain_id: str, name: str, domain_type: str, description: str = ""
-    ):
-        """Add a new domain"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO domains (id, name, domain_type, description)
-            VALUES (?, ?, ?, ?)
-        """,
-            (domain_id, name, domain_type, description),
-        )
-
-        conn.commit()
-        conn.close()
-
-    def get_domains(self) -> List[Dict[str, Any]]:
-        """Get all domains"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT d.id, d.name, d.domain_type, d.description, d.created_at,
-                   COUNT(doc.id) as doc_count
-            FROM domains d
-            LEFT JOIN documents doc ON d.id = doc.domain_id
-            GROUP BY d.id, d.name, d.domain_type, d.description, d.created_at
-            ORDER BY d.created_at DESC
-        """
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        domains = []
-        for row in rows:
-            domains.append(
-                {
-                    "domain_id": row[0],
-                    "domain_name": row[1],
-                    "domain_type": row[2],
-                    "description": row[3],
-                    "created_at": row[4],
-                    "documents_count": row[5],
-                    "status": "active",
-                }
-            )
-
-        return domains
-
-    def add_document(self, doc: Document) -> str:
-        """Add document to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+def to_document(row: Dict[str, Any]) -> Document:
+    return Document(
+        id=row["id"],
+        domain_id=row["domain"],
+        title=row["title"],
+        content=row["content"],
+        doc_type=row["doc_type"] or "general",
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+        metadata=row["metadata"],
+    )
 
-        cursor.execute(
-            """
-            INSERT INTO documents (id, domain_id, title, content, doc_type, metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
-            (
-                doc.id,
-                doc.domain_id,
-                doc.title,
-                doc.content,
-                doc.doc_type,
-                json.dumps(doc.metadata),
-            ),
-        )
-
-        conn.commit()
-        conn.close()
-        return doc.id
-
-    def get_documents(self, domain_id: str) -> List[Document]:
-        """Get all documents for a domain"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, domain_id, title, content, doc_type, created_at, updated_at, metadata
-            FROM documents WHERE domain_id = ?
-            ORDER BY created_at DESC
-        """,
-            (domain_id,),
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        documents = []
-        for row in rows:
-            doc = Document(
-                id=row[0],
-                domain_id=row[1],
-                title=row[2],
-                content=row[3],
-                doc_type=row[4],
-                created_at=datetime.fromisoformat(row[5]),
-                updated_at=datetime.fromisoformat(row[6]),
-                metadata=json.loads(row[7]) if row[7] else {},
-            )
-            documents.append(doc)
-
-        return documents
-
-    def get_document(self, doc_id: str) -> Optional[Document]:
-        """Get specific document"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, domain_id, title, content, doc_type, created_at, updated_at, metadata
-            FROM documents WHERE id = ?
-        """,
-            (doc_id,),
-        )
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            return Document(
-                id=row[0],
-                domain_id=row[1],
-                title=row[2],
-                content=row[3],
-                doc_type=row[4],
-                created_at=datetime.fromisoformat(row[5]),
-                updated_at=datetime.fromisoformat(row[6]),
-                metadata=json.loads(row[7]) if row[7] else {},
-            )
-        return None
-
-    def update_document(
-        self, doc_id: str, title: str, content: str, doc_type: str = None
-    ) -> bool:
-        """Update document"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        if doc_type:
-            cursor.execute(
-                """
-                UPDATE documents 
-                SET title = ?, content = ?, doc_type = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """,
-                (title, content, doc_type, doc_id),
-            )
-        else:
-            cursor.execute(
-                """
-                UPDATE documents 
-                SET title = ?, content = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """,
-                (title, content, doc_id),
-            )
 
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return success
-
-    def delete_document(self, doc_id: str) -> bool:
-        """Delete document"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-        success = cursor.rowcount > 0
-
-        conn.commit()
-        conn.close()
-        return success
-
-    def search_documents(
-        self, domain_id: str, query: str, max_results: int = 5
-    ) -> List[Dict[str, Any]]:
-        """Search documents using text matching"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, title, content, doc_type, created_at, updated_at
-            FROM documents 
-            WHERE domain_id = ? AND (
-                title LIKE ? OR content LIKE ?
-            )
-            ORDER BY created_at DESC
-        """,
-            (domain_id, f"%{query}%", f"%{query}%"),
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        results = []
-        for row in rows:
-            results.append(
-                {
-                    "document_id": row[0],
-                    "title": row[1],
-                    "content": row[2][:200] + "..." if len(row[2]) > 200 else row[2],
-                    "doc_type": row[3],
-                    "created_at": row[4],
-                    "updated_at": row[5],
-                    "relevance_score": 1.0,  # Simple matching
-                }
-            )
-
-        return results[:max_results]
-
-
-# Global RAG manager
+# Global RAG manager (storage and search from rag_core)
 class SimpleRAGManager:
-    def __init__(self):
-        self.db = SimpleRAGDatabase()
+    def __init__(self, db_path: str = "simple_rag.db"):
+        self.db_path = db_path
+        self.store = SQLiteStore(db_path)
+        self.retriever = Retriever(self.store)
         self.init_test_domains()
 
     def init_test_domains(self):
@@ -357,7 +106,7 @@ def init_test_domains(self):
         ]
 
         for domain_id, name, domain_type, description in test_domains:
-            self.db.add_domain(domain_id, name, domain_type, description)
+            self.store.upsert_collection(domain_id, domain_type, name, description)
 
         logger.info(f"✅ Initialized {len(test_domains)} test domains")
 
@@ -365,45 +114,81 @@ def add_document(
         self, domain_id: str, title: str, content: str, doc_type: str = "general"
     ) -> str:
         """Add document to domain"""
-        doc_id = str(uuid.uuid4())
-        doc = Document(
-            id=doc_id,
-            domain_id=domain_id,
-            title=title,
-            content=content,
-            doc_type=doc_type,
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            metadata={"source": "admin_panel", "added_by": "user"},
+        doc_id = self.retriever.add(
+            {
+                "domain": domain_id,
+                "title": title,
+                "content": content,
+                "doc_type": doc_type,
+                "metadata": {"source": "admin_panel", "added_by": "user"},
+            }
         )
-
-        doc_id = self.db.add_document(doc)
         logger.info(f"✅ Added document '{title}' to domain {domain_id}")
         return doc_id
 
-    def get_documents(self, domain_id: str) -> List[Document]:
+    def get_documents(self, domain_id: str, limit: Optional[int] = None) -> List[Document]:
         """Get documents for domain"""
-        return self.db.get_documents(domain_id)
+        return [to_document(row) for row in self.store.find({"domain": domain_id}, limit=limit)]
+
+    def count_documents(self, domain_id: str) -> int:
+        return self.store.count({"domain": domain_id})
 
     def update_document(
         self, doc_id: str, title: str, content: str, doc_type: str = None
     ) -> bool:
         """Update document"""
-        return self.db.update_document(doc_id, title, content, doc_type)
+        return self.retriever.update(doc_id, title=title, content=content, doc_type=doc_type)
 
     def delete_document(self, doc_id: str) -> bool:
         """Delete document"""
-        return self.db.delete_document(doc_id)
+        return self.retriever.delete(doc_id)
 
     def search_documents(
         self, domain_id: str, query: str, max_results: int = 5
     ) -> List[Dict[str, Any]]:
-        """Search documents"""
-        return self.db.search_documents(domain_id, query, max_results)
+        """Full-text search within a domain"""
+        results = []
+        for hit in self.retriever.search(query, k=max_results, filters={"domain": domain_id}):
+            content = hit["content"]
+            results.append(
+                {
+                    "document_id": hit["id"],
+                    "title": hit["title"],
+                    "content": content[:200] + "..." if len(content) > 200 else content,
+                    "doc_type": hit["doc_type"],
+                    "created_at": hit["created_at"],
+                    "updated_at": hit["updated_at"],
+                    "relevance_score": hit["score"],
+                }
+            )
+        return results
+
+    def get_domain(self, domain_id: str) -> Optional[Dict[str, Any]]:
+        """Get one domain"""
+        collection = self.store.collection(domain_id)
+        if not collection:
+            return None
+        return self._domain_info(collection, self.count_documents(domain_id))
 
     def get_domains(self) -> List[Dict[str, Any]]:
         """Get all domains"""
-        return self.db.get_domains()
+        counts = self.store.count_by("domain")
+        return [
+            self._domain_info(collection, counts.get(collection["id"], 0))
+            for collection in self.store.collections()
+        ]
+
+    @staticmethod
+    def _domain_info(collection: Dict[str, Any], documents_count: int) -> Dict[str, Any]:
+        return {
+            "domain_id": collection["id"],
+            "domain_name": collection["name"],
+            "domain_type": collection["kind"],
+            "description": collection["description"],
+            "created_at": collection["created_at"],
+            "documents_count": documents_count,
+            "status": "active",
+        }
 
 
 # Initialize RAG manager
@@ -435,7 +220,7 @@ async def health_check():
         "service": "CoolBits.ai Simple Functional RAG System",
         "version": "1.0.0",
         "domains_count": len(domains),
-        "database_path": "simple_rag.db",
+        "database_path": rag_manager.db_path,
         "timestamp": datetime.now().isoformat(),
     }
 
@@ -450,8 +235,7 @@ async def list_domains():
 @app.get("/domains/{domain_id}")
 async def get_domain(domain_id: str):
     """Get specific domain information"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -462,8 +246,7 @@ async def get_domain(domain_id: str):
 @app.get("/domains/{domain_id}/documents")
 async def get_domain_documents(domain_id: str):
     """Get all documents for a domain"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -492,8 +275,7 @@ async def get_domain_documents(domain_id: str):
 @app.post("/domains/{domain_id}/add-document")
 async def add_document(domain_id: str, request: DocumentRequest):
     """Add a new document to a domain"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -510,7 +292,7 @@ async def add_document(domain_id: str, request: DocumentRequest):
             "status": "success",
             "message": f"Document added to {domain['domain_name']}",
             "document_id": doc_id,
-            "total_documents": len(rag_manager.get_documents(domain_id)),
+            "total_documents": rag_manager.count_documents(domain_id),
         }
 
     except Exception as e:
@@ -566,8 +348,7 @@ async def delete_document(doc_id: str):
 @app.post("/domains/{domain_id}/search")
 async def search_documents(domain_id: str, request: QueryRequest):
     """Search documents in a domain"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -1,14 +1,220 @@
+"""
+SLO monitoring for CoolBits.ai
+
+Requests are recorded in memory into time-slotted ring buffers (5m, 1h
+and 30d). Each slot counts requests, 5xx errors and requests slower than
+the latency target, and the short windows also keep a fixed-size
+log-bucketed latency sketch for p95. Recording is O(1) with no file I/O,
+so it can run in request middleware:
+
+    monitor = SLOMonitor()
+    monitor.record_response_time(elapsed_ms, response.status_code)
+
+State is checkpointed atomically every SLO_CHECKPOINT_S seconds to one
+shard file per process in SLO_STATE_DIR. Reads with ``aggregate=True``
+merge every shard, so several workers (and restarts) add up to one
+error budget without sharing a file.
+"""
+
 import json
-import statistics
-from datetime import datetime, timedelta
-from collections import deque
+import math
+import os
+import socket
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Environment variables
+SLO_STATE_DIR = os.getenv("SLO_STATE_DIR", "slo_state")
+SLO_CHECKPOINT_S = float(os.getenv("SLO_CHECKPOINT_S", "60"))
+
+# name -> (span seconds, slots, keeps a latency sketch)
+WINDOWS = {
+    "5m": (300, 30, True),
+    "1h": (3600, 60, True),
+    "30d": (30 * 86400, 720, False),
+}
+
+# Multi-window, multi-burn-rate alerts: fire when both windows burn the
+# budget faster than burn_rate (1.0 = exactly on budget for 30 days)
+BURN_RATE_ALERTS = [
+    {"name": "fast_burn", "severity": "page", "long": 3600, "short": 300, "burn_rate": 14.4},
+    {"name": "medium_burn", "severity": "page", "long": 6 * 3600, "short": 1800, "burn_rate": 6.0},
+    {"name": "slow_burn", "severity": "ticket", "long": 3 * 86400, "short": 6 * 3600, "burn_rate": 1.0},
+]
+
+
+class QuantileSketch:
+    """Latency histogram with log-spaced buckets: fixed memory, ~2% relative error"""
+
+    MIN_MS = 0.1
+    MAX_MS = 600_000.0
+    GAMMA = 1.04
+    _LOG_GAMMA = math.log(GAMMA)
+    SIZE = int(math.ceil(math.log(MAX_MS / MIN_MS) / _LOG_GAMMA)) + 1
+    _ZEROS = array("Q", bytes(8 * SIZE))
+
+    def __init__(self):
+        self.counts = array("Q", self._ZEROS)
+        self.total = 0
+
+    @classmethod
+    def bucket(cls, value_ms: float) -> int:
+        if value_ms <= cls.MIN_MS:
+            return 0
+        return min(int(math.log(value_ms / cls.MIN_MS) / cls._LOG_GAMMA), cls.SIZE - 1)
+
+    def add(self, value_ms: float) -> None:
+        self.add_bucket(self.bucket(value_ms))
+
+    def add_bucket(self, index: int) -> None:
+        self.counts[index] += 1
+        self.total += 1
+
+    def discard(self, value_ms: float) -> None:
+        """Remove a previously added value (sliding windows over raw values)"""
+        index = self.bucket(value_ms)
+        if self.counts[index]:
+            self.counts[index] -= 1
+            self.total -= 1
+
+    def clear(self) -> None:
+        if self.total:
+            self.counts[:] = self._ZEROS
+            self.total = 0
+
+    def merge(self, other: "QuantileSketch") -> None:
+        counts = self.counts
+        for i, count in enumerate(other.counts):
+            if count:
+                counts[i] += count
+        self.total += other.total
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        rank = q * (self.total - 1)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                # geometric midpoint of the bucket
+                return self.MIN_MS * self.GAMMA ** (i + 0.5) if i else self.MIN_MS
+        return self.MAX_MS
+
+    def to_sparse(self) -> Dict[str, int]:
+        return {str(i): c for i, c in enumerate(self.counts) if c}
+
+    def merge_sparse(self, sparse: Dict[str, int]) -> None:
+        for i, count in sparse.items():
+            self.counts[int(i)] += count
+            self.total += count
+
+
+class _Slot:
+    __slots__ = ("epoch", "requests", "errors", "slow", "sketch")
+
+    def __init__(self, sketch: bool):
+        self.epoch = -1
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+        self.sketch = QuantileSketch() if sketch else None
+
+    def reset(self, epoch: int) -> None:
+        self.epoch = epoch
+        self.requests = self.errors = self.slow = 0
+        if self.sketch is not None:
+            self.sketch.clear()
+
+
+class RollingWindow:
+    """Ring of fixed time slots; slots are reused in place as time moves on"""
+
+    def __init__(self, span_s: float, slots: int, sketch: bool = False):
+        self.span_s = span_s
+        self.slot_s = span_s / slots
+        self.ring = [_Slot(sketch) for _ in range(slots)]
+
+    def record(self, now: float, bucket: int, error: bool, slow: bool) -> None:
+        """Count one request; ``bucket`` is QuantileSketch.bucket(latency)"""
+        epoch = int(now // self.slot_s)
+        slot = self.ring[epoch % len(self.ring)]
+        if slot.epoch != epoch:
+            slot.reset(epoch)
+        slot.requests += 1
+        if error:
+            slot.errors += 1
+        if slow:
+            slot.slow += 1
+        if slot.sketch is not None:
+            slot.sketch.add_bucket(bucket)
+
+    def _live(self, now: float, span_s: Optional[float]):
+        current = int(now // self.slot_s)
+        count = len(self.ring) if span_s is None else max(1, math.ceil(span_s / self.slot_s))
+        oldest = current - min(count, len(self.ring)) + 1
+        return [s for s in self.ring if oldest <= s.epoch <= current]
+
+    def totals(self, now: float, span_s: Optional[float] = None) -> Tuple[int, int, int]:
+        """(requests, errors, slow) over the trailing span (whole window when None)"""
+        requests = errors = slow = 0
+        for slot in self._live(now, span_s):
+            requests += slot.requests
+            errors += slot.errors
+            slow += slot.slow
+        return requests, errors, slow
+
+    def sketch(self, now: float, span_s: Optional[float] = None) -> QuantileSketch:
+        merged = QuantileSketch()
+        for slot in self._live(now, span_s):
+            if slot.sketch is not None and slot.sketch.total:
+                merged.merge(slot.sketch)
+        return merged
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "span_s": self.span_s,
+            "slots": [
+                [s.epoch, s.requests, s.errors, s.slow,
+                 s.sketch.to_sparse() if s.sketch is not None else None]
+                for s in self.ring if s.requests
+            ],
+        }
+
+    def merge_state(self, state: Dict[str, Any]) -> None:
+        """Add another process's slots (same layout) into this ring"""
+        for epoch, requests, errors, slow, sparse in state.get("slots", []):
+            slot = self.ring[epoch % len(self.ring)]
+            if slot.epoch > epoch:
+                continue  # already rotated past it
+            if slot.epoch < epoch:
+                slot.reset(epoch)
+            slot.requests += requests
+            slot.errors += errors
+            slot.slow += slow
+            if slot.sketch is not None and sparse:
+                slot.sketch.merge_sparse(sparse)
+
+
+def _new_windows() -> Dict[str, RollingWindow]:
+    return {name: RollingWindow(*spec) for name, spec in WINDOWS.items()}
+
+
+def _window_for(windows: Dict[str, RollingWindow], span_s: float) -> RollingWindow:
+    """Finest window that covers span_s"""
+    return min((w for w in windows.values() if w.span_s >= span_s), key=lambda w: w.span_s)
 
 
 class SLOMonitor:
     """SLO monitoring for CoolBits.ai."""
 
-    def __init__(self):
+    def __init__(self, state_dir: Optional[str] = SLO_STATE_DIR,
+                 checkpoint_s: float = SLO_CHECKPOINT_S, clock=time.time):
         self.slo_definitions = {
             "response_time_p95": {
                 "target": 400,  # milliseconds
@@ -26,105 +232,112 @@ def __init__(self):
                 "window": "30d",
             },
         }
+        self.min_requests = 10
 
-        self.metrics_buffer = deque(maxlen=1000)  # Keep last 1000 measurements
-        self.error_budget_file = "error_budget.json"
+        self.windows = _new_windows()
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state_dir = Path(state_dir) if state_dir else None
+        self.checkpoint_s = checkpoint_s
+        self.shard_name = f"{socket.gethostname()}-{os.getpid()}.json"
+        self._next_checkpoint = clock() + checkpoint_s
+        self._latency_target = self.slo_definitions["response_time_p95"]["target"]
 
     def record_response_time(self, response_time_ms: float, status_code: int):
-        """Record response time and status code."""
-        metric = {
-            "timestamp": datetime.now().isoformat(),
-            "response_time_ms": response_time_ms,
-            "status_code": status_code,
-            "is_5xx": status_code >= 500,
-        }
-
-        self.metrics_buffer.append(metric)
-
-        # Update error budget
-        self._update_error_budget(metric)
-
-    def _update_error_budget(self, metric):
-        """Update monthly error budget."""
+        """Record response time and status code (O(1), no I/O)."""
+        now = self.clock()
+        error = status_code >= 500
+        slow = response_time_ms > self._latency_target
+        bucket = QuantileSketch.bucket(response_time_ms)
+        with self.lock:
+            for window in self.windows.values():
+                window.record(now, bucket, error, slow)
+            due = self.state_dir is not None and now >= self._next_checkpoint
+            if due:
+                self._next_checkpoint = now + self.checkpoint_s
+        if due:
+            threading.Thread(target=self.checkpoint, daemon=True).start()
+
+    # -- persistence --
+    def checkpoint(self) -> Optional[Path]:
+        """Atomically write this process's window state to its shard file"""
+        if self.state_dir is None:
+            return None
+        with self.lock:
+            state = {
+                "updated": self.clock(),
+                "windows": {name: w.state() for name, w in self.windows.items()},
+            }
         try:
-            if Path(self.error_budget_file).exists():
-                with open(self.error_budget_file, "r") as f:
-                    budget_data = json.load(f)
-            else:
-                budget_data = {
-                    "monthly_requests": 0,
-                    "monthly_errors": 0,
-                    "start_date": datetime.now().isoformat(),
-                }
-
-            budget_data["monthly_requests"] += 1
-            if metric["is_5xx"]:
-                budget_data["monthly_errors"] += 1
-
-            # Calculate error rate
-            if budget_data["monthly_requests"] > 0:
-                budget_data["error_rate"] = (
-                    budget_data["monthly_errors"] / budget_data["monthly_requests"]
-                ) * 100
-
-            with open(self.error_budget_file, "w") as f:
-                json.dump(budget_data, f, indent=2)
-
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.state_dir, prefix=".slo-", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f, separators=(",", ":"))
+            path = self.state_dir / self.shard_name
+            os.replace(tmp, path)
+            return path
         except Exception as e:
-            print(f"❌ Error budget update failed: {e}")
-
-    def check_slo_response_time(self):
+            print(f"❌ SLO checkpoint failed: {e}")
+            return None
+
+    def _view(self, aggregate: bool) -> Dict[str, RollingWindow]:
+        """Live windows, or a merge of them with every other process's shard"""
+        if not aggregate or self.state_dir is None or not self.state_dir.exists():
+            return self.windows
+        view = _new_windows()
+        with self.lock:
+            for name, window in self.windows.items():
+                view[name].merge_state(window.state())
+        stale_before = self.clock() - WINDOWS["30d"][0]
+        for path in self.state_dir.glob("*.json"):
+            if path.name == self.shard_name:
+                continue
+            try:
+                if path.stat().st_mtime < stale_before:
+                    path.unlink()  # nothing left inside any window
+                    continue
+                shard = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue  # being replaced or removed; pick it up next time
+            for name, state in shard.get("windows", {}).items():
+                if name in view and state.get("span_s") == view[name].span_s:
+                    view[name].merge_state(state)
+        return view
+
+    # -- checks --
+    def check_slo_response_time(self, aggregate: bool = False):
         """Check response time SLO."""
-        if len(self.metrics_buffer) < 10:
-            return {"status": "insufficient_data", "slo": "response_time_p95"}
-
-        # Get last 5 minutes of data
-        cutoff_time = datetime.now() - timedelta(minutes=5)
-        recent_metrics = [
-            m
-            for m in self.metrics_buffer
-            if datetime.fromisoformat(m["timestamp"]) > cutoff_time
-        ]
+        now = self.clock()
+        view = self._view(aggregate)
+        with self.lock:
+            sketch = view["5m"].sketch(now)
 
-        if not recent_metrics:
+        if sketch.total < self.min_requests:
             return {"status": "insufficient_data", "slo": "response_time_p95"}
 
-        response_times = [m["response_time_ms"] for m in recent_metrics]
-        p95_response_time = statistics.quantiles(response_times, n=20)[
-            18
-        ]  # 95th percentile
-
+        p95_response_time = sketch.quantile(0.95)
         target = self.slo_definitions["response_time_p95"]["target"]
         slo_met = p95_response_time <= target
 
         return {
             "status": "met" if slo_met else "violated",
             "slo": "response_time_p95",
-            "current": p95_response_time,
+            "current": round(p95_response_time, 1),
             "target": target,
-            "measurements": len(recent_metrics),
+            "measurements": sketch.total,
         }
 
-    def check_slo_error_rate(self):
+    def check_slo_error_rate(self, aggregate: bool = False):
         """Check error rate SLO."""
-        if len(self.metrics_buffer) < 10:
-            return {"status": "insufficient_data", "slo": "error_rate_5xx"}
+        now = self.clock()
+        view = self._view(aggregate)
+        with self.lock:
+            total_requests, error_requests, _ = view["5m"].totals(now)
 
-        # Get last 5 minutes of data
-        cutoff_time = datetime.now() - timedelta(minutes=5)
-        recent_metrics = [
-            m
-            for m in self.metrics_buffer
-            if datetime.fromisoformat(m["timestamp"]) > cutoff_time
-        ]
-
-        if not recent_metrics:
+        if total_requests < self.min_requests:
             return {"status": "insufficient_data", "slo": "error_rate_5xx"}
 
-        total_requests = len(recent_metrics)
-        error_requests = sum(1 for m in recent_metrics if m["is_5xx"])
         error_rate = (error_requests / total_requests) * 100
-
         target = self.slo_definitions["error_rate_5xx"]["target"]
         slo_met = error_rate <= target
 
@@ -137,41 +350,71 @@ def check_slo_error_rate(self):
             "error_requests": error_requests,
         }
 
-    def check_slo_error_budget(self):
-        """Check monthly error budget SLO."""
-        try:
-            if not Path(self.error_budget_file).exists():
-                return {"status": "insufficient_data", "slo": "error_budget_monthly"}
-
-            with open(self.error_budget_file, "r") as f:
-                budget_data = json.load(f)
-
-            if "error_rate" not in budget_data:
-                return {"status": "insufficient_data", "slo": "error_budget_monthly"}
-
-            current_error_rate = budget_data["error_rate"]
-            target = self.slo_definitions["error_budget_monthly"]["target"]
-            slo_met = current_error_rate <= target
-
-            return {
-                "status": "met" if slo_met else "violated",
-                "slo": "error_budget_monthly",
-                "current": current_error_rate,
-                "target": target,
-                "monthly_requests": budget_data.get("monthly_requests", 0),
-                "monthly_errors": budget_data.get("monthly_errors", 0),
-            }
+    def check_slo_error_budget(self, aggregate: bool = True):
+        """Check the 30-day error budget SLO (all processes by default)."""
+        now = self.clock()
+        view = self._view(aggregate)
+        with self.lock:
+            requests, errors, _ = view["30d"].totals(now)
 
-        except Exception as e:
-            return {"status": "error", "slo": "error_budget_monthly", "error": str(e)}
+        if requests == 0:
+            return {"status": "insufficient_data", "slo": "error_budget_monthly"}
 
-    def check_all_slos(self):
+        current_error_rate = errors / requests * 100
+        target = self.slo_definitions["error_budget_monthly"]["target"]
+        slo_met = current_error_rate <= target
+
+        return {
+            "status": "met" if slo_met else "violated",
+            "slo": "error_budget_monthly",
+            "current": current_error_rate,
+            "target": target,
+            "monthly_requests": requests,
+            "monthly_errors": errors,
+            "budget_remaining": 1 - current_error_rate / target if target else 0.0,
+        }
+
+    def check_burn_rates(self, aggregate: bool = False):
+        """Multi-window burn-rate alerts for the availability and latency SLIs."""
+        now = self.clock()
+        view = self._view(aggregate)
+        budgets = {
+            # SLI -> (index in totals(), allowed bad fraction)
+            "availability": (1, self.slo_definitions["error_rate_5xx"]["target"] / 100),
+            "latency": (2, 0.05),  # p95 <= target means <= 5% slower than target
+        }
+
+        def burn(span_s: float, index: int, budget: float) -> float:
+            totals = _window_for(view, span_s).totals(now, span_s)
+            return totals[index] / totals[0] / budget if totals[0] else 0.0
+
+        alerts = []
+        with self.lock:
+            for sli, (index, budget) in budgets.items():
+                for rule in BURN_RATE_ALERTS:
+                    long_burn = burn(rule["long"], index, budget)
+                    short_burn = burn(rule["short"], index, budget)
+                    alerts.append({
+                        "name": rule["name"],
+                        "sli": sli,
+                        "severity": rule["severity"],
+                        "firing": long_burn >= rule["burn_rate"] and short_burn >= rule["burn_rate"],
+                        "burn_rate": rule["burn_rate"],
+                        "long_burn": round(long_burn, 2),
+                        "short_burn": round(short_burn, 2),
+                    })
+        return alerts
+
+    def check_all_slos(self, aggregate: bool = False):
         """Check all SLOs."""
         slo_results = {"timestamp": datetime.now().isoformat(), "slos": {}}
 
-        slo_results["slos"]["response_time_p95"] = self.check_slo_response_time()
-        slo_results["slos"]["error_rate_5xx"] = self.check_slo_error_rate()
+        slo_results["slos"]["response_time_p95"] = self.check_slo_response_time(aggregate)
+        slo_results["slos"]["error_rate_5xx"] = self.check_slo_error_rate(aggregate)
         slo_results["slos"]["error_budget_monthly"] = self.check_slo_error_budget()
+        slo_results["burn_rate_alerts"] = [
+            a for a in self.check_burn_rates(aggregate) if a["firing"]
+        ]
 
         # Overall SLO status
         all_met = all(
@@ -204,6 +447,8 @@ def generate_slo_report(self):
         status_code = 200 if i < 95 else 500  # 5% errors
         monitor.record_response_time(response_time, status_code)
 
+    monitor.checkpoint()
+
     # Generate report
     report = monitor.generate_slo_report()
     print(json.dumps(report, indent=2))
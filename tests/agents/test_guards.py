@@ -14,6 +14,11 @@
     AgentState,
     guard_tool_call,
     ensure_final_output,
+    BarrierTimeout,
+    GuardRegistry,
+    conversation_guard,
+    GuardConfig,
+    PRODUCTION_CONFIG,
 )
 
 
@@ -242,5 +247,124 @@ async def generate_response(context="test"):
         assert result == "final_response"
 
 
+class TestConversationIsolation:
+    """Test per-conversation guards"""
+
+    def test_conversations_do_not_share_budget(self):
+        """Budget exhausted in one conversation does not affect another"""
+        guards = GuardRegistry(factory=lambda: MultiAgentGuard(max_calls=1))
+
+        with conversation_guard("conv-a", guards):
+            assert get_guard().allow_tool_call("search", "q1", {}, "parent")
+            assert not get_guard().allow_tool_call("search", "q2", {}, "parent")
+
+        with conversation_guard("conv-b", guards):
+            assert get_guard().allow_tool_call("search", "q1", {}, "parent")
+
+        # Outside any conversation the global guard is used
+        assert get_guard() is not guards.get("conv-a")
+
+    def test_context_inherited_by_tasks(self):
+        """Subagent tasks see their conversation's guard"""
+        guards = GuardRegistry()
+
+        async def subagent():
+            return get_guard()
+
+        async def conversation(conv_id):
+            with conversation_guard(conv_id, guards) as conv_guard:
+                seen = await asyncio.gather(subagent(), subagent())
+                return conv_guard, seen
+
+        async def main():
+            return await asyncio.gather(conversation("a"), conversation("b"))
+
+        (guard_a, seen_a), (guard_b, seen_b) = asyncio.run(main())
+        assert guard_a is not guard_b
+        assert all(g is guard_a for g in seen_a)
+        assert all(g is guard_b for g in seen_b)
+
+    def test_registry_bounded(self):
+        """Registry evicts least recently used conversations"""
+        guards = GuardRegistry(max_conversations=3)
+        first = guards.get("c0")
+        for i in range(1, 10):
+            guards.get(f"c{i}")
+        assert len(guards) == 3
+        assert guards.get("c0") is not first
+
+
+class TestGuardConfig:
+    """Guards built from GuardConfig"""
+
+    def test_from_config_applies_tool_overrides_and_circuit(self):
+        """Per-tool limits and circuit thresholds come from the config"""
+        config = GuardConfig(
+            max_calls_per_tool=4,
+            max_iterations=100,
+            max_failures=1,
+            tool_overrides={"search": {"max_calls": 2}},
+        )
+        guard = MultiAgentGuard.from_config(config)
+
+        assert [guard.allow_tool_call("search", f"q{i}") for i in range(3)] == [True, True, False]
+        assert [guard.allow_tool_call("other", f"o{i}") for i in range(5)] == [True] * 4 + [False]
+
+        guard.record_tool_failure("flaky")
+        assert not guard.allow_tool_call("flaky", "f")
+
+    def test_registry_guards_follow_the_environment(self, monkeypatch):
+        """Conversation guards use the CB_ENVIRONMENT config by default"""
+        monkeypatch.setenv("CB_ENVIRONMENT", "production")
+        guard = GuardRegistry().get("conv")
+        assert guard.max_calls == PRODUCTION_CONFIG.max_calls_per_tool
+        assert guard.max_depth == PRODUCTION_CONFIG.max_depth
+        assert guard.tool_limits["search"]["max_calls"] == 3
+
+
+class TestDedupCache:
+    """Test heap-ordered dedup cache"""
+
+    def test_expired_entries_are_dropped(self):
+        """Expired hashes do not accumulate"""
+        guard = MultiAgentGuard(max_calls=1000, max_iterations=1000)
+        guard.dedup_window = 0
+        for i in range(100):
+            assert guard.allow_tool_call("tool", f"p{i}", {}, "parent")
+        guard._is_duplicate_call("x")
+        assert len(guard.recent_calls) == 0
+
+
+class TestBarrierPartialResults:
+    """Test straggler cancellation at the barrier"""
+
+    def test_stragglers_cancelled_partial_kept(self):
+        """Finished results survive a barrier timeout"""
+        guard = MultiAgentGuard()
+        cancelled = []
+
+        async def fast():
+            return "fast_result"
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def main():
+            with pytest.raises(BarrierTimeout) as exc:
+                await guard.run_subagents_with_barrier([fast(), slow()], timeout=0.1)
+            return exc.value
+
+        err = asyncio.run(main())
+        assert err.results[0] == "fast_result"
+        assert isinstance(err.results[1], asyncio.TimeoutError)
+        assert guard.last_barrier_results == err.results
+        assert cancelled == [True]
+        assert guard.state == AgentState.FINAL
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
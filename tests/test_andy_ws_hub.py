@@ -0,0 +1,142 @@
+# tests/test_andy_ws_hub.py
+import asyncio
+
+import pytest
+
+from andy_ws_hub import CLOSE_TRY_AGAIN_LATER, SessionHub, SlowConsumerPolicy
+
+
+class FakeSocket:
+    """Records frames; send_text blocks while `gate` is clear"""
+
+    def __init__(self, name="ws", fail=False):
+        self.name = name
+        self.fail = fail
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.sent = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame):
+        await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("connection reset")
+        self.sent.append(frame)
+
+    async def close(self, code=1000, reason=""):
+        self.closed = (code, reason)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_fan_out_is_per_session_and_shares_the_frame():
+    async def run():
+        hub = SessionHub(queue_size=8)
+        a, b, other = FakeSocket("a"), FakeSocket("b"), FakeSocket("other")
+        await hub.connect(a, "s1")
+        await hub.connect(b, "s1")
+        await hub.connect(other, "s2")
+
+        assert await hub.publish("s1", {"type": "token", "text": "hi"}) == 2
+        assert await hub.publish("s2", "only s2") == 1
+        assert await hub.publish("nobody", "lost") == 0
+        await _settle()
+
+        assert a.sent == b.sent == ['{"type": "token", "text": "hi"}']
+        assert a.sent[0] is b.sent[0]  # serialized once
+        assert other.sent == ["only s2"]
+        assert hub.info()["sessions"] == 2 and hub.info()["connections"] == 3
+
+        hub.disconnect(a, "s1")
+        hub.disconnect(a, "s1")  # idempotent
+        assert await hub.publish("s1", "after") == 1
+        hub.disconnect(b, "s1")
+        assert "s1" not in hub.sessions
+        await hub.close()
+        assert hub.sessions == {}
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("policy, delivered, slow_gets, f5_recipients", [
+    (SlowConsumerPolicy.DROP_OLDEST, [1, 1, 1, 1, 1], ["f4", "f5"], 2),
+    (SlowConsumerPolicy.DROP_NEWEST, [1, 1, 0, 0, 0], ["f0", "f1"], 1),
+])
+def test_full_queue_drop_policies(policy, delivered, slow_gets, f5_recipients):
+    async def run():
+        hub = SessionHub(queue_size=2, policy=policy)
+        slow, fast = FakeSocket("slow"), FakeSocket("fast")
+        await hub.connect(slow, "s")
+        slow.gate.clear()
+        await _settle()
+
+        # no await between deliveries: the writer cannot drain in between
+        assert [hub.deliver_local("s", f"f{i}") for i in range(5)] == delivered
+        assert hub.sessions["s"][slow].dropped == 3
+
+        await hub.connect(fast, "s")  # a later client has its own queue
+        assert hub.deliver_local("s", "f5") == f5_recipients
+        await _settle()
+        assert fast.sent == ["f5"] and slow.sent == []
+
+        slow.gate.set()
+        await _settle()
+        assert slow.sent == slow_gets
+        assert hub.stats["dropped"] == 4 and hub.stats["evicted"] == 0
+        assert slow.closed is None and len(hub.sessions["s"]) == 2
+        await hub.close()
+
+    asyncio.run(run())
+
+
+def test_disconnect_policy_evicts_only_the_slow_client():
+    async def run():
+        hub = SessionHub(queue_size=2, policy=SlowConsumerPolicy.DISCONNECT)
+        slow, ok = FakeSocket("slow"), FakeSocket("ok")
+        await hub.connect(slow, "s")
+        await hub.connect(ok, "s")
+        slow.gate.clear()
+        await _settle()
+
+        for i in range(2):
+            assert hub.deliver_local("s", f"f{i}") == 2
+            await _settle()  # ok drains, slow keeps one frame in flight
+        assert hub.deliver_local("s", "f2") == 2
+        assert hub.deliver_local("s", "f3") == 1  # slow's queue is full: evicted
+        await _settle()
+
+        assert list(hub.sessions["s"]) == [ok]
+        assert slow.closed[0] == CLOSE_TRY_AGAIN_LATER
+        assert ok.sent == ["f0", "f1", "f2", "f3"]
+        assert hub.stats["evicted"] == 1 and hub.stats["dropped"] == 1
+        await hub.close()
+
+    asyncio.run(run())
+
+
+def test_blocked_send_is_evicted_after_the_timeout():
+    async def run():
+        hub = SessionHub(queue_size=8, send_timeout=0.05)
+        stuck, failing = FakeSocket("stuck"), FakeSocket("failing", fail=True)
+        await hub.connect(stuck, "s")
+        await hub.connect(failing, "s")
+        stuck.gate.clear()
+
+        assert await hub.publish("s", "frame") == 2
+        await asyncio.sleep(0.2)
+
+        # the idle reader is closed with "try again later"; a broken socket
+        # is just forgotten
+        assert stuck.closed is not None and stuck.closed[0] == CLOSE_TRY_AGAIN_LATER
+        assert "blocked" in stuck.closed[1]
+        assert failing.closed is None
+        assert "s" not in hub.sessions and hub.stats["evicted"] == 1
+        assert await hub.publish("s", "late") == 0
+
+    asyncio.run(run())
@@ -0,0 +1,138 @@
+# tests/test_board_agents.py
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+import yaml
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "board" / "scripts"
+
+
+@pytest.fixture
+def discovery(monkeypatch):
+    monkeypatch.syspath_prepend(str(SCRIPTS))
+    import agent_discovery
+    return agent_discovery
+
+
+@pytest.fixture
+def heartbeat(monkeypatch):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("psutil")
+    monkeypatch.syspath_prepend(str(SCRIPTS))
+    import heartbeat_service
+    return heartbeat_service
+
+
+def test_scan_hosts_reports_open_ports_and_banners(discovery):
+    async def run():
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(b"HTTP/1.1 200 OK\r\nServer: uvicorn\r\n\r\n")
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        open_port = server.sockets[0].getsockname()[1]
+        # a port that was just bound and released is (almost surely) closed
+        probe = await asyncio.start_server(handle, "127.0.0.1", 0)
+        closed_port = probe.sockets[0].getsockname()[1]
+        probe.close()
+        await probe.wait_closed()
+
+        scanner = discovery.AgentDiscovery(concurrency=2, connect_timeout=1)
+        async with server:
+            targets = {"127.0.0.1": [open_port, closed_port]}
+            plain = await scanner.scan_hosts(targets)
+            banners = await scanner.scan_hosts(targets, identify=True)
+        return open_port, plain, banners
+
+    open_port, plain, banners = asyncio.run(run())
+    assert plain == {("127.0.0.1", open_port): b""}
+    assert list(banners) == [("127.0.0.1", open_port)]
+    banner = banners[("127.0.0.1", open_port)].decode()
+    assert discovery.AgentDiscovery().identify_service(open_port, banner)["id"] == f"fastapi-{open_port}"
+
+
+class StubResponse:
+    def __init__(self, status):
+        self.status = status
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self):
+        return b""
+
+
+class StubSession:
+    def __init__(self):
+        self.status = {}  # url -> HTTP status, or an exception to raise
+        self.calls = []
+
+    def get(self, url):
+        self.calls.append(url)
+        result = self.status[url]
+        if isinstance(result, Exception):
+            raise result
+        return StubResponse(result)
+
+
+class SteppingClock:
+    """datetime stand-in: each now() is one second after the previous one"""
+    tick = 0
+
+    @classmethod
+    def now(cls):
+        cls.tick += 1
+        return datetime(2026, 10, 19) + timedelta(seconds=cls.tick)
+
+
+def _rows(store):
+    return {agent_id: (row["status"], row["checked_at"]) for agent_id, row in store.load().items()}
+
+
+def test_update_agent_status_writes_transitions_and_probe_columns(heartbeat, tmp_path, monkeypatch):
+    agents = [{"id": f"a{i}", "heartbeat_url": f"ws://10.0.0.{i}:8765/heartbeat"} for i in range(3)]
+    agents.append({"id": "no-url"})
+    config = tmp_path / "board.agents.yaml"
+    config.write_text(yaml.safe_dump({"agents": agents}))
+
+    service = heartbeat.HeartbeatService(config_path=str(config), status_db=str(tmp_path / "status.db"))
+    session = StubSession()
+    session.status = {
+        "http://10.0.0.0:8765/heartbeat": 200,
+        "http://10.0.0.1:8765/heartbeat": 503,
+        "http://10.0.0.2:8765/heartbeat": OSError("refused"),
+    }
+    monkeypatch.setattr(heartbeat, "datetime", SteppingClock)
+
+    assert asyncio.run(service.update_agent_status_async(session)) == 3
+    assert sorted(session.calls) == sorted(session.status)  # ws:// probed over http://
+    first = _rows(service.store)
+    assert {k: v[0] for k, v in first.items()} == {
+        "a0": "healthy", "a1": "unhealthy", "a2": "unhealthy", "no-url": "unknown"}
+    assert service.store.load()["a0"]["latency_ms"] is not None
+
+    # no transitions: every probed agent still gets its probe columns refreshed
+    assert asyncio.run(service.update_agent_status_async(session)) == 0
+    second = service.store.load()
+    assert all(row["checked_at"] != first[k][1] for k, row in second.items())
+    assert second["a0"]["last_seen"] == second["a0"]["checked_at"]
+    assert second["a1"]["last_seen"] is None
+
+    session.status["http://10.0.0.0:8765/heartbeat"] = 500
+    assert asyncio.run(service.update_agent_status_async(session)) == 1
+    third = service.store.load()
+    assert third["a0"]["status"] == "unhealthy"
+    assert third["a0"]["last_seen"] == second["a0"]["last_seen"]  # last healthy probe
+
+    # a restarted service picks up the stored statuses, not the YAML ones
+    service.store.close()
+    restarted = heartbeat.HeartbeatService(config_path=str(config), status_db=str(tmp_path / "status.db"))
+    assert asyncio.run(restarted.update_agent_status_async(session)) == 0
+    restarted.store.close()
@@ -0,0 +1,117 @@
+# tests/test_opipe_bridge.py
+import ipaddress
+import random
+import types
+
+import pytest
+
+pytest.importorskip("flask")
+
+import opipe_bridge
+from opipe_bridge import IPAllowlist, RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(opipe_bridge, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_burst_then_sustained_rate(clock):
+    limiter = RateLimiter(rps=4, burst=3)  # 0.25s interval, 0.5s tolerance
+
+    assert [limiter.check("c")[0] for _ in range(3)] == [True, True, True]
+    assert limiter.check("c") == (False, 0.25)
+
+    # at exactly the sustained rate every request passes, one more per step does not
+    for _ in range(100):
+        clock[0] += 0.25
+        assert limiter.check("c") == (True, 0.0)
+        allowed, retry_after = limiter.check("c")
+        assert not allowed and retry_after == pytest.approx(0.25)
+
+    # the burst refills after a pause of burst * interval
+    clock[0] += 0.75
+    assert [limiter.check("c")[0] for _ in range(4)] == [True, True, True, False]
+    assert limiter.check("other") == (True, 0.0)  # clients never share a bucket
+
+
+def test_retry_after_grows_with_the_backlog(clock):
+    limiter = RateLimiter(rps=2, burst=1)
+    assert limiter.check("c") == (True, 0.0)
+    assert limiter.check("c") == (False, 0.5)
+    clock[0] += 0.2
+    allowed, retry_after = limiter.check("c")
+    assert not allowed and retry_after == pytest.approx(0.3)
+    clock[0] += 0.3
+    assert limiter.check("c") == (True, 0.0)
+
+
+def test_idle_clients_are_evicted(clock):
+    limiter = RateLimiter(rps=1, burst=1, shards=1, idle_ttl=10)
+    limiter.check("idle")
+    for _ in range(3):
+        limiter.check("throttled")  # TAT pushed 1s ahead; denials don't move it
+    assert len(limiter) == 2
+
+    clock[0] += 11.5
+    limiter.check("fresh")
+    # idle: TAT 1001 + 10 < now; throttled: same TAT, evicted alongside
+    assert len(limiter) == 1
+
+    limiter.check("a")
+    clock[0] += 5
+    limiter.check("b")
+    assert len(limiter) == 3  # nothing idle for 10s yet
+
+
+def _reference(networks, ip):
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    candidates = [addr]
+    if addr.version == 6 and addr.ipv4_mapped:
+        candidates.append(addr.ipv4_mapped)
+    return any(a in net for a in candidates for net in networks if net.version == a.version)
+
+
+def _random_ip(rng, version):
+    if version == 4:
+        return ipaddress.IPv4Address(rng.getrandbits(32))
+    return ipaddress.IPv6Address(rng.getrandbits(128))
+
+
+def _inside(rng, network):
+    host_bits = network.max_prefixlen - network.prefixlen
+    return network.network_address + rng.getrandbits(host_bits) if host_bits else network.network_address
+
+
+@pytest.mark.parametrize("extra", [[], ["0.0.0.0/0"], ["::/0"]])
+def test_allowlist_matches_ipaddress(extra):
+    rng = random.Random(43)
+    cidrs = list(extra)
+    for _ in range(40):
+        version = rng.choice((4, 6))
+        bits = 32 if version == 4 else 128
+        prefix = rng.choice((8, 12, 16, 24, 29, bits, rng.randint(8, bits)))
+        cidrs.append(f"{_random_ip(rng, version)}/{prefix}")
+    cidrs += ["10.1.2.3/32", "2001:db8::1/128", "::ffff:192.168.0.0/120", "not-a-cidr"]
+    allowlist = IPAllowlist(cidrs)
+    networks = allowlist.allowed_networks
+
+    probes = ["10.1.2.3", "10.1.2.4", "2001:db8::1", "2001:db8::2", "::ffff:10.1.2.3",
+              "::ffff:192.168.0.7", "192.168.0.7", "", "10.0.0", "1.2.3.4.5", "::g"]
+    for network in networks:
+        for _ in range(3):
+            probes.append(str(_inside(rng, network)))
+    for _ in range(500):
+        probes.append(str(_random_ip(rng, rng.choice((4, 6)))))
+    probes += [f"::ffff:{ip}" for ip in probes if ip.count(".") == 3]
+
+    decisions = [(ip, allowlist.is_allowed(ip), _reference(networks, ip)) for ip in probes]
+    assert [d for d in decisions if d[1] != d[2]] == []
+    assert any(allowed for _, allowed, _ in decisions)
+    if not extra:
+        assert not all(allowed for _, allowed, _ in decisions)
@@ -0,0 +1,108 @@
+# tests/test_opipe_gateway.py
+import json
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+import opipe_gateway as gw
+from opipe_gateway import LARGE_PAYLOAD, SPECIAL_CHARACTERS
+
+
+# -- the original codec, as the reference --
+def legacy_encode(obj):
+    try:
+        json_str = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        if len(json_str.encode("utf-8")) > 10 * 1024 * 1024:
+            raise ValueError("Payload too large (>10MB)")
+        return json_str
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Cannot serialize payload: {e}")
+
+
+def legacy_decode(txt):
+    if len(txt.encode("utf-8")) > 10 * 1024 * 1024:
+        raise ValueError("Payload too large (>10MB)")
+    try:
+        obj = json.loads(txt)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(obj, dict):
+        raise ValueError("Decoded payload must be a dictionary")
+    return obj
+
+
+def outcome(fn, arg):
+    """repr of the result (NaN-safe), or the ValueError raised"""
+    try:
+        return repr(fn(arg))
+    except ValueError:
+        return ValueError
+
+
+ENCODE_CASES = [
+    LARGE_PAYLOAD,
+    SPECIAL_CHARACTERS,
+    {"nan": float("nan"), "inf": float("inf"), "ninf": float("-inf")},
+    {"when": datetime(2026, 1, 2, 3, 4, 5)},
+    {"id": uuid.UUID(int=7)},
+    {"big": 2**70, "neg": -(2**64), "f": 1e308, "tiny": 5e-324},
+    {1: "int key", None: "none key", 2.5: "float key"},
+    {"surrogate": "\ud800"},
+    {"nested": [{"a": (1, 2)}, [], {}], "bytes": b"x"},
+    {"too_big": "x" * (10 * 1024 * 1024)},
+]
+
+DECODE_CASES = [
+    json.dumps(LARGE_PAYLOAD),
+    json.dumps(SPECIAL_CHARACTERS, ensure_ascii=False),
+    json.dumps(SPECIAL_CHARACTERS),
+    '{"x": NaN, "y": Infinity, "z": -Infinity}',
+    '{"x": 1e400}',
+    '{"x": "\\ud800"}',
+    '{"x": "\ud800"}',
+    '{"big": 123456789012345678901234567890, "neg": -18446744073709551617}',
+    '{"dup": 1, "dup": 2}',
+    "[1, 2]",
+    "",
+    "{",
+    '{"x": "' + "y" * (10 * 1024 * 1024) + '"}',
+]
+
+
+@pytest.fixture(params=["json", "orjson"])
+def backend(request, monkeypatch):
+    name, dumps, loads, errors = gw._select_json_backend(request.param)
+    if name != request.param:
+        pytest.skip(f"{request.param} not installed")
+    monkeypatch.setattr(gw, "JSON_BACKEND", name)
+    monkeypatch.setattr(gw, "_json_dumps", dumps)
+    monkeypatch.setattr(gw, "_json_loads", loads)
+    monkeypatch.setattr(gw, "_JSON_DECODE_ERRORS", errors)
+    return name
+
+
+def test_default_backend_is_stdlib():
+    if "OPIPE_JSON_BACKEND" in os.environ:
+        pytest.skip("backend set by the environment")
+    assert gw.JSON_BACKEND == "json"
+
+
+@pytest.mark.parametrize("obj", ENCODE_CASES, ids=range(len(ENCODE_CASES)))
+def test_encode_matches_original(obj, backend):
+    if backend != "json" and obj not in (LARGE_PAYLOAD, SPECIAL_CHARACTERS):
+        pytest.skip("opt-in backends differ on edge cases by design")
+    assert outcome(gw.encode_payload, obj) == outcome(legacy_encode, obj)
+
+
+@pytest.mark.parametrize("txt", DECODE_CASES, ids=range(len(DECODE_CASES)))
+def test_decode_matches_original(txt, backend):
+    if backend != "json" and "12345678901234567890" in txt:
+        pytest.skip("opt-in backends differ on integers beyond 64 bits by design")
+    assert outcome(gw.decode_payload, txt) == outcome(legacy_decode, txt)
+
+
+def test_round_trip_of_the_corpora(backend):
+    for obj in (LARGE_PAYLOAD, SPECIAL_CHARACTERS):
+        assert gw.decode_payload(gw.encode_payload(obj)) == obj
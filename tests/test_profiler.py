@@ -0,0 +1,122 @@
+# tests/test_profiler.py
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+from feature_flags import FeatureFlags
+from gateway import profiler as profiler_module
+from gateway.profiler import FlagFile, SamplingProfiler, SnapshotWriter
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += sum(i * i for i in range(200))
+    return n
+
+
+def test_samples_are_attributed_to_threads_and_tasks():
+    profiler = SamplingProfiler(interval_ms=2, mode="thread")
+    session = profiler.open_session()
+
+    worker = threading.Thread(target=_busy, args=(0.3,), name="cpu-worker")
+    worker.start()
+
+    async def handler():
+        await asyncio.sleep(0)
+        _busy(0.3)
+
+    async def main():
+        await asyncio.create_task(handler(), name="rag-query")
+
+    asyncio.run(main())
+    worker.join()
+    profiler.close_session(session)
+
+    lines = session.collapsed().splitlines()
+    assert any(line.startswith("thread:cpu-worker;") and "_busy" in line for line in lines)
+    assert any("task:rag-query;" in line and "_busy" in line for line in lines)
+    # parked threads (the sampler's own wait, idle pools) are left out
+    assert not any(line.split(" ")[0].endswith("(threading.py") for line in lines)
+
+    doc = json.loads(json.dumps(session.speedscope("test")))
+    assert {p["name"] for p in doc["profiles"]} >= {"thread:cpu-worker"}
+    frames = doc["shared"]["frames"]
+    for profile in doc["profiles"]:
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(0 <= i < len(frames) for stack in profile["samples"] for i in stack)
+    assert profiler.sessions == ()
+
+
+def test_snapshots_follow_the_flag_and_retention(tmp_path):
+    enabled = {"on": True}
+    profiler = SamplingProfiler(interval_ms=2, mode="thread")
+    writer = SnapshotWriter(profiler, "gw-1", directory=str(tmp_path), snapshot_s=1,
+                            retention=2, flag_fn=lambda: enabled["on"])
+
+    due = writer.tick(0.0, 0.0)
+    assert writer.session is not None and due == 1.0
+    for i in range(4):
+        writer.session.add(("MainThread", "", (_busy.__code__,)))
+        writer.session.started = 1_700_000_000 + i  # distinct file names
+        due = writer.tick(due, due)
+    assert len(list(tmp_path.glob("gw-1-*.collapsed"))) == 2
+
+    enabled["on"] = False
+    writer.tick(due, due)
+    assert writer.session is None and profiler.sessions == ()
+
+
+def test_flag_toggles_at_runtime(tmp_path):
+    path = tmp_path / "feature-flags.json"
+    reader = FeatureFlags(str(path))
+    assert not reader.is_enabled("enable_continuous_profiling")
+
+    FeatureFlags(str(path)).enable("enable_continuous_profiling")
+    os.utime(path, (time.time() + 5, time.time() + 5))  # coarse mtime filesystems
+    assert reader.refresh()
+    assert reader.is_enabled("enable_continuous_profiling")
+
+
+def test_prune_covers_past_pids_of_the_service(tmp_path):
+    old = time.time() - 48 * 3600
+    for name in ("gw-100-20261001T000000", "gw-100-20261001T000100", "gw-200-20261002T000000",
+                 "worker-300-20261002T000000", "other-20261001T000000"):
+        (tmp_path / f"{name}.collapsed").write_text("x 1\n")
+    os.utime(tmp_path / "other-20261001T000000.collapsed", (old, old))
+
+    profiler = SamplingProfiler(interval_ms=2, mode="thread")
+    writer = SnapshotWriter(profiler, "gw-300", directory=str(tmp_path), retention=2,
+                            service="gw")
+    writer.prune()
+    # oldest snapshots of the service go first, whichever pid wrote them;
+    # anything past retention_h goes regardless of who wrote it
+    assert sorted(p.stem for p in tmp_path.glob("*.collapsed")) == [
+        "gw-100-20261001T000100", "gw-200-20261002T000000", "worker-300-20261002T000000"]
+
+
+def test_flag_file_fallback_toggles_at_runtime(tmp_path, monkeypatch):
+    path = tmp_path / "feature-flags.json"
+    flags = FlagFile(str(path))
+    monkeypatch.setattr(profiler_module, "_flag_file", flags)
+    monkeypatch.setitem(sys.modules, "feature_flags", None)  # as in the gateway image
+    monkeypatch.delenv("COOLBITS_ENABLE_CONTINUOUS_PROFILING", raising=False)
+    assert not profiler_module.profiling_enabled()
+
+    path.write_text(json.dumps({"enable_continuous_profiling": True}))
+    assert profiler_module.profiling_enabled()
+
+    path.write_text("{")  # caught mid-write: keep the last good value
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    assert profiler_module.profiling_enabled()
+
+    path.write_text(json.dumps({"enable_continuous_profiling": False}))
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    assert not profiler_module.profiling_enabled()
+
+    monkeypatch.setenv("COOLBITS_ENABLE_CONTINUOUS_PROFILING", "true")
+    assert profiler_module.profiling_enabled()
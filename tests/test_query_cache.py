@@ -0,0 +1,124 @@
+# tests/test_query_cache.py
+import numpy as np
+
+from gateway import query_cache
+from gateway.query_cache import SemanticQueryCache, notify_ingest, redis_generation_fn
+
+
+def _vec(*xs):
+    return np.asarray(xs, dtype=np.float32)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+
+
+def test_exact_then_semantic_tier():
+    cache = SemanticQueryCache(threshold=0.9)
+    embeddings = {"what is rag": _vec(1, 0), "explain rag": _vec(0.95, 0.3),
+                  "weather today": _vec(0, 1)}
+    embed = lambda q: embeddings[" ".join(q.lower().split()).rstrip("?")]
+    computed = []
+
+    def compute(embedding):
+        computed.append(embedding)
+        return {"answer": len(computed)}
+
+    assert cache.get_or_compute("p1", "What is RAG?", compute, embed=embed) == ({"answer": 1}, "miss")
+    assert computed[0] is not None  # the search reuses the query embedding
+    assert cache.get_or_compute("p1", "  what is  rag ", compute, embed=embed)[1] == "exact"
+    assert cache.get_or_compute("p1", "Explain RAG", compute, embed=embed) == ({"answer": 1}, "semantic")
+    assert cache.get("p1", "explain rag") == {"answer": 1}  # paraphrase aliased
+    assert cache.get_or_compute("p1", "weather today", compute, embed=embed)[1] == "miss"
+
+    # namespaces and variants never share entries
+    assert cache.get("p2", "what is rag") is None
+    assert cache.get("p1", "what is rag", variant="k=10") is None
+    assert cache.get_similar("p1", _vec(1, 0), variant="k=10") is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (2, 1, 2)
+
+
+def test_invalidation_drops_namespace_and_skips_inflight_puts():
+    cache = SemanticQueryCache()
+    cache.put("p1", "q", "old", embedding=_vec(1, 0))
+    cache.put("p2", "q", "other")
+
+    assert cache.invalidate("p1") == 1
+    assert cache.get("p1", "q") is None and cache.get_similar("p1", _vec(1, 0)) is None
+    assert cache.get("p2", "q") == "other"
+
+    # an ingest landing while the result is computed must not be cached over
+    def compute(_):
+        cache.invalidate("p1")
+        return "computed before the ingest"
+
+    assert cache.get_or_compute("p1", "q", compute) == ("computed before the ingest", "miss")
+    assert cache.get("p1", "q") is None
+
+    def compute_all(_):
+        cache.invalidate()  # global invalidation bumps every namespace's epoch
+        return "stale"
+
+    cache.get_or_compute("p2", "new", compute_all)
+    assert cache.get("p2", "new") is None and cache.stats()["entries"] == 0
+
+
+def test_eviction_prefers_least_hit_and_respects_byte_bound(monkeypatch):
+    cache = SemanticQueryCache(max_entries=3)
+    for q in ("a", "b", "c"):
+        cache.put("p", q, q)
+    assert cache.get("p", "a") == "a"  # a is hit, b and c are not
+    cache.put("p", "d", "d")
+    assert cache.get("p", "a") == "a" and cache.get("p", "b") is None
+    assert cache.stats()["evictions"] == 1
+
+    small = SemanticQueryCache(max_bytes=200)
+    small.put("p", "x", "v" * 500)  # larger than the whole cache: not stored
+    assert small.get("p", "x") is None
+    for i in range(20):
+        small.put("p", f"q{i}", "v" * 20)
+    assert small.stats()["bytes"] <= 200 and small.get("p", "q19") == "v" * 20
+
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    ttl = SemanticQueryCache(ttl_s=5)
+    ttl.put("p", "q", "v")
+    now[0] += 6
+    assert ttl.get("p", "q") is None and ttl.stats()["entries"] == 0
+
+
+def test_redis_generation_invalidates_other_workers(monkeypatch):
+    redis = FakeRedis()
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    worker = SemanticQueryCache(generation_fn=redis_generation_fn(redis), generation_check_s=1.0)
+    worker.put("p1", "q", "v1")
+    worker.put("p2", "q", "v2")
+    assert worker.get("p1", "q") == "v1" and worker.get("p2", "q") == "v2"
+
+    # another process ingests into p1: the generation moves in Redis only
+    redis.incr(query_cache.GENERATION_PREFIX + "p1")
+    assert worker.get("p1", "q") == "v1"  # within generation_check_s: not re-read yet
+    now[0] += 1.5
+    assert worker.get("p1", "q") is None
+    assert worker.get("p2", "q") == "v2"
+
+    # local ingest: this process's caches now, Redis for the rest
+    worker.put("p1", "q", "v1")
+    notify_ingest(["p1"], redis)
+    assert worker.get("p1", "q") is None
+    assert redis.get(query_cache.GENERATION_PREFIX + "p1") == 2
+
+    # a failing generation read keeps serving the local entries
+    broken = SemanticQueryCache(generation_fn=lambda ns: 1 / 0, generation_check_s=0)
+    broken.put("p", "q", "v")
+    assert broken.get("p", "q") == "v"
+    assert redis_generation_fn(None) is None
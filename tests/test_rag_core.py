@@ -0,0 +1,137 @@
+# tests/test_rag_core.py
+import json
+import sqlite3
+
+import numpy as np
+
+from rag_core import PartitionedVectorIndex, Retriever, SQLiteStore
+
+
+def _legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE documents (id TEXT PRIMARY KEY, domain_id TEXT, title TEXT,
+            content TEXT, doc_type TEXT, created_at TEXT, updated_at TEXT,
+            metadata TEXT, vertex_embedding TEXT);
+        CREATE TABLE domains (id TEXT PRIMARY KEY, name TEXT,
+            domain_type TEXT, description TEXT, created_at TEXT, vertex_config TEXT);
+        """
+    )
+    conn.execute(
+        "INSERT INTO documents VALUES ('d1','ceo','Board strategy','quarterly plan',"
+        "'general','2025-09-01 10:00:00','2025-09-01 10:00:00','{}',?)",
+        (json.dumps([1.0, 0.0, 0.0]),),
+    )
+    conn.execute(
+        "INSERT INTO domains VALUES ('ceo','CEO','role','','2025-09-01 10:00:00','{}')"
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_migration(tmp_path):
+    path = str(tmp_path / "rag.db")
+    _legacy_db(path)
+    store = SQLiteStore(path)
+    doc = store.get("d1")
+    assert doc["domain"] == "ceo" and doc["created_at"] == "2025-09-01T10:00:00"
+    assert store.collection("ceo")["kind"] == "role"
+    ids, matrix = store.load_vectors({"domain": "ceo"})
+    assert list(ids) == ["d1"] and matrix.shape == (1, 3)
+    # second open does not duplicate anything
+    assert SQLiteStore(path).count() == 1
+
+
+def test_lexical_search_pushes_filters(tmp_path):
+    store = SQLiteStore(str(tmp_path / "rag.db"))
+    retriever = Retriever(store)
+    retriever.add_many(
+        [
+            {"domain": "ceo", "title": "Pricing strategy", "content": "pricing tiers"},
+            {"domain": "cto", "title": "Pricing service", "content": "pricing api"},
+            {"domain": "ceo", "title": "Hiring", "content": "interview loop"},
+        ]
+    )
+    hits = retriever.search("pricing", k=5, filters={"domain": "ceo"})
+    assert [hit["title"] for hit in hits] == ["Pricing strategy"]
+    assert store.count_by("domain") == {"ceo": 2, "cto": 1}
+
+
+def test_vector_index_update_and_delete(tmp_path):
+    store = SQLiteStore(str(tmp_path / "rag.db"))
+    vocab = ["alpha", "beta", "gamma"]
+
+    def embed(texts):
+        return np.array(
+            [[text.lower().count(word) for word in vocab] for text in texts],
+            dtype=np.float32,
+        )
+
+    retriever = Retriever(
+        store, lexical=None, vector=PartitionedVectorIndex(store), embed_fn=embed
+    )
+    a = retriever.add({"domain": "x", "title": "alpha", "content": "alpha alpha"})
+    b = retriever.add({"domain": "x", "title": "beta", "content": "beta"})
+    assert retriever.search("alpha", k=1, filters={"domain": "x"})[0]["id"] == a
+
+    retriever.update(b, content="gamma gamma gamma")
+    assert retriever.search("gamma", k=1, filters={"domain": "x"})[0]["id"] == b
+
+    retriever.delete(a)
+    assert a not in {hit["id"] for hit in retriever.search("alpha", k=5, filters={"domain": "x"})}
+    assert store.vector_doc_ids({"domain": "x"}) == {b}
+
+
+def test_legacy_functional_tables_migrate(tmp_path):
+    path = str(tmp_path / "rag.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE documents (id TEXT PRIMARY KEY, domain_id TEXT, title TEXT,
+            content TEXT, doc_type TEXT, created_at TEXT, updated_at TEXT,
+            embedding_id TEXT, metadata TEXT);
+        CREATE TABLE embeddings (id TEXT PRIMARY KEY, document_id TEXT, domain_id TEXT,
+            embedding_vector TEXT, created_at TEXT);
+        CREATE TABLE chat_history (id TEXT PRIMARY KEY, domain_id TEXT, user_message TEXT,
+            assistant_response TEXT, timestamp TEXT, metadata TEXT);
+        INSERT INTO documents VALUES ('d1','role_ceo','Plan','q3 plan','general',
+            '2025-09-01 10:00:00','2025-09-01 10:00:00',NULL,'{}');
+        INSERT INTO embeddings VALUES ('e1','d1','role_ceo','[1, 0]','2025-09-01 10:00:00');
+        INSERT INTO embeddings VALUES ('e2','d1','role_ceo','[0, 1]','2025-09-01 10:00:01');
+        INSERT INTO embeddings VALUES ('e3','gone','role_ceo','[1, 1]','2025-09-01 10:00:00');
+        INSERT INTO chat_history VALUES ('c1','role_ceo','hi','hello',
+            '2025-09-01 10:00:00','{"model": "x"}');
+        INSERT INTO chat_history VALUES ('c2','role_ceo','plan?','q3 plan',
+            '2025-09-01 10:05:00','{}');
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteStore(path)
+    ids, matrix = store.load_vectors({"domain": "role_ceo"})
+    assert list(ids) == ["d1", "d1"] and matrix.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+    history = store.chat_history("role_ceo")
+    assert [m["id"] for m in history] == ["c2", "c1"]
+    assert history[1]["timestamp"] == "2025-09-01T10:00:00"
+    assert history[1]["metadata"] == {"model": "x"}
+    assert len(SQLiteStore(path).chat_history("role_ceo")) == 2
+
+
+def test_min_score_filters_vector_similarity_before_fusion(tmp_path):
+    store = SQLiteStore(str(tmp_path / "rag.db"))
+    vocab = ["alpha", "beta"]
+
+    def embed(texts):
+        vectors = np.array([[text.count(word) for word in vocab] for text in texts], dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+    retriever = Retriever(store, vector=PartitionedVectorIndex(store), embed_fn=embed)
+    a = retriever.add({"domain": "x", "title": "alpha", "content": "alpha"})
+    b = retriever.add({"domain": "x", "title": "beta", "content": "beta"})
+
+    # fused scores are ~1/61: a similarity floor of 0.5 must not drop every hit
+    hits = retriever.search("alpha", k=5, filters={"domain": "x"}, min_score=0.5)
+    assert [hit["id"] for hit in hits] == [a]
+    assert [hit["id"] for hit in retriever.search("alpha", k=5, filters={"domain": "x"})] == [a, b]
@@ -0,0 +1,84 @@
+# tests/test_rag_eval_metrics.py
+import math
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+
+from gateway import rag_eval
+from gateway.rag_eval import compare_metrics, graded_relevance, retrieval_metrics, retrieved_doc_ids
+
+
+def test_binary_relevance_by_hand():
+    # gains 0 1 0 1 at ranks 1-4; ideal: three relevant at ranks 1-3
+    dcg = 1 / math.log2(3) + 1 / math.log2(5)  # 1.0616
+    idcg = 1 + 1 / math.log2(3) + 1 / math.log2(4)  # 2.1309
+    metrics = retrieval_metrics(["x", "a", "y", "b"], {"a": 1, "b": 1, "c": 1}, k=4)
+    assert metrics["ndcg"] == pytest.approx(dcg / idcg) == pytest.approx(0.49819, abs=1e-5)
+    assert metrics["mrr"] == 0.5
+    assert metrics["recall"] == pytest.approx(2 / 3)
+
+
+def test_graded_relevance_by_hand():
+    relevance = {"a": 3, "b": 1, "c": 2}
+    # gains 2^1-1 = 1 at rank 1, 2^3-1 = 7 at rank 2; ideal order 3, 2, 1
+    metrics = retrieval_metrics(["b", "a", "x"], relevance, k=3)
+    assert metrics["ndcg"] == pytest.approx((1 + 7 / math.log2(3)) / (7 + 3 / math.log2(3) + 1 / 2))
+    assert metrics["ndcg"] == pytest.approx(0.57667, abs=1e-5)
+    assert metrics["mrr"] == 1.0 and metrics["recall"] == pytest.approx(2 / 3)
+
+    # k cuts both the ranking and the ideal list
+    top1 = retrieval_metrics(["b", "a"], relevance, k=1)
+    assert top1 == pytest.approx({"ndcg": 1 / 7, "mrr": 1.0, "recall": 1 / 3})
+    assert retrieval_metrics(["a", "c", "b"], relevance, k=3)["ndcg"] == pytest.approx(1.0)
+
+
+def test_zero_relevant_and_zero_grades():
+    assert retrieval_metrics(["a", "b"], {}, k=5) == {"ndcg": 0.0, "mrr": 0.0, "recall": 0.0}
+    assert retrieval_metrics(["a"], {"a": 0}, k=5) == {"ndcg": 0.0, "mrr": 0.0, "recall": 0.0}
+    assert retrieval_metrics([], {"a": 1}, k=5) == {"ndcg": 0.0, "mrr": 0.0, "recall": 0.0}
+    # a judged-irrelevant hit is not the first relevant rank
+    assert retrieval_metrics(["a", "b"], {"a": 0, "b": 1}, k=5)["mrr"] == 0.5
+
+
+def test_duplicate_ids_count_once():
+    assert retrieval_metrics(["a", "a", "b"], {"a": 1}, k=3) == {"ndcg": 1.0, "mrr": 1.0, "recall": 1.0}
+    # the repeat does not push a later relevant id out of the top k either
+    assert retrieval_metrics(["a", "a", "b"], {"a": 1, "b": 1}, k=2)["recall"] == 1.0
+
+    chunks = [{"meta": {"doc_id": "d1"}, "chunk_id": "c1"},
+              {"meta": {"doc_id": "d1"}, "chunk_id": "c2"},
+              {"source": "s2", "chunk_id": "c3"},
+              {"source_uri": "file:///x", "chunk_id": "c4"}]
+    assert retrieved_doc_ids(chunks, {"d1": 1, "c4": 1}) == ["d1", "s2", "c4"]
+
+
+def test_graded_relevance_from_golden_items():
+    assert graded_relevance({"relevance": {"1": 2, 3: 1}}) == {"1": 2.0, "3": 1.0}
+    assert graded_relevance({"ideal": [1, "b"]}) == {"1": 1.0, "b": 1.0}
+    assert graded_relevance({"relevance": {}, "ideal": ["a"]}) == {"a": 1.0}
+    assert graded_relevance({}) == {}
+
+
+def test_compare_metrics_gates(monkeypatch):
+    monkeypatch.setattr(rag_eval, "EVAL_MAX_P95_REGRESSION", 0.10)
+    monkeypatch.setattr(rag_eval, "EVAL_MAX_NDCG_DROP", 0.02)
+    baseline = {"avg_ndcg": 0.80, "avg_recall": 0.9, "avg_mrr": 0.7,
+                "p50_latency_ms": 50.0, "p95_latency_ms": 100.0}
+
+    within = compare_metrics(baseline, {**baseline, "avg_ndcg": 0.79, "p95_latency_ms": 109.0}, "A", "B")
+    assert within["deltas"]["avg_ndcg"] == pytest.approx(-0.01)
+    assert within["deltas"]["p95_latency_ms"] == pytest.approx(9.0)
+    assert not within["regression"] and (within["baseline"], within["candidate"]) == ("A", "B")
+
+    slower = compare_metrics(baseline, {**baseline, "p95_latency_ms": 111.0})
+    assert slower["p95_regressed"] and not slower["ndcg_regressed"] and slower["regression"]
+
+    worse = compare_metrics(baseline, {**baseline, "avg_ndcg": 0.77})
+    assert worse["ndcg_regressed"] and not worse["p95_regressed"] and worse["regression"]
+
+    # no baseline latency: only the nDCG gate applies; missing keys count as 0
+    empty = compare_metrics({}, {"p95_latency_ms": 500.0})
+    assert not empty["p95_regressed"] and empty["deltas"]["avg_recall"] == 0.0
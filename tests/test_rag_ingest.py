@@ -0,0 +1,138 @@
+# tests/test_rag_ingest.py
+import json
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+
+from gateway.rag_eval import RAGIngestionManager
+
+
+class FakeSource:
+    id = None  # RAGSource.id == source_id in the (ignored) filter
+
+    def __init__(self, config):
+        self.id = "src-1"
+        self.config = config
+        self.last_sync = None
+
+
+class FakeSession:
+    """Commits persist ``source.config`` only when it differs from the
+    committed value, like SQLAlchemy does for a plain JSON column (the
+    committed value is the loaded object itself, not a copy)."""
+
+    def __init__(self, source):
+        self.source = source
+        self.committed = source.config
+        self.row = json.dumps(source.config)
+        self.chunks = {}
+        self.pending = []
+        self.fail_on = set()
+
+    def query(self, *args):
+        source = self.source
+
+        class Query:
+            def filter(self, *a):
+                return self
+
+            def first(self):
+                return source
+
+        return Query()
+
+    def bulk_insert_mappings(self, model, rows):
+        if any(row["source_uri"] in self.fail_on for row in rows):
+            raise RuntimeError("insert failed")
+        self.pending.append(("insert", rows))
+
+    def commit(self):
+        for op, arg in self.pending:
+            if op == "delete":
+                for uri in arg:
+                    self.chunks.pop(uri, None)
+            else:
+                for row in arg:
+                    self.chunks.setdefault(row["source_uri"], []).append(row["chunk_id"])
+        self.pending = []
+        if self.source.config != self.committed:
+            self.committed = self.source.config
+            self.row = json.dumps(self.source.config)
+
+    def rollback(self):
+        self.pending = []
+
+
+@pytest.fixture
+def ingest(monkeypatch):
+    monkeypatch.setitem(sys.modules, "gateway.db",
+                        types.SimpleNamespace(RAGSource=FakeSource, RAGChunk=None))
+    monkeypatch.setitem(sys.modules, "gateway.rag",
+                        types.SimpleNamespace(invalidate_query_cache=lambda spaces: None))
+
+    def run(db, path):
+        manager = RAGIngestionManager(db, batch_size=2)
+        manager._embed_batch = lambda texts: [[0.0]] * len(texts)
+        manager._delete_chunks = lambda org_id, space, uris: db.pending.append(("delete", list(uris)))
+        return manager.ingest_from_source("fs_local", {"path": str(path), "chunk_size": 100,
+                                                       "chunk_overlap": 0},
+                                          "org", "space", source_id="src-1")
+    return run
+
+
+def _persisted_files(db):
+    return set(json.loads(db.row)["_sync_state"]["files"])
+
+
+def test_second_sync_skips_unchanged_files(ingest, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("alpha " * 50)
+    db = FakeSession(FakeSource({"path": str(docs)}))
+
+    first = ingest(db, docs)
+    assert first["stats"] == {"files_changed": 1}
+    assert _persisted_files(db) == {str(docs / "a.txt")}
+
+    (docs / "b.txt").write_text("beta " * 50)
+    second = ingest(db, docs)
+    assert second["stats"] == {"files_changed": 1, "files_skipped": 1}
+    # the state mutated in place on the second run still reaches the row
+    assert _persisted_files(db) == {str(docs / "a.txt"), str(docs / "b.txt")}
+
+    # a fresh process loading the row re-ingests nothing
+    reloaded = FakeSession(FakeSource(json.loads(db.row)))
+    reloaded.chunks = db.chunks
+    third = ingest(reloaded, docs)
+    assert third["chunks_ingested"] == 0 and third["stats"] == {"files_skipped": 2}
+
+
+def test_failed_and_removed_sources(ingest, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    # two 100-char chunks per file: batches of 2 never mix files
+    (docs / "a.txt").write_text("a" * 200)
+    (docs / "b.txt").write_text("b" * 200)
+    db = FakeSession(FakeSource({"path": str(docs)}))
+    db.fail_on = {f"file://{docs / 'b.txt'}"}
+
+    result = ingest(db, docs)
+    assert result["sources_failed"] == 1
+    assert db.source.last_sync is None  # not advanced past a failed source
+    assert _persisted_files(db) == {str(docs / "a.txt")}
+
+    db.fail_on = set()
+    result = ingest(db, docs)
+    assert result["sources_failed"] == 0 and db.source.last_sync is not None
+    assert set(db.chunks) == {f"file://{docs / 'a.txt'}", f"file://{docs / 'b.txt'}"}
+
+    (docs / "a.txt").unlink()
+    result = ingest(db, docs)
+    assert result["sources_removed"] == 1
+    assert set(db.chunks) == {f"file://{docs / 'b.txt'}"}
+    assert _persisted_files(db) == {str(docs / "b.txt")}
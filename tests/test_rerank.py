@@ -0,0 +1,98 @@
+# tests/test_rerank.py
+import types
+
+import pytest
+
+from gateway import rerank
+from gateway.rerank import CrossEncoderReranker
+
+
+class FakeModel:
+    """predict(pairs) that costs ``pair_ms`` of (fake) clock per pair"""
+
+    def __init__(self, clock, pair_ms):
+        self.clock = clock
+        self.pair_ms = pair_ms
+        self.calls = []
+
+    def __call__(self, pairs):
+        self.calls.append([text for _, text in pairs])
+        self.clock.now += self.pair_ms * len(pairs) / 1000
+        return [float(text.split("-")[1]) for _, text in pairs]  # later chunk, higher score
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rerank, "time", types.SimpleNamespace(perf_counter=clock))
+    return clock
+
+
+def _candidates(n):
+    return [{"chunk_id": f"c{i}", "text": f"chunk-{i}"} for i in range(n)]
+
+
+def test_first_batch_overrun_truncates_and_keeps_tail_order(clock):
+    model = FakeModel(clock, pair_ms=30)
+    reranker = CrossEncoderReranker(budget_ms=100, batch_size=4, predict=model)
+
+    ranked = reranker.rerank("q", _candidates(10), k=10)
+
+    # no per-pair estimate yet: the whole first batch runs (120ms) and nothing after it
+    assert model.calls == [["chunk-0", "chunk-1", "chunk-2", "chunk-3"]]
+    assert [c["chunk_id"] for c in ranked] == ["c3", "c2", "c1", "c0",
+                                               "c4", "c5", "c6", "c7", "c8", "c9"]
+    assert [c["rerank_score"] for c in ranked[:4]] == [3.0, 2.0, 1.0, 0.0]
+    assert all(c["rerank_score"] is None for c in ranked[4:])
+    assert reranker.stats["truncated"] == 1 and reranker.stats["scored"] == 4
+
+
+def test_batches_shrink_to_the_remaining_budget(clock):
+    model = FakeModel(clock, pair_ms=10)
+    reranker = CrossEncoderReranker(budget_ms=105, batch_size=4, predict=model)
+
+    ranked = reranker.rerank("q", _candidates(16), k=5)
+
+    # 40ms + 40ms, then only 2 pairs fit in the last 25ms
+    assert [len(call) for call in model.calls] == [4, 4, 2]
+    assert reranker.stats["truncated"] == 1
+    assert [c["chunk_id"] for c in ranked] == ["c9", "c8", "c7", "c6", "c5"]
+
+    # the learned per-pair cost truncates up front on the next query
+    model.calls.clear()
+    reranker.rerank("other", _candidates(16), k=5, budget_ms=25)
+    assert [len(call) for call in model.calls] == [2]
+
+
+def test_cache_is_keyed_by_query_hash_and_chunk_id(clock):
+    model = FakeModel(clock, pair_ms=1)
+    reranker = CrossEncoderReranker(budget_ms=1000, batch_size=8, cache_size=6, predict=model)
+
+    first = reranker.rerank("What is  RAG?", _candidates(4), k=4)
+    model.calls.clear()
+
+    # same normalized query: only the new chunks are scored
+    again = reranker.rerank("what is rag?", _candidates(6), k=4)
+    assert model.calls == [["chunk-4", "chunk-5"]]
+    assert reranker.stats["cache_hits"] == 4
+    assert [c["chunk_id"] for c in again] == ["c5", "c4", "c3", "c2"]
+    assert [c["rerank_score"] for c in first] == [3.0, 2.0, 1.0, 0.0]
+
+    # a different query never reuses those scores
+    model.calls.clear()
+    reranker.rerank("something else", _candidates(2), k=2)
+    assert model.calls == [["chunk-0", "chunk-1"]]
+
+    # LRU bound: the two oldest entries of the first query were evicted
+    assert len(reranker._cache) == 6
+    model.calls.clear()
+    reranker.rerank("what is rag?", _candidates(6), k=6)
+    assert model.calls == [["chunk-0", "chunk-1"]]
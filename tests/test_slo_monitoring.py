@@ -0,0 +1,57 @@
+# tests/test_slo_monitoring.py
+import random
+
+import numpy as np
+
+from slo_monitoring import QuantileSketch, SLOMonitor
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_sketch_p95_within_relative_error():
+    rnd = random.Random(7)
+    values = [rnd.lognormvariate(5, 0.8) for _ in range(20000)]
+    sketch = QuantileSketch()
+    for v in values:
+        sketch.add(v)
+    exact = float(np.percentile(values, 95))
+    assert abs(sketch.quantile(0.95) - exact) / exact < 0.03
+
+
+def test_windows_expire_and_burn_rate_fires(tmp_path):
+    clock = FakeClock()
+    monitor = SLOMonitor(state_dir=str(tmp_path), clock=clock)
+    for i in range(200):
+        monitor.record_response_time(100, 500 if i % 4 == 0 else 200)
+    assert monitor.check_slo_error_rate()["error_requests"] == 50
+    firing = {(a["name"], a["sli"]) for a in monitor.check_burn_rates() if a["firing"]}
+    assert ("fast_burn", "availability") in firing
+    assert ("fast_burn", "latency") not in firing
+
+    clock.now += 600  # past the 5m window, still inside 1h and 30d
+    assert monitor.check_slo_error_rate()["status"] == "insufficient_data"
+    assert monitor.check_slo_error_budget()["monthly_errors"] == 50
+
+
+def test_shards_aggregate_across_processes(tmp_path):
+    clock = FakeClock()
+    workers = []
+    for n in range(3):
+        monitor = SLOMonitor(state_dir=str(tmp_path), clock=clock)
+        monitor.shard_name = f"worker-{n}.json"
+        for _ in range(20):
+            monitor.record_response_time(50 + 300 * n, 200)
+        monitor.checkpoint()
+        workers.append(monitor)
+
+    local = workers[0].check_slo_response_time()
+    merged = workers[0].check_slo_response_time(aggregate=True)
+    assert local["measurements"] == 20 and merged["measurements"] == 60
+    assert merged["current"] > 600
+    assert workers[1].check_slo_error_budget()["monthly_requests"] == 60
@@ -0,0 +1,101 @@
+# tests/test_tracing.py
+import asyncio
+import json
+
+from gateway.tracing import (
+    FileSpanExporter,
+    StageHistograms,
+    Tracer,
+    current_context,
+    current_trace_uuid,
+    extract,
+    format_traceparent,
+    inject,
+    parse_traceparent,
+    stream_lag_ms,
+)
+
+
+def test_context_propagates_through_headers_and_stream_fields():
+    producer = Tracer(sample_rate=1.0)
+    with producer.span("http POST /v1/nha/invoke", kind="server") as root:
+        fields = inject({"invocation_id": "inv-1"})
+        assert current_trace_uuid().replace("-", "") == root.context.trace_id
+
+    # what a worker reads back from XREADGROUP (bytes keys and values)
+    raw = {k.encode(): v.encode() for k, v in fields.items()}
+    parent = extract(raw)
+    assert parent.trace_id == root.context.trace_id and parent.span_id == root.context.span_id
+
+    consumer = Tracer(sample_rate=0.0)  # the remote sampling decision wins
+    with consumer.span("nha_worker.job", parent=parent, kind="consumer") as job:
+        with consumer.span("nha.adapter.sentiment") as child:
+            pass
+    assert job.parent_id == root.context.span_id and job.context.sampled
+    assert child.parent_id == job.context.span_id
+    assert child.context.trace_id == root.context.trace_id
+    assert current_context() is None
+
+    assert parse_traceparent("00-" + "0" * 32 + "-" + "1" * 16 + "-01") is None
+    assert parse_traceparent("garbage") is None
+    ctx = parse_traceparent(format_traceparent(job.context))
+    assert (ctx.trace_id, ctx.span_id, ctx.sampled) == (job.context.trace_id, job.context.span_id, True)
+
+
+def test_asyncio_tasks_keep_their_own_parent():
+    tracer = Tracer(sample_rate=1.0)
+
+    async def handler(name):
+        with tracer.span(name) as outer:
+            await asyncio.sleep(0.01)
+            with tracer.span(name + ".inner") as inner:
+                await asyncio.sleep(0)
+        return outer, inner
+
+    async def main():
+        return await asyncio.gather(*(handler(f"req{i}") for i in range(5)))
+
+    for outer, inner in asyncio.run(main()):
+        assert inner.parent_id == outer.context.span_id
+        assert outer.parent_id is None
+
+
+def test_histograms_merge_and_export():
+    local = StageHistograms()
+    remote = StageHistograms()
+    for ms in (0.5, 3, 40, 40000):
+        local.observe("nha_worker.job", ms)
+    remote.observe("nha_worker.job", 7)
+    local.merge_state(json.loads(json.dumps(remote.state())))
+
+    text = local.export_prometheus()
+    assert 'stage_duration_ms_bucket{stage="nha_worker.job",le="1"} 1' in text
+    assert 'stage_duration_ms_bucket{stage="nha_worker.job",le="10"} 3' in text
+    assert 'stage_duration_ms_bucket{stage="nha_worker.job",le="30000"} 4' in text
+    assert 'stage_duration_ms_bucket{stage="nha_worker.job",le="+Inf"} 5' in text
+    assert 'stage_duration_ms_count{stage="nha_worker.job"} 5' in text
+
+    assert stream_lag_ms(b"1700000000000-3", now=1700000000.25) == 250.0
+    assert stream_lag_ms("not-an-id") is None
+
+
+def test_only_sampled_spans_are_exported(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(sample_rate=0.0, exporter=FileSpanExporter(str(path)), flush_s=3600)
+    with tracer.span("unsampled"):
+        pass
+    sampled = parse_traceparent("00-" + "a" * 32 + "-" + "b" * 16 + "-01")
+    try:
+        with tracer.span("flow.node.rag", parent=sampled, attributes={"node_id": "n1", "k": 3}):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert tracer.flush() == 1
+    payload = json.loads(path.read_text().strip())
+    span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["name"] == "flow.node.rag" and span["parentSpanId"] == "b" * 16
+    assert span["status"]["code"] == 2 and "boom" in span["status"]["message"]
+    assert {"key": "k", "value": {"intValue": "3"}} in span["attributes"]
+    # both spans still feed the histograms
+    assert set(tracer.histograms.state()) == {"unsampled", "flow.node.rag"}
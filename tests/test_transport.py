@@ -0,0 +1,180 @@
+# tests/test_transport.py
+import asyncio
+import types
+import pytest
+from cblm.proto import transport
+from cblm.proto.envelope import ReplayCache, check_fresh, new_envelope
+from cblm.proto.transport import loopback_pair, encode_batch, decode_batch, serve, ChannelPool
+
+def _env(i=0, ttl_s=5):
+    return new_envelope("opipe-0.1", "event", "ogpt01/CEO", ["ocursor"], {"i": i}, ttl_s=ttl_s)
+
+def test_batch_roundtrip_and_tamper():
+    envs = [_env(i) for i in range(3)]
+    frame = encode_batch(envs, b"secret")
+    payload = frame[5:]
+    assert [e.body["i"] for e in decode_batch(payload, b"secret")] == [0, 1, 2]
+    with pytest.raises(ValueError):
+        decode_batch(payload, b"other")
+    with pytest.raises(ValueError):
+        decode_batch(payload[:-3] + b"9]]", b"secret")
+
+def test_loopback_order_and_credits(monkeypatch):
+    monkeypatch.setenv("OPIPE_HMAC_KEY", "secret")
+
+    async def run():
+        # window mic: 100 envelopes trebuie sa treaca prin mai multe runde de credit
+        a, b = await loopback_pair("OPIPE_HMAC_KEY", window=4, max_batch=8)
+
+        async def producer():
+            for i in range(100):
+                await a.send(_env(i))  # blocheaza cand peer-ul nu mai da credit
+
+        prod = asyncio.create_task(producer())
+        got = [(await b.recv()).body["i"] for _ in range(100)]
+        await prod
+        await a.close(); await b.close()
+        return got
+
+    assert asyncio.run(run()) == list(range(100))
+
+def test_request_response_multiplexed(monkeypatch):
+    monkeypatch.setenv("OPIPE_HMAC_KEY", "secret")
+
+    async def run():
+        a, b = await loopback_pair("OPIPE_HMAC_KEY")
+
+        async def echo():
+            async for req in b:
+                await b.reply(req, _env(req.body["i"] * 10))
+
+        server = asyncio.create_task(echo())
+        reqs = [_env(i) for i in range(20)]
+        resps = await asyncio.gather(*(a.request(r, timeout=2) for r in reversed(reqs)))
+        await a.close(); await b.close()
+        await server
+        return reqs, resps
+
+    reqs, resps = asyncio.run(run())
+    for req, resp in zip(reversed(reqs), resps):
+        assert resp.corr == req.id and resp.body["i"] == req.body["i"] * 10
+
+def test_replay_closes_channel(monkeypatch):
+    monkeypatch.setenv("OPIPE_HMAC_KEY", "secret")
+
+    async def run():
+        a, b = await loopback_pair("OPIPE_HMAC_KEY")
+        env = _env(1)
+        await a.send(env)
+        await b.recv()
+        await a.send(env)
+        with pytest.raises(ConnectionError):
+            await b.recv()
+        assert isinstance(b.error, ValueError)
+        await a.close(); await b.close()
+
+    asyncio.run(run())
+
+def test_tcp_pool_reuses_connection(monkeypatch):
+    monkeypatch.setenv("OPIPE_HMAC_KEY", "secret")
+
+    async def run():
+        conns = []
+
+        async def handler(ch):
+            conns.append(ch)
+            async for req in ch:
+                await ch.reply(req, _env(req.body["i"] + 1))
+
+        server = await serve(handler, "127.0.0.1", 0, "OPIPE_HMAC_KEY")
+        port = server.sockets[0].getsockname()[1]
+        pool = ChannelPool("OPIPE_HMAC_KEY")
+        out = []
+        for i in range(5):
+            ch = await pool.get("127.0.0.1", port)
+            out.append((await ch.request(_env(i), timeout=2)).body["i"])
+        await pool.close()
+        server.close(); await server.wait_closed()
+        return out, len(conns)
+
+    out, n_conns = asyncio.run(run())
+    assert out == [1, 2, 3, 4, 5] and n_conns == 1
+
+def test_oversized_batch_is_split_by_frame_size(monkeypatch):
+    monkeypatch.setenv("OPIPE_HMAC_KEY", "secret")
+    monkeypatch.setattr(transport, "MAX_FRAME", 4096)
+
+    async def run():
+        a, b = await loopback_pair("OPIPE_HMAC_KEY", max_batch=64)
+        for i in range(40):
+            await a.send(_env(i) if i % 2 else new_envelope(
+                "opipe-0.1", "event", "ogpt01/CEO", ["ocursor"], {"i": i, "pad": "x" * 1500}))
+        got = [(await b.recv()).body["i"] for _ in range(40)]
+        with pytest.raises(ValueError):
+            await a.send(new_envelope("opipe-0.1", "event", "a", ["b"], {"pad": "x" * 5000}))
+        with pytest.raises(TypeError):
+            await a.send(new_envelope("opipe-0.1", "event", "a", ["b"], {"obj": object()}))
+        assert not a.closed
+        await a.close(); await b.close()
+        return got
+
+    assert asyncio.run(run()) == list(range(40))
+
+def test_writer_failure_fails_pending_requests(monkeypatch):
+    monkeypatch.setenv("OPIPE_HMAC_KEY", "secret")
+
+    async def run():
+        a, b = await loopback_pair("OPIPE_HMAC_KEY")
+
+        def broken(*args):
+            raise RuntimeError("encoder bug")
+
+        monkeypatch.setattr(transport, "encode_batch_raw", broken)
+        with pytest.raises(ConnectionError):
+            await a.request(_env(1), timeout=5)
+        assert a.closed and isinstance(a.error, RuntimeError)
+        with pytest.raises(ConnectionError):
+            await a.send(_env(2))
+        await a.close(); await b.close()
+
+    asyncio.run(run())
+
+def test_replay_cache_is_bounded():
+    cache = ReplayCache(max_age_s=3600, max_size=100)
+    for i in range(1000):
+        cache.add(f"n{i}")
+    assert len(cache) == 100 and "n999" in cache and "n0" not in cache
+
+def test_replay_after_eviction_is_rejected(monkeypatch):
+    from cblm.proto import envelope
+    now = [1000.0]
+    monkeypatch.setattr(envelope, "time", types.SimpleNamespace(time=lambda: now[0], monotonic=lambda: now[0]))
+    cache = ReplayCache(max_age_s=60, max_size=3)
+
+    # un nonce scos dupa varsta nu mai trece: envelope-ul a expirat deja
+    old = _env(0, ttl_s=60); old.ts = now[0]
+    check_fresh(old, cache)
+    now[0] += 61
+    check_fresh(_env(1, ttl_s=60), cache)
+    assert old.nonce not in cache
+    with pytest.raises(ValueError, match="expired"):
+        check_fresh(old, cache)
+
+    # fara TTL, TTL peste fereastra sau ts in viitor: nonce-ul ar fi uitat inainte sa expire
+    for ttl_s, skew in ((0, 0), (61, 0), (60, 1)):
+        env = _env(2, ttl_s=ttl_s); env.ts = now[0] + skew
+        with pytest.raises(ValueError):
+            check_fresh(env, cache)
+
+    # scos de max_size cat inca e valid: replay-ul e respins pe ts
+    first = _env(3, ttl_s=60); first.ts = now[0]
+    check_fresh(first, cache)
+    for i in range(3):
+        now[0] += 1
+        env = _env(4 + i, ttl_s=60); env.ts = now[0]
+        check_fresh(env, cache)
+    assert first.nonce not in cache and len(cache) == 3
+    with pytest.raises(ValueError, match="replay window"):
+        check_fresh(first, cache)
+    later = _env(9, ttl_s=60); later.ts = now[0]
+    check_fresh(later, cache)  # envelopes noi trec in continuare
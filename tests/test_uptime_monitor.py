@@ -0,0 +1,139 @@
+# tests/test_uptime_monitor.py
+import os
+import random
+import statistics
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def um(tmp_path_factory):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("psutil")
+    # the module-level monitor reads its config and opens logs/ in the cwd
+    workdir = tmp_path_factory.mktemp("uptime")
+    (workdir / "logs").mkdir()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import uptime_monitor
+    finally:
+        os.chdir(cwd)
+    return uptime_monitor
+
+
+@pytest.fixture
+def monitor(um, tmp_path, monkeypatch):
+    (tmp_path / "logs").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return um.UptimeMonitor(config_file="uptime_config.json")
+
+
+def test_timer_wheel_fires_each_item_on_its_tick(um):
+    wheel = um.TimerWheel(tick_s=1.0, slots=8)
+    wheel.schedule("now", 0)  # at least one tick out
+    wheel.schedule("rounded", 2.4)
+    wheel.schedule("wrapped", 20)  # shares slot 4 with ticks 4 and 12
+
+    fired = {}
+    for _ in range(24):
+        for item in wheel.advance():
+            assert item not in fired
+            fired[item] = wheel.tick
+    assert fired == {"now": 1, "rounded": 2, "wrapped": 20}
+    assert all(not bucket for bucket in wheel.slots)
+
+
+def test_timer_wheel_periodic_rescheduling(um):
+    wheel = um.TimerWheel(tick_s=0.5, slots=16)
+    wheel.schedule("every-3s", 3)
+    wheel.schedule("every-7s", 7)
+    fires = {"every-3s": [], "every-7s": []}
+    for _ in range(84):  # 42 seconds
+        for item in wheel.advance():
+            fires[item].append(wheel.tick)
+            wheel.schedule(item, 3 if item == "every-3s" else 7)
+    assert fires["every-3s"] == list(range(6, 85, 6))
+    assert fires["every-7s"] == list(range(14, 85, 14))
+
+
+def test_percent_series_are_exact(um):
+    series = um.MetricSeries(maxlen=100, sketch=False)
+    for _ in range(50):
+        series.add(79.0)
+    assert series.quantile(0.95) == 79.0  # the sketch reported ~80.2 here
+
+    rng = random.Random(46)
+    values = [rng.uniform(0, 100) for _ in range(250)]
+    for value in values:
+        series.add(value)
+    window = values[-100:]
+    assert list(series.values) == window
+    assert series.sum == pytest.approx(sum(window))
+    assert series.quantile(0.95) == pytest.approx(statistics.quantiles(window, n=20)[18])
+    assert series.quantile(0.99) == pytest.approx(statistics.quantiles(window, n=100)[98])
+    assert series.sorted == sorted(window)  # kept in step with the window, not re-sorted
+    for q in (0.001, 0.25, 0.5, 0.9, 0.999):
+        assert series.quantile(q) == pytest.approx(statistics.quantiles(window, n=1000)[round(q * 1000) - 1])
+
+    flags = um.MetricSeries(maxlen=10, sketch=False)
+    for value in [0.0] * 7 + [1.0] * 8:  # duplicates leaving the window
+        flags.add(value)
+    assert flags.sorted == [0.0, 0.0] + [1.0] * 8 and flags.quantile(0.1) == 0.0
+
+    assert um.MetricSeries(sketch=False).quantile(0.95) is None
+
+
+def test_latency_series_sketch_tracks_the_window(um):
+    series = um.MetricSeries(maxlen=200)
+    rng = random.Random(7)
+    for _ in range(200):
+        series.add(rng.uniform(4000, 6000))
+    for _ in range(200):  # slides the slow values out of the window
+        series.add(rng.uniform(10, 20))
+    exact = statistics.quantiles(series.values, n=100)[98]
+    assert series.quantile(0.99) == pytest.approx(exact, rel=0.05)
+    assert series.sketch.total == 200
+
+
+def test_cpu_just_under_p95_threshold_does_not_alert(monitor, um):
+    for _ in range(20):
+        monitor._record_metric(um.MetricType.CPU_USAGE, 79.0)
+    monitor._calculate_percentiles()
+    assert not any(a.service == "system_p95" for a in monitor.alerts)
+
+    for _ in range(20):
+        monitor._record_metric(um.MetricType.CPU_USAGE, 81.0)
+    monitor._calculate_percentiles()
+    assert any(a.service == "system_p95" for a in monitor.alerts)
+    assert monitor.metrics_history[("system", um.MetricType.CPU_USAGE)].sketch is None
+    monitor._record_metric(um.MetricType.RESPONSE_TIME, 12.0, "api")
+    assert monitor.metrics_history[("api", um.MetricType.RESPONSE_TIME)].sketch is not None
+
+
+def test_alert_handlers_run_off_the_caller_thread(monitor, um):
+    release = threading.Event()
+    seen = []
+
+    def slow_handler(alert):
+        release.wait(5)  # e.g. SMTP to an unreachable server
+        seen.append((alert.value, threading.current_thread().name))
+
+    def broken_handler(alert):
+        raise RuntimeError("handler bug")
+
+    monitor.add_alert_handler(slow_handler)
+    monitor.add_alert_handler(broken_handler)
+
+    started = time.perf_counter()
+    for value in (90.0, 96.0):
+        monitor._record_metric(um.MetricType.CPU_USAGE, value)
+    assert time.perf_counter() - started < 1.0
+    assert len(monitor.alerts) == 2 and seen == []
+
+    release.set()
+    monitor._alert_pool.submit(lambda: None).result(timeout=5)
+    assert [value for value, _ in seen] == [90.0, 96.0]  # in order
+    assert all(name.startswith("uptime-alerts") for _, name in seen)
@@ -0,0 +1,84 @@
+# tests/test_vertex_index_store.py
+import os
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def vx(tmp_path_factory):
+    pytest.importorskip("faiss")
+    # the module-level manager opens vertex_rag.db in the cwd
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("vertex"))
+    try:
+        import vertex_ai_rag_system
+    finally:
+        os.chdir(cwd)
+    return vertex_ai_rag_system
+
+
+@pytest.fixture
+def store_factory(vx, tmp_path, monkeypatch):
+    import faiss
+
+    monkeypatch.setattr(vx, "faiss", faiss, raising=False)  # bound only with torch installed
+    monkeypatch.setattr(vx.config, "vector_segment_rows", 3)
+    monkeypatch.setattr(vx.config, "autosave_every", 10_000)
+    monkeypatch.setattr(vx.config, "compact_ratio", 0.5)
+    return lambda backfill=None: vx.DomainIndexStore("d", 4, str(tmp_path), backfill=backfill)
+
+
+def _vec(i):
+    return np.eye(4, dtype=np.float32)[i % 4] + 0.01 * i
+
+
+def _files(store):
+    return sorted(p.name for p in store.path.glob("vectors*.npy"))
+
+
+def test_saves_rewrite_only_new_segments(store_factory):
+    store = store_factory()
+    store.add([f"doc{i}" for i in range(5)], [_vec(i) for i in range(5)])
+    store.save()
+    assert _files(store) == ["vectors-0-00000.npy", "vectors-0-00001.npy"]
+    full = os.stat(store.path / "vectors-0-00000.npy").st_ino
+
+    store.add(["doc5", "doc6"], [_vec(5), _vec(6)])
+    store.save()
+    assert os.stat(store.path / "vectors-0-00000.npy").st_ino == full  # untouched
+    assert _files(store)[-1] == "vectors-0-00002.npy"
+
+    reloaded = store_factory()
+    assert reloaded.stats()["total_documents"] == 7
+    assert np.array_equal(reloaded.vectors, store.vectors)
+    assert reloaded.search(_vec(6).tolist(), 1, 0.0)[0]["document_id"] == "doc6"
+
+    # compaction drops rows: a new generation replaces every segment
+    for i in range(4):
+        reloaded.delete(f"doc{i}")
+    assert reloaded.generation == 1 and not reloaded.tombstones
+    reloaded.save()
+    assert _files(reloaded) == ["vectors-1-00000.npy"]
+    again = store_factory()
+    assert sorted(r["document_id"] for r in again.search(_vec(5).tolist(), 5, -1.0)) == [
+        "doc4", "doc5", "doc6"]
+
+
+def test_backfill_reads_only_rows_past_the_saved_mark(store_factory):
+    rows = [(10 + i, f"doc{i}", _vec(i)) for i in range(3)]
+    calls = []
+
+    def backfill(domain_id, after):
+        calls.append(after)
+        return [row for row in rows if row[0] > after]
+
+    store = store_factory(backfill)
+    assert store.stats()["total_documents"] == 3 and calls == [0]
+    store.save()
+
+    rows.append((20, "doc3", _vec(3)))  # stored after the save, never indexed (crash)
+    reloaded = store_factory(backfill)
+    assert reloaded.stats()["total_documents"] == 4 and calls == [0, 12]
+    reloaded.save()
+    assert store_factory(backfill).stats()["total_documents"] == 4 and calls[-1] == 20
@@ -4,18 +4,24 @@
 import os
 import json
 import time
-import requests
+import random
+import asyncio
+import bisect
+import aiohttp
 import psutil
 import threading
-from typing import Dict, List, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Callable, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from enum import Enum
-import statistics
 import logging
 from collections import deque
 import smtplib
 from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from slo_monitoring import QuantileSketch
 
 
 class AlertLevel(Enum):
@@ -86,23 +92,128 @@ def __post_init__(self):
             self.headers = {}
 
 
+class TimerWheel:
+    """Hashed timing wheel: O(1) scheduling, one bucket scanned per tick"""
+
+    def __init__(self, tick_s: float = 1.0, slots: int = 512):
+        self.tick_s = tick_s
+        self.slots: List[List[Tuple[int, object]]] = [[] for _ in range(slots)]
+        self.tick = 0
+
+    def schedule(self, item, delay_s: float):
+        """Fire ``item`` after ``delay_s`` (at least one tick from now)"""
+        target = self.tick + max(1, round(delay_s / self.tick_s))
+        self.slots[target % len(self.slots)].append((target, item))
+
+    def advance(self) -> list:
+        """Move to the next tick and return the items due on it"""
+        self.tick += 1
+        bucket = self.slots[self.tick % len(self.slots)]
+        due = [item for target, item in bucket if target <= self.tick]
+        if due:
+            bucket[:] = [(t, item) for t, item in bucket if t > self.tick]
+        return due
+
+
+class MetricSeries:
+    """Last ``maxlen`` values of one service metric with running aggregates
+
+    With ``sketch`` (latencies in ms) the quantile sketch is updated as
+    values enter and leave the window, so p95/p99 never re-sort the
+    history. Other metrics (percentages, 0/1 flags, counts) are outside
+    the sketch's millisecond buckets and its ~4% resolution would move
+    them across thresholds, so their quantiles are computed exactly from
+    a sorted copy of the window, kept in order as values enter and leave.
+    """
+
+    __slots__ = ("values", "sorted", "sum", "sketch", "last_updated")
+
+    def __init__(self, maxlen: int = 1000, sketch: bool = True):
+        self.values: deque = deque(maxlen=maxlen)
+        self.sorted: List[float] = []
+        self.sum = 0.0
+        self.sketch = QuantileSketch() if sketch else None
+        self.last_updated: Optional[datetime] = None
+
+    def add(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            oldest = self.values[0]
+            self.sum -= oldest
+            if self.sketch is not None:
+                self.sketch.discard(oldest)
+            else:
+                del self.sorted[bisect.bisect_left(self.sorted, oldest)]
+        self.values.append(value)
+        self.sum += value
+        if self.sketch is not None:
+            self.sketch.add(value)
+        else:
+            bisect.insort(self.sorted, value)
+        self.last_updated = datetime.now()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.sketch is not None:
+            return self.sketch.quantile(q)
+        if len(self.values) < 2:
+            return self.values[0] if self.values else None
+        # statistics.quantiles(values, n=1000)[i - 1] without re-sorting: same
+        # cut points as statistics.quantiles(values, n=20)[18] for q=0.95
+        data, n = self.sorted, 1000
+        i, m = round(q * n), len(data) + 1
+        j = min(max(i * m // n, 1), len(data) - 1)
+        delta = i * m - j * n
+        return (data[j - 1] * (n - delta) + data[j] * delta) / n
+
+
 class UptimeMonitor:
-    """Uptime monitoring system."""
+    """Uptime monitoring system.
+
+    Checks run on an asyncio scheduler in the monitor thread: each check
+    fires on its own ``check_interval`` (jittered so checks spread out),
+    probes share one keep-alive connection pool, and at most
+    ``max_concurrency`` are in flight. A hung endpoint only holds its own
+    slot until its timeout; a check still in flight when it is due again
+    is skipped for that round. Alert handlers (SMTP and the like) run in
+    order on a worker thread, never on the scheduler loop.
+    """
 
-    def __init__(self, config_file: str = "uptime_config.json"):
+    # Millisecond latencies go through the quantile sketch, the rest are exact
+    SKETCHED_METRICS = frozenset({MetricType.RESPONSE_TIME})
+
+    def __init__(
+        self,
+        config_file: str = "uptime_config.json",
+        max_concurrency: int = 50,
+        jitter: float = 0.1,
+        system_interval: float = 30.0,
+    ):
         self.config_file = config_file
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter  # +/- fraction of each interval
+        self.system_interval = system_interval
         self.uptime_checks: List[UptimeCheck] = []
         self.metric_thresholds: List[MetricThreshold] = []
+        self.thresholds: Dict[MetricType, MetricThreshold] = {}
         self.alerts: List[Alert] = []
-        self.metrics_history: Dict[str, deque] = {}
+        self.metrics_history: Dict[Tuple[str, MetricType], MetricSeries] = {}
         self.running = False
         self.monitor_thread: Optional[threading.Thread] = None
+        self.probe_stats = {"probes": 0, "failures": 0, "skipped_inflight": 0}
+
+        # Scheduler state, owned by the monitor thread's event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._wheel: Optional[TimerWheel] = None
 
         # Alert handlers
         self.alert_handlers: List[Callable[[Alert], None]] = []
+        self._alert_pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="uptime-alerts"
+        )
 
         # Load configuration
         self._load_config()
+        self._index_thresholds()
 
         # Setup logging
         self._setup_logging()
@@ -201,7 +312,8 @@ def _save_config(self):
         config = {
             "uptime_checks": [asdict(check) for check in self.uptime_checks],
             "metric_thresholds": [
-                asdict(threshold) for threshold in self.metric_thresholds
+                {**asdict(threshold), "metric_type": threshold.metric_type.value}
+                for threshold in self.metric_thresholds
             ],
         }
 
@@ -221,14 +333,23 @@ def _setup_logging(self):
 
         self.logger = logging.getLogger("uptime_monitor")
 
+    def _index_thresholds(self):
+        """Threshold per metric type (the first configured one wins)."""
+        self.thresholds = {}
+        for threshold in self.metric_thresholds:
+            self.thresholds.setdefault(threshold.metric_type, threshold)
+
     def add_uptime_check(self, check: UptimeCheck):
         """Add new uptime check."""
         self.uptime_checks.append(check)
         self._save_config()
+        if self.running and self._loop and check.enabled:
+            self._loop.call_soon_threadsafe(self._schedule, check, 0)
 
     def add_metric_threshold(self, threshold: MetricThreshold):
         """Add new metric threshold."""
         self.metric_thresholds.append(threshold)
+        self._index_thresholds()
         self._save_config()
 
     def add_alert_handler(self, handler: Callable[[Alert], None]):
@@ -239,21 +360,22 @@ def _record_metric(
         self, metric_type: MetricType, value: float, service: str = "system"
     ):
         """Record metric value."""
-        key = f"{service}_{metric_type.value}"
+        key = (service, metric_type)
 
-        if key not in self.metrics_history:
-            self.metrics_history[key] = deque(maxlen=1000)  # Keep last 1000 values
+        series = self.metrics_history.get(key)
+        if series is None:
+            series = self.metrics_history[key] = MetricSeries(  # Keep last 1000 values
+                sketch=metric_type in self.SKETCHED_METRICS
+            )
 
-        self.metrics_history[key].append({"value": value, "timestamp": datetime.now()})
+        series.add(value)
 
         # Check thresholds
         self._check_thresholds(metric_type, value, service)
 
     def _check_thresholds(self, metric_type: MetricType, value: float, service: str):
         """Check metric against thresholds."""
-        threshold = next(
-            (t for t in self.metric_thresholds if t.metric_type == metric_type), None
-        )
+        threshold = self.thresholds.get(metric_type)
         if not threshold:
             return
 
@@ -299,36 +421,46 @@ def _create_alert(
 
         self.alerts.append(alert)
 
-        # Send alert to handlers
-        for handler in self.alert_handlers:
+        # Send alert to handlers (may block on I/O: off the caller's thread)
+        if self.alert_handlers:
+            self._alert_pool.submit(self._dispatch_alert, alert)
+
+        self.logger.warning(f"Alert created: {alert.message}")
+
+    def _dispatch_alert(self, alert: Alert):
+        """Run every alert handler on one alert (alert worker thread)."""
+        for handler in list(self.alert_handlers):
             try:
                 handler(alert)
             except Exception as e:
                 self.logger.error(f"Error in alert handler: {e}")
 
-        self.logger.warning(f"Alert created: {alert.message}")
-
-    def _perform_uptime_check(self, check: UptimeCheck) -> Dict:
+    async def _perform_uptime_check(
+        self, session: aiohttp.ClientSession, check: UptimeCheck
+    ) -> Dict:
         """Perform single uptime check."""
-        start_time = time.time()
+        start_time = time.perf_counter()
+        self.probe_stats["probes"] += 1
 
         try:
-            response = requests.request(
-                method=check.method,
-                url=check.url,
+            async with session.request(
+                check.method,
+                check.url,
                 headers=check.headers,
-                timeout=check.timeout,
-            )
+                timeout=aiohttp.ClientTimeout(total=check.timeout),
+            ) as response:
+                # Read the body so the connection goes back to the pool
+                body = await response.text(errors="replace")
 
-            response_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+            response_time = (time.perf_counter() - start_time) * 1000  # Convert to milliseconds
 
             # Check status code
-            status_ok = response.status_code == check.expected_status
+            status_ok = response.status == check.expected_status
 
             # Check content if specified
             content_ok = True
             if check.expected_content:
-                content_ok = check.expected_content in response.text
+                content_ok = check.expected_content in body
 
             # Overall check result
             success = status_ok and content_ok
@@ -338,102 +470,149 @@ def _perform_uptime_check(self, check: UptimeCheck) -> Dict:
             self._record_metric(MetricType.UPTIME, 1.0 if success else 0.0, check.name)
 
             if not success:
+                self.probe_stats["failures"] += 1
                 self._record_metric(MetricType.ERROR_RATE, 1.0, check.name)
 
             return {
                 "success": success,
                 "response_time": response_time,
-                "status_code": response.status_code,
+                "status_code": response.status,
                 "timestamp": datetime.now(),
             }
 
-        except requests.RequestException as e:
-            response_time = (time.time() - start_time) * 1000
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            response_time = (time.perf_counter() - start_time) * 1000
+            self.probe_stats["failures"] += 1
 
             self._record_metric(MetricType.RESPONSE_TIME, response_time, check.name)
             self._record_metric(MetricType.UPTIME, 0.0, check.name)
             self._record_metric(MetricType.ERROR_RATE, 1.0, check.name)
 
-            self.logger.error(f"Uptime check failed for {check.name}: {e}")
+            self.logger.error(f"Uptime check failed for {check.name}: {e!r}")
 
             return {
                 "success": False,
                 "response_time": response_time,
-                "error": str(e),
+                "error": repr(e),
                 "timestamp": datetime.now(),
             }
 
-    def _collect_system_metrics(self):
+    def _read_system_metrics(self) -> List[Tuple[MetricType, float]]:
+        """Read system metrics (blocks ~1s for the CPU sample)."""
+        disk = psutil.disk_usage("/")
+        return [
+            (MetricType.CPU_USAGE, psutil.cpu_percent(interval=1)),
+            (MetricType.MEMORY_USAGE, psutil.virtual_memory().percent),
+            (MetricType.DISK_USAGE, (disk.used / disk.total) * 100),
+        ]
+
+    async def _collect_system_metrics(self):
         """Collect system metrics."""
         try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            self._record_metric(MetricType.CPU_USAGE, cpu_percent)
-
-            # Memory usage
-            memory = psutil.virtual_memory()
-            self._record_metric(MetricType.MEMORY_USAGE, memory.percent)
-
-            # Disk usage
-            disk = psutil.disk_usage("/")
-            disk_percent = (disk.used / disk.total) * 100
-            self._record_metric(MetricType.DISK_USAGE, disk_percent)
-
+            for metric_type, value in await asyncio.to_thread(self._read_system_metrics):
+                self._record_metric(metric_type, value)
         except Exception as e:
             self.logger.error(f"Error collecting system metrics: {e}")
 
     def _monitor_loop(self):
-        """Main monitoring loop."""
-        while self.running:
+        """Main monitoring loop (runs the probe scheduler on its own event loop)."""
+        try:
+            asyncio.run(self._run_scheduler())
+        except Exception as e:
+            self.logger.error(f"Error in monitoring loop: {e}")
+        finally:
+            self._loop = self._wheel = self._stop = None
+
+    def _schedule(self, check: UptimeCheck, delay_s: float):
+        if self._wheel is not None:
+            self._wheel.schedule(check, delay_s)
+
+    def _next_delay(self, interval: float) -> float:
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _run_scheduler(self):
+        """Tick the timer wheel and dispatch due checks until stopped."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._wheel = wheel = TimerWheel(tick_s=1.0)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        inflight: set = set()
+        tasks: set = set()
+
+        def spawn(coro):
+            task = asyncio.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        async def probe(check: UptimeCheck):
             try:
-                # Perform uptime checks
-                for check in self.uptime_checks:
-                    if check.enabled:
-                        self._perform_uptime_check(check)
+                async with semaphore:
+                    await self._perform_uptime_check(session, check)
+            except Exception as e:
+                self.logger.error(f"Error probing {check.name}: {e}")
+            finally:
+                inflight.discard(check.name)
 
-                # Collect system metrics
-                self._collect_system_metrics()
+        async def periodic(job, interval: float):
+            while True:
+                await job()
+                await asyncio.sleep(interval)
 
-                # Calculate percentiles
-                self._calculate_percentiles()
+        async def evaluate_percentiles():
+            self._calculate_percentiles()
 
-                # Sleep until next check
-                time.sleep(30)  # Check every 30 seconds
+        # Spread the first round over each check's interval
+        for check in self.uptime_checks:
+            if check.enabled:
+                wheel.schedule(check, random.uniform(0, check.check_interval))
 
-            except Exception as e:
-                self.logger.error(f"Error in monitoring loop: {e}")
-                time.sleep(60)  # Wait longer on error
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency, ttl_dns_cache=300, keepalive_timeout=60
+        )
+        async with aiohttp.ClientSession(connector=connector) as session:
+            spawn(periodic(self._collect_system_metrics, self.system_interval))
+            spawn(periodic(evaluate_percentiles, self.system_interval))
+
+            started = time.monotonic()
+            while self.running:
+                # Sleep to the next tick boundary (no drift; catches up if late)
+                next_tick = started + (wheel.tick + 1) * wheel.tick_s
+                try:
+                    await asyncio.wait_for(
+                        self._stop.wait(), max(0.0, next_tick - time.monotonic())
+                    )
+                    break
+                except asyncio.TimeoutError:
+                    pass
+
+                for check in wheel.advance():
+                    if not check.enabled:
+                        continue  # disabled: drop from the wheel
+                    wheel.schedule(check, self._next_delay(check.check_interval))
+                    if check.name in inflight:
+                        self.probe_stats["skipped_inflight"] += 1
+                        continue
+                    inflight.add(check.name)
+                    spawn(probe(check))
+
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     def _calculate_percentiles(self):
-        """Calculate P95 and P99 percentiles for metrics."""
-        for key, values in self.metrics_history.items():
-            if len(values) < 10:  # Need at least 10 values
+        """Check P95 and P99 percentiles of each metric against thresholds."""
+        for (service, metric_type), series in list(self.metrics_history.items()):
+            if len(series.values) < 10:  # Need at least 10 values
                 continue
 
-            metric_values = [v["value"] for v in values]
-
-            # Calculate percentiles
-            p95 = statistics.quantiles(metric_values, n=20)[18]  # 95th percentile
-            p99 = statistics.quantiles(metric_values, n=100)[98]  # 99th percentile
-
-            # Extract metric type and service from key
-            parts = key.split("_", 1)
-            service = parts[0] if len(parts) > 1 else "system"
-            metric_type_str = parts[1] if len(parts) > 1 else parts[0]
+            threshold = self.thresholds.get(metric_type)
+            if not threshold or not (threshold.p95_threshold or threshold.p99_threshold):
+                continue
 
-            try:
-                metric_type = MetricType(metric_type_str)
-
-                # Check P95 thresholds
-                threshold = next(
-                    (t for t in self.metric_thresholds if t.metric_type == metric_type),
-                    None,
-                )
-                if (
-                    threshold
-                    and threshold.p95_threshold
-                    and p95 >= threshold.p95_threshold
-                ):
+            # Check P95 thresholds
+            if threshold.p95_threshold:
+                p95 = series.quantile(0.95)
+                if p95 >= threshold.p95_threshold:
                     self._create_alert(
                         AlertLevel.WARNING,
                         metric_type,
@@ -442,12 +621,10 @@ def _calculate_percentiles(self):
                         f"{service}_p95",
                     )
 
-                # Check P99 thresholds
-                if (
-                    threshold
-                    and threshold.p99_threshold
-                    and p99 >= threshold.p99_threshold
-                ):
+            # Check P99 thresholds
+            if threshold.p99_threshold:
+                p99 = series.quantile(0.99)
+                if p99 >= threshold.p99_threshold:
                     self._create_alert(
                         AlertLevel.ERROR,
                         metric_type,
@@ -456,9 +633,6 @@ def _calculate_percentiles(self):
                         f"{service}_p99",
                     )
 
-            except ValueError:
-                continue  # Skip unknown metric types
-
     def start_monitoring(self):
         """Start monitoring."""
         if self.running:
@@ -473,6 +647,12 @@ def start_monitoring(self):
     def stop_monitoring(self):
         """Stop monitoring."""
         self.running = False
+        loop, stop = self._loop, self._stop
+        if loop and stop:
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:
+                pass  # loop already closed
         if self.monitor_thread:
             self.monitor_thread.join()
 
@@ -483,20 +663,13 @@ def get_uptime_stats(self) -> Dict:
         stats = {}
 
         for check in self.uptime_checks:
-            key = f"{check.name}_uptime"
-            if key in self.metrics_history:
-                values = list(self.metrics_history[key])
-                if values:
-                    uptime_percent = (
-                        sum(v["value"] for v in values) / len(values)
-                    ) * 100
-                    stats[check.name] = {
-                        "uptime_percent": uptime_percent,
-                        "total_checks": len(values),
-                        "last_check": (
-                            values[-1]["timestamp"].isoformat() if values else None
-                        ),
-                    }
+            series = self.metrics_history.get((check.name, MetricType.UPTIME))
+            if series and series.values:
+                stats[check.name] = {
+                    "uptime_percent": (series.sum / len(series.values)) * 100,
+                    "total_checks": len(series.values),
+                    "last_check": series.last_updated.isoformat(),
+                }
 
         return stats
 
@@ -504,28 +677,19 @@ def get_metrics_summary(self) -> Dict:
         """Get metrics summary."""
         summary = {}
 
-        for key, values in self.metrics_history.items():
-            if not values:
+        for (service, metric_type), series in list(self.metrics_history.items()):
+            if not series.values:
                 continue
 
-            metric_values = [v["value"] for v in values]
-
-            summary[key] = {
-                "count": len(metric_values),
-                "min": min(metric_values),
-                "max": max(metric_values),
-                "avg": statistics.mean(metric_values),
-                "p95": (
-                    statistics.quantiles(metric_values, n=20)[18]
-                    if len(metric_values) >= 10
-                    else None
-                ),
-                "p99": (
-                    statistics.quantiles(metric_values, n=100)[98]
-                    if len(metric_values) >= 10
-                    else None
-                ),
-                "last_updated": values[-1]["timestamp"].isoformat(),
+            count = len(series.values)
+            summary[f"{service}_{metric_type.value}"] = {
+                "count": count,
+                "min": min(series.values),
+                "max": max(series.values),
+                "avg": series.sum / count,
+                "p95": series.quantile(0.95) if count >= 10 else None,
+                "p99": series.quantile(0.99) if count >= 10 else None,
+                "last_updated": series.last_updated.isoformat(),
             }
 
         return summary
@@ -554,6 +718,7 @@ def __init__(
         password: str,
         from_email: str,
         to_emails: List[str],
+        timeout: float = 10.0,
     ):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
@@ -561,6 +726,7 @@ def __init__(
         self.password = password
         self.from_email = from_email
         self.to_emails = to_emails
+        self.timeout = timeout
 
     def __call__(self, alert: Alert):
         """Send email alert."""
@@ -585,9 +751,9 @@ def __call__(self, alert: Alert):
 Please check the system immediately.
             """
 
-            msg.attach(MimeText(body, "plain"))
+            msg.attach(MIMEText(body, "plain"))
 
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
             server.starttls()
             server.login(self.username, self.password)
             text = msg.as_string()
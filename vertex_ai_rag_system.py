@@ -9,9 +9,11 @@
 
 import json
 import logging
-import sqlite3
+import os
+import threading
 import numpy as np
-from typing import Dict, List, Optional, Any
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Any, Tuple
 from datetime import datetime
 import uuid
 
@@ -20,6 +22,8 @@
 from pydantic import BaseModel
 import uvicorn
 
+from rag_core import Retriever, SQLiteStore
+
 # Vector search libraries
 try:
     import torch
@@ -48,6 +52,17 @@ class VertexAIConfig(BaseModel):
     vector_dimension: int = 384  # all-MiniLM-L6-v2 dimension
     similarity_threshold: float = 0.7
     max_results: int = 10
+    # Persistent FAISS domain indexes
+    index_dir: str = "vertex_indexes"
+    ann_threshold: int = 20000  # flat (exact) below, ANN above
+    ann_kind: str = "hnsw"  # "hnsw" | "ivf"
+    hnsw_m: int = 32
+    hnsw_ef_search: int = 64
+    ivf_nprobe: int = 16
+    compact_ratio: float = 0.2  # rebuild when tombstones exceed this share
+    autosave_every: int = 100  # persist after this many unsaved adds/deletes
+    vector_segment_rows: int = 4096  # rows per vectors-*.npy file; saves rewrite only new ones
+    embedding_batch_size: int = 64
 
 
 config = VertexAIConfig()
@@ -100,13 +115,309 @@ class DocumentRequest(BaseModel):
     vertex_metadata: Dict[str, Any] = {}
 
 
+# Persistent per-domain FAISS index
+class DomainIndexStore:
+    """
+    FAISS index for one domain, persisted under {index_dir}/{domain_id}/:
+      index.faiss         - IndexIDMap2 over Flat (small) or HNSW/IVF (>= ann_threshold)
+      vectors-G-NNNNN.npy - normalized float32 vectors in segments of
+                            vector_segment_rows, source for rebuild/compaction
+      ids.json            - sidecar: faiss id -> document id, tombstones, next
+                            id, vector generation, backfill mark
+
+    Loaded lazily on first use. Deletes are tombstones filtered at query time;
+    the index is rebuilt from the vectors once they pass compact_ratio.
+    Vectors are append-only within a generation, so a save rewrites only the
+    segments past the last saved row; compaction starts a new generation and
+    the old files are removed once the sidecar points at it.
+    Documents present in the DB but missing from the files (crash before
+    save) are backfilled from their stored embeddings, never re-embedded:
+    backfill(domain_id, mark) yields (mark, document id, embedding) for rows
+    stored after `mark`, and the highest mark seen is kept in the sidecar.
+    """
+
+    def __init__(
+        self,
+        domain_id: str,
+        dimension: int,
+        root_dir: str,
+        backfill: Optional[Callable[[str, int], Iterable[Tuple[int, str, List[float]]]]] = None,
+    ):
+        self.domain_id = domain_id
+        self.dimension = dimension
+        self.path = Path(root_dir) / domain_id
+        self.backfill = backfill
+        self.index = None
+        self.kind = "flat"
+        self.vectors = np.zeros((0, dimension), dtype=np.float32)
+        self.row_ids = np.zeros(0, dtype=np.int64)
+        self.doc_ids: Dict[int, str] = {}
+        self.faiss_ids: Dict[str, int] = {}
+        self.tombstones: set = set()
+        self.next_id = 0
+        self.unsaved = 0
+        self.generation = 0  # bumped when rows are dropped (compaction)
+        self.saved_rows = 0  # vector rows already on disk for this generation
+        self.backfill_mark = 0
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    # -- build --
+    def _new_index(self, n: int):
+        if n < config.ann_threshold:
+            self.kind = "flat"
+            base = faiss.IndexFlatIP(self.dimension)
+        elif config.ann_kind == "ivf":
+            self.kind = "ivf"
+            nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            base = faiss.IndexIVFFlat(
+                quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT
+            )
+            base.train(self.vectors)
+            base.nprobe = config.ivf_nprobe
+        else:
+            self.kind = "hnsw"
+            base = faiss.IndexHNSWFlat(
+                self.dimension, config.hnsw_m, faiss.METRIC_INNER_PRODUCT
+            )
+            base.hnsw.efSearch = config.hnsw_ef_search
+        return faiss.IndexIDMap2(base)
+
+    def _rebuild(self):
+        """Rebuild from live vectors (drops tombstones, may switch flat -> ANN)"""
+        if self.tombstones:
+            live = np.array(
+                [fid not in self.tombstones for fid in self.row_ids.tolist()],
+                dtype=bool,
+            )
+            self.vectors = np.ascontiguousarray(self.vectors[live])
+            self.row_ids = self.row_ids[live]
+            self.generation += 1
+            self.saved_rows = 0
+            for fid in self.tombstones:
+                doc_id = self.doc_ids.pop(fid, None)
+                if self.faiss_ids.get(doc_id) == fid:
+                    del self.faiss_ids[doc_id]
+            self.tombstones = set()
+        self.index = self._new_index(len(self.row_ids))
+        if len(self.row_ids):
+            self.index.add_with_ids(self.vectors, self.row_ids)
+        self.unsaved += 1
+
+    # -- persistence --
+    def _ensure_loaded(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            sidecar = self.path / "ids.json"
+            if sidecar.exists() and (self.path / "index.faiss").exists():
+                meta = json.loads(sidecar.read_text(encoding="utf-8"))
+                self.index = faiss.read_index(str(self.path / "index.faiss"))
+                self.row_ids = np.asarray(meta["row_ids"], dtype=np.int64)
+                self.vectors = self._load_vectors(meta)
+                self.doc_ids = {int(k): v for k, v in meta["doc_ids"].items()}
+                self.tombstones = set(meta.get("tombstones", []))
+                self.faiss_ids = {
+                    v: k for k, v in self.doc_ids.items() if k not in self.tombstones
+                }
+                self.next_id = meta["next_id"]
+                self.kind = meta.get("kind", "flat")
+                self.backfill_mark = meta.get("backfill_mark", 0)
+                logger.info(
+                    f"✅ Loaded {self.kind} index for {self.domain_id} ({len(self.doc_ids)} vectors)"
+                )
+            else:
+                self.index = self._new_index(0)
+            self.loaded = True
+
+            if self.backfill:
+                missing, mark = [], self.backfill_mark
+                for mark, doc_id, emb in self.backfill(self.domain_id, mark):
+                    if doc_id not in self.faiss_ids:
+                        missing.append((doc_id, emb))
+                if mark != self.backfill_mark:
+                    self.backfill_mark = mark  # rows come in mark order
+                    self.unsaved += 1
+                if missing:
+                    self.add([d for d, _ in missing], [e for _, e in missing])
+                    logger.info(
+                        f"✅ Backfilled {len(missing)} stored embeddings into {self.domain_id}"
+                    )
+
+    def _segment_path(self, generation: int, segment: int) -> Path:
+        return self.path / f"vectors-{generation}-{segment:05d}.npy"
+
+    def _load_vectors(self, meta: Dict[str, Any]) -> np.ndarray:
+        rows = len(self.row_ids)
+        if "vector_generation" not in meta:
+            vectors = np.load(self.path / "vectors.npy")  # single-file layout
+        else:
+            self.generation = meta["vector_generation"]
+            segments = -(-rows // config.vector_segment_rows)
+            parts = [np.load(self._segment_path(self.generation, i)) for i in range(segments)]
+            vectors = np.concatenate(parts) if parts else np.zeros((0, self.dimension), np.float32)
+        # a segment may already hold rows appended after this sidecar was written
+        self.saved_rows = rows if "vector_generation" in meta else 0
+        return np.ascontiguousarray(vectors[:rows], dtype=np.float32)
+
+    def _save_vectors(self):
+        """Write the segments holding rows added since the last save"""
+        size = config.vector_segment_rows
+        rows = len(self.row_ids)
+        for segment in range(self.saved_rows // size, -(-rows // size)):
+            path = self._segment_path(self.generation, segment)
+            with open(path.with_suffix(".npy.tmp"), "wb") as f:
+                np.save(f, self.vectors[segment * size : (segment + 1) * size])
+            os.replace(path.with_suffix(".npy.tmp"), path)
+
+    def _remove_stale_vectors(self):
+        current = f"vectors-{self.generation}-"
+        for path in self.path.glob("vectors*.npy"):
+            if not path.name.startswith(current):
+                path.unlink(missing_ok=True)
+
+    def save(self):
+        """Atomically persist index, new vector segments and sidecar"""
+        with self._lock:
+            if not self.loaded:
+                return
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_index = self.path / "index.faiss.tmp"
+            faiss.write_index(self.index, str(tmp_index))
+            # within a generation rows are only appended, so rewriting the tail
+            # segment keeps it valid for the previous sidecar too
+            self._save_vectors()
+            (self.path / "ids.json.tmp").write_text(
+                json.dumps(
+                    {
+                        "domain_id": self.domain_id,
+                        "dimension": self.dimension,
+                        "kind": self.kind,
+                        "next_id": self.next_id,
+                        "row_ids": self.row_ids.tolist(),
+                        "doc_ids": self.doc_ids,
+                        "tombstones": sorted(self.tombstones),
+                        "vector_generation": self.generation,
+                        "backfill_mark": self.backfill_mark,
+                    }
+                ),
+                encoding="utf-8",
+            )
+            # sidecar last: a crash mid-save leaves the previous consistent set
+            os.replace(tmp_index, self.path / "index.faiss")
+            os.replace(self.path / "ids.json.tmp", self.path / "ids.json")
+            self._remove_stale_vectors()
+            self.saved_rows = len(self.row_ids)
+            self.unsaved = 0
+
+    def _maybe_save(self):
+        if self.unsaved >= config.autosave_every:
+            self.save()
+
+    # -- mutations --
+    def add(self, doc_ids: List[str], embeddings: List[List[float]]) -> int:
+        """Batched add; re-adding a doc id replaces its previous vector"""
+        if not doc_ids:
+            return 0
+        self._ensure_loaded()
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in self.faiss_ids:
+                    self.tombstones.add(self.faiss_ids.pop(doc_id))
+            vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+            faiss.normalize_L2(vectors)
+            ids = np.arange(self.next_id, self.next_id + len(doc_ids), dtype=np.int64)
+            self.next_id += len(doc_ids)
+
+            self.vectors = np.concatenate([self.vectors, vectors])
+            self.row_ids = np.concatenate([self.row_ids, ids])
+            for fid, doc_id in zip(ids.tolist(), doc_ids):
+                self.doc_ids[fid] = doc_id
+                self.faiss_ids[doc_id] = fid
+
+            if self.kind == "flat" and len(self.row_ids) >= config.ann_threshold:
+                self._rebuild()  # switch to ANN
+            else:
+                self.index.add_with_ids(vectors, ids)
+            self.unsaved += len(doc_ids)
+            self._maybe_compact()
+            self._maybe_save()
+            return len(doc_ids)
+
+    def delete(self, doc_id: str) -> bool:
+        self._ensure_loaded()
+        with self._lock:
+            fid = self.faiss_ids.pop(doc_id, None)
+            if fid is None:
+                return False
+            self.tombstones.add(fid)
+            self.unsaved += 1
+            self._maybe_compact()
+            self._maybe_save()
+            return True
+
+    def _maybe_compact(self):
+        if self.tombstones and len(self.tombstones) > config.compact_ratio * max(
+            len(self.row_ids), 1
+        ):
+            self._rebuild()
+
+    # -- queries --
+    def search(
+        self, query_embedding: List[float], k: int, threshold: float
+    ) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            total = len(self.row_ids)
+            if total == 0:
+                return []
+            query = np.asarray([query_embedding], dtype=np.float32)
+            faiss.normalize_L2(query)
+            # oversample so tombstoned hits do not shrink the result set
+            fetch = min(total, k + len(self.tombstones))
+            scores, ids = self.index.search(query, fetch)
+
+            # filter under the lock: a concurrent delete or compaction
+            # rewrites tombstones and doc_ids
+            results = []
+            for score, fid in zip(scores[0].tolist(), ids[0].tolist()):
+                if fid == -1 or fid in self.tombstones or score < threshold:
+                    continue
+                doc_id = self.doc_ids.get(fid)
+                if doc_id:
+                    results.append(
+                        {"document_id": doc_id, "similarity_score": float(score), "index": fid}
+                    )
+                if len(results) >= k:
+                    break
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        return {
+            "total_documents": len(self.faiss_ids),
+            "dimension": self.dimension,
+            "index_type": f"FAISS_IndexIDMap2_{self.kind}",
+            "tombstones": len(self.tombstones),
+            "persisted_path": str(self.path),
+            "unsaved_changes": self.unsaved,
+        }
+
+
 # Vector search engine
 class VertexAIVectorSearch:
-    def __init__(self, dimension: int = 384):
+    def __init__(
+        self,
+        dimension: int = 384,
+        backfill: Optional[Callable[[str, int], Iterable[Tuple[int, str, List[float]]]]] = None,
+    ):
         self.dimension = dimension
         self.embedding_model = None
-        self.indexes: Dict[str, faiss.IndexFlatIP] = {}
-        self.document_mappings: Dict[str, Dict[int, str]] = {}
+        self.backfill = backfill
+        self.stores: Dict[str, DomainIndexStore] = {}
 
         if HAS_VECTOR_LIBS:
             self._initialize_embedding_model()
@@ -128,27 +439,29 @@ def _initialize_embedding_model(self):
             self.embedding_model = None
 
     def create_domain_index(self, domain_id: str):
-        """Create FAISS index for a domain"""
-        if not HAS_VECTOR_LIBS:
+        """Register the domain's index store (files are loaded lazily on first use)"""
+        if not HAS_VECTOR_LIBS or domain_id in self.stores:
             return
 
-        try:
-            # Use Inner Product for similarity (compatible with Vertex AI)
-            index = faiss.IndexFlatIP(self.dimension)
-            self.indexes[domain_id] = index
-            self.document_mappings[domain_id] = {}
-            logger.info(f"✅ Created FAISS index for domain {domain_id}")
-        except Exception as e:
-            logger.error(f"❌ Error creating index for {domain_id}: {e}")
+        self.stores[domain_id] = DomainIndexStore(
+            domain_id, self.dimension, config.index_dir, backfill=self.backfill
+        )
 
     def generate_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding for text"""
+        embeddings = self.generate_embeddings([text])
+        return embeddings[0] if embeddings else None
+
+    def generate_embeddings(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Generate embeddings for many texts in one batched encode"""
         if not self.embedding_model:
             return None
 
         try:
-            embedding = self.embedding_model.encode(text, convert_to_tensor=False)
-            return embedding.tolist()
+            embeddings = self.embedding_model.encode(
+                texts, batch_size=config.embedding_batch_size, convert_to_tensor=False
+            )
+            return np.asarray(embeddings, dtype=np.float32).tolist()
         except Exception as e:
             logger.error(f"❌ Error generating embedding: {e}")
             return None
@@ -157,26 +470,28 @@ def add_document_to_index(
         self, domain_id: str, doc_id: str, embedding: List[float]
     ):
         """Add document embedding to FAISS index"""
-        if not HAS_VECTOR_LIBS or domain_id not in self.indexes:
-            return False
-
-        try:
-            # Normalize embedding for Inner Product
-            embedding_array = np.array([embedding], dtype=np.float32)
-            faiss.normalize_L2(embedding_array)
+        return self.add_documents_to_index(domain_id, [doc_id], [embedding]) == 1
 
-            # Add to index
-            self.indexes[domain_id].add(embedding_array)
+    def add_documents_to_index(
+        self, domain_id: str, doc_ids: List[str], embeddings: List[List[float]]
+    ) -> int:
+        """Add many embeddings with one normalize + add_with_ids"""
+        if not HAS_VECTOR_LIBS or domain_id not in self.stores:
+            return 0
 
-            # Store mapping
-            doc_index = self.indexes[domain_id].ntotal - 1
-            self.document_mappings[domain_id][doc_index] = doc_id
-
-            logger.info(f"✅ Added document {doc_id} to index for domain {domain_id}")
-            return True
+        try:
+            added = self.stores[domain_id].add(doc_ids, embeddings)
+            logger.info(f"✅ Added {added} documents to index for domain {domain_id}")
+            return added
         except Exception as e:
-            logger.error(f"❌ Error adding document to index: {e}")
+            logger.error(f"❌ Error adding documents to index: {e}")
+            return 0
+
+    def remove_document_from_index(self, domain_id: str, doc_id: str) -> bool:
+        """Tombstone a document; compaction happens in the store"""
+        if not HAS_VECTOR_LIBS or domain_id not in self.stores:
             return False
+        return self.stores[domain_id].delete(doc_id)
 
     def search_similar(
         self,
@@ -186,290 +501,84 @@ def search_similar(
         similarity_threshold: float = 0.7,
     ) -> List[Dict[str, Any]]:
         """Search for similar documents using vector similarity"""
-        if not HAS_VECTOR_LIBS or domain_id not in self.indexes:
+        if not HAS_VECTOR_LIBS or domain_id not in self.stores:
             return []
 
         try:
-            # Normalize query embedding
-            query_array = np.array([query_embedding], dtype=np.float32)
-            faiss.normalize_L2(query_array)
-
-            # Search
-            scores, indices = self.indexes[domain_id].search(query_array, max_results)
-
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx != -1 and score >= similarity_threshold:
-                    doc_id = self.document_mappings[domain_id].get(idx)
-                    if doc_id:
-                        results.append(
-                            {
-                                "document_id": doc_id,
-                                "similarity_score": float(score),
-                                "index": int(idx),
-                            }
-                        )
-
-            return results
+            return self.stores[domain_id].search(
+                query_embedding, max_results, similarity_threshold
+            )
         except Exception as e:
             logger.error(f"❌ Error searching index: {e}")
             return []
 
     def get_index_stats(self, domain_id: str) -> Dict[str, Any]:
         """Get statistics for domain index"""
-        if domain_id not in self.indexes:
+        if domain_id not in self.stores:
             return {"total_documents": 0, "dimension": self.dimension}
 
-        return {
-            "total_documents": self.indexes[domain_id].ntotal,
-            "dimension": self.dimension,
-            "index_type": "FAISS_IndexFlatIP",
-        }
-
-
-# Database setup compatible with Vertex AI
-class VertexAIDatabase:
-    def __init__(self, db_path: str = "vertex_rag.db"):
-        self.db_path = db_path
-        self.init_database()
-
-    def init_database(self):
-        """Initialize SQLite database with Vertex AI compatible schema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create documents table with Vertex AI fields
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS documents (
-                id TEXT PRIMARY KEY,
-                domain_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                doc_type TEXT DEFAULT 'general',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                embedding_id TEXT,
-                metadata TEXT DEFAULT '{}',
-                vertex_id TEXT,
-                vertex_embedding TEXT,
-                vertex_metadata TEXT DEFAULT '{}'
-            )
-        """
-        )
-
-        # Create domains table
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS domains (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                domain_type TEXT NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                vertex_config TEXT DEFAULT '{}'
-            )
-        """
-        )
-
-        # Create embeddings table for Vertex AI compatibility
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS embeddings (
-                id TEXT PRIMARY KEY,
-                document_id TEXT NOT NULL,
-                domain_id TEXT NOT NULL,
-                embedding_vector TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                vertex_embedding_id TEXT,
-                FOREIGN KEY (document_id) REFERENCES documents (id)
-            )
-        """
-        )
-
-        conn.commit()
-        conn.close()
-        logger.info("✅ Vertex AI compatible database initialized")
-
-    def add_domain(
-        self, domain_id: str, name: str, domain_type: str, description: str = ""
-    ):
-        """Add a new domain"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        vertex_config = json.dumps(
-            {
-                "embedding_model": config.embedding_model,
-                "dimension": config.vector_dimension,
-                "similarity_threshold": config.similarity_threshold,
-            }
-        )
-
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO domains (id, name, domain_type, description, vertex_config)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (domain_id, name, domain_type, description, vertex_config),
-        )
-
-        conn.commit()
-        conn.close()
-
-    def get_domains(self) -> List[Dict[str, Any]]:
-        """Get all domains"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT d.id, d.name, d.domain_type, d.description, d.created_at, d.vertex_config,
-                   COUNT(doc.id) as doc_count
-            FROM domains d
-            LEFT JOIN documents doc ON d.id = doc.domain_id
-            GROUP BY d.id, d.name, d.domain_type, d.description, d.created_at, d.vertex_config
-            ORDER BY d.created_at DESC
-        """
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        domains = []
-        for row in rows:
-            vertex_config = json.loads(row[5]) if row[5] else {}
-            domains.append(
-                {
-                    "domain_id": row[0],
-                    "domain_name": row[1],
-                    "domain_type": row[2],
-                    "description": row[3],
-                    "created_at": row[4],
-                    "documents_count": row[6],
-                    "status": "active",
-                    "vertex_config": vertex_config,
-                }
-            )
-
-        return domains
-
-    def add_document(self, doc: Document) -> str:
-        """Add document to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Serialize embeddings
-        vertex_embedding_str = (
-            json.dumps(doc.vertex_embedding) if doc.vertex_embedding else None
-        )
-
-        cursor.execute(
-            """
-            INSERT INTO documents (id, domain_id, title, content, doc_type, metadata, 
-                                vertex_id, vertex_embedding, vertex_metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                doc.id,
-                doc.domain_id,
-                doc.title,
-                doc.content,
-                doc.doc_type,
-                json.dumps(doc.metadata),
-                doc.vertex_id,
-                vertex_embedding_str,
-                json.dumps(doc.vertex_metadata),
-            ),
-        )
-
-        conn.commit()
-        conn.close()
-        return doc.id
-
-    def get_documents(self, domain_id: str) -> List[Document]:
-        """Get all documents for a domain"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, domain_id, title, content, doc_type, created_at, updated_at, 
-                   embedding_id, metadata, vertex_id, vertex_embedding, vertex_metadata
-            FROM documents WHERE domain_id = ?
-            ORDER BY created_at DESC
-        """,
-            (domain_id,),
-        )
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        documents = []
-        for row in rows:
-            vertex_embedding = json.loads(row[10]) if row[10] else None
-            doc = Document(
-                id=row[0],
-                domain_id=row[1],
-                title=row[2],
-                content=row[3],
-                doc_type=row[4],
-                created_at=datetime.fromisoformat(row[5]),
-                updated_at=datetime.fromisoformat(row[6]),
-                embedding_id=row[7],
-                metadata=json.loads(row[8]) if row[8] else {},
-                vertex_id=row[9],
-                vertex_embedding=vertex_embedding,
-                vertex_metadata=json.loads(row[11]) if row[11] else {},
-            )
-            documents.append(doc)
-
-        return documents
-
-    def get_document(self, doc_id: str) -> Optional[Document]:
-        """Get specific document"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, domain_id, title, content, doc_type, created_at, updated_at, 
-                   embedding_id, metadata, vertex_id, vertex_embedding, vertex_metadata
-            FROM documents WHERE id = ?
-        """,
-            (doc_id,),
-        )
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            vertex_embedding = json.loads(row[10]) if row[10] else None
-            return Document(
-                id=row[0],
-                domain_id=row[1],
-                title=row[2],
-                content=row[3],
-                doc_type=row[4],
-                created_at=datetime.fromisoformat(row[5]),
-                updated_at=datetime.fromisoformat(row[6]),
-                embedding_id=row[7],
-                metadata=json.loads(row[8]) if row[8] else {},
-                vertex_id=row[9],
-                vertex_embedding=vertex_embedding,
-                vertex_metadata=json.loads(row[11]) if row[11] else {},
-            )
-        return None
+        return self.stores[domain_id].stats()
+
+    def save_all(self):
+        """Persist every loaded domain index"""
+        for store in self.stores.values():
+            try:
+                store.save()
+            except Exception as e:
+                logger.error(f"❌ Error saving index for {store.domain_id}: {e}")
+
+
+def to_document(row: Dict[str, Any], has_embedding: bool = False) -> Document:
+    metadata = dict(row["metadata"])
+    vertex_metadata = metadata.pop("_vertex", {})
+    return Document(
+        id=row["id"],
+        domain_id=row["domain"],
+        title=row["title"],
+        content=row["content"],
+        doc_type=row["doc_type"] or "general",
+        created_at=datetime.fromisoformat(row["created_at"]),
+        updated_at=datetime.fromisoformat(row["updated_at"]),
+        embedding_id=row["id"] if has_embedding else None,
+        metadata=metadata,
+        vertex_id=f"vertex_{row['id']}",
+        vertex_metadata=vertex_metadata,
+    )
 
 
 # Global RAG manager with Vertex AI compatibility
 class VertexAIRAGManager:
     def __init__(self):
-        self.db = VertexAIDatabase(config.db_path)
-        self.vector_search = VertexAIVectorSearch(config.vector_dimension)
+        # documents/domains in the shared rag_core store (legacy vertex_rag.db
+        # tables are migrated on first open); FAISS stays the vector index
+        self.store = SQLiteStore(config.db_path)
+        self.retriever = Retriever(self.store)
+        self.vector_search = VertexAIVectorSearch(
+            config.vector_dimension, backfill=self.get_domain_embeddings
+        )
         self.domains: Dict[str, Dict] = {}
         self.init_test_domains()
 
+    def get_domain_embeddings(
+        self, domain_id: str, after: int = 0
+    ) -> List[Tuple[int, str, np.ndarray]]:
+        """Stored (rowid, document id, embedding) rows after `after`, for index backfill
+
+        put_vectors re-inserts a document's rows, so a re-embedded document
+        gets a new rowid and shows up past the mark again.
+        """
+        where, params = self.store.where({"domain": domain_id}, alias="d")
+        rows = self.store.query(
+            "SELECT v.rowid AS mark, v.doc_id AS doc_id, v.embedding AS embedding "
+            "FROM rag_vectors v JOIN rag_documents d ON d.id = v.doc_id "
+            f"WHERE v.rowid > ?{' AND ' + where if where else ''} ORDER BY v.rowid",
+            [after, *params],
+        )
+        return [
+            (row["mark"], row["doc_id"], np.frombuffer(bytes(row["embedding"]), dtype=np.float32))
+            for row in rows
+        ]
+
     def init_test_domains(self):
         """Initialize test domains compatible with Vertex AI"""
         test_domains = [
@@ -505,8 +614,15 @@ def init_test_domains(self):
             ),
         ]
 
+        vertex_config = {
+            "embedding_model": config.embedding_model,
+            "dimension": config.vector_dimension,
+            "similarity_threshold": config.similarity_threshold,
+        }
         for domain_id, name, domain_type, description in test_domains:
-            self.db.add_domain(domain_id, name, domain_type, description)
+            self.store.upsert_collection(
+                domain_id, domain_type, name, description, vertex_config
+            )
             self.vector_search.create_domain_index(domain_id)
 
         logger.info(f"✅ Initialized {len(test_domains)} Vertex AI compatible domains")
@@ -525,30 +641,28 @@ def add_document(
         # Generate embedding
         embedding = self.vector_search.generate_embedding(f"{title} {content}")
 
-        # Create Vertex AI compatible document
-        doc = Document(
-            id=doc_id,
-            domain_id=domain_id,
-            title=title,
-            content=content,
-            doc_type=doc_type,
-            created_at=datetime.now(),
-            updated_at=datetime.now(),
-            metadata=metadata or {},
-            vertex_id=f"vertex_{doc_id}",
-            vertex_embedding=embedding,
-            vertex_metadata={
-                "source": "local_development",
-                "embedding_model": config.embedding_model,
-                "dimension": config.vector_dimension,
-            },
+        # Add to database (Vertex AI compatible metadata rides along in metadata)
+        self.retriever.add(
+            {
+                "id": doc_id,
+                "domain": domain_id,
+                "title": title,
+                "content": content,
+                "doc_type": doc_type,
+                "metadata": {
+                    **(metadata or {}),
+                    "_vertex": {
+                        "source": "local_development",
+                        "embedding_model": config.embedding_model,
+                        "dimension": config.vector_dimension,
+                    },
+                },
+            }
         )
 
-        # Add to database
-        doc_id = self.db.add_document(doc)
-
         # Add to vector index
         if embedding:
+            self.store.put_vectors(doc_id, np.asarray([embedding], dtype=np.float32))
             self.vector_search.add_document_to_index(domain_id, doc_id, embedding)
 
         logger.info(
@@ -556,6 +670,15 @@ def add_document(
         )
         return doc_id
 
+    def delete_document(self, domain_id: str, doc_id: str) -> bool:
+        """Delete document from database and tombstone it in the index"""
+        row = self.store.get(doc_id)
+        if not row or row["domain"] != domain_id:
+            return False
+        self.retriever.delete(doc_id)
+        self.vector_search.remove_document_from_index(domain_id, doc_id)
+        return True
+
     def vector_search_documents(
         self,
         domain_id: str,
@@ -578,23 +701,14 @@ def vector_search_documents(
             domain_id, query_embedding, max_results, similarity_threshold
         )
 
-        # Get document details
+        # Get document details in one query
+        rows = self.store.get_many([r["document_id"] for r in search_results])
         results = []
         for result in search_results:
-            doc = self.db.get_document(result["document_id"])
-            if doc:
+            row = rows.get(result["document_id"])
+            if row:
                 results.append(
-                    {
-                        "document_id": doc.id,
-                        "title": doc.title,
-                        "content": doc.content,
-                        "doc_type": doc.doc_type,
-                        "similarity_score": result["similarity_score"],
-                        "created_at": doc.created_at.isoformat(),
-                        "updated_at": doc.updated_at.isoformat(),
-                        "vertex_id": doc.vertex_id,
-                        "vertex_metadata": doc.vertex_metadata,
-                    }
+                    self._result(to_document(row, True), result["similarity_score"])
                 )
 
         processing_time = (datetime.now() - start_time).total_seconds()
@@ -610,63 +724,75 @@ def vector_search_documents(
             embedding_model=config.embedding_model,
         )
 
+    @staticmethod
+    def _result(doc: Document, score: float) -> Dict[str, Any]:
+        return {
+            "document_id": doc.id,
+            "title": doc.title,
+            "content": doc.content,
+            "doc_type": doc.doc_type,
+            "similarity_score": score,
+            "created_at": doc.created_at.isoformat(),
+            "updated_at": doc.updated_at.isoformat(),
+            "vertex_id": doc.vertex_id,
+            "vertex_metadata": doc.vertex_metadata,
+        }
+
     def _fallback_text_search(
         self, domain_id: str, query: str, max_results: int
     ) -> VectorSearchResponse:
-        """Fallback text search when vector search is not available"""
-        documents = self.db.get_documents(domain_id)
-        results = []
-
-        query_words = query.lower().split()
-
-        for doc in documents:
-            content_words = doc.content.lower().split()
-            title_words = doc.title.lower().split()
-
-            # Calculate relevance score
-            content_matches = sum(1 for word in query_words if word in content_words)
-            title_matches = sum(1 for word in query_words if word in title_words)
-
-            total_matches = content_matches + (title_matches * 2)
-            relevance_score = total_matches / len(query_words) if query_words else 0
-
-            if relevance_score > 0:
-                results.append(
-                    {
-                        "document_id": doc.id,
-                        "title": doc.title,
-                        "content": doc.content,
-                        "doc_type": doc.doc_type,
-                        "similarity_score": relevance_score,
-                        "created_at": doc.created_at.isoformat(),
-                        "updated_at": doc.updated_at.isoformat(),
-                        "vertex_id": doc.vertex_id,
-                        "vertex_metadata": doc.vertex_metadata,
-                    }
-                )
-
-        # Sort by relevance
-        results.sort(key=lambda x: x["similarity_score"], reverse=True)
-        results = results[:max_results]
+        """Fallback full-text search when vector search is not available"""
+        start_time = datetime.now()
+        hits = self.retriever.search(query, k=max_results, filters={"domain": domain_id})
+        results = [self._result(to_document(hit), hit["score"]) for hit in hits]
 
         return VectorSearchResponse(
             domain_id=domain_id,
             query=query,
             results=results,
             total_results=len(results),
-            processing_time=0.001,
+            processing_time=(datetime.now() - start_time).total_seconds(),
             timestamp=datetime.now(),
             vertex_format=True,
             embedding_model="text_fallback",
         )
 
+    def get_domain(self, domain_id: str) -> Optional[Dict[str, Any]]:
+        """Get one domain"""
+        collection = self.store.collection(domain_id)
+        if not collection:
+            return None
+        return self._domain_info(collection, self.count_documents(domain_id))
+
     def get_domains(self) -> List[Dict[str, Any]]:
         """Get all domains"""
-        return self.db.get_domains()
+        counts = self.store.count_by("domain")
+        return [
+            self._domain_info(collection, counts.get(collection["id"], 0))
+            for collection in self.store.collections()
+        ]
+
+    @staticmethod
+    def _domain_info(collection: Dict[str, Any], documents_count: int) -> Dict[str, Any]:
+        return {
+            "domain_id": collection["id"],
+            "domain_name": collection["name"],
+            "domain_type": collection["kind"],
+            "description": collection["description"],
+            "created_at": collection["created_at"],
+            "documents_count": documents_count,
+            "status": "active",
+            "vertex_config": collection["config"],
+        }
 
     def get_documents(self, domain_id: str) -> List[Document]:
         """Get documents for domain"""
-        return self.db.get_documents(domain_id)
+        rows = self.store.find({"domain": domain_id})
+        embedded = self.store.vector_doc_ids({"domain": domain_id})
+        return [to_document(row, row["id"] in embedded) for row in rows]
+
+    def count_documents(self, domain_id: str) -> int:
+        return self.store.count({"domain": domain_id})
 
     def get_vector_stats(self, domain_id: str) -> Dict[str, Any]:
         """Get vector search statistics for domain"""
@@ -728,8 +854,7 @@ async def list_domains():
 @app.get("/domains/{domain_id}")
 async def get_domain(domain_id: str):
     """Get specific domain information"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -744,8 +869,7 @@ async def get_domain(domain_id: str):
 @app.get("/domains/{domain_id}/documents")
 async def get_domain_documents(domain_id: str):
     """Get all documents for a domain"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -766,7 +890,7 @@ async def get_domain_documents(domain_id: str):
                 "metadata": doc.metadata,
                 "vertex_id": doc.vertex_id,
                 "vertex_metadata": doc.vertex_metadata,
-                "has_embedding": bool(doc.vertex_embedding),
+                "has_embedding": doc.embedding_id is not None,
             }
             for doc in documents
         ],
@@ -778,8 +902,7 @@ async def get_domain_documents(domain_id: str):
 @app.post("/domains/{domain_id}/add-document")
 async def add_document(domain_id: str, request: DocumentRequest):
     """Add a new document to a domain"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -798,7 +921,7 @@ async def add_document(domain_id: str, request: DocumentRequest):
             "message": f"Document added to {domain['domain_name']} with vector embedding",
             "document_id": doc_id,
             "vertex_id": f"vertex_{doc_id}",
-            "total_documents": len(rag_manager.get_documents(domain_id)),
+            "total_documents": rag_manager.count_documents(domain_id),
             "vertex_ai_compatible": True,
         }
 
@@ -807,11 +930,29 @@ async def add_document(domain_id: str, request: DocumentRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.delete("/domains/{domain_id}/documents/{doc_id}")
+async def delete_document(domain_id: str, doc_id: str):
+    """Delete a document (index entry is tombstoned, compacted later)"""
+    if not rag_manager.delete_document(domain_id, doc_id):
+        raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
+
+    return {
+        "status": "success",
+        "document_id": doc_id,
+        "vector_stats": rag_manager.get_vector_stats(domain_id),
+    }
+
+
+@app.on_event("shutdown")
+async def save_indexes():
+    """Persist domain indexes on shutdown"""
+    rag_manager.vector_search.save_all()
+
+
 @app.post("/domains/{domain_id}/vector-search", response_model=VectorSearchResponse)
 async def vector_search_documents(domain_id: str, request: VectorSearchRequest):
     """Perform vector search compatible with Vertex AI"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")
@@ -832,8 +973,7 @@ async def vector_search_documents(domain_id: str, request: VectorSearchRequest):
 @app.get("/domains/{domain_id}/vector-stats")
 async def get_vector_stats(domain_id: str):
     """Get vector search statistics for domain"""
-    domains = rag_manager.get_domains()
-    domain = next((d for d in domains if d["domain_id"] == domain_id), None)
+    domain = rag_manager.get_domain(domain_id)
 
     if not domain:
         raise HTTPException(status_code=404, detail=f"Domain {domain_id} not found")